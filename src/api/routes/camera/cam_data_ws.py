@@ -2,7 +2,6 @@ import logging
 import time
 from datetime import datetime
 
-import cv2
 import numpy as np
 from fastapi import APIRouter, WebSocket
 
@@ -14,6 +13,9 @@ cam_ws_router = APIRouter()
 
 
 async def websocket_send(web_socket: WebSocket, input_payload: FramePayload):
+    # OpenCV only gets imported once a frame needs encoding, so the server starts fast
+    import cv2
+
     if not input_payload.success:
         return
     success, frame = cv2.imencode(".png", input_payload.image)
@@ -24,6 +26,8 @@ async def websocket_send(web_socket: WebSocket, input_payload: FramePayload):
 
 @cam_ws_router.websocket("/ws/hello_world")
 async def preview_webcam(web_socket: WebSocket):
+    import cv2
+
     await web_socket.accept()
     while True:
         last_read = time.perf_counter()
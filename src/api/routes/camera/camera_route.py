@@ -1,12 +1,10 @@
 import logging
 
-import cv2
 from fastapi import APIRouter
 from pydantic import BaseModel
 
 from src.api.services.user_config import UserConfigService, WebcamConfigModel
 from src.cameras.detection.cam_singleton import get_or_create_cams
-from src.cameras.multicam_manager.cv_camera_manager import OpenCVCameraManager
 
 camera_router = APIRouter()
 
@@ -27,6 +25,11 @@ async def config_cam(webcam_config_model: WebcamConfigModel, session_id):
 async def show_camera(
     webcam_id: str, camera_preview_model: CameraPreviewModel = CameraPreviewModel()
 ):
+    # OpenCV only gets imported once a camera is needed, so the server starts fast
+    import cv2
+
+    from src.cameras.multicam_manager.cv_camera_manager import OpenCVCameraManager
+
     cv_cam_manager = OpenCVCameraManager(session_id=camera_preview_model.session_id)
     with cv_cam_manager.start_capture_session_single_cam(
         webcam_id
@@ -50,6 +53,10 @@ async def show_camera(
 async def cv2_imshow_all_camera(
     camera_preview_model: CameraPreviewModel = CameraPreviewModel(),
 ):
+    import cv2
+
+    from src.cameras.multicam_manager.cv_camera_manager import OpenCVCameraManager
+
     cv_cam_manager = OpenCVCameraManager(session_id=camera_preview_model.session_id)
     with cv_cam_manager.start_capture_session_all_cams() as connected_cameras_dict:
         logger.info(f"Available cameras: {connected_cameras_dict}")
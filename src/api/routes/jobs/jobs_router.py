@@ -0,0 +1,65 @@
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from src.api.services.session_processing_jobs import get_session_processing_job_queue
+
+logger = logging.getLogger(__name__)
+
+jobs_router = APIRouter()
+
+
+class NumberOfWorkersModel(BaseModel):
+    # how many processing jobs can run at the same time
+    number_of_workers: int = 1
+
+
+@jobs_router.on_event("startup")
+async def start_processing_job_queue():
+    # picks the jobs that didn't finish last time back up
+    get_session_processing_job_queue().start()
+
+
+@jobs_router.on_event("shutdown")
+async def stop_processing_job_queue():
+    get_session_processing_job_queue().stop()
+
+
+@jobs_router.get("/jobs")
+async def get_processing_jobs(status: Optional[str] = None) -> List[dict]:
+    """every job (oldest first), optionally only the ones with a given `status` (queued/running/succeeded/failed/cancelled)"""
+    return get_session_processing_job_queue().get_jobs(status=status)
+
+
+@jobs_router.get("/jobs/{job_id}")
+async def get_processing_job(job_id: str) -> dict:
+    """the job's status, progress, per-stage timings and (once it's done) its result or error"""
+    try:
+        return get_session_processing_job_queue().get_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No job with id: {job_id}")
+
+
+@jobs_router.post("/jobs/{job_id}/cancel")
+async def cancel_processing_job(job_id: str) -> dict:
+    try:
+        return get_session_processing_job_queue().cancel_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No job with id: {job_id}")
+
+
+@jobs_router.post("/jobs/number_of_workers")
+async def set_number_of_processing_workers(
+    number_of_workers_model: NumberOfWorkersModel,
+) -> NumberOfWorkersModel:
+    try:
+        get_session_processing_job_queue().set_number_of_workers(
+            number_of_workers_model.number_of_workers
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    return NumberOfWorkersModel(
+        number_of_workers=get_session_processing_job_queue().number_of_workers
+    )
@@ -1,33 +1,16 @@
 import logging
-import traceback
-from pathlib import Path
 from typing import Optional, Union
 
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from jon_scratch.pupil_calibration_pipeline.qt_gl_laser_skeleton_visualizer import (
-    QtGlLaserSkeletonVisualizer,
-)
-from src.cameras.launch_camera_frame_loop import launch_camera_frame_loop
-from src.cameras.multicam_manager.cv_camera_manager import OpenCVCameraManager
+from src.api.services.session_processing_jobs import get_session_processing_job_queue
 from src.config.home_dir import (
     create_default_session_id,
     get_session_folder_path,
     get_most_recent_session_id,
     create_session_folder,
 )
-from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
-    MediaPipeSkeletonDetector,
-)
-from src.pipelines.calibration_pipeline.calibration_pipeline_orchestrator import (
-    CalibrationPipelineOrchestrator,
-)
-from src.pipelines.session_pipeline.session_pipeline_orchestrator import (
-    SessionPipelineOrchestrator,
-    load_mediapipe3d_skeleton_data,
-    load_mediapipe2d_data,
-)
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +39,6 @@ class SessionCalibrateModel(TweakedPydanticBaseModel):
 
     session_id: str = None
     webcam_configs_dict: dict = None
-    opencv_camera_manager: OpenCVCameraManager = None
     charuco_square_size: Union[int, float] = 39
 
 
@@ -71,6 +53,22 @@ class SessionIdModel(BaseModel):
     session_id: str = None
 
 
+class SessionExportToBlenderModel(BaseModel):
+    session_id: str = None
+    blender_exe_path: str = (
+        None  # `None` means our best guess of where Blender is installed
+    )
+    timeout_seconds: Optional[float] = 3600
+
+
+class ProcessingJobSubmittedResponse(BaseModel):
+    """the job runs in the background - check on it with `GET /jobs/{job_id}`"""
+
+    job_id: str
+    session_id: str
+    status: str
+
+
 @session_router.post("/session/create")
 async def create_session(
     session_create_model: SessionCreateModel = SessionCreateModel(),
@@ -89,42 +87,31 @@ async def create_session(
 @session_router.post("/session/calibrate")
 def calibrate_session(
     session_calibrate_model: SessionCalibrateModel = SessionCalibrateModel(),
-):
+) -> ProcessingJobSubmittedResponse:
     """calibate start volume - record synchronized videos (from all available camras wtih default parameters for now) and process with Anipose to produce a camera calibration (saved as a `.toml` file in the session folder"""
 
     session_id = session_calibrate_model.session_id
     if session_id is None or session_id == "string":
         session_id = get_most_recent_session_id()
 
-    calibration_orchestrator = CalibrationPipelineOrchestrator(session_id)
-
-    # calibration_orchestrator.record_videos(show_visualizer_gui=False,
-    #                                        save_video_in_frame_loop=False,
-    #                                        show_camera_views_in_windows=True,
-    #                                        )
-
-    launch_camera_frame_loop(
-        session_id=session_id,
-        webcam_configs_dict=session_calibrate_model.webcam_configs_dict,
-        show_camera_views_in_windows=True,
-        calibration_videos_bool=True,
-        detect_charuco_in_image=True,
+    job = get_session_processing_job_queue().submit_job(
+        "calibrate_session",
+        parameters={
+            "session_id": session_id,
+            "webcam_configs_dict": session_calibrate_model.webcam_configs_dict,
+            "charuco_square_size": session_calibrate_model.charuco_square_size,
+        },
+    )
+    return ProcessingJobSubmittedResponse(
+        job_id=job["job_id"], session_id=session_id, status=job["status"]
     )
-
-    try:
-        calibration_orchestrator.run_anipose_camera_calibration(
-            charuco_square_size=session_calibrate_model.charuco_square_size,
-            pin_camera_0_to_origin=True,
-        )
-    except:
-        logger.error("Printing Traceback")
-        traceback.print_exc()
-
-    return calibration_orchestrator
 
 
 @session_router.post("/session/record")
 def record_session(session_record_model: SessionRecordModel = SessionRecordModel()):
+    # the camera stuff only gets imported once it's needed, so the server starts fast
+    from src.cameras.launch_camera_frame_loop import launch_camera_frame_loop
+
     launch_camera_frame_loop(
         session_id=session_record_model.session_id,
         webcam_configs_dict=session_record_model.webcam_configs_dict,
@@ -137,7 +124,7 @@ def record_session(session_record_model: SessionRecordModel = SessionRecordModel
 @session_router.post("/session/mediapipe_track_skeletons_offline")
 def mediapipe_track_2D_skeletons_offline(
     session_id_model: SessionIdModel = SessionIdModel(),
-):
+) -> ProcessingJobSubmittedResponse:
     if session_id_model.session_id is None or session_id_model.session_id == "string":
         this_session_id = get_most_recent_session_id()
         logger.info(f"loading most recent session:{this_session_id}")
@@ -145,27 +132,62 @@ def mediapipe_track_2D_skeletons_offline(
         this_session_id = session_id_model.session_id
 
     logger.info(
-        f"tracking 2D mediapipe skeletons in videos from session: {this_session_id}"
+        f"queueing 2D mediapipe skeleton tracking in videos from session: {this_session_id}"
+    )
+    job = get_session_processing_job_queue().submit_job(
+        "mediapipe_track_skeletons_offline",
+        parameters={"session_id": this_session_id},
+    )
+    return ProcessingJobSubmittedResponse(
+        job_id=job["job_id"], session_id=this_session_id, status=job["status"]
     )
-    mediapipe_skeleton_detector = MediaPipeSkeletonDetector(this_session_id)
-    mediapipe_skeleton_detector.process_session_folder()
 
 
 @session_router.post("/session/reconstruct_mediapipe3d_offline")
-def mediapipe_reconstruct_3D_skeletons_offline(session_id_model: SessionIdModel = None):
-    if session_id_model is None or session_id_model.session_id == "string":
+def mediapipe_reconstruct_3D_skeletons_offline(
+    session_id_model: SessionIdModel = None,
+) -> ProcessingJobSubmittedResponse:
+    if session_id_model is None or session_id_model.session_id in (None, "string"):
         session_id = get_most_recent_session_id()
     else:
         session_id = session_id_model.session_id
 
-    this_session_orchestrator = SessionPipelineOrchestrator(session_id=session_id)
-    this_session_orchestrator.anipose_camera_calibration_object = (
-        CalibrationPipelineOrchestrator().load_calibration_from_session_id(session_id)
+    job = get_session_processing_job_queue().submit_job(
+        "reconstruct_mediapipe_3d_offline", parameters={"session_id": session_id}
+    )
+    return ProcessingJobSubmittedResponse(
+        job_id=job["job_id"], session_id=session_id, status=job["status"]
+    )
+
+
+@session_router.post("/session/export_to_blender")
+def export_session_to_blender(
+    session_export_to_blender_model: SessionExportToBlenderModel = SessionExportToBlenderModel(),
+) -> ProcessingJobSubmittedResponse:
+    """runs Blender in the background - its progress shows up on the job, and cancelling the job stops Blender"""
+    from src.blender_stuff.get_best_guess_of_blender_path import (
+        get_best_guess_of_blender_path,
     )
-    this_session_orchestrator.mediapipe2d_numCams_numFrames_numTrackedPoints_XY = (
-        load_mediapipe2d_data(session_id)
+
+    session_id = session_export_to_blender_model.session_id
+    if session_id is None or session_id == "string":
+        session_id = get_most_recent_session_id()
+
+    blender_exe_path = session_export_to_blender_model.blender_exe_path
+    if blender_exe_path is None or blender_exe_path == "string":
+        blender_exe_path = get_best_guess_of_blender_path()
+
+    job = get_session_processing_job_queue().submit_job(
+        "export_to_blender",
+        parameters={
+            "session_id": session_id,
+            "blender_exe_path": str(blender_exe_path),
+            "timeout_seconds": session_export_to_blender_model.timeout_seconds,
+        },
+    )
+    return ProcessingJobSubmittedResponse(
+        job_id=job["job_id"], session_id=session_id, status=job["status"]
     )
-    this_session_orchestrator.reconstruct3d_from_2d_data_offline()
 
 
 @session_router.post("/session/visualize_offline")
@@ -175,6 +197,14 @@ def visualize_session_offline(session_id_model: SessionIdModel = None):
     else:
         session_id = session_id_model.session_id
 
+    # the visualizer (Qt, OpenGL, mediapipe...) only gets imported once it's needed, so the server starts fast
+    from src.pipelines.session_pipeline.session_pipeline_orchestrator import (
+        load_mediapipe3d_skeleton_data,
+    )
+    from src.pupil_labs_stuff.qt_gl_laser_skeleton_visualizer import (
+        QtGlLaserSkeletonVisualizer,
+    )
+
     mediapipe3d_data_payload = load_mediapipe3d_skeleton_data(session_id)
 
     mediapipe3d_skeleton_nFrames_nTrajectories_xyz = (
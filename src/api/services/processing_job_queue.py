@@ -0,0 +1,476 @@
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple, Union
+
+from src.config.home_dir import PERFORMANCE_REPORTS_FOLDER_NAME
+from src.core_processes.utils.performance_recorder import (
+    PerformanceRecorder,
+    measure_performance,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CANCELLED = "cancelled"
+FINISHED_JOB_STATUSES = (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED, JOB_STATUS_CANCELLED)
+
+DEFAULT_NUMBER_OF_PROCESSING_WORKERS = 1
+
+
+class ProcessingJobProgressReporter:
+    """
+    Handed to the job function (which runs in a worker process), so it can say how far along it is.
+
+        def my_job(parameters: dict, progress_reporter: ProcessingJobProgressReporter) -> dict:
+            with progress_reporter.stage("triangulation"):
+                ...
+            progress_reporter.report_progress(0.5, "done triangulating")
+    """
+
+    def __init__(self, job_id: str, message_connection):
+        self._job_id = job_id
+        self._message_connection = message_connection
+
+    @property
+    def job_id(self) -> str:
+        return self._job_id
+
+    def report_progress(
+        self, fraction_done: Optional[float] = None, message: Optional[str] = None
+    ):
+        self._message_connection.send(
+            ("progress", {"fraction_done": fraction_done, "message": message})
+        )
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        """times a stage of the job (it also shows up in the job's performance report)"""
+        self._message_connection.send(("stage_started", stage_name))
+        stage_start_time = time.perf_counter()
+        with measure_performance(stage_name):
+            yield
+        self._message_connection.send(
+            (
+                "stage_finished",
+                {
+                    "stage_name": stage_name,
+                    "wall_time_seconds": time.perf_counter() - stage_start_time,
+                },
+            )
+        )
+
+
+class _ProcessingJobStopped(BaseException):
+    """raised in a worker when the queue stops it (cancelled, or the queue shutting down)"""
+
+
+def _raise_processing_job_stopped(signal_number, frame):
+    raise _ProcessingJobStopped()
+
+
+def _run_processing_job(
+    job_function: Callable[[dict, ProcessingJobProgressReporter], Any],
+    job_id: str,
+    parameters: dict,
+    message_connection,
+    performance_reports_folder_path: str,
+):
+    """runs in the worker process - whatever happens, the last message says how the job went"""
+    # the queue stops a worker with `terminate` - turning that into an exception lets the job clean up after itself
+    # on the way out (e.g. a Blender export stops its Blender). On windows `terminate` can't be caught, so it can't there
+    signal.signal(signal.SIGTERM, _raise_processing_job_stopped)
+
+    progress_reporter = ProcessingJobProgressReporter(job_id, message_connection)
+    performance_recorder = PerformanceRecorder(run_name=job_id)
+    try:
+        try:
+            with performance_recorder:
+                result = job_function(parameters, progress_reporter)
+        finally:
+            performance_recorder.save_report(performance_reports_folder_path)
+        message_connection.send((JOB_STATUS_SUCCEEDED, result))
+    except _ProcessingJobStopped:
+        # the queue already knows, and isn't listening anymore
+        return
+    except BaseException as error:
+        message_connection.send(
+            (
+                JOB_STATUS_FAILED,
+                {
+                    "error": f"{type(error).__name__}: {error}",
+                    "traceback": traceback.format_exc(),
+                },
+            )
+        )
+
+
+class ProcessingJobQueue:
+    """
+    Runs long processing jobs (calibration, 2d tracking, 3d reconstruction, ...) in worker processes, so whoever
+    submits them (i.e. the api routes) gets a job id back straight away and can check in on it later.
+
+    `job_functions` maps each job type to a (top level, so it can be pickled) function that takes the job's
+    `parameters` (a json-able dict) and a `ProcessingJobProgressReporter`, and returns a json-able result.
+    At most `number_of_workers` jobs run at the same time, the rest wait in line.
+
+    Every job is saved as a json file in `jobs_folder_path`, so the queue survives a restart - jobs that were still
+    waiting stay in line, and jobs that were running when the server went down get queued up again if their type is
+    in `resumable_job_types` (the session stage cache lets them pick up where they left off). The rest (e.g. a
+    calibration, which would grab the cameras and record over the calibration videos) fail as interrupted
+    """
+
+    def __init__(
+        self,
+        jobs_folder_path: Union[str, Path],
+        job_functions: Dict[str, Callable[[dict, ProcessingJobProgressReporter], Any]],
+        number_of_workers: int = DEFAULT_NUMBER_OF_PROCESSING_WORKERS,
+        resumable_job_types: Collection[str] = (),
+    ):
+        self._jobs_folder_path = Path(jobs_folder_path)
+        self._job_functions = job_functions
+        self._resumable_job_types = set(resumable_job_types)
+        self._number_of_workers = number_of_workers
+
+        self._jobs: Dict[str, dict] = {}
+        self._worker_processes: Dict[str, multiprocessing.Process] = {}
+        # each worker gets its own pipe, so killing one (i.e. cancelling its job) can't jam the others
+        self._worker_message_connections: Dict[
+            str, multiprocessing.connection.Connection
+        ] = {}
+        self._lock = threading.RLock()
+        self._job_finished_condition = threading.Condition(self._lock)
+
+        # `spawn` so the workers don't inherit the server's threads (and it's what windows does anyway)
+        self._multiprocessing_context = multiprocessing.get_context("spawn")
+        self._stop_event = threading.Event()
+        self._dispatcher_thread = None
+
+    @property
+    def number_of_workers(self) -> int:
+        return self._number_of_workers
+
+    def set_number_of_workers(self, number_of_workers: int):
+        """takes effect as jobs start - jobs that are already running get to finish"""
+        if number_of_workers < 1:
+            logger.error(f"Need at least one worker, got: {number_of_workers}")
+            raise ValueError(f"Need at least one worker, got: {number_of_workers}")
+        with self._lock:
+            self._number_of_workers = number_of_workers
+
+    @property
+    def is_running(self) -> bool:
+        return self._dispatcher_thread is not None
+
+    def start(self):
+        if self.is_running:
+            return
+        self._jobs_folder_path.mkdir(exist_ok=True, parents=True)
+        self._load_jobs()
+        self._stop_event.clear()
+        self._dispatcher_thread = threading.Thread(
+            target=self._dispatch_jobs, name="processing_job_dispatcher", daemon=True
+        )
+        self._dispatcher_thread.start()
+        logger.info(
+            f"Started processing job queue with {self._number_of_workers} worker(s), jobs are saved in: {self._jobs_folder_path}"
+        )
+
+    def stop(self):
+        """stops the running jobs without marking them as done, so they start over the next time the queue starts"""
+        if not self.is_running:
+            return
+        self._stop_event.set()
+        self._dispatcher_thread.join()
+        self._dispatcher_thread = None
+        with self._lock:
+            worker_processes = {
+                job_id: self._remove_worker(job_id)
+                for job_id in list(self._worker_processes)
+            }
+        for job_id, worker_process in worker_processes.items():
+            logger.info(f"Stopping job {job_id}")
+            self._wait_for_worker_to_exit(worker_process)
+
+    def submit_job(self, job_type: str, parameters: Optional[dict] = None) -> dict:
+        if job_type not in self._job_functions:
+            logger.error(
+                f"Unknown job type: {job_type} (known job types: {list(self._job_functions)})"
+            )
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job_id = (
+            f"{job_type}_{time.strftime('%Y-%m-%d_%H_%M_%S')}_{uuid.uuid4().hex[:8]}"
+        )
+        job = {
+            "job_id": job_id,
+            "job_type": job_type,
+            "parameters": parameters or {},
+            "status": JOB_STATUS_QUEUED,
+            "fraction_done": 0.0,
+            "progress_message": None,
+            "current_stage": None,
+            "stage_timings": [],
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "number_of_times_resumed": 0,
+            "result": None,
+            "error": None,
+            "traceback": None,
+            "performance_reports_folder_path": None,
+        }
+        # make sure the parameters can be saved before it goes in line
+        json.dumps(job)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save_job(job)
+        logger.info(f"Queued job: {job_id}")
+        return dict(job)
+
+    def get_job(self, job_id: str) -> dict:
+        with self._lock:
+            if job_id not in self._jobs:
+                logger.error(f"No job with id: {job_id}")
+                raise KeyError(job_id)
+            return dict(self._jobs[job_id])
+
+    def get_jobs(self, status: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [
+                dict(job)
+                for job in sorted(self._jobs.values(), key=lambda job: job["created"])
+                if status is None or job["status"] == status
+            ]
+
+    def cancel_job(self, job_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                logger.error(f"No job with id: {job_id}")
+                raise KeyError(job_id)
+            if job["status"] in FINISHED_JOB_STATUSES:
+                return dict(job)
+
+            worker_process = None
+            if job_id in self._worker_processes:
+                logger.info(f"Cancelling running job: {job_id}")
+                worker_process = self._remove_worker(job_id)
+            self._finish_job(job, JOB_STATUS_CANCELLED)
+            job = dict(job)
+        if worker_process is not None:
+            self._wait_for_worker_to_exit(worker_process)
+        return job
+
+    def wait_for_job(self, job_id: str, timeout: Optional[float] = None) -> dict:
+        """blocks until the job is done (or `timeout` seconds go by) and returns it"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self.get_job(job_id)["status"] not in FINISHED_JOB_STATUSES:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._job_finished_condition.wait(remaining)
+            return self.get_job(job_id)
+
+    def _get_job_file_path(self, job_id: str) -> Path:
+        return self._jobs_folder_path / f"{job_id}.json"
+
+    def _save_job(self, job: dict):
+        # write-then-rename, so a crash never leaves half a job file behind
+        job_file_path = self._get_job_file_path(job["job_id"])
+        temporary_file_path = job_file_path.with_suffix(".json.tmp")
+        temporary_file_path.write_text(json.dumps(job, indent=4))
+        os.replace(temporary_file_path, job_file_path)
+
+    def _load_jobs(self):
+        with self._lock:
+            for job_file_path in sorted(self._jobs_folder_path.glob("*.json")):
+                try:
+                    job = json.loads(job_file_path.read_text())
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable job file: {job_file_path}")
+                    continue
+
+                if (
+                    job["status"] == JOB_STATUS_RUNNING
+                    and job["job_type"] in self._resumable_job_types
+                ):
+                    logger.info(
+                        f"Job {job['job_id']} was running when the queue stopped, queueing it up again"
+                    )
+                    job["status"] = JOB_STATUS_QUEUED
+                    job["current_stage"] = None
+                    job["number_of_times_resumed"] += 1
+                    self._save_job(job)
+                elif job["status"] == JOB_STATUS_RUNNING:
+                    job[
+                        "error"
+                    ] = f"Interrupted - the queue stopped while it was running, and {job['job_type']} jobs don't get re-run on their own"
+                    logger.warning(f"Job {job['job_id']}: {job['error']}")
+                    self._finish_job(job, JOB_STATUS_FAILED)
+
+                if (
+                    job["status"] == JOB_STATUS_QUEUED
+                    and job["job_type"] not in self._job_functions
+                ):
+                    job["error"] = f"Unknown job type: {job['job_type']}"
+                    self._finish_job(job, JOB_STATUS_FAILED)
+                self._jobs[job["job_id"]] = job
+
+    def _dispatch_jobs(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                message_connections = list(self._worker_message_connections.values())
+            if message_connections:
+                ready_connections = multiprocessing.connection.wait(
+                    message_connections, timeout=0.1
+                )
+            else:
+                ready_connections = []
+                self._stop_event.wait(0.1)
+
+            finished_workers = []
+            with self._lock:
+                for job_id, message_connection in list(
+                    self._worker_message_connections.items()
+                ):
+                    if message_connection in ready_connections:
+                        finished_worker = self._handle_worker_messages(
+                            job_id, message_connection
+                        )
+                        if finished_worker is not None:
+                            finished_workers.append(finished_worker)
+                self._start_queued_jobs()
+
+            # waiting for the workers to exit happens outside of the lock, so the api routes never wait on it
+            for job_id, worker_process, worker_crashed in finished_workers:
+                exit_code = self._wait_for_worker_to_exit(worker_process, kill=False)
+                if worker_crashed:
+                    with self._lock:
+                        job = self._jobs[job_id]
+                        if job["status"] not in FINISHED_JOB_STATUSES:
+                            job[
+                                "error"
+                            ] = f"Worker process exited with code {exit_code} before the job finished"
+                            logger.error(f"Job {job_id} failed: {job['error']}")
+                            self._finish_job(job, JOB_STATUS_FAILED)
+
+    def _handle_worker_messages(
+        self, job_id: str, message_connection: multiprocessing.connection.Connection
+    ) -> Optional[Tuple[str, multiprocessing.Process, bool]]:
+        """
+        `(job_id, worker_process, worker_crashed)` if the worker is done (it's already out of the job tables,
+        waiting for it to exit is up to the caller), else `None`
+        """
+        try:
+            while message_connection.poll():
+                if self._handle_worker_message(job_id, *message_connection.recv()):
+                    return job_id, self._remove_worker(job_id), False
+        except (EOFError, OSError):
+            # the worker is gone - if it didn't say how its job went, it crashed
+            return job_id, self._remove_worker(job_id), True
+        return None
+
+    def _handle_worker_message(
+        self, job_id: str, message_type: str, payload: Any
+    ) -> bool:
+        """whether the job is done"""
+        job = self._jobs[job_id]
+        if job["status"] != JOB_STATUS_RUNNING:
+            return False
+
+        if message_type == "progress":
+            if payload["fraction_done"] is not None:
+                job["fraction_done"] = payload["fraction_done"]
+            if payload["message"] is not None:
+                job["progress_message"] = payload["message"]
+        elif message_type == "stage_started":
+            job["current_stage"] = payload
+        elif message_type == "stage_finished":
+            job["current_stage"] = None
+            job["stage_timings"].append(payload)
+        elif message_type == JOB_STATUS_SUCCEEDED:
+            job["fraction_done"] = 1.0
+            job["result"] = payload
+        elif message_type == JOB_STATUS_FAILED:
+            logger.error(f"Job {job_id} failed: {payload['error']}")
+            job["error"] = payload["error"]
+            job["traceback"] = payload["traceback"]
+
+        if message_type in FINISHED_JOB_STATUSES:
+            self._finish_job(job, message_type)
+            return True
+        self._save_job(job)
+        return False
+
+    def _start_queued_jobs(self):
+        for job in self.get_jobs(status=JOB_STATUS_QUEUED):
+            if len(self._worker_processes) >= self._number_of_workers:
+                return
+            job = self._jobs[job["job_id"]]
+            job["status"] = JOB_STATUS_RUNNING
+            job["started"] = time.time()
+            job["performance_reports_folder_path"] = str(
+                self._jobs_folder_path / PERFORMANCE_REPORTS_FOLDER_NAME
+            )
+            self._save_job(job)
+
+            logger.info(f"Starting job: {job['job_id']}")
+            (
+                receiving_connection,
+                sending_connection,
+            ) = self._multiprocessing_context.Pipe(duplex=False)
+            # not a daemon, so jobs can start processes of their own
+            worker_process = self._multiprocessing_context.Process(
+                target=_run_processing_job,
+                args=(
+                    self._job_functions[job["job_type"]],
+                    job["job_id"],
+                    job["parameters"],
+                    sending_connection,
+                    str(self._jobs_folder_path),
+                ),
+                name=f"processing_job_{job['job_id']}",
+            )
+            worker_process.start()
+            # only the worker should hold the sending end, so we hear about it when the worker goes away
+            sending_connection.close()
+            self._worker_processes[job["job_id"]] = worker_process
+            self._worker_message_connections[job["job_id"]] = receiving_connection
+
+    def _remove_worker(self, job_id: str) -> multiprocessing.Process:
+        """takes the job's worker out of the job tables (with `self._lock` held) - then wait for it to exit without the lock"""
+        self._worker_message_connections.pop(job_id).close()
+        return self._worker_processes.pop(job_id)
+
+    @staticmethod
+    def _wait_for_worker_to_exit(
+        worker_process: multiprocessing.Process, kill: bool = True
+    ) -> Optional[int]:
+        """returns the worker's exit code - `kill=False` gives a worker that's done with its job a moment to exit"""
+        if not kill:
+            worker_process.join(timeout=5)
+        if worker_process.is_alive():
+            worker_process.terminate()
+            worker_process.join()
+        return worker_process.exitcode
+
+    def _finish_job(self, job: dict, status: str):
+        job["status"] = status
+        job["current_stage"] = None
+        job["finished"] = time.time()
+        self._save_job(job)
+        self._job_finished_condition.notify_all()
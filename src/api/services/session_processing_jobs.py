@@ -0,0 +1,193 @@
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from src.api.services.processing_job_queue import (
+    DEFAULT_NUMBER_OF_PROCESSING_WORKERS,
+    ProcessingJobProgressReporter,
+    ProcessingJobQueue,
+)
+from src.config.home_dir import (
+    MEDIAPIPE_2D_NPY_FILE_NAME,
+    get_processing_jobs_folder_path,
+    get_raw_data_folder_path,
+    get_session_folder_path,
+    get_synchronized_videos_folder_path,
+)
+from src.core_processes.batch_processing.session_processing_parameter_models import (
+    AniposeTriangulate3DParametersModel,
+    BlenderExportParametersModel,
+    MediaPipe2DParametersModel,
+)
+
+logger = logging.getLogger(__name__)
+
+# these run in the job queue's worker processes, so they only get json-able `parameters` and return json-able results.
+# the heavy stuff (cameras, mediapipe, anipose...) gets imported inside of them, so only the worker that needs it pays for it
+
+
+def calibrate_session_job(
+    parameters: dict, progress_reporter: ProcessingJobProgressReporter
+) -> dict:
+    from src.cameras.launch_camera_frame_loop import launch_camera_frame_loop
+    from src.pipelines.calibration_pipeline.calibration_pipeline_orchestrator import (
+        CalibrationPipelineOrchestrator,
+    )
+
+    session_id = parameters["session_id"]
+    calibration_orchestrator = CalibrationPipelineOrchestrator(session_id)
+
+    with progress_reporter.stage("record_calibration_videos"):
+        launch_camera_frame_loop(
+            session_id=session_id,
+            webcam_configs_dict=parameters.get("webcam_configs_dict"),
+            show_camera_views_in_windows=True,
+            calibration_videos_bool=True,
+            detect_charuco_in_image=True,
+        )
+    progress_reporter.report_progress(0.5, "Recorded calibration videos")
+
+    with progress_reporter.stage("anipose_camera_calibration"):
+        calibration_orchestrator.run_anipose_camera_calibration(
+            charuco_square_size=parameters["charuco_square_size"],
+            pin_camera_0_to_origin=True,
+            progress_callback=lambda message: progress_reporter.report_progress(
+                message=message
+            ),
+        )
+    return {"session_id": session_id}
+
+
+def mediapipe_track_skeletons_offline_job(
+    parameters: dict, progress_reporter: ProcessingJobProgressReporter
+) -> dict:
+    from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
+        MediaPipeSkeletonDetector,
+    )
+
+    session_id = parameters["session_id"]
+    raw_data_folder_path = get_raw_data_folder_path(session_id)
+
+    with progress_reporter.stage("mediapipe_2d_skeleton_detection"):
+        mediapipe_skeleton_detector = MediaPipeSkeletonDetector(
+            parameter_model=MediaPipe2DParametersModel()
+        )
+        mediapipe_skeleton_detector.process_folder_full_of_videos(
+            get_synchronized_videos_folder_path(session_id, create_folder=False),
+            raw_data_folder_path,
+        )
+    return {
+        "session_id": session_id,
+        "mediapipe_2d_npy_path": str(
+            Path(raw_data_folder_path) / MEDIAPIPE_2D_NPY_FILE_NAME
+        ),
+    }
+
+
+def reconstruct_mediapipe_3d_offline_job(
+    parameters: dict, progress_reporter: ProcessingJobProgressReporter
+) -> dict:
+    from src.core_processes.capture_volume_calibration.triangulate_3d_data import (
+        triangulate_3d_data,
+    )
+    from src.pipelines.calibration_pipeline.calibration_pipeline_orchestrator import (
+        CalibrationPipelineOrchestrator,
+    )
+
+    session_id = parameters["session_id"]
+    raw_data_folder_path = get_raw_data_folder_path(session_id)
+    anipose_triangulate_3d_parameters = AniposeTriangulate3DParametersModel()
+
+    with progress_reporter.stage("load_data"):
+        anipose_calibration_object = (
+            CalibrationPipelineOrchestrator().load_calibration_from_session_id(
+                session_id
+            )
+        )
+        # copy-on-write, because the confidence thresholding edits it in place
+        mediapipe_2d_data = np.load(
+            str(Path(raw_data_folder_path) / MEDIAPIPE_2D_NPY_FILE_NAME),
+            mmap_mode="c",
+        )
+    progress_reporter.report_progress(0.1, "Loaded calibration and 2d data")
+
+    with progress_reporter.stage("triangulation"):
+        triangulate_3d_data(
+            anipose_calibration_object=anipose_calibration_object,
+            mediapipe_2d_data=mediapipe_2d_data,
+            output_data_folder_path=raw_data_folder_path,
+            mediapipe_confidence_cutoff_threshold=anipose_triangulate_3d_parameters.confidence_threshold_cutoff,
+            use_triangulate_ransac=anipose_triangulate_3d_parameters.use_triangulate_ransac_method,
+        )
+    return {"session_id": session_id, "raw_data_folder_path": raw_data_folder_path}
+
+
+def export_to_blender_job(
+    parameters: dict, progress_reporter: ProcessingJobProgressReporter
+) -> dict:
+    """cancelling the job stops Blender too (see `BlenderExportProcess`)"""
+    from src.blender_stuff.blender_export_process import (
+        BLENDER_EXPORT_STATUS_SUCCEEDED,
+    )
+    from src.blender_stuff.create_blend_file_from_session_data import (
+        create_blend_file_from_session_data,
+    )
+
+    session_id = parameters["session_id"]
+
+    def report_blender_progress(progress: dict):
+        progress_reporter.report_progress(
+            message=f"{progress['stage']} - frame {progress['frames_done']} of {progress['total_frames']}"
+        )
+
+    with progress_reporter.stage("blender_export"):
+        blender_export_result = create_blend_file_from_session_data(
+            session_folder_path=get_session_folder_path(session_id),
+            blender_exe_path=parameters["blender_exe_path"],
+            timeout_seconds=parameters.get(
+                "timeout_seconds", BlenderExportParametersModel().timeout_seconds
+            ),
+            progress_callback=report_blender_progress,
+        )
+    if blender_export_result is None:
+        raise FileNotFoundError(
+            f"Could not find the blender executable at {parameters['blender_exe_path']}"
+        )
+    if blender_export_result["status"] != BLENDER_EXPORT_STATUS_SUCCEEDED:
+        raise RuntimeError(
+            f"Blender export {blender_export_result['status']} - see {blender_export_result['log_file_path']}"
+        )
+    return {"session_id": session_id, **blender_export_result}
+
+
+session_processing_job_functions = {
+    "calibrate_session": calibrate_session_job,
+    "mediapipe_track_skeletons_offline": mediapipe_track_skeletons_offline_job,
+    "reconstruct_mediapipe_3d_offline": reconstruct_mediapipe_3d_offline_job,
+    "export_to_blender": export_to_blender_job,
+}
+
+# the jobs that are safe to start over if the server went down while they were running (the stage cache skips the
+# work they already did) - not `calibrate_session`, that would open the cameras and record over the calibration videos
+RESUMABLE_SESSION_PROCESSING_JOB_TYPES = (
+    "mediapipe_track_skeletons_offline",
+    "reconstruct_mediapipe_3d_offline",
+    "export_to_blender",
+)
+
+_session_processing_job_queue = None
+
+
+def get_session_processing_job_queue(
+    number_of_workers: int = DEFAULT_NUMBER_OF_PROCESSING_WORKERS,
+) -> ProcessingJobQueue:
+    global _session_processing_job_queue
+    if _session_processing_job_queue is None:
+        _session_processing_job_queue = ProcessingJobQueue(
+            jobs_folder_path=get_processing_jobs_folder_path(),
+            job_functions=session_processing_job_functions,
+            number_of_workers=number_of_workers,
+            resumable_job_types=RESUMABLE_SESSION_PROCESSING_JOB_TYPES,
+        )
+    return _session_processing_job_queue
@@ -0,0 +1,314 @@
+import json
+import logging
+import platform
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Union
+
+import cv2
+import numpy as np
+from aniposelib.boards import CharucoBoard as AniposeCharucoBoard
+from aniposelib.boards import extract_points
+
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_charuco_rows,
+    create_synthetic_skeleton_data,
+    perturb_camera_group,
+)
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+    CameraGroup,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def time_stage(results: dict, stage_name: str):
+    """adds `<stage_name>_duration_seconds` to `results`"""
+    tic = time.perf_counter()
+    yield
+    results[f"{stage_name}_duration_seconds"] = time.perf_counter() - tic
+
+
+def relative_pose_errors(
+    estimated_camera_group: CameraGroup, true_camera_group: CameraGroup
+) -> dict:
+    """
+    Calibration puts camera 0 at the origin, so compare the pose of every camera *relative to camera 0*
+    (rotation error in degrees, position error in mm)
+    """
+
+    def relative_poses(camera_group):
+        rotation_0, _ = cv2.Rodrigues(camera_group.cameras[0].get_rotation())
+        translation_0 = camera_group.cameras[0].get_translation()
+        poses = []
+        for camera in camera_group.cameras[1:]:
+            rotation, _ = cv2.Rodrigues(camera.get_rotation())
+            relative_rotation = rotation @ rotation_0.T
+            relative_translation = (
+                camera.get_translation() - relative_rotation @ translation_0
+            )
+            poses.append((relative_rotation, relative_translation))
+        return poses
+
+    rotation_errors_degrees = []
+    translation_errors_mm = []
+    for (estimated_rotation, estimated_translation), (
+        true_rotation,
+        true_translation,
+    ) in zip(relative_poses(estimated_camera_group), relative_poses(true_camera_group)):
+        rotation_difference, _ = cv2.Rodrigues(estimated_rotation @ true_rotation.T)
+        rotation_errors_degrees.append(
+            float(np.rad2deg(np.linalg.norm(rotation_difference)))
+        )
+        translation_errors_mm.append(
+            float(np.linalg.norm(estimated_translation - true_translation))
+        )
+
+    return {
+        "max_relative_rotation_error_degrees": max(rotation_errors_degrees),
+        "max_relative_translation_error_mm": max(translation_errors_mm),
+    }
+
+
+def benchmark_calibration(
+    number_of_cameras: int,
+    number_of_charuco_frames: int,
+    random_seed: int = 0,
+) -> dict:
+    """time `calibrate_rows` (from scratch, like a real calibration) and `bundle_adjust_iter` (from a perturbed rig)"""
+    results = {
+        "number_of_cameras": number_of_cameras,
+        "number_of_charuco_frames": number_of_charuco_frames,
+    }
+    true_camera_group = create_synthetic_camera_group(
+        number_of_cameras=number_of_cameras, random_seed=random_seed
+    )
+    charuco_board = AniposeCharucoBoard(
+        7,
+        5,
+        square_length=60,  # mm
+        marker_length=60 * 0.8,
+        marker_bits=4,
+        dict_size=250,
+    )
+    all_rows = create_synthetic_charuco_rows(
+        true_camera_group,
+        charuco_board,
+        number_of_frames=number_of_charuco_frames,
+        random_seed=random_seed,
+    )
+    results["number_of_charuco_detections"] = sum(len(rows) for rows in all_rows)
+
+    calibrated_camera_group = CameraGroup.from_names(true_camera_group.get_names())
+    for calibrated_camera, true_camera in zip(
+        calibrated_camera_group.cameras, true_camera_group.cameras
+    ):
+        calibrated_camera.set_size(true_camera.get_size())
+
+    with time_stage(results, "calibrate_rows"):
+        error, merged, _ = calibrated_camera_group.calibrate_rows(
+            all_rows, charuco_board, verbose=False
+        )
+    results["calibrate_rows_error"] = float(error)
+    results.update(relative_pose_errors(calibrated_camera_group, true_camera_group))
+
+    imgp, extra = extract_points(merged, charuco_board, min_cameras=2)
+    perturbed_camera_group = perturb_camera_group(
+        true_camera_group, random_seed=random_seed
+    )
+    with time_stage(results, "bundle_adjust_iter"):
+        error = perturbed_camera_group.bundle_adjust_iter(imgp, extra, verbose=False)
+    results["bundle_adjust_iter_error"] = float(error)
+
+    return results
+
+
+def benchmark_reconstruction(
+    number_of_cameras: int,
+    number_of_frames: int,
+    number_of_tracked_points: int = 543,
+    ransac_max_number_of_points: int = 2000,
+    random_seed: int = 0,
+) -> dict:
+    """
+    time `triangulate` (with and without the undistortion lookup), `triangulate_with_outlier_rejection`,
+    `triangulate_ransac` and `reprojection_error`
+    on synthetic mediapipe-like data, and measure how far the results land from the ground truth.
+    `triangulate_ransac` is so much slower than the rest that it only gets the first `ransac_max_number_of_points` points
+    (its duration is also reported per point)
+    """
+    results = {
+        "number_of_cameras": number_of_cameras,
+        "number_of_frames": number_of_frames,
+        "number_of_tracked_points": number_of_tracked_points,
+    }
+    camera_group = create_synthetic_camera_group(
+        number_of_cameras=number_of_cameras, random_seed=random_seed
+    )
+    synthetic_data = create_synthetic_skeleton_data(
+        camera_group,
+        number_of_frames=number_of_frames,
+        number_of_tracked_points=number_of_tracked_points,
+        random_seed=random_seed,
+    )
+    data2d_flat = synthetic_data.skeleton_2d_camera_frame_marker_xy.reshape(
+        number_of_cameras, -1, 2
+    )
+    true_data3d_flat = synthetic_data.skeleton_3d_frame_marker_xyz.reshape(-1, 3)
+    results["number_of_2d_points"] = int(np.prod(data2d_flat.shape[:2]))
+
+    def median_3d_error(data3d_flat, number_of_points=None):
+        return float(
+            np.nanmedian(
+                np.linalg.norm(
+                    data3d_flat - true_data3d_flat[:number_of_points], axis=1
+                )
+            )
+        )
+
+    # warm up numba so compilation time doesn't end up in the first timed stage - with exactly the same call signatures
+    # as the timed calls, since numba compiles a separate version for e.g. `mean=True` vs leaving `mean` out
+    warm_up_data3d_flat = camera_group.triangulate(data2d_flat[:, :10])
+    camera_group.reprojection_error(warm_up_data3d_flat, data2d_flat[:, :10], mean=True)
+
+    with time_stage(results, "triangulate"):
+        data3d_flat = camera_group.triangulate(data2d_flat)
+    results["triangulate_median_error_mm"] = median_3d_error(data3d_flat)
+
+    with time_stage(results, "reprojection_error"):
+        camera_group.reprojection_error(data3d_flat, data2d_flat, mean=True)
+
+    with time_stage(results, "build_undistortion_lookups"):
+        camera_group.build_undistortion_lookups()
+    with time_stage(results, "triangulate_with_undistortion_lookup"):
+        data3d_flat = camera_group.triangulate(data2d_flat)
+    results["triangulate_with_undistortion_lookup_median_error_mm"] = median_3d_error(
+        data3d_flat
+    )
+    for camera in camera_group.cameras:
+        camera.set_undistortion_lookup(None)
+
+    with time_stage(results, "triangulate_with_outlier_rejection"):
+        data3d_flat = camera_group.triangulate_with_outlier_rejection(data2d_flat)
+    results["triangulate_with_outlier_rejection_median_error_mm"] = median_3d_error(
+        data3d_flat
+    )
+
+    number_of_ransac_points = min(ransac_max_number_of_points, data2d_flat.shape[1])
+    with time_stage(results, "triangulate_ransac"):
+        data3d_ransac = camera_group.triangulate_ransac(
+            data2d_flat[:, :number_of_ransac_points]
+        )
+    results["triangulate_ransac_number_of_points"] = number_of_ransac_points
+    results["triangulate_ransac_duration_seconds_per_point"] = (
+        results["triangulate_ransac_duration_seconds"] / number_of_ransac_points
+    )
+    results["triangulate_ransac_median_error_mm"] = median_3d_error(
+        data3d_ransac, number_of_ransac_points
+    )
+
+    return results
+
+
+def run_calibration_and_reconstruction_benchmark(
+    output_json_path: Union[str, Path],
+    number_of_cameras_list: List[int] = (3, 4, 6),
+    number_of_frames_list: List[int] = (100, 1000),
+    number_of_charuco_frames: int = 200,
+    number_of_tracked_points: int = 543,
+    random_seed: int = 0,
+) -> dict:
+    """
+    Run the calibration benchmark for every number of cameras, and the reconstruction benchmark for every
+    (number of cameras, number of frames) pair, then save everything (plus a description of the machine) as json
+    """
+    benchmark_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "opencv_version": cv2.__version__,
+        },
+        "calibration": [],
+        "reconstruction": [],
+    }
+
+    for number_of_cameras in number_of_cameras_list:
+        logger.info(f"Benchmarking calibration with {number_of_cameras} cameras")
+        benchmark_report["calibration"].append(
+            benchmark_calibration(
+                number_of_cameras=number_of_cameras,
+                number_of_charuco_frames=number_of_charuco_frames,
+                random_seed=random_seed,
+            )
+        )
+
+        for number_of_frames in number_of_frames_list:
+            logger.info(
+                f"Benchmarking reconstruction with {number_of_cameras} cameras and {number_of_frames} frames"
+            )
+            benchmark_report["reconstruction"].append(
+                benchmark_reconstruction(
+                    number_of_cameras=number_of_cameras,
+                    number_of_frames=number_of_frames,
+                    number_of_tracked_points=number_of_tracked_points,
+                    random_seed=random_seed,
+                )
+            )
+
+    output_json_path = Path(output_json_path)
+    output_json_path.parent.mkdir(exist_ok=True, parents=True)
+    output_json_path.write_text(json.dumps(benchmark_report, indent=4))
+    logger.info(f"Saved benchmark results to {str(output_json_path)}")
+
+    return benchmark_report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.pretty import pprint
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_json_path",
+        type=str,
+        help="where to save the benchmark results",
+        default="calibration_and_reconstruction_benchmark.json",
+    )
+    parser.add_argument(
+        "--number_of_cameras",
+        type=int,
+        nargs="+",
+        help="number of cameras to benchmark (one run per value)",
+        default=[3, 4, 6],
+    )
+    parser.add_argument(
+        "--number_of_frames",
+        type=int,
+        nargs="+",
+        help="number of frames of synthetic skeleton data to reconstruct (one run per value)",
+        default=[100, 1000],
+    )
+    parser.add_argument(
+        "--number_of_charuco_frames",
+        type=int,
+        help="number of frames of synthetic charuco board data to calibrate from",
+        default=200,
+    )
+    args = parser.parse_args()
+
+    pprint(
+        run_calibration_and_reconstruction_benchmark(
+            output_json_path=args.output_json_path,
+            number_of_cameras_list=args.number_of_cameras,
+            number_of_frames_list=args.number_of_frames,
+            number_of_charuco_frames=args.number_of_charuco_frames,
+        ),
+        expand_all=True,
+    )
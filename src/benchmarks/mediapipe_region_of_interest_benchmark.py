@@ -0,0 +1,265 @@
+import json
+import logging
+import platform
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from src.config.home_dir import SYNCHRONIZED_VIDEOS_FOLDER_NAME
+from src.core_processes.batch_processing.session_processing_parameter_models import (
+    MediaPipe2DParametersModel,
+)
+from src.core_processes.mediapipe_stuff.medaipipe_tracked_points_names_dict import (
+    mediapipe_tracked_point_names_dict,
+)
+from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
+    MediaPipeSkeletonDetector,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_tracked_point_group_slices() -> dict:
+    """where the body, hands and face live in the [number_of_tracked_points] axis of the 2d data"""
+    group_sizes = {
+        "body": len(mediapipe_tracked_point_names_dict["body"]),
+        "right_hand": len(mediapipe_tracked_point_names_dict["right_hand"]),
+        "left_hand": len(mediapipe_tracked_point_names_dict["left_hand"]),
+        "face": mp.python.solutions.face_mesh.FACEMESH_NUM_LANDMARKS_WITH_IRISES,
+    }
+    group_slices = {}
+    start_index = 0
+    for group_name, group_size in group_sizes.items():
+        group_slices[group_name] = slice(start_index, start_index + group_size)
+        start_index += group_size
+    return group_slices
+
+
+def compare_2d_data(
+    reference_data2d_fr_mar_xy: np.ndarray,
+    data2d_fr_mar_xy: np.ndarray,
+    group_slices: dict,
+) -> dict:
+    """
+    per body part group: how far (pixels) `data2d_fr_mar_xy` lands from the reference where both found the point,
+    and how often only one of them found it
+    """
+    comparison = {}
+    for group_name, group_slice in group_slices.items():
+        reference_xy = reference_data2d_fr_mar_xy[:, group_slice, :]
+        xy = data2d_fr_mar_xy[:, group_slice, :]
+        reference_found = np.isfinite(reference_xy).all(axis=2)
+        found = np.isfinite(xy).all(axis=2)
+        both_found = reference_found & found
+        pixel_errors = np.linalg.norm(xy - reference_xy, axis=2)[both_found]
+
+        comparison[group_name] = {
+            "number_of_points_found_by_both": int(both_found.sum()),
+            "number_of_points_only_in_reference": int((reference_found & ~found).sum()),
+            "number_of_points_only_in_this_one": int((found & ~reference_found).sum()),
+            "median_pixel_error": float(np.median(pixel_errors))
+            if pixel_errors.size
+            else None,
+            "95th_percentile_pixel_error": float(np.percentile(pixel_errors, 95))
+            if pixel_errors.size
+            else None,
+            "max_pixel_error": float(pixel_errors.max()) if pixel_errors.size else None,
+        }
+    return comparison
+
+
+def detect_skeletons_in_video(
+    mediapipe_skeleton_detector: MediaPipeSkeletonDetector,
+    video_file_path: Path,
+    max_number_of_frames: Optional[int] = None,
+) -> dict:
+    """runs the detector on (the start of) the video, returns the [number_of_frames, number_of_tracked_points, XY] data and how long it took"""
+    data2d_chunks = []
+    number_of_frames = 0
+    tic = time.perf_counter()
+    for data2d_chunk in mediapipe_skeleton_detector.detect_skeletons_in_video_in_chunks(
+        video_file_path,
+        chunk_size_frames=min(150, max_number_of_frames or 150),
+    ):
+        data2d_chunks.append(data2d_chunk)
+        number_of_frames += data2d_chunk.shape[0]
+        if (
+            max_number_of_frames is not None
+            and number_of_frames >= max_number_of_frames
+        ):
+            break
+    duration_seconds = time.perf_counter() - tic
+
+    return {
+        "data2d_fr_mar_xy": np.concatenate(data2d_chunks),
+        "number_of_frames": number_of_frames,
+        "duration_seconds": duration_seconds,
+        "frames_per_second": number_of_frames / duration_seconds,
+    }
+
+
+def benchmark_region_of_interest_tracking(
+    video_file_path: Union[str, Path],
+    parameter_model: MediaPipe2DParametersModel,
+    max_number_of_frames: Optional[int] = None,
+) -> dict:
+    """full-frame `mediapipe` vs region of interest `mediapipe` on one video - speed, and how far the ROI landmarks land from the full-frame ones"""
+    video_file_path = Path(video_file_path)
+    video_capture_object = cv2.VideoCapture(str(video_file_path))
+    image_width = int(video_capture_object.get(cv2.CAP_PROP_FRAME_WIDTH))
+    image_height = int(video_capture_object.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video_capture_object.release()
+
+    full_frame_results = detect_skeletons_in_video(
+        MediaPipeSkeletonDetector(
+            parameter_model=parameter_model.copy(
+                update={"use_region_of_interest_tracking": False}
+            )
+        ),
+        video_file_path,
+        max_number_of_frames=max_number_of_frames,
+    )
+    region_of_interest_skeleton_detector = MediaPipeSkeletonDetector(
+        parameter_model=parameter_model.copy(
+            update={"use_region_of_interest_tracking": True}
+        )
+    )
+    region_of_interest_results = detect_skeletons_in_video(
+        region_of_interest_skeleton_detector,
+        video_file_path,
+        max_number_of_frames=max_number_of_frames,
+    )
+    region_of_interest_tracker = (
+        region_of_interest_skeleton_detector.region_of_interest_tracker
+    )
+
+    return {
+        "video": video_file_path.name,
+        "image_width": image_width,
+        "image_height": image_height,
+        "number_of_frames": full_frame_results["number_of_frames"],
+        "full_frame": {
+            "duration_seconds": full_frame_results["duration_seconds"],
+            "frames_per_second": full_frame_results["frames_per_second"],
+        },
+        "region_of_interest": {
+            "duration_seconds": region_of_interest_results["duration_seconds"],
+            "frames_per_second": region_of_interest_results["frames_per_second"],
+            "number_of_full_frame_detections": region_of_interest_tracker.number_of_full_frame_detections,
+            "number_of_region_of_interest_detections": region_of_interest_tracker.number_of_region_of_interest_detections,
+            "number_of_region_of_interest_box_moves": region_of_interest_tracker.number_of_region_of_interest_box_moves,
+        },
+        "speedup": full_frame_results["duration_seconds"]
+        / region_of_interest_results["duration_seconds"],
+        "region_of_interest_vs_full_frame": compare_2d_data(
+            full_frame_results["data2d_fr_mar_xy"],
+            region_of_interest_results["data2d_fr_mar_xy"],
+            get_tracked_point_group_slices(),
+        ),
+    }
+
+
+def run_mediapipe_region_of_interest_benchmark(
+    session_folder_paths: List[Union[str, Path]],
+    output_json_path: Union[str, Path],
+    parameter_model: MediaPipe2DParametersModel = MediaPipe2DParametersModel(),
+    max_number_of_frames: Optional[int] = None,
+) -> dict:
+    """run the ROI benchmark on every synchronized video of every (recorded) session, then save everything (plus a description of the machine) as json"""
+    benchmark_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "opencv_version": cv2.__version__,
+            "mediapipe_version": mp.__version__,
+        },
+        "mediapipe_2d_parameters": parameter_model.dict(),
+        "videos": [],
+    }
+    for session_folder_path in session_folder_paths:
+        for video_file_path in sorted(
+            (Path(session_folder_path) / SYNCHRONIZED_VIDEOS_FOLDER_NAME).glob("*.mp4")
+        ):
+            logger.info(
+                f"Benchmarking region of interest tracking on {video_file_path}"
+            )
+            video_report = benchmark_region_of_interest_tracking(
+                video_file_path,
+                parameter_model=parameter_model,
+                max_number_of_frames=max_number_of_frames,
+            )
+            video_report["session"] = Path(session_folder_path).name
+            benchmark_report["videos"].append(video_report)
+
+    output_json_path = Path(output_json_path)
+    output_json_path.parent.mkdir(exist_ok=True, parents=True)
+    output_json_path.write_text(json.dumps(benchmark_report, indent=4))
+    logger.info(f"Saved benchmark results to {str(output_json_path)}")
+
+    return benchmark_report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.pretty import pprint
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "session_folder_paths",
+        type=str,
+        nargs="+",
+        help="recorded session folders (the videos in their `synchronized_videos` folders get used)",
+    )
+    parser.add_argument(
+        "--output_json_path",
+        type=str,
+        help="where to save the benchmark results",
+        default="mediapipe_region_of_interest_benchmark.json",
+    )
+    parser.add_argument(
+        "--max_number_of_frames",
+        type=int,
+        help="only use the first this many frames of each video",
+        default=None,
+    )
+    parser.add_argument(
+        "--padding_fraction",
+        type=float,
+        help="padding around the subject, as a fraction of their size",
+        default=MediaPipe2DParametersModel().region_of_interest_padding_fraction,
+    )
+    parser.add_argument(
+        "--full_frame_redetect_interval_frames",
+        type=int,
+        help="look at the whole frame every this many frames",
+        default=MediaPipe2DParametersModel().region_of_interest_full_frame_redetect_interval_frames,
+    )
+    parser.add_argument(
+        "--grid_size_pixels",
+        type=int,
+        help="snap the crop's edges to a grid this coarse",
+        default=MediaPipe2DParametersModel().region_of_interest_grid_size_pixels,
+    )
+    args = parser.parse_args()
+
+    pprint(
+        run_mediapipe_region_of_interest_benchmark(
+            session_folder_paths=args.session_folder_paths,
+            output_json_path=args.output_json_path,
+            parameter_model=MediaPipe2DParametersModel(
+                region_of_interest_padding_fraction=args.padding_fraction,
+                region_of_interest_full_frame_redetect_interval_frames=args.full_frame_redetect_interval_frames,
+                region_of_interest_grid_size_pixels=args.grid_size_pixels,
+            ),
+            max_number_of_frames=args.max_number_of_frames,
+        ),
+        expand_all=True,
+    )
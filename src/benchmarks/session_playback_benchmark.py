@@ -0,0 +1,241 @@
+import json
+import logging
+import platform
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Union
+
+import cv2
+import numpy as np
+
+from src.gui.main.visualize_session.session_playback_engine import (
+    DEFAULT_PLAYBACK_BUFFER_SIZE_FRAMES,
+    SessionPlaybackEngine,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def create_synthetic_videos(
+    output_folder_path: Union[str, Path],
+    number_of_videos: int,
+    number_of_frames: int,
+    image_width: int = 1280,
+    image_height: int = 720,
+    frames_per_second: Union[int, float] = 30,
+    random_seed: int = 0,
+) -> List[str]:
+    """`mp4` files of a moving, noisy gradient with the frame number written on it (about as hard to decode as real footage)"""
+    output_folder_path = Path(output_folder_path)
+    output_folder_path.mkdir(exist_ok=True, parents=True)
+    random_number_generator = np.random.default_rng(random_seed)
+
+    gradient = (
+        np.add.outer(
+            np.linspace(0, 255, image_height), np.linspace(0, 255, image_width)
+        )
+        / 2
+    )
+    list_of_video_paths = []
+    for video_number in range(number_of_videos):
+        video_path = output_folder_path / f"synthetic_camera_{video_number}.mp4"
+        video_writer = cv2.VideoWriter(
+            str(video_path),
+            cv2.VideoWriter_fourcc(*"mp4v"),
+            frames_per_second,
+            (image_width, image_height),
+        )
+        for frame_number in range(number_of_frames):
+            image = np.roll(gradient, 8 * frame_number + 50 * video_number, axis=1)
+            image = image + random_number_generator.normal(0, 8, image.shape)
+            image = np.repeat(
+                np.clip(image, 0, 255).astype(np.uint8)[:, :, np.newaxis], 3, axis=2
+            )
+            cv2.putText(
+                image,
+                str(frame_number),
+                (image_width // 10, image_height // 2),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                image_height / 200,
+                (0, 0, 255),
+                thickness=4,
+            )
+            video_writer.write(image)
+        video_writer.release()
+        list_of_video_paths.append(str(video_path))
+    return list_of_video_paths
+
+
+def measure_serial_decode_frames_per_second(
+    list_of_video_paths: List[str], number_of_frames: int
+) -> float:
+    """how fast one thread can read the videos frame by frame, one after the other (what playback used to do)"""
+    video_captures = [
+        cv2.VideoCapture(video_path) for video_path in list_of_video_paths
+    ]
+    tic = time.perf_counter()
+    for _ in range(number_of_frames):
+        for video_capture in video_captures:
+            video_capture.read()
+    elapsed_seconds = time.perf_counter() - tic
+    for video_capture in video_captures:
+        video_capture.release()
+    return number_of_frames / elapsed_seconds
+
+
+def benchmark_session_playback(
+    list_of_video_paths: List[str],
+    frames_per_second: Union[int, float] = 30,
+    duration_seconds: float = 10,
+    buffer_size_frames: int = DEFAULT_PLAYBACK_BUFFER_SIZE_FRAMES,
+) -> dict:
+    """
+    Play the videos headless (like the GUI does, minus the drawing) for `duration_seconds` and report the
+    playback rate each video kept up, what got dropped, and how much CPU it took (100% = one core)
+    """
+    with SessionPlaybackEngine(
+        list_of_video_paths,
+        frames_per_second=frames_per_second,
+        buffer_size_frames=buffer_size_frames,
+    ) as playback_engine:
+        number_of_frames = playback_engine.number_of_frames
+        wall_time_start = time.perf_counter()
+        cpu_time_start = time.process_time()
+        playback_engine.play()
+        while time.perf_counter() - wall_time_start < duration_seconds:
+            playback_engine.get_new_frames()
+            playback_engine.wait_for_next_frame()
+        elapsed_wall_time_seconds = time.perf_counter() - wall_time_start
+        elapsed_cpu_time_seconds = time.process_time() - cpu_time_start
+        playback_statistics = playback_engine.get_playback_statistics()
+
+    playback_frames_per_second = [
+        video_statistics["number_of_frames_shown"] / elapsed_wall_time_seconds
+        for video_statistics in playback_statistics.values()
+    ]
+    return {
+        "number_of_videos": len(list_of_video_paths),
+        "number_of_frames": number_of_frames,
+        "requested_frames_per_second": frames_per_second,
+        "buffer_size_frames": buffer_size_frames,
+        "duration_seconds": elapsed_wall_time_seconds,
+        "min_playback_frames_per_second": min(playback_frames_per_second),
+        "mean_playback_frames_per_second": float(np.mean(playback_frames_per_second)),
+        "cpu_percent": 100 * elapsed_cpu_time_seconds / elapsed_wall_time_seconds,
+        "serial_decode_frames_per_second": measure_serial_decode_frames_per_second(
+            list_of_video_paths, number_of_frames=min(number_of_frames, 100)
+        ),
+        "videos": playback_statistics,
+    }
+
+
+def run_session_playback_benchmark(
+    output_json_path: Union[str, Path],
+    number_of_videos_list: List[int] = (1, 3, 6),
+    number_of_frames: int = 300,
+    image_width: int = 1280,
+    image_height: int = 720,
+    frames_per_second: Union[int, float] = 30,
+    duration_seconds: float = 10,
+) -> dict:
+    """run the playback benchmark for every number of videos, then save everything (plus a description of the machine) as json"""
+    benchmark_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "opencv_version": cv2.__version__,
+        },
+        "image_width": image_width,
+        "image_height": image_height,
+        "playback": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temporary_folder_path:
+        list_of_video_paths = create_synthetic_videos(
+            temporary_folder_path,
+            number_of_videos=max(number_of_videos_list),
+            number_of_frames=number_of_frames,
+            image_width=image_width,
+            image_height=image_height,
+            frames_per_second=frames_per_second,
+        )
+        for number_of_videos in number_of_videos_list:
+            logger.info(f"Benchmarking playback of {number_of_videos} videos")
+            benchmark_report["playback"].append(
+                benchmark_session_playback(
+                    list_of_video_paths[:number_of_videos],
+                    frames_per_second=frames_per_second,
+                    duration_seconds=duration_seconds,
+                )
+            )
+
+    output_json_path = Path(output_json_path)
+    output_json_path.parent.mkdir(exist_ok=True, parents=True)
+    output_json_path.write_text(json.dumps(benchmark_report, indent=4))
+    logger.info(f"Saved benchmark results to {str(output_json_path)}")
+
+    return benchmark_report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.pretty import pprint
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_json_path",
+        type=str,
+        help="where to save the benchmark results",
+        default="session_playback_benchmark.json",
+    )
+    parser.add_argument(
+        "--number_of_videos",
+        type=int,
+        nargs="+",
+        help="number of synthetic videos to play at once (one run per value)",
+        default=[1, 3, 6],
+    )
+    parser.add_argument(
+        "--number_of_frames",
+        type=int,
+        help="number of frames in each synthetic video",
+        default=300,
+    )
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        nargs=2,
+        help="width and height of the synthetic videos",
+        default=[1280, 720],
+    )
+    parser.add_argument(
+        "--frames_per_second",
+        type=float,
+        help="playback rate to ask for",
+        default=30,
+    )
+    parser.add_argument(
+        "--duration_seconds",
+        type=float,
+        help="how long to play for (per run)",
+        default=10,
+    )
+    args = parser.parse_args()
+
+    pprint(
+        run_session_playback_benchmark(
+            output_json_path=args.output_json_path,
+            number_of_videos_list=args.number_of_videos,
+            number_of_frames=args.number_of_frames,
+            image_width=args.resolution[0],
+            image_height=args.resolution[1],
+            frames_per_second=args.frames_per_second,
+            duration_seconds=args.duration_seconds,
+        ),
+        expand_all=True,
+    )
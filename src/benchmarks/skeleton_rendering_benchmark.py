@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import platform
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+
+from src.gui.main.visualize_session.skeleton_line_segments import (
+    SKELETON_LINE_COLORS,
+    gather_line_segment_vertices,
+    get_mediapipe_connection_index_arrays,
+)
+
+logger = logging.getLogger(__name__)
+
+# body + both hands + face (with irises), laid out the way `MediaPipeSkeletonDetector` saves it
+MEDIAPIPE_NUMBER_OF_TRACKED_POINTS = 33 + 21 + 21 + 478
+
+RENDERING_METHODS = ["line_item_per_connection", "line_item_per_body_part"]
+
+
+def create_synthetic_skeleton_data(
+    number_of_frames: int,
+    number_of_tracked_points: int = MEDIAPIPE_NUMBER_OF_TRACKED_POINTS,
+    random_seed: int = 0,
+) -> np.ndarray:
+    """[number_of_frames, number_of_tracked_points, 3] random walk around a ~1 meter blob (in mm)"""
+    random_number_generator = np.random.default_rng(random_seed)
+    initial_xyz = random_number_generator.normal(0, 300, (number_of_tracked_points, 3))
+    steps_xyz = random_number_generator.normal(
+        0, 5, (number_of_frames, number_of_tracked_points, 3)
+    )
+    return initial_xyz + np.cumsum(steps_xyz, axis=0)
+
+
+def _add_line_item_per_connection(
+    gl_view_widget, first_frame_xyz: np.ndarray, connection_index_arrays
+) -> Tuple[list, Callable[[np.ndarray], None]]:
+    """the way the skeleton used to be drawn - one `GLLinePlotItem` and one `setData` per connection"""
+    import pyqtgraph.opengl as gl
+
+    line_items_and_connections = []
+    for body_part_name, connection_index_array in connection_index_arrays.items():
+        for this_connection in connection_index_array.reshape(-1, 2):
+            line_item = gl.GLLinePlotItem(
+                pos=first_frame_xyz[this_connection, :],
+                color=SKELETON_LINE_COLORS[body_part_name],
+            )
+            gl_view_widget.addItem(line_item)
+            line_items_and_connections.append((line_item, this_connection))
+
+    def update_line_items(skeleton_xyz: np.ndarray):
+        for line_item, this_connection in line_items_and_connections:
+            line_item.setData(pos=skeleton_xyz[this_connection, :])
+
+    return [line_item for line_item, _ in line_items_and_connections], update_line_items
+
+
+def _add_line_item_per_body_part(
+    gl_view_widget, first_frame_xyz: np.ndarray, connection_index_arrays
+) -> Tuple[list, Callable[[np.ndarray], None]]:
+    """the way `Gl3dViewPort` draws it now - one `GLLinePlotItem(mode="lines")` per body part, filled by one gather"""
+    import pyqtgraph.opengl as gl
+
+    line_items = {}
+    vertex_buffers = {}
+    for body_part_name, connection_index_array in connection_index_arrays.items():
+        vertex_buffers[body_part_name] = gather_line_segment_vertices(
+            first_frame_xyz, connection_index_array
+        )
+        line_items[body_part_name] = gl.GLLinePlotItem(
+            pos=vertex_buffers[body_part_name],
+            color=SKELETON_LINE_COLORS[body_part_name],
+            mode="lines",
+        )
+        gl_view_widget.addItem(line_items[body_part_name])
+
+    def update_line_items(skeleton_xyz: np.ndarray):
+        for body_part_name, line_item in line_items.items():
+            line_item.setData(
+                pos=gather_line_segment_vertices(
+                    skeleton_xyz,
+                    connection_index_arrays[body_part_name],
+                    out=vertex_buffers[body_part_name],
+                )
+            )
+
+    return list(line_items.values()), update_line_items
+
+
+def _count_paint_calls(line_items: list) -> List[int]:
+    """wraps every item's `paint` (each one is a draw call) so the returned counter goes up whenever one gets drawn"""
+    paint_call_counter = [0]
+    for line_item in line_items:
+        original_paint = line_item.paint
+
+        def counted_paint(original_paint=original_paint):
+            paint_call_counter[0] += 1
+            original_paint()
+
+        line_item.paint = counted_paint
+    return paint_call_counter
+
+
+def benchmark_skeleton_rendering(
+    skeleton_fr_mar_xyz: np.ndarray,
+    connection_index_arrays: Dict[str, np.ndarray],
+    rendering_method: str,
+    image_width: int = 1280,
+    image_height: int = 720,
+) -> dict:
+    """
+    Draw every frame of `skeleton_fr_mar_xyz` into an offscreen `GLViewWidget` and report the time it took to update
+    the line items, the time for the whole frame (update + render), and the number of draw calls per frame
+    """
+    import pyqtgraph as pg
+    import pyqtgraph.opengl as gl
+
+    if rendering_method not in RENDERING_METHODS:
+        logger.error(
+            f"Unknown rendering_method: {rendering_method}, should be one of {RENDERING_METHODS}"
+        )
+        raise ValueError(
+            f"Unknown rendering_method: {rendering_method}, should be one of {RENDERING_METHODS}"
+        )
+    add_line_items = {
+        "line_item_per_connection": _add_line_item_per_connection,
+        "line_item_per_body_part": _add_line_item_per_body_part,
+    }[rendering_method]
+
+    pg.mkQApp("skeleton_rendering_benchmark")
+    gl_view_widget = gl.GLViewWidget()
+    gl_view_widget.resize(image_width, image_height)
+    gl_view_widget.opts["distance"] = 2e3
+
+    line_items, update_line_items = add_line_items(
+        gl_view_widget, skeleton_fr_mar_xyz[0], connection_index_arrays
+    )
+    paint_call_counter = _count_paint_calls(line_items)
+    # the first render sets up the GL context and shaders, so it doesn't count
+    gl_view_widget.grabFramebuffer()
+    paint_call_counter[0] = 0
+
+    update_times_seconds = []
+    frame_times_seconds = []
+    for skeleton_xyz in skeleton_fr_mar_xyz:
+        tic = time.perf_counter()
+        update_line_items(skeleton_xyz)
+        update_times_seconds.append(time.perf_counter() - tic)
+        gl_view_widget.grabFramebuffer()
+        frame_times_seconds.append(time.perf_counter() - tic)
+
+    gl_view_widget.deleteLater()
+    number_of_frames = skeleton_fr_mar_xyz.shape[0]
+    return {
+        "rendering_method": rendering_method,
+        "number_of_frames": number_of_frames,
+        "number_of_line_segments": int(
+            sum(
+                connection_index_array.size // 2
+                for connection_index_array in connection_index_arrays.values()
+            )
+        ),
+        "number_of_line_items": len(line_items),
+        "draw_calls_per_frame": paint_call_counter[0] / number_of_frames,
+        "mean_update_time_milliseconds": 1e3 * float(np.mean(update_times_seconds)),
+        "mean_frame_time_milliseconds": 1e3 * float(np.mean(frame_times_seconds)),
+        "p95_frame_time_milliseconds": 1e3
+        * float(np.percentile(frame_times_seconds, 95)),
+        "frames_per_second": number_of_frames / float(np.sum(frame_times_seconds)),
+    }
+
+
+def run_skeleton_rendering_benchmark(
+    output_json_path: Union[str, Path],
+    number_of_frames: int = 300,
+    include_hands: bool = True,
+    include_face: bool = True,
+    image_width: int = 1280,
+    image_height: int = 720,
+) -> dict:
+    """run the rendering benchmark for both ways of drawing the skeleton, then save everything (plus a description of the machine) as json"""
+    skeleton_fr_mar_xyz = create_synthetic_skeleton_data(number_of_frames)
+    connection_index_arrays = get_mediapipe_connection_index_arrays(
+        number_of_tracked_points=skeleton_fr_mar_xyz.shape[1],
+        include_hands=include_hands,
+        include_face=include_face,
+    )
+
+    benchmark_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "qt_platform": os.environ.get("QT_QPA_PLATFORM"),
+        },
+        "body_parts": list(connection_index_arrays.keys()),
+        "image_width": image_width,
+        "image_height": image_height,
+        "rendering": [],
+    }
+    for rendering_method in RENDERING_METHODS:
+        logger.info(f"Benchmarking skeleton rendering with {rendering_method}")
+        benchmark_report["rendering"].append(
+            benchmark_skeleton_rendering(
+                skeleton_fr_mar_xyz,
+                connection_index_arrays,
+                rendering_method=rendering_method,
+                image_width=image_width,
+                image_height=image_height,
+            )
+        )
+
+    output_json_path = Path(output_json_path)
+    output_json_path.parent.mkdir(exist_ok=True, parents=True)
+    output_json_path.write_text(json.dumps(benchmark_report, indent=4))
+    logger.info(f"Saved benchmark results to {str(output_json_path)}")
+
+    return benchmark_report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.pretty import pprint
+
+    # render without a window (set QT_QPA_PLATFORM yourself to benchmark on a real display)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_json_path",
+        type=str,
+        help="where to save the benchmark results",
+        default="skeleton_rendering_benchmark.json",
+    )
+    parser.add_argument(
+        "--number_of_frames",
+        type=int,
+        help="number of frames to draw (per rendering method)",
+        default=300,
+    )
+    parser.add_argument(
+        "--body_only",
+        action="store_true",
+        help="leave out the hand and face lines",
+    )
+    parser.add_argument(
+        "--resolution",
+        type=int,
+        nargs=2,
+        help="width and height of the offscreen view",
+        default=[1280, 720],
+    )
+    args = parser.parse_args()
+
+    pprint(
+        run_skeleton_rendering_benchmark(
+            output_json_path=args.output_json_path,
+            number_of_frames=args.number_of_frames,
+            include_hands=not args.body_only,
+            include_face=not args.body_only,
+            image_width=args.resolution[0],
+            image_height=args.resolution[1],
+        ),
+        expand_all=True,
+    )
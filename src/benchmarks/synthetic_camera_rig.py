@@ -0,0 +1,323 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+    Camera,
+    CameraGroup,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyntheticSkeletonData:
+    """ground truth and 'detected' data for a synthetic recording, shaped like the real mediapipe data"""
+
+    # [number_of_frames, number_of_tracked_points, XYZ]
+    skeleton_3d_frame_marker_xyz: np.ndarray = None
+    # [number_of_cameras, number_of_frames, number_of_tracked_points, XY]
+    skeleton_2d_camera_frame_marker_xy: np.ndarray = None
+    dropout_mask: np.ndarray = None  # True where a 2d point was removed
+    outlier_mask: np.ndarray = None  # True where a 2d point was replaced with garbage
+
+    @property
+    def number_of_cameras(self):
+        return self.skeleton_2d_camera_frame_marker_xy.shape[0]
+
+    @property
+    def number_of_frames(self):
+        return self.skeleton_3d_frame_marker_xyz.shape[0]
+
+    @property
+    def number_of_tracked_points(self):
+        return self.skeleton_3d_frame_marker_xyz.shape[1]
+
+
+def look_at_rotation_and_translation(
+    camera_position_xyz: np.ndarray,
+    target_xyz: np.ndarray,
+    world_up_xyz: np.ndarray = np.array([0.0, 0.0, 1.0]),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """opencv-style (x right, y down, z forward) rvec and tvec for a camera at `camera_position_xyz` looking at `target_xyz`"""
+    forward = target_xyz - camera_position_xyz
+    forward = forward / np.linalg.norm(forward)
+    right = np.cross(forward, world_up_xyz)
+    right = right / np.linalg.norm(right)
+    down = np.cross(forward, right)
+
+    rotation_matrix_world_to_camera = np.vstack([right, down, forward])
+    rvec, _ = cv2.Rodrigues(rotation_matrix_world_to_camera)
+    tvec = -rotation_matrix_world_to_camera @ camera_position_xyz
+    return rvec.ravel(), tvec
+
+
+def create_synthetic_camera_group(
+    number_of_cameras: int = 4,
+    image_size: Tuple[int, int] = (1920, 1080),
+    focal_length_pixels: float = 1200.0,
+    radial_distortion: float = -0.05,
+    ring_radius_mm: float = 3000.0,
+    camera_height_mm: float = 1500.0,
+    random_seed: int = 0,
+) -> CameraGroup:
+    """
+    A `CameraGroup` with known intrinsics and extrinsics: `number_of_cameras` cameras spread around a ring,
+    all looking at a point 1m above the origin (roughly where a person's center of mass would be)
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    width, height = image_size
+
+    cameras = []
+    for camera_number in range(number_of_cameras):
+        angle = (
+            2 * np.pi * camera_number / number_of_cameras
+            + random_number_generator.uniform(-0.1, 0.1)
+        )
+        camera_position_xyz = np.array(
+            [
+                ring_radius_mm * np.cos(angle),
+                ring_radius_mm * np.sin(angle),
+                camera_height_mm + random_number_generator.uniform(-200, 200),
+            ]
+        )
+        rvec, tvec = look_at_rotation_and_translation(
+            camera_position_xyz, target_xyz=np.array([0.0, 0.0, 1000.0])
+        )
+
+        camera_matrix = np.array(
+            [
+                [focal_length_pixels, 0, width / 2],
+                [0, focal_length_pixels, height / 2],
+                [0, 0, 1],
+            ]
+        )
+        cameras.append(
+            Camera(
+                matrix=camera_matrix,
+                dist=[radial_distortion, 0, 0, 0, 0],
+                size=image_size,
+                rvec=rvec,
+                tvec=tvec,
+                name=f"cam_{camera_number}",
+            )
+        )
+    return CameraGroup(cameras)
+
+
+def random_rotation_vectors(
+    random_number_generator: np.random.Generator,
+    number_of_vectors: int,
+    max_angle_radians: float,
+) -> np.ndarray:
+    axes = random_number_generator.normal(size=(number_of_vectors, 3))
+    axes /= np.linalg.norm(axes, axis=1, keepdims=True)
+    angles = random_number_generator.uniform(
+        0, max_angle_radians, size=(number_of_vectors, 1)
+    )
+    return axes * angles
+
+
+def create_synthetic_charuco_rows(
+    camera_group: CameraGroup,
+    charuco_board,
+    number_of_frames: int = 200,
+    pixel_noise: float = 0.5,
+    minimum_number_of_corners: int = 7,
+    random_seed: int = 0,
+) -> List[List[dict]]:
+    """
+    Synthetic charuco detections, in the same `rows` format that `charuco_board.detect_video` returns
+    (one list of `{"framenum", "corners", "ids", "filled"}` dicts per camera), ready for `CameraGroup.calibrate_rows`.
+
+    The board stands upright in the middle of the capture volume and turns a full circle over the recording
+    (with a random wobble of up to 30 degrees and a random position every frame), and a camera only 'detects'
+    the board in frames where it can see its front side and enough of its corners land inside the image.
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    board_object_points = charuco_board.get_object_points().reshape(-1, 3)
+    board_center = board_object_points.mean(axis=0)
+
+    # board starts out facing the +X direction and standing upright, then gets spun around the vertical axis
+    # so every camera sees it face-on for part of the recording
+    upright = (
+        cv2.Rodrigues(np.array([0.0, np.pi / 2, 0.0]))[0]
+        @ cv2.Rodrigues(np.array([0.0, 0.0, np.pi / 2]))[0]
+    )
+
+    all_rows = [[] for _ in camera_group.cameras]
+    for frame_number in range(number_of_frames):
+        spin = cv2.Rodrigues(
+            np.array([0.0, 0.0, 2 * np.pi * frame_number / number_of_frames])
+        )[0]
+        wobble = cv2.Rodrigues(
+            random_rotation_vectors(random_number_generator, 1, np.deg2rad(30))[0]
+        )[0]
+        board_rotation = spin @ wobble @ upright
+        board_position = random_number_generator.uniform(
+            [-500, -500, 700], [500, 500, 1500]
+        )
+        board_points_xyz = (
+            board_object_points - board_center
+        ) @ board_rotation.T + board_position
+        board_normal = board_rotation @ np.array([0.0, 0.0, 1.0])
+
+        for camera_number, camera in enumerate(camera_group.cameras):
+            rotation_matrix, _ = cv2.Rodrigues(camera.get_rotation())
+            camera_position = -rotation_matrix.T @ camera.get_translation()
+            if np.dot(board_normal, camera_position - board_position) <= 0:
+                continue  # looking at the back of the board
+
+            corners = camera.project(board_points_xyz).reshape(-1, 2)
+            corners = corners + random_number_generator.normal(
+                0, pixel_noise, corners.shape
+            )
+            width, height = camera.get_size()
+            visible = (
+                (corners[:, 0] >= 0)
+                & (corners[:, 0] < width)
+                & (corners[:, 1] >= 0)
+                & (corners[:, 1] < height)
+            )
+            if np.sum(visible) < minimum_number_of_corners:
+                continue
+
+            ids = np.flatnonzero(visible).astype("int32").reshape(-1, 1)
+            all_rows[camera_number].append(
+                {
+                    "framenum": (0, frame_number),
+                    "corners": corners[visible].astype("float32").reshape(-1, 1, 2),
+                    "ids": ids,
+                }
+            )
+
+    for rows in all_rows:
+        charuco_board.fill_points_rows(rows)
+
+    logger.info(
+        f"Created synthetic charuco detections - detections per camera: {[len(rows) for rows in all_rows]}"
+    )
+    return all_rows
+
+
+def create_synthetic_skeleton_trajectories(
+    number_of_frames: int = 300,
+    number_of_tracked_points: int = 543,
+    framerate: float = 30.0,
+    random_seed: int = 0,
+) -> np.ndarray:
+    """
+    Smooth, mediapipe-skeleton-sized 3d trajectories ([number_of_frames, number_of_tracked_points, XYZ], in mm):
+    a point cloud about the size of a person that sways and walks around the middle of the capture volume,
+    with each point also wiggling at its own (human-ish, < 3Hz) frequencies
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    time_seconds = np.arange(number_of_frames) / framerate
+
+    body_offsets_xyz = random_number_generator.uniform(
+        [-300, -150, 0], [300, 150, 1800], size=(number_of_tracked_points, 3)
+    )
+    body_center_xyz = np.stack(
+        [
+            400 * np.sin(2 * np.pi * 0.1 * time_seconds),
+            400 * np.sin(2 * np.pi * 0.07 * time_seconds),
+            np.zeros(number_of_frames),
+        ],
+        axis=1,
+    )
+
+    frequencies = random_number_generator.uniform(
+        0.2, 3.0, size=(number_of_tracked_points, 3)
+    )
+    phases = random_number_generator.uniform(
+        0, 2 * np.pi, size=(number_of_tracked_points, 3)
+    )
+    amplitudes = random_number_generator.uniform(
+        10, 80, size=(number_of_tracked_points, 3)
+    )
+    wiggle_xyz = amplitudes * np.sin(
+        2 * np.pi * frequencies * time_seconds[:, None, None] + phases
+    )
+
+    return body_center_xyz[:, None, :] + body_offsets_xyz[None, :, :] + wiggle_xyz
+
+
+def create_synthetic_skeleton_data(
+    camera_group: CameraGroup,
+    number_of_frames: int = 300,
+    number_of_tracked_points: int = 543,
+    pixel_noise: float = 1.0,
+    dropout_fraction: float = 0.1,
+    outlier_fraction: float = 0.01,
+    random_seed: int = 0,
+) -> SyntheticSkeletonData:
+    """
+    Project synthetic 3d trajectories into every camera of `camera_group`, then make the 2d data look like
+    real mediapipe output: gaussian pixel noise, `dropout_fraction` of points set to NaN, and `outlier_fraction`
+    of points replaced by a random location in the image (i.e. the tracker latched onto the wrong thing)
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    skeleton_3d_frame_marker_xyz = create_synthetic_skeleton_trajectories(
+        number_of_frames=number_of_frames,
+        number_of_tracked_points=number_of_tracked_points,
+        random_seed=random_seed,
+    )
+
+    number_of_cameras = len(camera_group.cameras)
+    skeleton_2d_camera_frame_marker_xy = camera_group.project(
+        skeleton_3d_frame_marker_xyz.reshape(-1, 3)
+    ).reshape(number_of_cameras, number_of_frames, number_of_tracked_points, 2)
+    skeleton_2d_camera_frame_marker_xy += random_number_generator.normal(
+        0, pixel_noise, skeleton_2d_camera_frame_marker_xy.shape
+    )
+
+    mask_shape = skeleton_2d_camera_frame_marker_xy.shape[:3]
+    outlier_mask = random_number_generator.random(mask_shape) < outlier_fraction
+    for camera_number, camera in enumerate(camera_group.cameras):
+        width, height = camera.get_size()
+        number_of_outliers = np.sum(outlier_mask[camera_number])
+        skeleton_2d_camera_frame_marker_xy[camera_number][
+            outlier_mask[camera_number]
+        ] = random_number_generator.uniform(
+            [0, 0], [width, height], size=(number_of_outliers, 2)
+        )
+
+    dropout_mask = random_number_generator.random(mask_shape) < dropout_fraction
+    skeleton_2d_camera_frame_marker_xy[dropout_mask] = np.nan
+    outlier_mask &= ~dropout_mask
+
+    return SyntheticSkeletonData(
+        skeleton_3d_frame_marker_xyz=skeleton_3d_frame_marker_xyz,
+        skeleton_2d_camera_frame_marker_xy=skeleton_2d_camera_frame_marker_xy,
+        dropout_mask=dropout_mask,
+        outlier_mask=outlier_mask,
+    )
+
+
+def perturb_camera_group(
+    camera_group: CameraGroup,
+    rotation_noise_radians: float = 0.02,
+    translation_noise_mm: float = 20.0,
+    focal_length_noise_fraction: float = 0.02,
+    random_seed: int = 0,
+) -> CameraGroup:
+    """a copy of `camera_group` with noisy extrinsics and focal lengths, i.e. a starting point for bundle adjustment"""
+    random_number_generator = np.random.default_rng(random_seed)
+    perturbed_camera_group = camera_group.copy()
+    for camera in perturbed_camera_group.cameras:
+        camera.set_rotation(
+            camera.get_rotation()
+            + random_number_generator.normal(0, rotation_noise_radians, 3)
+        )
+        camera.set_translation(
+            camera.get_translation()
+            + random_number_generator.normal(0, translation_noise_mm, 3)
+        )
+        camera.set_focal_length(
+            camera.get_focal_length()
+            * (1 + random_number_generator.normal(0, focal_length_noise_fraction))
+        )
+    return perturbed_camera_group
@@ -0,0 +1,251 @@
+import json
+import logging
+import platform
+import time
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+import scipy
+from scipy import optimize
+from scipy.spatial.transform import Rotation
+
+from src.pupil_labs_stuff.vor_calibration_objective import (
+    VorCalibrationObjective,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def create_synthetic_vor_segment(
+    number_of_frames: int,
+    true_rotational_offset: List[float] = (0.1, -0.05, 0.2),
+    gaze_noise_mm: float = 5,
+    random_seed: int = 0,
+) -> dict:
+    """
+    Someone looking at a fixed point while wobbling their head around (i.e. a VOR calibration), with the eye tracker
+    mounted `true_rotational_offset` (xyz euler angles) off - arrays are in the shapes `VorCalibrator` uses
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    time_seconds = np.arange(number_of_frames) / 30
+
+    # smooth head wobble, a few degrees in every direction
+    head_rotation_vectors = np.column_stack(
+        [
+            0.2 * np.sin(2 * np.pi * frequency * time_seconds + phase)
+            for frequency, phase in [(0.5, 0), (0.7, 1), (0.3, 2)]
+        ]
+    )
+    head_rotation_matricies = Rotation.from_rotvec(head_rotation_vectors).as_matrix()
+    eye_socket_origin_fr_xyz = np.column_stack(
+        [
+            30 * np.sin(2 * np.pi * 0.4 * time_seconds),
+            20 * np.cos(2 * np.pi * 0.6 * time_seconds),
+            1600 + 10 * np.sin(2 * np.pi * 0.2 * time_seconds),
+        ]
+    )
+    fixation_point_fr_xyz = np.tile([0.0, 1500.0, 800.0], (number_of_frames, 1))
+
+    # the gaze the eye tracker would report so the (offset) gaze laser lands on the fixation point
+    true_offset_rotation_matrix = Rotation.from_euler(
+        "xyz", true_rotational_offset
+    ).as_matrix()
+    gaze_fr_xyz = (
+        np.einsum(
+            "fij,fj->fi",
+            head_rotation_matricies,
+            fixation_point_fr_xyz - eye_socket_origin_fr_xyz,
+        )
+        @ true_offset_rotation_matrix
+    )
+    gaze_fr_xyz += random_number_generator.normal(0, gaze_noise_mm, gaze_fr_xyz.shape)
+
+    return {
+        "true_rotational_offset": np.array(true_rotational_offset),
+        "eye_socket_origin_fr_xyz": eye_socket_origin_fr_xyz,
+        "head_rotation_matricies": head_rotation_matricies,
+        "fixation_point_fr_xyz": fixation_point_fr_xyz,
+        "gaze_fr_xyz": gaze_fr_xyz,
+    }
+
+
+def get_vor_calibration_error_per_frame_loop(
+    rotational_offset,
+    eye_socket_origin_fr_xyz,
+    head_rotation_matricies,
+    fixation_point_fr_xyz,
+    gaze_fr_xyz,
+) -> float:
+    """the objective the way `VorCalibrator` used to compute it (one matrix multiplication per frame, in python)"""
+    offset_rotation_matrix = Rotation.from_euler("xyz", rotational_offset).as_matrix()
+    gaze_rotated_by_guess_fr_xyz = np.array(
+        [
+            offset_rotation_matrix @ gaze_fr_xyz[this_frame_number, :]
+            for this_frame_number in range(gaze_fr_xyz.shape[0])
+        ]
+    )
+    gaze_laser_endpoint_fr_xyz = (
+        np.array(
+            [
+                np.transpose(head_rotation_matricies[this_frame_number])
+                @ gaze_rotated_by_guess_fr_xyz[this_frame_number, :]
+                for this_frame_number in range(gaze_rotated_by_guess_fr_xyz.shape[0])
+            ]
+        )
+        + eye_socket_origin_fr_xyz
+    )
+
+    distance_error = np.sqrt(
+        np.nanmean(
+            np.linalg.norm(gaze_laser_endpoint_fr_xyz - fixation_point_fr_xyz, axis=1)
+            ** 2
+        )
+    )
+    mean_gaze_tip_velocity_per_frame = np.nanmean(
+        np.diff(gaze_laser_endpoint_fr_xyz, axis=0), axis=0
+    )
+    velocity_error = np.sqrt(np.nanmean(mean_gaze_tip_velocity_per_frame**2))
+    return distance_error + velocity_error
+
+
+def _get_stacked_least_squares_arguments(objective_arguments) -> dict:
+    vor_calibration_objective = VorCalibrationObjective(*objective_arguments)
+    return dict(
+        fun=vor_calibration_objective.get_error,
+        jac=vor_calibration_objective.get_jacobian,
+    )
+
+
+def benchmark_vor_calibration(
+    number_of_frames: int, number_of_repeats: int = 3
+) -> dict:
+    """
+    Time one objective evaluation and a whole `least_squares` fit, for the per-frame loop with finite differences
+    (the old way) and the stacked objective with its analytic gradient (the new way)
+    """
+    vor_segment = create_synthetic_vor_segment(number_of_frames)
+    objective_arguments = (
+        vor_segment["eye_socket_origin_fr_xyz"],
+        vor_segment["head_rotation_matricies"],
+        vor_segment["fixation_point_fr_xyz"],
+        vor_segment["gaze_fr_xyz"],
+    )
+
+    def get_per_frame_loop_error(rotational_offset):
+        return get_vor_calibration_error_per_frame_loop(
+            rotational_offset, *objective_arguments
+        )
+
+    least_squares_arguments_by_method = {
+        "per_frame_loop_finite_differences": lambda: dict(fun=get_per_frame_loop_error),
+        # building the objective (i.e. the per-frame precomputation) counts towards its time
+        "stacked_analytic_jacobian": lambda: _get_stacked_least_squares_arguments(
+            objective_arguments
+        ),
+    }
+
+    results_by_method = {}
+    for (
+        method_name,
+        get_least_squares_arguments,
+    ) in least_squares_arguments_by_method.items():
+        objective_times_seconds = []
+        fit_times_seconds = []
+        for repeat_number in range(number_of_repeats):
+            tic = time.perf_counter()
+            least_squares_arguments = get_least_squares_arguments()
+            optimization_results = optimize.least_squares(
+                x0=[0, 0, 0], gtol=1e-10, **least_squares_arguments
+            )
+            fit_times_seconds.append(time.perf_counter() - tic)
+
+            # a fresh guess every time, so nothing comes out of a cache
+            tic = time.perf_counter()
+            least_squares_arguments["fun"](np.full(3, 1e-3 * (repeat_number + 1)))
+            objective_times_seconds.append(time.perf_counter() - tic)
+
+        results_by_method[method_name] = {
+            "objective_time_milliseconds": 1e3 * min(objective_times_seconds),
+            "fit_time_seconds": min(fit_times_seconds),
+            "number_of_function_evaluations": int(optimization_results.nfev),
+            "recovered_rotational_offset": optimization_results.x.tolist(),
+            "rotational_offset_error_radians": float(
+                np.max(
+                    np.abs(
+                        optimization_results.x - vor_segment["true_rotational_offset"]
+                    )
+                )
+            ),
+            "final_error": float(np.atleast_1d(optimization_results.fun)[0]),
+        }
+
+    return {
+        "number_of_frames": number_of_frames,
+        "true_rotational_offset": vor_segment["true_rotational_offset"].tolist(),
+        "fit_speedup": results_by_method["per_frame_loop_finite_differences"][
+            "fit_time_seconds"
+        ]
+        / results_by_method["stacked_analytic_jacobian"]["fit_time_seconds"],
+        "methods": results_by_method,
+    }
+
+
+def run_vor_calibration_benchmark(
+    output_json_path: Union[str, Path],
+    number_of_frames_list: List[int] = (300, 3000, 30000),
+) -> dict:
+    """run the VOR calibration benchmark for every segment length, then save everything (plus a description of the machine) as json"""
+    benchmark_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python_version": platform.python_version(),
+            "numpy_version": np.__version__,
+            "scipy_version": scipy.__version__,
+        },
+        "vor_calibration": [],
+    }
+    for number_of_frames in number_of_frames_list:
+        logger.info(f"Benchmarking VOR calibration on {number_of_frames} frames")
+        benchmark_report["vor_calibration"].append(
+            benchmark_vor_calibration(number_of_frames)
+        )
+
+    output_json_path = Path(output_json_path)
+    output_json_path.parent.mkdir(exist_ok=True, parents=True)
+    output_json_path.write_text(json.dumps(benchmark_report, indent=4))
+    logger.info(f"Saved benchmark results to {str(output_json_path)}")
+
+    return benchmark_report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.pretty import pprint
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_json_path",
+        type=str,
+        help="where to save the benchmark results",
+        default="vor_calibration_benchmark.json",
+    )
+    parser.add_argument(
+        "--number_of_frames",
+        type=int,
+        nargs="+",
+        help="length of the synthetic VOR segment (one run per value)",
+        default=[300, 3000, 30000],
+    )
+    args = parser.parse_args()
+
+    pprint(
+        run_vor_calibration_benchmark(
+            output_json_path=args.output_json_path,
+            number_of_frames_list=args.number_of_frames,
+        ),
+        expand_all=True,
+    )
@@ -4,6 +4,23 @@ import numpy as np
 from pathlib import Path
 import sys
 
+# `blender_keyframe_arrays` lives next to this script (and only needs numpy)
+sys.path.insert(0, str(Path(__file__).parent))
+from blender_keyframe_arrays import (
+    add_virtual_markers,
+    build_location_keyframe_arrays,
+    get_location_keyframes_by_object_name,
+    insert_location_keyframes,
+    load_keyframe_arrays,
+)
+from blender_progress_lines import format_blender_progress_line
+
+
+def report_progress(stage: str, frames_done: int, total_frames: int):
+    """picked up by `BlenderExportProcess` (flushed, because stdout is a pipe)"""
+    print(format_blender_progress_line(stage, frames_done, total_frames), flush=True)
+
+
 print(" - Starting (alpha) blender megascript - ")
 
 #######################################################################
@@ -24,6 +41,12 @@ try:
         good_clean_frame_number = int(argv[1])
     else:
         good_clean_frame_number = 0
+
+    # precomputed by `create_blend_file_from_session_data` (if it isn't there we work them out here)
+    if len(argv) > 2:
+        keyframe_arrays_path = Path(argv[2])
+    else:
+        keyframe_arrays_path = None
 except:
     print(
         "we appear to be running from the Blender Scripting tab! Manually enter your `session_path` at line 23"
@@ -32,6 +55,7 @@ except:
         r"C:\Users\jonma\Dropbox\FreeMoCapProject\FreeMocap_Data\sesh_2022-05-07_17_15_05_pupil_wobble_juggle_0"
     )
     good_clean_frame_number = 3341
+    keyframe_arrays_path = None
 
 print(str(session_path))
 session_path = Path(session_path)
@@ -111,6 +135,7 @@ face_fr_mar_dim = mediapipe_skel_fr_mar_dim[
 
 # %% Session Specific stuff
 number_of_frames = mediapipe_skel_fr_mar_dim.shape[0]
+report_progress("loading_data", number_of_frames, number_of_frames)
 start_frame = 1
 end_frame = number_of_frames
 
@@ -255,6 +280,20 @@ try:
 
     #######################################################################
     # %% load empties
+    if keyframe_arrays_path is not None and keyframe_arrays_path.exists():
+        print(f"loading keyframes from {keyframe_arrays_path}")
+        keyframe_arrays = load_keyframe_arrays(keyframe_arrays_path)
+    else:
+        keyframe_arrays = build_location_keyframe_arrays(
+            add_virtual_markers(
+                mediapipe_skel_fr_mar_dim, mediapipe_tracked_point_names
+            )
+        )
+    keyframe_frame_numbers = keyframe_arrays["frame_numbers"]
+    location_keyframes_by_object_name = get_location_keyframes_by_object_name(
+        keyframe_arrays
+    )
+
     print(
         "loading {} empties on {} frames".format(
             len(mediapipe_tracked_point_names), number_of_frames
@@ -265,6 +304,11 @@ try:
 
     for this_point_index, this_point_name in enumerate(mediapipe_tracked_point_names):
         print(f"loading {this_point_name}...")
+        report_progress(
+            "keyframing_empties",
+            number_of_frames * this_point_index // len(mediapipe_tracked_point_names),
+            number_of_frames,
+        )
         bpy.ops.object.empty_add(type="SPHERE")
         this_empty = bpy.context.active_object
         this_empty.name = this_point_name
@@ -278,17 +322,12 @@ try:
 
         this_empty.parent = freemocap_origin_axes
 
-        this_point_fr_xyz = mediapipe_skel_fr_mar_dim[:, this_point_index, :]
-
-        for frame_num in range(end_frame):
-            this_empty.location = [
-                this_point_fr_xyz[frame_num, 0],
-                this_point_fr_xyz[frame_num, 1],
-                this_point_fr_xyz[frame_num, 2],
-            ]
-            bpy.context.view_layer.update()
-
-            this_empty.keyframe_insert(data_path="location", frame=frame_num)
+        insert_location_keyframes(
+            bpy.data,
+            this_empty,
+            keyframe_frame_numbers,
+            location_keyframes_by_object_name[this_point_name],
+        )
 
     #######################################################################
     # %% create virtual markers
@@ -308,13 +347,12 @@ try:
     this_empty.parent = freemocap_origin_axes
     mediapipe_tracked_point_names.append(this_empty.name)
 
-    for frame_num in range(end_frame):
-        this_empty.location = [
-            hips_xyz[frame_num, 0],
-            hips_xyz[frame_num, 1],
-            hips_xyz[frame_num, 2],
-        ]
-        this_empty.keyframe_insert(data_path="location", frame=frame_num)
+    insert_location_keyframes(
+        bpy.data,
+        this_empty,
+        keyframe_frame_numbers,
+        location_keyframes_by_object_name[this_empty.name],
+    )
 
     print("neck_center - midway between left and right shoulders")
     left_shoulder_index = 11
@@ -330,13 +368,12 @@ try:
     this_empty.parent = freemocap_origin_axes
     mediapipe_tracked_point_names.append(this_empty.name)
 
-    for frame_num in range(end_frame):
-        this_empty.location = [
-            neck_xyz[frame_num, 0],
-            neck_xyz[frame_num, 1],
-            neck_xyz[frame_num, 2],
-        ]
-        this_empty.keyframe_insert(data_path="location", frame=frame_num)
+    insert_location_keyframes(
+        bpy.data,
+        this_empty,
+        keyframe_frame_numbers,
+        location_keyframes_by_object_name[this_empty.name],
+    )
 
     print("hip_center - midway between left and right hips")
     left_hip_index = 23
@@ -555,13 +592,12 @@ try:
     except:
         pass
 
-        for frame_num in range(end_frame):
-            this_empty.location = [
-                hips_xyz[frame_num, 0],
-                hips_xyz[frame_num, 1],
-                hips_xyz[frame_num, 2],
-            ]
-            this_empty.keyframe_insert(data_path="location", frame=frame_num)
+        insert_location_keyframes(
+            bpy.data,
+            this_empty,
+            keyframe_frame_numbers,
+            location_keyframes_by_object_name[this_empty.name],
+        )
 
         print("chest_center - mean of R/L shoulders and R/L hips")
         chest_xyz = (neck_xyz + hips_xyz) / 2
@@ -572,18 +608,18 @@ try:
         this_empty.parent = freemocap_origin_axes
         mediapipe_tracked_point_names.append(this_empty.name)
 
-        for frame_num in range(end_frame):
-            this_empty.location = [
-                chest_xyz[frame_num, 0],
-                chest_xyz[frame_num, 1],
-                chest_xyz[frame_num, 2],
-            ]
-            this_empty.keyframe_insert(data_path="location", frame=frame_num)
+        insert_location_keyframes(
+            bpy.data,
+            this_empty,
+            keyframe_frame_numbers,
+            location_keyframes_by_object_name[this_empty.name],
+        )
 
         print("Done loading empties :D")
 
         ######################################################################
         ## Fit Rigify metarig armatures to empties
+        report_progress("fitting_rig", 0, number_of_frames)
 
         bpy.context.scene.frame_set(good_clean_frame_number)
 
@@ -1664,6 +1700,7 @@ try:
         ## Load nSynched Videos
         try:
             print("loading videos as planes...")
+            report_progress("loading_videos", 0, number_of_frames)
             annotated_videos_path = session_path / "annotated_videos"
 
             if annotated_videos_path.is_dir():
@@ -1720,4 +1757,6 @@ except Exception as e:
 sessionID = session_path.stem
 blend_file_save_path = session_path / (sessionID + ".blend")
 print(f"Saving Blender output file to: {str(blend_file_save_path)}")
+report_progress("saving_blend_file", 0, number_of_frames)
 bpy.ops.wm.save_as_mainfile(filepath=str(blend_file_save_path))
+report_progress("done", number_of_frames, number_of_frames)
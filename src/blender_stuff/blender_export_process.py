@@ -0,0 +1,185 @@
+import logging
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+from src.blender_stuff.blender_progress_lines import parse_blender_progress_line
+
+logger = logging.getLogger(__name__)
+
+BLENDER_EXPORT_STATUS_SUCCEEDED = "succeeded"
+BLENDER_EXPORT_STATUS_FAILED = "failed"
+BLENDER_EXPORT_STATUS_CANCELLED = "cancelled"
+BLENDER_EXPORT_STATUS_TIMED_OUT = "timed_out"
+
+# how often `wait` checks for a cancel or a timeout
+BLENDER_EXPORT_POLL_INTERVAL_SECONDS = 0.1
+# how long Blender gets to exit after being asked to, before it gets killed
+BLENDER_EXPORT_STOP_GRACE_PERIOD_SECONDS = 5
+
+
+class BlenderExportProcess:
+    """
+    Runs Blender (i.e. the megascript) as a child process we keep an eye on, instead of blocking until it exits:
+    - everything it prints goes to `log_file_path` (in the session folder)
+    - its progress lines (see `blender_progress_lines`) go to `progress_callback` as they come in
+    - it gets stopped if it runs longer than `timeout_seconds`, or if `cancel_event` gets set (from any thread)
+
+        with BlenderExportProcess(command_list, log_file_path, timeout_seconds=600) as blender_export_process:
+            result = blender_export_process.wait()
+
+    Leaving the `with` block always stops Blender, so an exception (or the worker getting stopped) can't leave it
+    running in the background
+    """
+
+    def __init__(
+        self,
+        command_list: List[str],
+        log_file_path: Union[str, Path],
+        timeout_seconds: Optional[float] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        self._command_list = [str(argument) for argument in command_list]
+        self._log_file_path = Path(log_file_path)
+        self._timeout_seconds = timeout_seconds
+        self._progress_callback = progress_callback
+        self._cancel_event = cancel_event or threading.Event()
+
+        self._process = None
+        self._output_reader_thread = None
+        self._start_time = None
+        self._latest_progress = None
+
+    @property
+    def latest_progress(self) -> Optional[dict]:
+        return self._latest_progress
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        logger.info(
+            f"Starting `blender` sub-process with this command: \n {self._command_list}"
+        )
+        self._log_file_path.parent.mkdir(exist_ok=True, parents=True)
+        log_file = open(self._log_file_path, "w", encoding="utf-8")
+        log_file.write(f"command: {self._command_list}\n")
+        log_file.write(f"started: {time.strftime('%Y-%m-%d_%H_%M_%S')}\n\n")
+        log_file.flush()
+
+        self._start_time = time.monotonic()
+        try:
+            self._process = subprocess.Popen(
+                self._command_list,
+                shell=False,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+        except OSError:
+            log_file.close()
+            raise
+
+        self._output_reader_thread = threading.Thread(
+            target=self._read_output,
+            args=(log_file,),
+            name="blender_export_output_reader",
+            daemon=True,
+        )
+        self._output_reader_thread.start()
+
+    def cancel(self):
+        """safe to call from any thread - `wait` stops Blender and returns `cancelled`"""
+        self._cancel_event.set()
+
+    def wait(self) -> dict:
+        """blocks until Blender exits, times out or gets cancelled, and says how it went"""
+        status = None
+        while self._process.poll() is None:
+            if self._cancel_event.wait(BLENDER_EXPORT_POLL_INTERVAL_SECONDS):
+                logger.info("Cancelling the Blender export")
+                status = BLENDER_EXPORT_STATUS_CANCELLED
+                break
+            if (
+                self._timeout_seconds is not None
+                and time.monotonic() - self._start_time > self._timeout_seconds
+            ):
+                logger.error(
+                    f"The Blender export is still running after {self._timeout_seconds} seconds (last progress: {self._latest_progress}), stopping it"
+                )
+                status = BLENDER_EXPORT_STATUS_TIMED_OUT
+                break
+
+        self.stop()
+        return_code = self._process.returncode
+        if status is None:
+            status = (
+                BLENDER_EXPORT_STATUS_SUCCEEDED
+                if return_code == 0
+                else BLENDER_EXPORT_STATUS_FAILED
+            )
+        if status == BLENDER_EXPORT_STATUS_FAILED:
+            logger.error(
+                f"Blender exited with code {return_code} - see {self._log_file_path}"
+            )
+
+        return {
+            "status": status,
+            "return_code": return_code,
+            "duration_seconds": time.monotonic() - self._start_time,
+            "latest_progress": self._latest_progress,
+            "log_file_path": str(self._log_file_path),
+        }
+
+    def stop(self):
+        """ask Blender to exit (and kill it if it doesn't), then wait for the rest of its output"""
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=BLENDER_EXPORT_STOP_GRACE_PERIOD_SECONDS)
+            except subprocess.TimeoutExpired:
+                logger.warning("Blender didn't exit when asked to, killing it")
+                self._process.kill()
+                self._process.wait()
+        # (a grandchild process that inherited Blender's stdout can keep the pipe open after Blender itself is gone)
+        self._output_reader_thread.join(
+            timeout=BLENDER_EXPORT_STOP_GRACE_PERIOD_SECONDS
+        )
+        if self._output_reader_thread.is_alive():
+            logger.warning(
+                f"Blender's output is still open {BLENDER_EXPORT_STOP_GRACE_PERIOD_SECONDS} seconds after it stopped, not waiting for the rest of it"
+            )
+
+    def _read_output(self, log_file):
+        with log_file:
+            for line in self._process.stdout:
+                log_file.write(line)
+                log_file.flush()
+                progress = parse_blender_progress_line(line)
+                if progress is None:
+                    logger.debug(f"blender: {line.rstrip()}")
+                    continue
+                self._latest_progress = progress
+                if self._progress_callback is not None:
+                    try:
+                        self._progress_callback(progress)
+                    except Exception:
+                        logger.exception("Blender export progress callback failed")
+            self._process.stdout.close()
+
+    def __enter__(self) -> "BlenderExportProcess":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,143 @@
+"""
+Keyframes for the Blender megascript, precomputed as one array per object (so Blender doesn't need
+one `keyframe_insert` call per frame per empty).
+
+This module only needs `numpy` - it gets imported from inside Blender (by the megascript, which puts this folder on
+`sys.path`) as well as from freemocap, so no `src.` imports in here. The Blender side takes `bpy.data` as an argument
+instead of importing `bpy`.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# bump this whenever the layout of the keyframe arrays file changes
+BLENDER_KEYFRAME_ARRAYS_FORMAT_VERSION = 1
+
+# virtual markers the megascript adds to the mediapipe ones (each is the mean of these tracked points)
+VIRTUAL_MARKER_DEFINITIONS = {
+    "head_center": ["left_ear", "right_ear"],
+    "neck_center": ["left_shoulder", "right_shoulder"],
+    "hip_center": ["left_hip", "right_hip"],
+    "chest_center": ["left_shoulder", "right_shoulder", "left_hip", "right_hip"],
+}
+
+
+def add_virtual_markers(
+    skeleton_fr_mar_xyz: np.ndarray,
+    tracked_point_names: List[str],
+) -> Dict[str, np.ndarray]:
+    """
+    {object name: [number_of_frames, 3] trajectory} for every tracked point (`tracked_point_names` go with the
+    first markers of `skeleton_fr_mar_xyz`) and every virtual marker
+    """
+    trajectories_by_object_name = {
+        tracked_point_name: skeleton_fr_mar_xyz[:, tracked_point_index, :]
+        for tracked_point_index, tracked_point_name in enumerate(tracked_point_names)
+    }
+    for virtual_marker_name, marker_names in VIRTUAL_MARKER_DEFINITIONS.items():
+        trajectories_by_object_name[virtual_marker_name] = np.mean(
+            [trajectories_by_object_name[marker_name] for marker_name in marker_names],
+            axis=0,
+        )
+    return trajectories_by_object_name
+
+
+def build_location_keyframe_arrays(
+    trajectories_by_object_name: Dict[str, np.ndarray],
+    first_frame_number: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    - `object_names` - [number_of_objects]
+    - `frame_numbers` - [number_of_frames], float32 (what Blender stores keyframe times as)
+    - `locations_obj_xyz_fr` - [number_of_objects, 3, number_of_frames], float32, so every fcurve's values are one
+      contiguous row
+    """
+    object_names = list(trajectories_by_object_name)
+    number_of_frames = trajectories_by_object_name[object_names[0]].shape[0]
+    locations_obj_xyz_fr = np.empty(
+        (len(object_names), 3, number_of_frames), dtype=np.float32
+    )
+    for object_index, object_name in enumerate(object_names):
+        locations_obj_xyz_fr[object_index] = np.asarray(
+            trajectories_by_object_name[object_name]
+        ).T
+    return {
+        "format_version": np.array(BLENDER_KEYFRAME_ARRAYS_FORMAT_VERSION),
+        "object_names": np.array(object_names),
+        "frame_numbers": np.arange(
+            first_frame_number, first_frame_number + number_of_frames, dtype=np.float32
+        ),
+        "locations_obj_xyz_fr": locations_obj_xyz_fr,
+    }
+
+
+def save_keyframe_arrays(
+    keyframe_arrays_path: Union[str, Path], keyframe_arrays: Dict[str, np.ndarray]
+):
+    Path(keyframe_arrays_path).parent.mkdir(exist_ok=True, parents=True)
+    np.savez(keyframe_arrays_path, **keyframe_arrays)
+
+
+def load_keyframe_arrays(
+    keyframe_arrays_path: Union[str, Path]
+) -> Dict[str, np.ndarray]:
+    with np.load(keyframe_arrays_path, allow_pickle=False) as keyframe_arrays_file:
+        keyframe_arrays = {
+            array_name: keyframe_arrays_file[array_name]
+            for array_name in keyframe_arrays_file.files
+        }
+    if int(keyframe_arrays["format_version"]) != BLENDER_KEYFRAME_ARRAYS_FORMAT_VERSION:
+        logger.error(
+            f"{keyframe_arrays_path} is keyframe arrays format version {int(keyframe_arrays['format_version'])}, this is version {BLENDER_KEYFRAME_ARRAYS_FORMAT_VERSION}"
+        )
+        raise ValueError(
+            f"{keyframe_arrays_path} is keyframe arrays format version {int(keyframe_arrays['format_version'])}, this is version {BLENDER_KEYFRAME_ARRAYS_FORMAT_VERSION}"
+        )
+    return keyframe_arrays
+
+
+def get_location_keyframes_by_object_name(
+    keyframe_arrays: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """{object name: [3, number_of_frames] locations}"""
+    return {
+        str(object_name): keyframe_arrays["locations_obj_xyz_fr"][object_index]
+        for object_index, object_name in enumerate(keyframe_arrays["object_names"])
+    }
+
+
+def insert_location_keyframes(
+    blender_data,
+    blender_object,
+    frame_numbers: np.ndarray,
+    location_xyz_fr: np.ndarray,
+):
+    """
+    Keyframe `blender_object`'s location on every frame at once - one fcurve per axis, filled with
+    `keyframe_points.add` and `foreach_set` (same keyframes `keyframe_insert(data_path="location", ...)`
+    would make on each frame). `blender_data` is `bpy.data`
+    """
+    if blender_object.animation_data is None:
+        blender_object.animation_data_create()
+    if blender_object.animation_data.action is None:
+        blender_object.animation_data.action = blender_data.actions.new(
+            name=f"{blender_object.name}Action"
+        )
+    action = blender_object.animation_data.action
+
+    number_of_frames = len(frame_numbers)
+    # `co` is (frame, value) pairs, flattened
+    keyframe_coordinates = np.empty((number_of_frames, 2), dtype=np.float32)
+    keyframe_coordinates[:, 0] = frame_numbers
+    for axis_index in range(3):
+        fcurve = action.fcurves.new(
+            data_path="location", index=axis_index, action_group="Object Transforms"
+        )
+        fcurve.keyframe_points.add(number_of_frames)
+        keyframe_coordinates[:, 1] = location_xyz_fr[axis_index]
+        fcurve.keyframe_points.foreach_set("co", keyframe_coordinates.ravel())
+        fcurve.update()
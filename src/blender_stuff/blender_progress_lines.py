@@ -0,0 +1,37 @@
+"""
+How the Blender megascript tells whoever started it how far along it is - one json line per update on stdout,
+e.g. `FREEMOCAP_BLENDER_PROGRESS {"stage": "keyframing_empties", "frames_done": 300, "total_frames": 1200}`.
+
+Standard library only (it gets imported from inside Blender too, see `blender_keyframe_arrays`)
+"""
+import json
+from typing import Optional
+
+BLENDER_PROGRESS_LINE_PREFIX = "FREEMOCAP_BLENDER_PROGRESS "
+
+
+def format_blender_progress_line(
+    stage: str, frames_done: int, total_frames: int
+) -> str:
+    """`frames_done` is how far along `stage` is, in frames (out of `total_frames`)"""
+    return BLENDER_PROGRESS_LINE_PREFIX + json.dumps(
+        {
+            "stage": stage,
+            "frames_done": int(frames_done),
+            "total_frames": int(total_frames),
+        }
+    )
+
+
+def parse_blender_progress_line(line: str) -> Optional[dict]:
+    """`None` for anything that isn't a (well formed) progress line, i.e. the rest of what Blender prints"""
+    line = line.strip()
+    if not line.startswith(BLENDER_PROGRESS_LINE_PREFIX):
+        return None
+    try:
+        progress = json.loads(line[len(BLENDER_PROGRESS_LINE_PREFIX) :])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(progress, dict) or "stage" not in progress:
+        return None
+    return progress
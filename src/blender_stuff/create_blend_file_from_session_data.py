@@ -1,8 +1,26 @@
-import subprocess
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Callable, Optional, Union
 
-from src.config.home_dir import get_session_folder_path
+import numpy as np
+
+from src.blender_stuff.blender_export_process import BlenderExportProcess
+from src.blender_stuff.blender_keyframe_arrays import (
+    add_virtual_markers,
+    build_location_keyframe_arrays,
+    save_keyframe_arrays,
+)
+from src.config.home_dir import (
+    BLENDER_EXPORT_LOG_FILE_NAME,
+    BLENDER_KEYFRAME_ARRAYS_NPZ_FILE_NAME,
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    OUTPUT_DATA_FOLDER_NAME,
+    PARTIALLY_PROCESSED_DATA_FOLDER_NAME,
+    get_session_folder_path,
+)
+from src.core_processes.mediapipe_stuff.medaipipe_tracked_points_names_dict import (
+    mediapipe_tracked_point_names_dict,
+)
 
 # blender_exe_path = (
 #     r"C:\Users\jonma\Blender Foundation\stable\blender-3.1.0-windows-x64\blender.exe"
@@ -14,11 +32,65 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def get_data_arrays_folder_path_for_blender(
+    session_folder_path: Union[str, Path]
+) -> Path:
+    """where the megascript looks for its data (`DataArrays` for freemocap version <= v0.0.54)"""
+    output_data_folder_path = Path(session_folder_path) / OUTPUT_DATA_FOLDER_NAME
+    if (output_data_folder_path / PARTIALLY_PROCESSED_DATA_FOLDER_NAME).exists():
+        return output_data_folder_path
+    return Path(session_folder_path) / "DataArrays"
+
+
+def save_blender_keyframe_arrays(session_folder_path: Union[str, Path]) -> Path:
+    """
+    Precompute the location keyframes of every empty the megascript makes (mediapipe body + hands, plus the virtual
+    markers), in meters, so Blender can fill each fcurve in one go instead of calling `keyframe_insert` on every frame
+    """
+    data_arrays_folder_path = get_data_arrays_folder_path_for_blender(
+        session_folder_path
+    )
+    if data_arrays_folder_path.name == OUTPUT_DATA_FOLDER_NAME:
+        mediapipe_npy_path = (
+            data_arrays_folder_path
+            / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
+            / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME
+        )
+    else:
+        mediapipe_npy_path = data_arrays_folder_path / "mediaPipeSkel_3d_smoothed.npy"
+
+    logger.info(f"Precomputing Blender keyframes from {mediapipe_npy_path}")
+    mediapipe_skel_fr_mar_xyz = (
+        np.load(str(mediapipe_npy_path), mmap_mode="r") / 1000
+    )  # convert to meters
+    tracked_point_names = (
+        mediapipe_tracked_point_names_dict["body"]
+        + mediapipe_tracked_point_names_dict["right_hand"]
+        + mediapipe_tracked_point_names_dict["left_hand"]
+    )
+    keyframe_arrays = build_location_keyframe_arrays(
+        add_virtual_markers(mediapipe_skel_fr_mar_xyz, tracked_point_names)
+    )
+
+    keyframe_arrays_path = (
+        data_arrays_folder_path / BLENDER_KEYFRAME_ARRAYS_NPZ_FILE_NAME
+    )
+    save_keyframe_arrays(keyframe_arrays_path, keyframe_arrays)
+    return keyframe_arrays_path
+
+
 def create_blend_file_from_session_data(
     session_folder_path: Union[str, Path],
     blender_exe_path: Union[str, Path],
     good_clean_frame_number: int = 0,
-):
+    timeout_seconds: Optional[float] = None,
+    progress_callback: Optional[Callable[[dict], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[dict]:
+    """
+    Run the Blender megascript on this session (see `BlenderExportProcess` for the timeout, progress and cancelling),
+    with Blender's output saved to the session folder. Returns how it went (`None` if there's no Blender to run)
+    """
     path_to_this_py_file = Path(__file__).parent.resolve()
 
     freemocap_blender_megascript_path = (
@@ -42,6 +114,9 @@ def create_blend_file_from_session_data(
     command_list = [
         str(blender_exe_path),
         "--background",
+        # so an uncaught error in the megascript shows up in the exit code
+        "--python-exit-code",
+        "1",
         "--python",
         str(freemocap_blender_megascript_path),
         "--",
@@ -49,19 +124,23 @@ def create_blend_file_from_session_data(
         str(good_clean_frame_number),
     ]
 
-    logger.info(f"Starting `blender` sub-process with this command: \n {command_list}")
+    try:
+        command_list.append(str(save_blender_keyframe_arrays(session_folder_path)))
+    except Exception as e:
+        logger.warning(
+            f"Could not precompute the Blender keyframes, the megascript will work them out itself - {e}"
+        )
+
+    with BlenderExportProcess(
+        command_list,
+        log_file_path=Path(session_folder_path) / BLENDER_EXPORT_LOG_FILE_NAME,
+        timeout_seconds=timeout_seconds,
+        progress_callback=progress_callback,
+        cancel_event=cancel_event,
+    ) as blender_export_process:
+        blender_export_result = blender_export_process.wait()
 
-    blender_process = subprocess.Popen(
-        command_list, shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    logger.info(
+        f"Done with blender stuff - {blender_export_result['status']} after {blender_export_result['duration_seconds']:.1f} seconds"
     )
-    while True:
-        output = blender_process.stdout.readline()
-        if blender_process.poll() is not None:
-            break
-        if output:
-            print(output.strip().decode())
-
-    if blender_process.returncode == 0:
-        print("Blender returned an error:")
-        print(blender_process.stderr.read().decode())
-    logger.info(f"Done with blender stuff :D")
+    return blender_export_result
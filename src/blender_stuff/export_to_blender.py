@@ -1,7 +1,9 @@
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Callable, Optional, Union
 
 
+from src.blender_stuff.blender_export_process import BLENDER_EXPORT_STATUS_SUCCEEDED
 from src.blender_stuff.create_blend_file_from_session_data import (
     create_blend_file_from_session_data,
 )
@@ -11,8 +13,13 @@ logger = logging.getLogger(__name__)
 
 
 def export_to_blender(
-    session_folder_path: Union[str, Path], blender_exe_path: Union[str, Path]
-):
+    session_folder_path: Union[str, Path],
+    blender_exe_path: Union[str, Path],
+    timeout_seconds: Optional[float] = None,
+    progress_callback: Optional[Callable[[dict], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[str]:
+    """the path to the `.blend` file, or `None` if the export didn't finish (see the log in the session folder)"""
 
     blender_file_name = Path(session_folder_path).stem + ".blend"
     blender_file_path = Path(session_folder_path) / blender_file_name
@@ -20,10 +27,19 @@ def export_to_blender(
         f"Exporting session data to a Blender scene at: {str(blender_file_path)}"
     )
 
-    create_blend_file_from_session_data(
-        session_folder_path=session_folder_path, blender_exe_path=blender_exe_path
+    blender_export_result = create_blend_file_from_session_data(
+        session_folder_path=session_folder_path,
+        blender_exe_path=blender_exe_path,
+        timeout_seconds=timeout_seconds,
+        progress_callback=progress_callback,
+        cancel_event=cancel_event,
     )
 
+    if (
+        blender_export_result is None
+        or blender_export_result["status"] != BLENDER_EXPORT_STATUS_SUCCEEDED
+    ):
+        return None
     return str(blender_file_path)
 
 
@@ -1,4 +1,3 @@
-from src.cameras.detection.cam_detection import DetectPossibleCameras
 from src.cameras.detection.models import FoundCamerasResponse
 
 # No consumer should call this "private" variable
@@ -10,6 +9,9 @@ _available_cameras: FoundCamerasResponse = None
 def get_or_create_cams(always_create=False):
     global _available_cameras
     if _available_cameras is None or always_create:
+        # OpenCV only gets imported once we actually go looking for cameras
+        from src.cameras.detection.cam_detection import DetectPossibleCameras
+
         d = DetectPossibleCameras()
         _available_cameras = d.find_available_cameras()
 
@@ -5,7 +5,6 @@ from typing import List, Union
 
 import cv2
 import numpy as np
-import pandas as pd
 
 from src.cameras.capture.dataclasses.frame_payload import FramePayload
 
@@ -160,6 +159,9 @@ class VideoRecorder:
         path_to_save_timestamps_csv = (
             base_timestamp_path_str + "_timestamps_human_readable.csv"
         )
+        # pandas only gets imported once there are timestamps to save (it's slow to import)
+        import pandas as pd
+
         timestamp_dataframe = pd.DataFrame(timestamps_npy)
         timestamp_dataframe.to_csv(str(path_to_save_timestamps_csv))
         logger.info(f"Saved timestamps to path: {str(path_to_save_timestamps_csv)}")
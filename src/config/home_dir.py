@@ -39,6 +39,28 @@ TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME = "total_body_center_of_mass_xyz.npy"
 
 MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME = "mediaPipeSkel_3d_origin_aligned.npy"
 
+SKELETON_SEGMENT_LENGTHS_JSON_FILE_NAME = "skeleton_segment_lengths.json"
+
+STAGE_CACHE_MANIFEST_FILE_NAME = "stage_cache_manifest.json"
+
+DATA_MANIFEST_FILE_NAME = "data_manifest.json"
+
+PERFORMANCE_REPORTS_FOLDER_NAME = "performance_reports"
+
+PROCESSING_JOBS_FOLDER_NAME = "processing_jobs"
+
+PUPIL_POSITIONS_CACHE_FILE_NAME = "pupil_positions_cache.npz"
+
+FREEMOCAP_UNIX_TIMESTAMPS_CACHE_FILE_NAME = "unix_synced_timestamps_cache.npz"
+
+BLENDER_KEYFRAME_ARRAYS_NPZ_FILE_NAME = "blender_keyframe_arrays.npz"
+
+BLENDER_EXPORT_LOG_FILE_NAME = "blender_export_log.txt"
+
+FRAME_TIMING_NPZ_FILE_NAME = "frame_timing.npz"
+
+FRAME_TIMING_REPORT_JSON_FILE_NAME = "frame_timing_report.json"
+
 
 def create_default_session_id(string_tag: str = None):
     session_id = "session_" + time.strftime("%Y-%m-%d-%H_%M_%S")
@@ -49,6 +71,15 @@ def create_default_session_id(string_tag: str = None):
     return session_id
 
 
+def get_processing_jobs_folder_path(create_folder: bool = True):
+    processing_jobs_folder_path = (
+        Path(get_freemocap_data_folder_path()) / PROCESSING_JOBS_FOLDER_NAME
+    )
+    if create_folder:
+        processing_jobs_folder_path.mkdir(exist_ok=create_folder, parents=True)
+    return str(processing_jobs_folder_path)
+
+
 def get_log_file_path():
     log_folder_path = Path(get_freemocap_data_folder_path()) / LOG_FILE_FOLDER_NAME
     log_folder_path.mkdir(exist_ok=True, parents=True)
@@ -1,6 +1,15 @@
+import json
 import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Union, Any, Dict
+from typing import Union, Any, Dict, List, Optional
+
+import cv2
+import numpy as np
 from rich.pretty import pprint
 
 from src.core_processes.batch_processing.process_session_folder import (
@@ -15,12 +24,176 @@ from src.core_processes.capture_volume_calibration.anipose_camera_calibration im
 
 logger = logging.getLogger(__name__)
 
+# rough guesses, only used to decide how many sessions fit in `max_total_memory_gb` at once
+MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES = 2 * 1024**3
+NUMBER_OF_TRACKED_POINTS = 543  # body + hands + face
+NUMBER_OF_2D_DATA_COPIES_DURING_TRIANGULATION = 4
+
+# how often the parallel batch checks whether it's been cancelled
+BATCH_CANCEL_POLL_INTERVAL_SECONDS = 0.5
+
+# set once per worker process by `_initialize_batch_worker`, so the calibration only gets pickled once per worker
+_worker_anipose_calibration_object = None
+_worker_mediapipe_2d_semaphore = None
+_worker_cancel_event = None
+
+
+def find_synchronized_videos_folder(
+    session_folder_path: Union[str, Path]
+) -> Optional[Path]:
+    session_folder_path = Path(session_folder_path)
+    if Path(
+        session_folder_path / "synchronized_videos"
+    ).exists():  # session was recorded freemocap version > v0.0.54 (aka `alpha`)
+        return session_folder_path / "synchronized_videos"
+
+    if Path(
+        session_folder_path / "SyncedVideos"
+    ).exists():  # session was recorded with freemocap version <= v0.0.54 (aka `pre-alpha`)
+        return session_folder_path / "SyncedVideos"
+
+    return None
+
+
+def estimate_session_memory_bytes(
+    synchronized_videos_folder: Union[str, Path],
+    storage_dtype: str = "float64",
+) -> int:
+    """
+    Rough peak memory of processing one session: the mediapipe model, the annotated frames of one video
+    (`process_folder_full_of_videos` keeps them all in memory before saving the annotated video)
+    and a few copies of the 2d data during triangulation
+    """
+    video_sizes = []
+    for video_path in Path(synchronized_videos_folder).glob("*.mp4"):
+        video_capture_object = cv2.VideoCapture(str(video_path))
+        video_sizes.append(
+            (
+                int(video_capture_object.get(cv2.CAP_PROP_FRAME_COUNT)),
+                int(video_capture_object.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(video_capture_object.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            )
+        )
+        video_capture_object.release()
+
+    if len(video_sizes) == 0:
+        return MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES
+
+    annotated_video_bytes = max(
+        number_of_frames * width * height * 3
+        for number_of_frames, width, height in video_sizes
+    )
+    data2d_bytes = (
+        len(video_sizes)
+        * max(number_of_frames for number_of_frames, _, _ in video_sizes)
+        * NUMBER_OF_TRACKED_POINTS
+        * 2
+        * np.dtype(storage_dtype).itemsize
+    )
+    return (
+        MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES
+        + annotated_video_bytes
+        + NUMBER_OF_2D_DATA_COPIES_DURING_TRIANGULATION * data2d_bytes
+    )
+
+
+def _initialize_batch_worker(
+    anipose_calibration_object, mediapipe_2d_semaphore, cancel_event=None
+):
+    global _worker_anipose_calibration_object, _worker_mediapipe_2d_semaphore, _worker_cancel_event
+    _worker_anipose_calibration_object = anipose_calibration_object
+    _worker_mediapipe_2d_semaphore = mediapipe_2d_semaphore
+    _worker_cancel_event = cancel_event
+
+
+def _create_cancelled_session_result(session_folder_path: Union[str, Path]) -> dict:
+    return {
+        "session_folder_path": str(session_folder_path),
+        "succeeded": False,
+        "duration_seconds": 0.0,
+        "error": "The batch was cancelled before this session started",
+        "traceback": None,
+    }
+
+
+def process_session_folder_in_worker(
+    session_folder_path: Union[str, Path],
+    synchronized_videos_folder: Union[str, Path],
+    path_to_blender_executable: Union[str, Path],
+    anipose_calibration_object=None,
+    mediapipe_2d_semaphore=None,
+    use_undistortion_lookup: bool = False,
+    cancel_event=None,
+) -> Dict[str, Any]:
+    """
+    Process one session (with `process_session_folder`) and report how it went
+    instead of raising, so one bad session doesn't stop the batch.
+    The calibration, semaphore and cancel event default to the ones this worker process was initialized with
+    """
+    if anipose_calibration_object is None:
+        anipose_calibration_object = _worker_anipose_calibration_object
+    if mediapipe_2d_semaphore is None:
+        mediapipe_2d_semaphore = _worker_mediapipe_2d_semaphore
+    if cancel_event is None:
+        cancel_event = _worker_cancel_event
+
+    result = {
+        "session_folder_path": str(session_folder_path),
+        "succeeded": False,
+        "duration_seconds": None,
+        "error": None,
+        "traceback": None,
+    }
+    tic = time.perf_counter()
+    try:
+        output_data_folder = Path(session_folder_path) / "output_data"
+        output_data_folder.mkdir(exist_ok=True, parents=True)
+
+        session_processing_parameter_model = SessionProcessingParameterModel(
+            path_to_session_folder=session_folder_path,
+            path_to_output_data_folder=output_data_folder,
+            path_to_folder_of_synchronized_videos=synchronized_videos_folder,
+            anipose_calibration_object=anipose_calibration_object,
+            path_to_blender_executable=path_to_blender_executable,
+        )
+
+        session_processing_parameter_model.anipose_triangulate_3d_parameters.use_triangulate_ransac_method = (
+            False
+        )
+        session_processing_parameter_model.anipose_triangulate_3d_parameters.use_undistortion_lookup = (
+            use_undistortion_lookup
+        )
+
+        session_processing_parameter_model.start_processing_at_stage = 0
+
+        pprint(session_processing_parameter_model.dict(), expand_all=True)
+
+        process_session_folder(
+            session_processing_parameter_model,
+            mediapipe_2d_semaphore=mediapipe_2d_semaphore,
+            cancel_event=cancel_event,
+        )
+        result["succeeded"] = True
+    except Exception as e:
+        logger.exception(f"Failed to process session folder: {session_folder_path}")
+        result["error"] = repr(e)
+        result["traceback"] = traceback.format_exc()
+
+    result["duration_seconds"] = time.perf_counter() - tic
+    return result
+
 
 def batch_process_session_folders(
     path_to_folder_of_session_folders: Union[str, Path],
     path_to_camera_calibration_toml: Union[str, Path],
     path_to_blender_executable: Union[str, Path],
-):
+    number_of_processes: int = 1,
+    max_concurrent_mediapipe_workers: Optional[int] = None,
+    max_total_memory_gb: Optional[float] = None,
+    use_undistortion_lookup: bool = False,
+    path_to_summary_report: Optional[Union[str, Path]] = None,
+    cancel_event=None,
+) -> Dict[str, Any]:
     """
     Process a folder full of session folders.
 
@@ -29,58 +202,269 @@ def batch_process_session_folders(
     path_to_folder_of_session_folders : Union[str, Path]
         Path to folder full of session folders.
     path_to_camera_calibration_toml : Union[str, Path]
-        Path to camera calibration toml file.
+        Path to camera calibration toml file (loaded once and shared by every session).
     path_to_blender_executable : Union[str, Path]
         Path to a Blender executable.
+    number_of_processes : int
+        How many sessions to process at the same time (each in its own worker process).
+        `1` processes them one after another in this process.
+    max_concurrent_mediapipe_workers : Optional[int]
+        How many sessions may run the (CPU hungry) mediapipe 2d detection at the same time,
+        the others wait for a slot before starting it. `None` means no extra limit.
+    max_total_memory_gb : Optional[float]
+        A new session only starts if the estimated memory of all running sessions (see `estimate_session_memory_bytes`)
+        stays below this. A session is always started if nothing else is running. `None` means no limit.
+    use_undistortion_lookup : bool
+        Undistort the 2d points with the precomputed lookups saved next to the toml (built if there aren't any)
+        instead of opencv's iterative solver.
+    path_to_summary_report : Optional[Union[str, Path]]
+        Where to save the json summary (per-session timings and errors),
+        defaults to a timestamped file in `path_to_folder_of_session_folders`.
+    cancel_event : optional
+        A `threading.Event` (or `multiprocessing.Event`) - once it's set no new sessions get started, the running ones
+        stop after their current stage (see `process_session_folder`) and the summary gets saved as usual.
 
+    Failed sessions are logged and recorded in the summary, and the batch keeps going.
     """
+    batch_tic = time.perf_counter()
+
+    anipose_calibration_object = freemocap_anipose.CameraGroup.load(
+        str(path_to_camera_calibration_toml)
+    )
+    if use_undistortion_lookup:
+        # picks up the precomputed undistortion lookups saved next to the toml (if there are any),
+        # so every session doesn't have to build its own
+        anipose_calibration_object.load_undistortion_lookups(
+            path_to_camera_calibration_toml
+        )
 
-    for session_folder_path in Path(path_to_folder_of_session_folders).iterdir():
+    session_results = []
+    sessions_to_process = []
+    for session_folder_path in sorted(
+        Path(path_to_folder_of_session_folders).iterdir()
+    ):
         if not session_folder_path.is_dir():
             continue
 
-        logger.info(f"Processing session folder: {session_folder_path}")
-        if Path(
-            session_folder_path / "synchronized_videos"
-        ).exists():  # session was recorded freemocap version > v0.0.54 (aka `alpha`)
-            synchronized_videos_folder = (
-                Path(session_folder_path) / "synchronized_videos"
-            )
-
-        if Path(
-            session_folder_path / "SyncedVideos"
-        ).exists():  # session was recorded with freemocap version <= v0.0.54 (aka `pre-alpha`)
-            synchronized_videos_folder = Path(session_folder_path) / "SyncedVideos"
-        else:
-            print(
+        synchronized_videos_folder = find_synchronized_videos_folder(
+            session_folder_path
+        )
+        if synchronized_videos_folder is None:
+            logger.error(
                 f"No folder full of synchronized videos found for {session_folder_path}"
             )
-            raise FileNotFoundError
+            session_results.append(
+                {
+                    "session_folder_path": str(session_folder_path),
+                    "succeeded": False,
+                    "duration_seconds": 0.0,
+                    "error": "No folder full of synchronized videos found",
+                    "traceback": None,
+                }
+            )
+            continue
 
-        anipose_calibration_object = freemocap_anipose.CameraGroup.load(
-            str(path_to_camera_calibration_toml)
+        sessions_to_process.append(
+            {
+                "session_folder_path": session_folder_path,
+                "synchronized_videos_folder": synchronized_videos_folder,
+                "estimated_memory_bytes": estimate_session_memory_bytes(
+                    synchronized_videos_folder
+                ),
+            }
         )
 
-        output_data_folder = Path(session_folder_path) / "output_data"
-        output_data_folder.mkdir(exist_ok=True, parents=True)
+    logger.info(
+        f"Processing {len(sessions_to_process)} session folders with {number_of_processes} process(es)"
+    )
 
-        session_processing_parameter_model = SessionProcessingParameterModel(
-            path_to_session_folder=session_folder_path,
-            path_to_output_data_folder=output_data_folder,
-            path_to_folder_of_synchronized_videos=synchronized_videos_folder,
-            anipose_calibration_object=anipose_calibration_object,
+    if number_of_processes <= 1:
+        for session in sessions_to_process:
+            if cancel_event is not None and cancel_event.is_set():
+                session_results.append(
+                    _create_cancelled_session_result(session["session_folder_path"])
+                )
+                continue
+            logger.info(f"Processing session folder: {session['session_folder_path']}")
+            session_results.append(
+                process_session_folder_in_worker(
+                    session["session_folder_path"],
+                    session["synchronized_videos_folder"],
+                    path_to_blender_executable,
+                    anipose_calibration_object=anipose_calibration_object,
+                    use_undistortion_lookup=use_undistortion_lookup,
+                    cancel_event=cancel_event,
+                )
+            )
+    else:
+        session_results += _process_sessions_in_parallel(
+            sessions_to_process=sessions_to_process,
             path_to_blender_executable=path_to_blender_executable,
+            anipose_calibration_object=anipose_calibration_object,
+            number_of_processes=number_of_processes,
+            max_concurrent_mediapipe_workers=max_concurrent_mediapipe_workers,
+            max_total_memory_bytes=None
+            if max_total_memory_gb is None
+            else max_total_memory_gb * 1024**3,
+            use_undistortion_lookup=use_undistortion_lookup,
+            cancel_event=cancel_event,
         )
 
-        session_processing_parameter_model.anipose_triangulate_3d_parameters.use_triangulate_ransac_method = (
-            False
+    for session_result, session in zip(
+        session_results[-len(sessions_to_process) :], sessions_to_process
+    ):
+        session_result["estimated_memory_gb"] = (
+            session["estimated_memory_bytes"] / 1024**3
         )
 
-        session_processing_parameter_model.start_processing_at_stage = 0
+    summary_report = {
+        "created": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        "path_to_folder_of_session_folders": str(path_to_folder_of_session_folders),
+        "path_to_camera_calibration_toml": str(path_to_camera_calibration_toml),
+        "number_of_processes": number_of_processes,
+        "max_concurrent_mediapipe_workers": max_concurrent_mediapipe_workers,
+        "max_total_memory_gb": max_total_memory_gb,
+        "use_undistortion_lookup": use_undistortion_lookup,
+        "total_duration_seconds": time.perf_counter() - batch_tic,
+        "cancelled": cancel_event is not None and cancel_event.is_set(),
+        "number_of_sessions_succeeded": sum(
+            session_result["succeeded"] for session_result in session_results
+        ),
+        "number_of_sessions_failed": sum(
+            not session_result["succeeded"] for session_result in session_results
+        ),
+        "sessions": session_results,
+    }
 
-        pprint(session_processing_parameter_model.dict(), expand_all=True)
+    if path_to_summary_report is None:
+        path_to_summary_report = Path(path_to_folder_of_session_folders) / (
+            f"batch_processing_report_{summary_report['created']}.json"
+        )
+    Path(path_to_summary_report).write_text(json.dumps(summary_report, indent=4))
+    logger.info(
+        f"Processed {len(session_results)} sessions "
+        f"({summary_report['number_of_sessions_failed']} failed) "
+        f"in {summary_report['total_duration_seconds']:.1f} seconds, "
+        f"summary saved to {str(path_to_summary_report)}"
+    )
+    return summary_report
+
+
+def _process_sessions_in_parallel(
+    sessions_to_process: List[Dict[str, Any]],
+    path_to_blender_executable: Union[str, Path],
+    anipose_calibration_object,
+    number_of_processes: int,
+    max_concurrent_mediapipe_workers: Optional[int],
+    max_total_memory_bytes: Optional[float],
+    use_undistortion_lookup: bool = False,
+    cancel_event=None,
+) -> List[Dict[str, Any]]:
+    """results come back in the same order as `sessions_to_process`"""
+    mediapipe_2d_semaphore = None
+    if max_concurrent_mediapipe_workers is not None:
+        mediapipe_2d_semaphore = multiprocessing.BoundedSemaphore(
+            max_concurrent_mediapipe_workers
+        )
+    # `cancel_event` may well be a `threading.Event`, which can't be shared with the workers, so it gets passed on to this one
+    worker_cancel_event = multiprocessing.Event()
+
+    def create_executor():
+        return ProcessPoolExecutor(
+            max_workers=number_of_processes,
+            initializer=_initialize_batch_worker,
+            initargs=(
+                anipose_calibration_object,
+                mediapipe_2d_semaphore,
+                worker_cancel_event,
+            ),
+        )
+
+    results = [None] * len(sessions_to_process)
+    waiting_session_numbers = list(range(len(sessions_to_process)))
+    running_futures = {}
+    executor = create_executor()
+    try:
+        while waiting_session_numbers or running_futures:
+            if cancel_event is not None and cancel_event.is_set():
+                if not worker_cancel_event.is_set():
+                    logger.info(
+                        f"Batch cancelled, waiting for the {len(running_futures)} running session(s) to stop"
+                    )
+                    worker_cancel_event.set()
+                for session_number in waiting_session_numbers:
+                    results[session_number] = _create_cancelled_session_result(
+                        sessions_to_process[session_number]["session_folder_path"]
+                    )
+                waiting_session_numbers = []
+
+            while (
+                waiting_session_numbers and len(running_futures) < number_of_processes
+            ):
+                session = sessions_to_process[waiting_session_numbers[0]]
+                memory_in_use_bytes = sum(
+                    sessions_to_process[session_number]["estimated_memory_bytes"]
+                    for session_number in running_futures.values()
+                )
+                if (
+                    running_futures
+                    and max_total_memory_bytes is not None
+                    and memory_in_use_bytes + session["estimated_memory_bytes"]
+                    > max_total_memory_bytes
+                ):
+                    break
+
+                session_number = waiting_session_numbers.pop(0)
+                logger.info(
+                    f"Starting session folder: {session['session_folder_path']} "
+                    f"(estimated memory: {session['estimated_memory_bytes'] / 1024 ** 3:.1f} GB)"
+                )
+                future = executor.submit(
+                    process_session_folder_in_worker,
+                    session["session_folder_path"],
+                    session["synchronized_videos_folder"],
+                    path_to_blender_executable,
+                    use_undistortion_lookup=use_undistortion_lookup,
+                )
+                running_futures[future] = session_number
+
+            if not running_futures:
+                continue
+            done_futures, _ = wait(
+                running_futures,
+                timeout=None
+                if cancel_event is None
+                else BATCH_CANCEL_POLL_INTERVAL_SECONDS,
+                return_when=FIRST_COMPLETED,
+            )
+            pool_is_broken = False
+            for future in done_futures:
+                session_number = running_futures.pop(future)
+                try:
+                    results[session_number] = future.result()
+                except BrokenProcessPool as e:
+                    # a worker died (e.g. killed for running out of memory), which takes the whole pool down
+                    pool_is_broken = True
+                    results[session_number] = {
+                        "session_folder_path": str(
+                            sessions_to_process[session_number]["session_folder_path"]
+                        ),
+                        "succeeded": False,
+                        "duration_seconds": None,
+                        "error": repr(e),
+                        "traceback": None,
+                    }
+
+            if pool_is_broken:
+                logger.error(
+                    "A worker process died, restarting the worker pool and carrying on with the remaining sessions"
+                )
+                executor.shutdown(wait=True)
+                executor = create_executor()
+    finally:
+        executor.shutdown(wait=True)
 
-        process_session_folder(session_processing_parameter_model)
+    return results
 
 
 if __name__ == "__main__":
@@ -104,4 +488,7 @@ if __name__ == "__main__":
         path_to_folder_of_session_folders=path_to_folder_of_session_folders,
         path_to_camera_calibration_toml=path_to_camera_calibration_toml,
         path_to_blender_executable=path_to_blender_executable,
+        number_of_processes=4,
+        max_concurrent_mediapipe_workers=2,
+        max_total_memory_gb=48,
     )
@@ -1,17 +1,26 @@
 import logging
+import threading
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
-import pandas as pd
 
+from src.blender_stuff.blender_export_process import BLENDER_EXPORT_STATUS_SUCCEEDED
 from src.blender_stuff.create_blend_file_from_session_data import (
     create_blend_file_from_session_data,
 )
 from src.config.home_dir import (
+    CENTER_OF_MASS_FOLDER_NAME,
     MEDIAPIPE_2D_NPY_FILE_NAME,
-    MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
     MEDIAPIPE_3D_NPY_FILE_NAME,
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
     RAW_DATA_FOLDER_NAME,
+    SEGMENT_CENTER_OF_MASS_NPY_FILE_NAME,
+    SKELETON_SEGMENT_LENGTHS_JSON_FILE_NAME,
+    STAGE_CACHE_MANIFEST_FILE_NAME,
+    TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME,
 )
 from src.core_processes.capture_volume_calibration.anipose_camera_calibration import (
     freemocap_anipose,
@@ -25,8 +34,12 @@ from src.core_processes.mediapipe_stuff.convert_mediapipe_npy_to_csv import (
 from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
     MediaPipeSkeletonDetector,
 )
+from src.core_processes.mediapipe_stuff.validate_mediapipe_data import (
+    validate_mediapipe_2d_data,
+    validate_mediapipe_3d_data,
+)
 from src.core_processes.post_process_skeleton_data.estimate_skeleton_segment_lengths import (
-    estimate_skeleton_segment_lengths,
+    estimate_skeleton_segment_lengths_from_3d_data,
     mediapipe_skeleton_segment_definitions,
     save_skeleton_segment_lengths_to_json,
 )
@@ -36,9 +49,21 @@ from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_al
 from src.core_processes.batch_processing.session_processing_parameter_models import (
     SessionProcessingParameterModel,
 )
-from src.tests.test_mediapipe_data import (
-    test_mediapipe_2d_data,
-    test_mediapipe_3d_data,
+from src.core_processes.batch_processing.session_stage_cache import (
+    SessionStageCache,
+)
+from src.core_processes.batch_processing.streaming_session_pipeline import (
+    run_streaming_session_pipeline,
+)
+from src.core_processes.utils.performance_recorder import (
+    PerformanceRecorder,
+    measure_performance,
+)
+from src.core_processes.utils.session_frame_timing import (
+    TIMESTAMPS_FOLDER_NAME,
+    load_session_frame_timing,
+    reindex_onto_common_time_base,
+    save_session_frame_timing,
 )
 
 logger = logging.getLogger(__name__)
@@ -46,6 +71,8 @@ logger = logging.getLogger(__name__)
 
 def process_session_folder(
     session_processing_parameter_model: SessionProcessingParameterModel,
+    mediapipe_2d_semaphore=None,
+    cancel_event: Optional[threading.Event] = None,
 ):
     """
     Process a single session folder.
@@ -54,146 +81,424 @@ def process_session_folder(
     ----------
     session_processing_parameter_model : SessionProcessingParameterModel
         SessionProcessingParameterModel object (contains all the paths and parameters necessary to process a session folder
-
+    mediapipe_2d_semaphore : optional
+        A (multiprocessing) semaphore to hold while running the mediapipe 2d detection,
+        so batch processing can cap how many sessions run it at once
+    cancel_event : Optional[threading.Event]
+        Set it (from any thread, or any process if it's a `multiprocessing.Event`) to stop processing - the current
+        stage finishes (the Blender export gets stopped right away) and then this raises
+
+    Raises if the Blender export fails, times out or gets cancelled
     """
 
     s = session_processing_parameter_model  # make it smol
+    p = s.performance_report_parameters
 
-    if s.start_processing_at_stage <= 0:
-        if not Path(s.path_to_folder_of_synchronized_videos).exists():
-            raise FileNotFoundError(
-                f"Could not find synchronized_videos folder at {synchronized_videos_folder}"
-            )
+    performance_recorder = PerformanceRecorder(
+        run_name="process_session_folder",
+        memory_sampling_interval_seconds=p.memory_sampling_interval_seconds,
+        sampling_profiler_interval_seconds=p.sampling_profiler_interval_seconds,
+    )
+    try:
+        with performance_recorder:
+            _process_session_folder_stages(s, mediapipe_2d_semaphore, cancel_event)
+    finally:
+        if p.save_performance_report:
+            performance_recorder.save_report(s.path_to_output_data_folder)
 
-        logger.info("Detecting 2d skeletons...")
-        # 2d skeleton detection
-        mediapipe_skeleton_detector = MediaPipeSkeletonDetector(
-            parameter_model=s.mediapipe_2d_parameters,
-        )
 
-        mediapipe_2d_data = mediapipe_skeleton_detector.process_folder_full_of_videos(
+def _raise_if_cancelled(cancel_event: Optional[threading.Event], next_stage_name: str):
+    if cancel_event is not None and cancel_event.is_set():
+        logger.error(f"Session processing was cancelled before {next_stage_name}")
+        raise Exception(f"Session processing was cancelled before {next_stage_name}")
+
+
+def _process_session_folder_stages(
+    s: SessionProcessingParameterModel,
+    mediapipe_2d_semaphore=None,
+    cancel_event: Optional[threading.Event] = None,
+):
+    output_data_folder_path = Path(s.path_to_output_data_folder)
+    raw_data_folder_path = output_data_folder_path / RAW_DATA_FOLDER_NAME
+
+    mediapipe_2d_npy_path = raw_data_folder_path / MEDIAPIPE_2D_NPY_FILE_NAME
+    mediapipe_3d_npy_path = raw_data_folder_path / MEDIAPIPE_3D_NPY_FILE_NAME
+    reprojection_error_npy_path = (
+        raw_data_folder_path / MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME
+    )
+    origin_aligned_npy_path = (
+        output_data_folder_path / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME
+    )
+    center_of_mass_npy_paths = [
+        output_data_folder_path / CENTER_OF_MASS_FOLDER_NAME / file_name
+        for file_name in [
+            SEGMENT_CENTER_OF_MASS_NPY_FILE_NAME,
+            TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME,
+        ]
+    ]
+    csv_export_paths = [
+        output_data_folder_path / f"mediapipe_{body_part}_3d_xyz.{extension}"
+        for body_part in ["body", "right_hand", "left_hand", "face"]
+        for extension in ["npy", "csv"]
+        if s.csv_export_parameters.save_face_csv
+        or (body_part, extension) != ("face", "csv")
+    ]
+    segment_lengths_json_path = (
+        output_data_folder_path / SKELETON_SEGMENT_LENGTHS_JSON_FILE_NAME
+    )
+
+    stage_cache = SessionStageCache(
+        output_data_folder_path / STAGE_CACHE_MANIFEST_FILE_NAME,
+        enabled=s.use_stage_cache,
+    )
+
+    # frame timing (i.e. dropped/duplicated frames) from the timestamps saved with the synchronized videos
+    f = s.frame_timing_parameters
+    session_frame_timing = None
+    if Path(s.path_to_folder_of_synchronized_videos).exists():
+        session_frame_timing = load_session_frame_timing(
             s.path_to_folder_of_synchronized_videos,
-            s.path_to_output_data_folder / RAW_DATA_FOLDER_NAME,
+            matching_tolerance_fraction=f.matching_tolerance_fraction,
         )
+    if session_frame_timing is not None:
+        save_session_frame_timing(session_frame_timing, raw_data_folder_path)
 
-        assert test_mediapipe_2d_data(
-            s.path_to_folder_of_synchronized_videos,
-            s.path_to_output_data_folder / RAW_DATA_FOLDER_NAME,
-            mediapipe_2d_data,
+    use_gap_aware_frame_indexing = (
+        f.use_gap_aware_frame_indexing and session_frame_timing is not None
+    )
+    if f.use_gap_aware_frame_indexing and session_frame_timing is None:
+        logger.warning(
+            "Gap-aware frame indexing is on, but this session has no usable timestamps - assuming every camera's frames are in step and evenly spaced"
+        )
+
+    sampling_rate = s.post_processing_parameters.framerate
+    expected_number_of_3d_frames = None
+    frame_timing_stage_parameters = {}
+    timestamps_file_paths = []
+    if use_gap_aware_frame_indexing:
+        sampling_rate = session_frame_timing.frames_per_second
+        expected_number_of_3d_frames = session_frame_timing.number_of_frames
+        frame_timing_stage_parameters = {"frame_timing_parameters": f.dict()}
+        timestamps_file_paths = sorted(
+            (
+                Path(s.path_to_folder_of_synchronized_videos) / TIMESTAMPS_FOLDER_NAME
+            ).glob("*_binary.npy")
+        )
+    elif (
+        session_frame_timing is not None
+        and abs(session_frame_timing.frames_per_second - sampling_rate)
+        > 0.05 * sampling_rate
+    ):
+        logger.warning(
+            f"The cameras recorded at {session_frame_timing.frames_per_second:.2f} fps, but the filter assumes {sampling_rate} fps (turn on gap-aware frame indexing to use the recorded rate)"
+        )
+
+    mediapipe_2d_data = None
+    raw_skel3d_frame_marker_xyz = None
+    skeleton_reprojection_error_fr_mar = None
+    skel3d_frame_marker_xyz = None
+
+    if mediapipe_2d_semaphore is None:
+        mediapipe_2d_semaphore = nullcontext()
+
+    if s.use_streaming_pipeline and use_gap_aware_frame_indexing:
+        logger.warning(
+            "The streaming pipeline assumes every camera's frames are in step, so it doesn't do gap-aware frame indexing - running the stages one after the other instead"
         )
 
-    if s.start_processing_at_stage <= 1:
-        logger.info("Triangulating 3d skeletons...")
+    ran_streaming_pipeline = False
+    _raise_if_cancelled(cancel_event, "mediapipe_2d")
+    if (
+        s.use_streaming_pipeline
+        and not use_gap_aware_frame_indexing
+        and s.start_processing_at_stage <= 0
+    ):
+        if not Path(s.path_to_folder_of_synchronized_videos).exists():
+            raise FileNotFoundError(
+                f"Could not find synchronized_videos folder at {s.path_to_folder_of_synchronized_videos}"
+            )
 
-        if s.start_processing_at_stage > 0:
-            try:
-                mediapipe_2d_data = np.load(
-                    s.path_to_output_data_folder / MEDIAPIPE_2D_NPY_FILE_NAME
+        # one stage instead of three, since they run at the same time
+        with stage_cache.run_stage(
+            "streaming_mediapipe_2d_triangulation_post_processing",
+            input_file_paths=sorted(
+                Path(s.path_to_folder_of_synchronized_videos).glob("*.mp4")
+            ),
+            parameters={
+                "mediapipe_2d_parameters": s.mediapipe_2d_parameters.dict(),
+                "anipose_triangulate_3d_parameters": s.anipose_triangulate_3d_parameters.dict(),
+                "camera_calibration": s.anipose_calibration_object.get_dicts(),
+                "post_processing_parameters": s.post_processing_parameters.dict(),
+                "storage_dtype": s.storage_dtype,
+            },
+            output_file_paths=[
+                mediapipe_2d_npy_path,
+                mediapipe_3d_npy_path,
+                reprojection_error_npy_path,
+                origin_aligned_npy_path,
+            ]
+            + center_of_mass_npy_paths,
+        ) as needs_to_run:
+            if needs_to_run:
+                with mediapipe_2d_semaphore:
+                    logger.info(
+                        "Detecting 2d skeletons, triangulating and post-processing them at the same time..."
+                    )
+                    (
+                        mediapipe_2d_data,
+                        raw_skel3d_frame_marker_xyz,
+                        skeleton_reprojection_error_fr_mar,
+                        skel3d_frame_marker_xyz,
+                    ) = run_streaming_session_pipeline(s)
+
+                validate_mediapipe_2d_data(
+                    s.path_to_folder_of_synchronized_videos,
+                    raw_data_folder_path,
+                    mediapipe_2d_data,
                 )
-            except FileNotFoundError:
-                mediapipe_2d_data = np.load(
-                    s.path_to_output_data_folder / "mediaPipeData_2d.npy"
+                validate_mediapipe_3d_data(
+                    raw_data_folder_path,
+                    raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar,
                 )
-            assert test_mediapipe_2d_data(
-                s.path_to_folder_of_synchronized_videos,
-                s.path_to_output_data_folder,
-                mediapipe_2d_data,
+        ran_streaming_pipeline = True
+
+    if s.start_processing_at_stage <= 0 and not ran_streaming_pipeline:
+        if not Path(s.path_to_folder_of_synchronized_videos).exists():
+            raise FileNotFoundError(
+                f"Could not find synchronized_videos folder at {s.path_to_folder_of_synchronized_videos}"
             )
 
-        (
-            raw_skel3d_frame_marker_xyz,
-            skeleton_reprojection_error_fr_mar,
-        ) = triangulate_3d_data(
-            anipose_calibration_object=s.anipose_calibration_object,
-            mediapipe_2d_data=mediapipe_2d_data,
-            output_data_folder_path=Path(s.path_to_output_data_folder)
-            / RAW_DATA_FOLDER_NAME,
-            mediapipe_confidence_cutoff_threshold=s.anipose_triangulate_3d_parameters.confidence_threshold_cutoff,
-            use_triangulate_ransac=s.anipose_triangulate_3d_parameters.use_triangulate_ransac_method,
-        )
+        with stage_cache.run_stage(
+            "mediapipe_2d",
+            input_file_paths=sorted(
+                Path(s.path_to_folder_of_synchronized_videos).glob("*.mp4")
+            ),
+            parameters={
+                "mediapipe_2d_parameters": s.mediapipe_2d_parameters.dict(),
+                "storage_dtype": s.storage_dtype,
+            },
+            output_file_paths=[mediapipe_2d_npy_path],
+        ) as needs_to_run:
+            if needs_to_run:
+                with mediapipe_2d_semaphore:
+                    logger.info("Detecting 2d skeletons...")
+                    # 2d skeleton detection
+                    mediapipe_skeleton_detector = MediaPipeSkeletonDetector(
+                        parameter_model=s.mediapipe_2d_parameters,
+                    )
 
-        assert test_mediapipe_3d_data(
-            s.path_to_folder_of_synchronized_videos,
-            Path(s.path_to_output_data_folder) / RAW_DATA_FOLDER_NAME,
-            raw_skel3d_frame_marker_xyz,
-            skeleton_reprojection_error_fr_mar,
-        )
+                    mediapipe_2d_data = (
+                        mediapipe_skeleton_detector.process_folder_full_of_videos(
+                            s.path_to_folder_of_synchronized_videos,
+                            raw_data_folder_path,
+                            storage_dtype=s.storage_dtype,
+                        )
+                    )
 
-    if s.start_processing_at_stage <= 2:
-        logger.info(
-            "Gap-filling, butterworth filtering, origin aligning 3d skeletons, then calculating center of mass ..."
-        )
+                validate_mediapipe_2d_data(
+                    s.path_to_folder_of_synchronized_videos,
+                    raw_data_folder_path,
+                    mediapipe_2d_data,
+                )
 
-        if s.start_processing_at_stage > 1:
-            try:
-                raw_skel3d_frame_marker_xyz = np.load(
-                    str(
-                        Path(s.path_to_output_data_folder)
-                        / RAW_DATA_FOLDER_NAME
-                        / MEDIAPIPE_3D_NPY_FILE_NAME
+    _raise_if_cancelled(cancel_event, "triangulation")
+    if s.start_processing_at_stage <= 1 and not ran_streaming_pipeline:
+        if not mediapipe_2d_npy_path.exists():
+            # older sessions saved it in a different place/with a different name
+            for legacy_mediapipe_2d_npy_path in [
+                output_data_folder_path / MEDIAPIPE_2D_NPY_FILE_NAME,
+                output_data_folder_path / "mediaPipeData_2d.npy",
+            ]:
+                if legacy_mediapipe_2d_npy_path.exists():
+                    mediapipe_2d_npy_path = legacy_mediapipe_2d_npy_path
+                    break
+
+        with stage_cache.run_stage(
+            "triangulation",
+            input_file_paths=[mediapipe_2d_npy_path] + timestamps_file_paths,
+            parameters={
+                "anipose_triangulate_3d_parameters": s.anipose_triangulate_3d_parameters.dict(),
+                "camera_calibration": s.anipose_calibration_object.get_dicts(),
+                "storage_dtype": s.storage_dtype,
+                **frame_timing_stage_parameters,
+            },
+            output_file_paths=[mediapipe_3d_npy_path, reprojection_error_npy_path],
+        ) as needs_to_run:
+            if needs_to_run:
+                logger.info("Triangulating 3d skeletons...")
+
+                if mediapipe_2d_data is None:
+                    # copy-on-write, because the confidence thresholding edits it in place
+                    mediapipe_2d_data = np.load(
+                        str(mediapipe_2d_npy_path), mmap_mode="c"
+                    ).astype(s.storage_dtype, copy=False)
+                    validate_mediapipe_2d_data(
+                        s.path_to_folder_of_synchronized_videos,
+                        mediapipe_2d_npy_path.parent,
+                        mediapipe_2d_data,
                     )
-                )
-                skeleton_reprojection_error_fr_mar = np.load(
-                    str(
-                        Path(s.path_to_output_data_folder)
-                        / RAW_DATA_FOLDER_NAME
-                        / MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME
+
+                if use_gap_aware_frame_indexing:
+                    logger.info(
+                        f"Lining up {session_frame_timing.number_of_frames} frames at {session_frame_timing.frames_per_second:.2f} fps across cameras (nan where a camera dropped one)..."
                     )
+                    mediapipe_2d_data = reindex_onto_common_time_base(
+                        mediapipe_2d_data, session_frame_timing.frame_index_maps
+                    ).astype(s.storage_dtype, copy=False)
+
+                (
+                    raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar,
+                ) = triangulate_3d_data(
+                    anipose_calibration_object=s.anipose_calibration_object,
+                    mediapipe_2d_data=mediapipe_2d_data,
+                    output_data_folder_path=raw_data_folder_path,
+                    mediapipe_confidence_cutoff_threshold=s.anipose_triangulate_3d_parameters.confidence_threshold_cutoff,
+                    use_triangulate_ransac=s.anipose_triangulate_3d_parameters.use_triangulate_ransac_method,
+                    use_undistortion_lookup=s.anipose_triangulate_3d_parameters.use_undistortion_lookup,
+                    use_triangulate_optim_windowed=s.anipose_triangulate_3d_parameters.use_triangulate_optim_windowed_method,
+                    window_size_frames=s.anipose_triangulate_3d_parameters.windowed_optimization_parameters.window_size_frames,
+                    window_overlap_frames=s.anipose_triangulate_3d_parameters.windowed_optimization_parameters.window_overlap_frames,
+                    number_of_processes=s.anipose_triangulate_3d_parameters.windowed_optimization_parameters.number_of_processes,
+                    use_limb_length_constraints=s.anipose_triangulate_3d_parameters.windowed_optimization_parameters.use_limb_length_constraints,
+                    use_triangulate_outlier_rejection=s.anipose_triangulate_3d_parameters.use_triangulate_outlier_rejection_method,
+                    outlier_rejection_threshold_pixels=s.anipose_triangulate_3d_parameters.outlier_rejection_parameters.reprojection_error_threshold_pixels,
+                    outlier_rejection_max_rounds=s.anipose_triangulate_3d_parameters.outlier_rejection_parameters.max_rounds,
+                    outlier_rejection_min_cameras=s.anipose_triangulate_3d_parameters.outlier_rejection_parameters.min_cameras,
+                    storage_dtype=s.storage_dtype,
                 )
-            except:
-                raise FileNotFoundError(
-                    f"Could not find 3d data at {s.path_to_output_data_folder}"
+
+                validate_mediapipe_3d_data(
+                    raw_data_folder_path,
+                    raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar,
+                    expected_number_of_frames=expected_number_of_3d_frames,
                 )
 
-            assert test_mediapipe_3d_data(
-                s.path_to_folder_of_synchronized_videos,
-                Path(s.path_to_output_data_folder) / RAW_DATA_FOLDER_NAME,
-                raw_skel3d_frame_marker_xyz,
-                skeleton_reprojection_error_fr_mar,
-            )
+    _raise_if_cancelled(cancel_event, "post_processing")
+    if s.start_processing_at_stage <= 2 and not ran_streaming_pipeline:
+        with stage_cache.run_stage(
+            "post_processing",
+            input_file_paths=[mediapipe_3d_npy_path, reprojection_error_npy_path],
+            parameters={
+                **s.post_processing_parameters.dict(),
+                **(
+                    {"sampling_rate": sampling_rate}
+                    if use_gap_aware_frame_indexing
+                    else {}
+                ),
+            },
+            output_file_paths=[origin_aligned_npy_path] + center_of_mass_npy_paths,
+        ) as needs_to_run:
+            if needs_to_run:
+                logger.info(
+                    "Gap-filling, butterworth filtering, origin aligning 3d skeletons, then calculating center of mass ..."
+                )
 
-        skel3d_frame_marker_xyz = gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
-            skel3d_frame_marker_xyz=raw_skel3d_frame_marker_xyz,
-            skeleton_reprojection_error_fr_mar=skeleton_reprojection_error_fr_mar,
-            path_to_folder_where_we_will_save_this_data=s.path_to_output_data_folder,
-            sampling_rate=s.post_processing_parameters.framerate,
-            cut_off=s.post_processing_parameters.butterworth_filter_parameters.cutoff_frequency,
-            order=s.post_processing_parameters.butterworth_filter_parameters.order,
-            reference_frame_number=None,
-        )
+                if raw_skel3d_frame_marker_xyz is None:
+                    try:
+                        raw_skel3d_frame_marker_xyz = np.load(
+                            str(mediapipe_3d_npy_path), mmap_mode="r"
+                        ).astype(s.storage_dtype, copy=False)
+                        skeleton_reprojection_error_fr_mar = np.load(
+                            str(reprojection_error_npy_path), mmap_mode="r"
+                        ).astype(s.storage_dtype, copy=False)
+                    except:
+                        raise FileNotFoundError(
+                            f"Could not find 3d data at {s.path_to_output_data_folder}"
+                        )
+
+                    validate_mediapipe_3d_data(
+                        raw_data_folder_path,
+                        raw_skel3d_frame_marker_xyz,
+                        skeleton_reprojection_error_fr_mar,
+                        expected_number_of_frames=expected_number_of_3d_frames,
+                    )
 
-        logger.info(
-            "Breaking up big `npy` into smaller bits and converting to `csv`..."
-        )
-        # break up big NPY and save out csv's
-        convert_mediapipe_npy_to_csv(
-            mediapipe_3d_frame_trackedPoint_xyz=skel3d_frame_marker_xyz,
-            output_data_folder_path=s.path_to_output_data_folder,
-        )
+                skel3d_frame_marker_xyz = gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
+                    skel3d_frame_marker_xyz=raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar=skeleton_reprojection_error_fr_mar,
+                    path_to_folder_where_we_will_save_this_data=output_data_folder_path,
+                    sampling_rate=sampling_rate,
+                    cut_off=s.post_processing_parameters.butterworth_filter_parameters.cutoff_frequency,
+                    order=s.post_processing_parameters.butterworth_filter_parameters.order,
+                    reference_frame_number=None,
+                )
 
+    _raise_if_cancelled(cancel_event, "csv_export")
+    if s.start_processing_at_stage <= 2:
+        with stage_cache.run_stage(
+            "csv_export",
+            input_file_paths=[origin_aligned_npy_path],
+            parameters=s.csv_export_parameters.dict(),
+            output_file_paths=csv_export_paths,
+        ) as needs_to_run:
+            if needs_to_run:
+                logger.info(
+                    "Breaking up big `npy` into smaller bits and converting to `csv`..."
+                )
+                if skel3d_frame_marker_xyz is None:
+                    skel3d_frame_marker_xyz = np.load(
+                        str(origin_aligned_npy_path), mmap_mode="r"
+                    )
+
+                # break up big NPY and save out csv's
+                convert_mediapipe_npy_to_csv(
+                    mediapipe_3d_frame_trackedPoint_xyz=skel3d_frame_marker_xyz,
+                    output_data_folder_path=output_data_folder_path,
+                    float_precision=s.csv_export_parameters.float_precision,
+                    save_face_csv=s.csv_export_parameters.save_face_csv,
+                )
+
+    _raise_if_cancelled(cancel_event, "segment_lengths")
     if s.start_processing_at_stage <= 3:
-        logger.info("Creating Blender animation from motion capture data...")
-        # export to Blender
-        path_to_skeleton_body_csv = (
-            s.path_to_output_data_folder / "mediapipe_body_3d_xyz.csv"
-        )
-        skeleton_dataframe = pd.read_csv(path_to_skeleton_body_csv)
+        with stage_cache.run_stage(
+            "segment_lengths",
+            input_file_paths=[origin_aligned_npy_path],
+            parameters={},
+            output_file_paths=[segment_lengths_json_path],
+        ) as needs_to_run:
+            if needs_to_run:
+                if skel3d_frame_marker_xyz is None:
+                    skel3d_frame_marker_xyz = np.load(
+                        str(origin_aligned_npy_path), mmap_mode="r"
+                    )
 
-        logger.info("Estimating skeleton segment lengths...")
-        skeleton_segment_lengths_dict = estimate_skeleton_segment_lengths(
-            skeleton_dataframe=skeleton_dataframe,
-            skeleton_segment_definitions=mediapipe_skeleton_segment_definitions,
-        )
+                logger.info("Estimating skeleton segment lengths...")
+                skeleton_segment_lengths_dict = estimate_skeleton_segment_lengths_from_3d_data(
+                    skel3d_frame_marker_xyz=skel3d_frame_marker_xyz,
+                    skeleton_segment_definitions=mediapipe_skeleton_segment_definitions,
+                )
 
-        save_skeleton_segment_lengths_to_json(
-            s.path_to_output_data_folder, skeleton_segment_lengths_dict
-        )
+                save_skeleton_segment_lengths_to_json(
+                    output_data_folder_path, skeleton_segment_lengths_dict
+                )
 
+        # the blender output isn't cached - the megascript decides where the `.blend` file goes
+        logger.info("Creating Blender animation from motion capture data...")
         logger.info("Starting Blender output sub-process...")
-        create_blend_file_from_session_data(
-            session_folder_path=Path(s.path_to_folder_of_synchronized_videos).parent,
-            blender_exe_path=s.path_to_blender_executable,
-        )
+        _raise_if_cancelled(cancel_event, "blender_export")
+        with measure_performance("blender_export"):
+            blender_export_result = create_blend_file_from_session_data(
+                session_folder_path=Path(
+                    s.path_to_folder_of_synchronized_videos
+                ).parent,
+                blender_exe_path=s.path_to_blender_executable,
+                timeout_seconds=s.blender_export_parameters.timeout_seconds,
+                cancel_event=cancel_event,
+            )
+        # (`None` means there's no Blender to run, which has already been logged)
+        if (
+            blender_export_result is not None
+            and blender_export_result["status"] != BLENDER_EXPORT_STATUS_SUCCEEDED
+        ):
+            logger.error(
+                f"The Blender export {blender_export_result['status']} - see {blender_export_result['log_file_path']}"
+            )
+            raise Exception(
+                f"The Blender export {blender_export_result['status']} - see {blender_export_result['log_file_path']}"
+            )
 
 
 if __name__ == "__main__":
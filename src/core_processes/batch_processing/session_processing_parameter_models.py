@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Union
+from typing import Literal, Optional, Union
 
 from pydantic import BaseModel
 
@@ -9,11 +9,40 @@ class MediaPipe2DParametersModel(BaseModel):
     min_detection_confidence: float = 0.5
     min_tracking_confidence: float = 0.5
     static_image_mode: bool = False
+    # only run `mediapipe` on a padded crop around where the subject was on the last frame
+    use_region_of_interest_tracking: bool = False
+    region_of_interest_padding_fraction: float = 0.25
+    region_of_interest_full_frame_redetect_interval_frames: int = 30
+    region_of_interest_minimum_size_pixels: int = 256
+    # the crop's edges snap to a grid this coarse, so it moves less often (every move restarts mediapipe's tracking)
+    region_of_interest_grid_size_pixels: int = 128
+
+
+class WindowedOptimizationParametersModel(BaseModel):
+    window_size_frames: int = 300
+    window_overlap_frames: int = 30
+    number_of_processes: Optional[int] = None  # `None` means one per CPU
+    use_limb_length_constraints: bool = True
+
+
+class OutlierRejectionParametersModel(BaseModel):
+    reprojection_error_threshold_pixels: float = 15
+    max_rounds: int = 2  # at most one camera gets dropped per round
+    min_cameras: int = 2
 
 
 class AniposeTriangulate3DParametersModel(BaseModel):
     confidence_threshold_cutoff: float = 0.7
     use_triangulate_ransac_method: bool = True
+    use_undistortion_lookup: bool = False
+    use_triangulate_optim_windowed_method: bool = False
+    windowed_optimization_parameters: WindowedOptimizationParametersModel = (
+        WindowedOptimizationParametersModel()
+    )
+    use_triangulate_outlier_rejection_method: bool = False
+    outlier_rejection_parameters: OutlierRejectionParametersModel = (
+        OutlierRejectionParametersModel()
+    )
 
 
 class ButterworthFilterParametersModel(BaseModel):
@@ -27,6 +56,40 @@ class PostProcessingParametersModel(BaseModel):
     butterworth_filter_parameters = ButterworthFilterParametersModel()
 
 
+class CsvExportParametersModel(BaseModel):
+    # decimals written to the `csv` files - `None` (the default) writes the shortest exact representation, like the
+    # csv export always has; e.g. 6 is a lot faster to write and still sub-micron for data in mm
+    float_precision: Optional[int] = None
+    save_face_csv: bool = True
+
+
+class FrameTimingParametersModel(BaseModel):
+    # line the cameras' frames up on a common, evenly spaced time base (from the recorded timestamps) before
+    # triangulating, with nan where a camera dropped a frame - this changes the number of frames in the 3d data (so it
+    # no longer matches the videos frame for frame), which is why it's off by default
+    use_gap_aware_frame_indexing: bool = False
+    # a camera's frame only goes with a common timestamp if it's within this fraction of a frame of it
+    matching_tolerance_fraction: float = 0.75
+
+
+class StreamingPipelineParametersModel(BaseModel):
+    # how many frames each camera's detection hands over to triangulation at a time
+    chunk_size_frames: int = 150
+
+
+class BlenderExportParametersModel(BaseModel):
+    # stop Blender if the export takes longer than this (`None` means wait however long it takes)
+    timeout_seconds: Optional[float] = 3600
+
+
+class PerformanceReportParametersModel(BaseModel):
+    # save a json report of the wall time, CPU time and memory of every stage in the output data folder
+    save_performance_report: bool = True
+    memory_sampling_interval_seconds: float = 0.05
+    # also sample every thread's call stack this often (`None` means don't), saved next to the report for flame graphs
+    sampling_profiler_interval_seconds: Optional[float] = None
+
+
 class SessionProcessingParameterModel(BaseModel):
     path_to_session_folder: Union[Path, str]
     path_to_output_data_folder: Union[Path, str]
@@ -40,7 +103,26 @@ class SessionProcessingParameterModel(BaseModel):
     post_processing_parameters: PostProcessingParametersModel = (
         PostProcessingParametersModel()
     )
+    csv_export_parameters: CsvExportParametersModel = CsvExportParametersModel()
+    frame_timing_parameters: FrameTimingParametersModel = FrameTimingParametersModel()
     start_processing_at_stage: Union[int, str] = 0
+    # dtype of the 2d/3d/reprojection error arrays kept in memory and saved to disk,
+    # `float32` halves RAM and disk use (the triangulation math itself always runs in float64)
+    storage_dtype: Literal["float64", "float32"] = "float64"
+    # skip stages whose input files and parameters haven't changed since they last ran
+    use_stage_cache: bool = True
+    # run 2d detection, triangulation and post-processing at the same time on chunks of frames
+    # (see `run_streaming_session_pipeline`), instead of one stage after the other
+    use_streaming_pipeline: bool = False
+    streaming_pipeline_parameters: StreamingPipelineParametersModel = (
+        StreamingPipelineParametersModel()
+    )
+    performance_report_parameters: PerformanceReportParametersModel = (
+        PerformanceReportParametersModel()
+    )
+    blender_export_parameters: BlenderExportParametersModel = (
+        BlenderExportParametersModel()
+    )
 
     class Config:
         arbitrary_types_allowed = True
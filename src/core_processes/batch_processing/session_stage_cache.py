@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+from src.core_processes.utils.file_hashing import hash_file_contents
+from src.core_processes.utils.performance_recorder import measure_performance
+
+logger = logging.getLogger(__name__)
+
+
+def hash_parameters(parameters: Any) -> str:
+    """
+    Hash anything json can handle (pydantic models should be passed in as `model.dict()`),
+    falling back to `str` for everything else (e.g. `Path`s)
+    """
+    return hashlib.sha256(
+        json.dumps(parameters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class SessionStageCache:
+    """
+    A json manifest (in the session's output data folder) of which processing stages have already run,
+    keyed by the contents of each stage's input files and its parameters.
+
+    A stage is up to date (i.e. can be skipped) if its key is unchanged and its output files are still exactly
+    the ones it wrote. Since a stage's inputs are the previous stage's outputs, changing an upstream
+    parameter only re-runs the downstream stages whose inputs actually changed.
+
+    File digests are remembered by (size, modification time) so unchanged files are only hashed once.
+    """
+
+    def __init__(
+        self,
+        manifest_path: Union[str, Path],
+        enabled: bool = True,
+    ):
+        self._manifest_path = Path(manifest_path)
+        self._root_folder_path = self._manifest_path.parent
+        self._enabled = enabled
+        self._manifest = {"file_digests": {}, "stages": {}}
+
+        if self._manifest_path.exists():
+            try:
+                self._manifest = json.loads(self._manifest_path.read_text())
+            except json.JSONDecodeError:
+                logger.warning(
+                    f"Could not read stage cache manifest at {self._manifest_path}, starting from an empty one"
+                )
+
+    @property
+    def stages(self) -> Dict[str, dict]:
+        return self._manifest["stages"]
+
+    def _relative_path(self, file_path: Union[str, Path]) -> str:
+        """manifest keys are relative to the output folder, so moving a session folder doesn't invalidate it"""
+        try:
+            return Path(os.path.relpath(file_path, self._root_folder_path)).as_posix()
+        except ValueError:  # different drive on Windows
+            return Path(file_path).as_posix()
+
+    def get_file_digest(self, file_path: Union[str, Path]) -> Union[str, None]:
+        """`None` if the file doesn't exist"""
+        file_path = Path(file_path)
+        if not file_path.exists():
+            return None
+
+        stat = file_path.stat()
+        relative_path = self._relative_path(file_path)
+        remembered = self._manifest["file_digests"].get(relative_path)
+        if (
+            remembered is not None
+            and remembered["size"] == stat.st_size
+            and remembered["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return remembered["sha256"]
+
+        digest = hash_file_contents(file_path)
+        self._manifest["file_digests"][relative_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }
+        return digest
+
+    def compute_stage_key(
+        self,
+        input_file_paths: List[Union[str, Path]],
+        parameters: Any,
+    ) -> str:
+        input_file_digests = {
+            self._relative_path(file_path): self.get_file_digest(file_path)
+            for file_path in input_file_paths
+        }
+        return hash_parameters(
+            {
+                "input_files": input_file_digests,
+                "parameters": hash_parameters(parameters),
+            }
+        )
+
+    def is_up_to_date(
+        self,
+        stage_name: str,
+        stage_key: str,
+        output_file_paths: List[Union[str, Path]],
+    ) -> bool:
+        if not self._enabled:
+            return False
+
+        recorded_stage = self.stages.get(stage_name)
+        if recorded_stage is None or recorded_stage["stage_key"] != stage_key:
+            return False
+
+        for file_path in output_file_paths:
+            recorded_digest = recorded_stage["output_files"].get(
+                self._relative_path(file_path)
+            )
+            if (
+                recorded_digest is None
+                or self.get_file_digest(file_path) != recorded_digest
+            ):
+                return False
+        return True
+
+    def record_stage(
+        self,
+        stage_name: str,
+        stage_key: str,
+        output_file_paths: List[Union[str, Path]],
+        duration_seconds: float,
+    ):
+        self.stages[stage_name] = {
+            "stage_key": stage_key,
+            "output_files": {
+                self._relative_path(file_path): self.get_file_digest(file_path)
+                for file_path in output_file_paths
+            },
+            "duration_seconds": duration_seconds,
+            "completed": time.strftime("%Y-%m-%d_%H_%M_%S"),
+        }
+        self.save()
+
+    @contextmanager
+    def run_stage(
+        self,
+        stage_name: str,
+        input_file_paths: List[Union[str, Path]],
+        parameters: Any,
+        output_file_paths: List[Union[str, Path]],
+    ):
+        """
+        Yields `True` if the stage needs to run. Once the body finishes without raising,
+        the stage is recorded in the manifest with its wall time.
+
+            with stage_cache.run_stage("my_stage", inputs, parameters, outputs) as needs_to_run:
+                if needs_to_run:
+                    ...
+        """
+        with measure_performance(stage_name) as measurement:
+            stage_key = self.compute_stage_key(input_file_paths, parameters)
+            if self.is_up_to_date(stage_name, stage_key, output_file_paths):
+                logger.info(
+                    f"Skipping stage `{stage_name}` - its inputs and parameters haven't changed since it last ran"
+                )
+                measurement.details["skipped_by_stage_cache"] = True
+                yield False
+                return
+
+            tic = time.perf_counter()
+            yield True
+            duration_seconds = time.perf_counter() - tic
+            logger.info(f"Stage `{stage_name}` took {duration_seconds:.3f} seconds")
+            self.record_stage(
+                stage_name, stage_key, output_file_paths, duration_seconds
+            )
+
+    def save(self):
+        self._manifest_path.parent.mkdir(exist_ok=True, parents=True)
+        self._manifest_path.write_text(json.dumps(self._manifest, indent=4))
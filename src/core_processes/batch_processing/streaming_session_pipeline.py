@@ -0,0 +1,352 @@
+import logging
+import queue
+import threading
+import warnings
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.home_dir import MEDIAPIPE_2D_NPY_FILE_NAME, RAW_DATA_FOLDER_NAME
+from src.core_processes.batch_processing.session_processing_parameter_models import (
+    SessionProcessingParameterModel,
+)
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import (
+    calculate_reprojection_error_threshold,
+    remove_3d_data_with_high_reprojection_error,
+    save_mediapipe_3d_data_to_npy,
+    triangulate_2d_points,
+)
+from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
+    MediaPipeSkeletonDetector,
+)
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    origin_align_3d_data_and_then_calculate_center_of_mass,
+)
+from src.core_processes.post_process_skeleton_data.streaming_gap_fill_and_filter import (
+    StreamingGapFillAndButterworthFilter,
+)
+from src.core_processes.utils.npy_data_manifest import (
+    save_npy_and_record_in_data_manifest,
+)
+from src.core_processes.utils.performance_recorder import measure_performance
+
+logger = logging.getLogger(__name__)
+
+
+def _detect_skeletons_in_video_in_thread(
+    camera_number: int,
+    video_file_path: Path,
+    session_processing_parameter_model: SessionProcessingParameterModel,
+    chunk_queue: queue.Queue,
+    stop_event: threading.Event,
+):
+    """puts `(camera_number, chunk_number, data2d_chunk)` on the queue, then `(camera_number, None, None)` when it's done (or `(camera_number, None, exception)` if it fails)"""
+    s = session_processing_parameter_model
+    try:
+        # every camera gets its own tracker, since `mediapipe` tracks from one frame to the next
+        mediapipe_skeleton_detector = MediaPipeSkeletonDetector(
+            parameter_model=s.mediapipe_2d_parameters,
+        )
+        with measure_performance("detect_skeletons_in_video") as measurement:
+            measurement.details["video"] = video_file_path.name
+            for chunk_number, data2d_chunk in enumerate(
+                mediapipe_skeleton_detector.detect_skeletons_in_video_in_chunks(
+                    video_file_path,
+                    chunk_size_frames=s.streaming_pipeline_parameters.chunk_size_frames,
+                    annotated_video_save_path=Path(
+                        s.path_to_folder_of_synchronized_videos
+                    ).parent
+                    / "annotated_videos"
+                    / (video_file_path.stem + "_mediapipe.mp4"),
+                    stop_event=stop_event,
+                    storage_dtype=s.storage_dtype,
+                )
+            ):
+                measurement.add_items(data2d_chunk.shape[0])
+                chunk_queue.put((camera_number, chunk_number, data2d_chunk))
+        chunk_queue.put((camera_number, None, None))
+    except Exception as e:
+        logger.exception(f"Failed to detect skeletons in {str(video_file_path)}")
+        chunk_queue.put((camera_number, None, e))
+
+
+def run_streaming_session_pipeline(
+    session_processing_parameter_model: SessionProcessingParameterModel,
+    on_3d_frames_ready: Optional[Callable[[int, int, np.ndarray], None]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    2d skeleton detection, triangulation and post-processing (gap-filling, filtering, origin alignment
+    and center of mass) with the stages running at the same time, instead of one after the other.
+
+    Every camera gets its own detection thread, which hands over its 2d data every
+    `streaming_pipeline_parameters.chunk_size_frames` frames. As soon as every camera has handed over a chunk,
+    it gets triangulated and fed to a `StreamingGapFillAndButterworthFilter`, while detection keeps going.
+    `on_3d_frames_ready(start_frame, stop_frame, data3d_chunk)` gets called with every chunk of 3d data as it comes in
+    (thresholded by the reprojection error threshold of the frames so far).
+
+    Saves the same files as the stage-by-stage pipeline, with the same results
+    (except that every camera gets a fresh `mediapipe` tracker), because the parts that need the whole recording
+    (the reprojection error threshold, gap-filling the ends of the recording and origin alignment) get finished
+    off once detection is done.
+
+    Returns (2d data, raw 3d data, reprojection error, origin aligned 3d data)
+    """
+    s = session_processing_parameter_model
+    triangulate_3d_parameters = s.anipose_triangulate_3d_parameters
+
+    if triangulate_3d_parameters.use_triangulate_optim_windowed_method:
+        logger.error(
+            "`triangulate_optim_windowed` optimizes whole windows of frames at once, so it can't be used with the streaming pipeline"
+        )
+        raise ValueError(
+            "The streaming pipeline doesn't support `use_triangulate_optim_windowed_method`"
+        )
+
+    output_data_folder_path = Path(s.path_to_output_data_folder)
+    raw_data_folder_path = output_data_folder_path / RAW_DATA_FOLDER_NAME
+
+    # same camera order as `MediaPipeSkeletonDetector.process_folder_full_of_videos`
+    video_file_paths = list(Path(s.path_to_folder_of_synchronized_videos).glob("*.mp4"))
+    if len(video_file_paths) == 0:
+        raise FileNotFoundError(
+            f"No videos found in {s.path_to_folder_of_synchronized_videos}"
+        )
+
+    number_of_frames_per_video = []
+    for video_file_path in video_file_paths:
+        video_capture_object = cv2.VideoCapture(str(video_file_path))
+        number_of_frames_per_video.append(
+            int(video_capture_object.get(cv2.CAP_PROP_FRAME_COUNT))
+        )
+        video_capture_object.release()
+    if len(set(number_of_frames_per_video)) != 1:
+        logger.error(
+            f"Synchronized videos should all have the same number of frames, but they have: {number_of_frames_per_video}"
+        )
+        raise Exception
+
+    number_of_cameras = len(video_file_paths)
+    number_of_frames = number_of_frames_per_video[0]
+    chunk_size_frames = s.streaming_pipeline_parameters.chunk_size_frames
+    number_of_chunks = int(np.ceil(number_of_frames / chunk_size_frames))
+
+    # same as `triangulate_3d_data` - loaded lookups only get used when they're asked for
+    if (
+        triangulate_3d_parameters.use_undistortion_lookup
+        and not s.anipose_calibration_object.has_undistortion_lookups()
+    ):
+        logger.info("Building undistortion lookups from camera calibration")
+        s.anipose_calibration_object.build_undistortion_lookups()
+
+    logger.info(
+        f"Streaming {number_of_frames} frames from {number_of_cameras} cameras through detection, triangulation and filtering in chunks of {chunk_size_frames} frames"
+    )
+
+    chunk_queue = queue.Queue(maxsize=4 * number_of_cameras)
+    stop_event = threading.Event()
+    detection_threads = [
+        threading.Thread(
+            target=_detect_skeletons_in_video_in_thread,
+            args=(camera_number, video_file_path, s, chunk_queue, stop_event),
+            name=f"mediapipe_camera_{camera_number}",
+            daemon=True,
+        )
+        for camera_number, video_file_path in enumerate(video_file_paths)
+    ]
+    for detection_thread in detection_threads:
+        detection_thread.start()
+
+    mediapipe_2d_data = None
+    data3d_before_thresholding = None
+    reprojection_error = None
+    mean_reprojection_error_per_frame = None
+    streaming_filter = None
+    chunks_by_number = {}
+    number_of_chunks_triangulated = 0
+    number_of_cameras_done = 0
+
+    try:
+        while number_of_chunks_triangulated < number_of_chunks:
+            camera_number, chunk_number, data2d_chunk = chunk_queue.get()
+            if chunk_number is None:
+                if isinstance(data2d_chunk, Exception):
+                    raise data2d_chunk
+                number_of_cameras_done += 1
+                if number_of_cameras_done == number_of_cameras:
+                    logger.error(
+                        f"Detection finished after {number_of_chunks_triangulated} out of {number_of_chunks} chunks"
+                    )
+                    raise Exception
+                continue
+
+            if mediapipe_2d_data is None:
+                number_of_tracked_points = data2d_chunk.shape[1]
+                mediapipe_2d_data = np.full(
+                    (
+                        number_of_cameras,
+                        number_of_frames,
+                        number_of_tracked_points,
+                        2,
+                    ),
+                    np.nan,
+                    dtype=s.storage_dtype,
+                )
+                data3d_before_thresholding = np.full(
+                    (number_of_frames, number_of_tracked_points, 3),
+                    np.nan,
+                    dtype=s.storage_dtype,
+                )
+                reprojection_error = np.full(
+                    (number_of_frames, number_of_tracked_points),
+                    np.nan,
+                    dtype=s.storage_dtype,
+                )
+                mean_reprojection_error_per_frame = np.full(number_of_frames, np.nan)
+                butterworth_filter_parameters = (
+                    s.post_processing_parameters.butterworth_filter_parameters
+                )
+                streaming_filter = StreamingGapFillAndButterworthFilter(
+                    number_of_frames=number_of_frames,
+                    number_of_tracked_points=number_of_tracked_points,
+                    sampling_rate=s.post_processing_parameters.framerate,
+                    cutoff=butterworth_filter_parameters.cutoff_frequency,
+                    order=butterworth_filter_parameters.order,
+                    dtype=s.storage_dtype,
+                )
+
+            start_frame = chunk_number * chunk_size_frames
+            stop_frame = start_frame + data2d_chunk.shape[0]
+            mediapipe_2d_data[camera_number, start_frame:stop_frame] = data2d_chunk
+            chunks_by_number.setdefault(chunk_number, set()).add(camera_number)
+
+            # chunks come in order from every camera, so the next one to triangulate is always the lowest-numbered one
+            while (
+                len(chunks_by_number.get(number_of_chunks_triangulated, ()))
+                == number_of_cameras
+            ):
+                del chunks_by_number[number_of_chunks_triangulated]
+                start_frame = number_of_chunks_triangulated * chunk_size_frames
+                stop_frame = min(start_frame + chunk_size_frames, number_of_frames)
+                with measure_performance(
+                    "triangulate_and_filter_chunk",
+                    number_of_items=stop_frame - start_frame,
+                ):
+                    data3d_chunk = _triangulate_and_filter_chunk(
+                        s,
+                        start_frame,
+                        stop_frame,
+                        mediapipe_2d_data,
+                        data3d_before_thresholding,
+                        reprojection_error,
+                        mean_reprojection_error_per_frame,
+                        streaming_filter,
+                    )
+                number_of_chunks_triangulated += 1
+
+                if on_3d_frames_ready is not None:
+                    on_3d_frames_ready(start_frame, stop_frame, data3d_chunk)
+    finally:
+        stop_event.set()
+        # unblock any detection thread that's waiting on a full queue
+        while any(
+            detection_thread.is_alive() for detection_thread in detection_threads
+        ):
+            try:
+                chunk_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    logger.info(
+        "Detection is done, finishing off the parts that need the whole recording"
+    )
+    mediapipe_2d_npy_path = raw_data_folder_path / MEDIAPIPE_2D_NPY_FILE_NAME
+    mediapipe_2d_npy_path.parent.mkdir(exist_ok=True, parents=True)
+    logger.info(f"saving: {mediapipe_2d_npy_path}")
+    save_npy_and_record_in_data_manifest(mediapipe_2d_npy_path, mediapipe_2d_data)
+
+    raw_skel3d_frame_marker_xyz = remove_3d_data_with_high_reprojection_error(
+        data3d_numFrames_numTrackedPoints_XYZ=data3d_before_thresholding.copy(),
+        data3d_numFrames_numTrackedPoints_reprojectionError=reprojection_error,
+    )
+    save_mediapipe_3d_data_to_npy(
+        data3d_numFrames_numTrackedPoints_XYZ=raw_skel3d_frame_marker_xyz,
+        data3d_numFrames_numTrackedPoints_reprojectionError=reprojection_error,
+        path_to_folder_where_data_will_be_saved=raw_data_folder_path,
+    )
+
+    butterworth_filtered_skeleton_data = streaming_filter.finish(
+        raw_skel3d_frame_marker_xyz
+    )
+    skel3d_frame_marker_xyz = origin_align_3d_data_and_then_calculate_center_of_mass(
+        butterworth_filtered_skeleton_data=butterworth_filtered_skeleton_data,
+        path_to_folder_where_we_will_save_this_data=output_data_folder_path,
+    )
+
+    return (
+        mediapipe_2d_data,
+        raw_skel3d_frame_marker_xyz,
+        reprojection_error,
+        skel3d_frame_marker_xyz,
+    )
+
+
+def _triangulate_and_filter_chunk(
+    session_processing_parameter_model: SessionProcessingParameterModel,
+    start_frame: int,
+    stop_frame: int,
+    mediapipe_2d_data: np.ndarray,
+    data3d_before_thresholding: np.ndarray,
+    reprojection_error: np.ndarray,
+    mean_reprojection_error_per_frame: np.ndarray,
+    streaming_filter: StreamingGapFillAndButterworthFilter,
+) -> np.ndarray:
+    """triangulates frames [start_frame, stop_frame) into the arrays it gets, and returns the (provisionally thresholded) 3d data it fed to the filter"""
+    s = session_processing_parameter_model
+    triangulate_3d_parameters = s.anipose_triangulate_3d_parameters
+    number_of_cameras = mediapipe_2d_data.shape[0]
+
+    # same as `threshold_by_confidence`, but on a copy (the saved 2d data doesn't get thresholded) and without logging every chunk
+    data2d_chunk = mediapipe_2d_data[:, start_frame:stop_frame].copy()
+    data2d_chunk[
+        data2d_chunk <= triangulate_3d_parameters.confidence_threshold_cutoff
+    ] = np.nan
+    data2d_flat = data2d_chunk.reshape(number_of_cameras, -1, 2)
+
+    data3d_flat = triangulate_2d_points(
+        anipose_calibration_object=s.anipose_calibration_object,
+        data2d_flat=data2d_flat,
+        use_triangulate_ransac=triangulate_3d_parameters.use_triangulate_ransac_method,
+        use_triangulate_outlier_rejection=triangulate_3d_parameters.use_triangulate_outlier_rejection_method,
+        outlier_rejection_threshold_pixels=triangulate_3d_parameters.outlier_rejection_parameters.reprojection_error_threshold_pixels,
+        outlier_rejection_max_rounds=triangulate_3d_parameters.outlier_rejection_parameters.max_rounds,
+        outlier_rejection_min_cameras=triangulate_3d_parameters.outlier_rejection_parameters.min_cameras,
+        use_undistortion_lookup=triangulate_3d_parameters.use_undistortion_lookup,
+        progress=False,
+    )
+    reprojection_error[
+        start_frame:stop_frame
+    ] = s.anipose_calibration_object.reprojection_error(
+        data3d_flat, data2d_flat, mean=True
+    ).reshape(
+        stop_frame - start_frame, -1
+    )
+    data3d_before_thresholding[start_frame:stop_frame] = data3d_flat.reshape(
+        stop_frame - start_frame, -1, 3
+    )
+
+    # the real threshold needs the whole recording, so until then use the one from the frames so far
+    # (`StreamingGapFillAndButterworthFilter.finish` re-does the points that end up on the other side of it)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # frames with no data
+        mean_reprojection_error_per_frame[start_frame:stop_frame] = np.nanmean(
+            reprojection_error[start_frame:stop_frame], axis=1
+        )
+        error_threshold = calculate_reprojection_error_threshold(
+            mean_reprojection_error_per_frame[:stop_frame]
+        )
+    data3d_chunk = data3d_before_thresholding[start_frame:stop_frame].copy()
+    data3d_chunk[reprojection_error[start_frame:stop_frame] > error_threshold] = np.nan
+    streaming_filter.add_frames(data3d_chunk)
+    return data3d_chunk
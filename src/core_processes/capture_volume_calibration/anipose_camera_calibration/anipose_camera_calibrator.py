@@ -116,10 +116,22 @@ class AniposeCameraCalibrator:
             f"anipose camera calibration data saved to {str(camera_calibration_toml_path)}"
         )
 
+        # precompute the undistortion lookups once, so triangulation can skip opencv's iterative solver
+        self._anipose_camera_group_object.build_undistortion_lookups()
+        undistortion_lookup_path = (
+            self._anipose_camera_group_object.save_undistortion_lookups(
+                camera_calibration_toml_path
+            )
+        )
+        logger.info(f"undistortion lookups saved to {str(undistortion_lookup_path)}")
+
         last_successful_calibration_path = Path(
             get_freemocap_data_folder_path(), "last_successful_calibration.toml"
         )
         self._anipose_camera_group_object.dump(last_successful_calibration_path)
+        self._anipose_camera_group_object.save_undistortion_lookups(
+            last_successful_calibration_path
+        )
 
         logger.info(
             f"anipose camera calibration data also saved to {str(last_successful_calibration_path)}"
@@ -13,6 +13,7 @@ from numba import jit
 from collections import defaultdict, Counter
 import toml
 import itertools
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import trange
 from rich import print
 import time
@@ -26,6 +27,11 @@ from aniposelib.boards import (
 )
 from aniposelib.utils import get_initial_extrinsics, make_M, get_rtvec, get_connections
 
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.undistortion_lookup import (
+    UndistortionLookup,
+    get_undistortion_lookup_path,
+)
+
 numba_logger = logging.getLogger("numba")
 numba_logger.setLevel(logging.INFO)
 
@@ -45,6 +51,51 @@ def triangulate_simple(points, camera_mats):
     return p3d
 
 
+def triangulate_simple_batched(points, camera_mats, chunk_size=100_000):
+    """
+    Vectorized version of `triangulate_simple` for many points at once.
+    Takes an CxNx2 array of (undistorted) 2D points with NaNs for missing views and a Cx3x4 array of camera matrices,
+    returns an Nx3 array of points (NaN where fewer than 2 cameras saw the point).
+    Missing views become all-zero rows of the DLT system, which leaves its solution unchanged,
+    so every point can go through one batched SVD regardless of which cameras saw it.
+    """
+    n_cams, n_points, _ = points.shape
+    out = np.full((n_points, 3), np.nan)
+
+    for start in range(0, n_points, chunk_size):
+        sub = points[:, start : start + chunk_size]
+        good = ~np.isnan(sub[:, :, 0])
+        enough = np.sum(good, axis=0) >= 2
+        if not np.any(enough):
+            continue
+
+        sub = np.where(good[:, :, None], sub, 0)[:, enough]
+        good = good[:, enough]
+
+        # rows x*P[2]-P[0] and y*P[2]-P[1] for every camera, shape (points, 2*cams, 4)
+        A = (
+            sub[:, :, :, None] * camera_mats[:, None, 2:3, :]
+            - camera_mats[:, None, 0:2, :]
+        )
+        A = A * good[:, :, None, None]
+        A = A.transpose(1, 0, 2, 3).reshape(-1, n_cams * 2, 4)
+
+        _, _, vh = np.linalg.svd(A, full_matrices=False)
+        p3d = vh[:, -1]
+        out[start : start + chunk_size][enough] = p3d[:, :3] / p3d[:, 3:4]
+
+    return out
+
+
+def nanmean_over_cams(errors_per_cam):
+    """mean over the first (camera) axis ignoring NaNs, NaN (without a warning) where every camera is NaN"""
+    good = ~np.isnan(errors_per_cam)
+    n_good = np.sum(good, axis=0)
+    total = np.sum(np.where(good, errors_per_cam, 0), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n_good > 0, total / n_good, np.nan)
+
+
 def get_error_dict(errors_full, min_points=10):
     n_cams = errors_full.shape[0]
     errors_norm = np.linalg.norm(errors_full, axis=2)
@@ -153,6 +204,65 @@ def medfilt_data(values, size=15):
     return vpadf[padsize:-padsize]
 
 
+def estimate_default_smooth(p3ds_intp):
+    """inverse of the mean absolute frame-to-frame change of the (median filtered) 3d points"""
+    p3ds_med = np.apply_along_axis(medfilt_data, 0, p3ds_intp, size=7)
+    return 1.0 / np.mean(np.abs(np.diff(p3ds_med, axis=0)))
+
+
+def get_window_bounds(n_frames, window_size, window_overlap):
+    """
+    Split `n_frames` into windows of `window_size` frames that overlap by (at least) `window_overlap` frames.
+    The last window is shifted back so that it is full length, rather than leaving a short tail.
+    Returns a list of (start, stop) frame numbers.
+    """
+    assert (
+        0 <= window_overlap < window_size
+    ), "window_overlap must be smaller than window_size"
+
+    if n_frames <= window_size:
+        return [(0, n_frames)]
+
+    stride = window_size - window_overlap
+    window_starts = list(range(0, n_frames - window_size, stride))
+    window_starts.append(n_frames - window_size)
+    return [(start, start + window_size) for start in window_starts]
+
+
+def get_window_blend_weights(window_bounds):
+    """
+    Per-frame weights for each window, ramping linearly across the frames shared with the neighbouring windows,
+    so overlapping solutions cross-fade into each other instead of jumping at the seam.
+    """
+    weights_list = []
+    for window_number, (start, stop) in enumerate(window_bounds):
+        weights = np.ones(stop - start, dtype="float64")
+
+        if window_number > 0:
+            overlap_before = max(0, window_bounds[window_number - 1][1] - start)
+            weights[:overlap_before] = np.arange(1, overlap_before + 1) / (
+                overlap_before + 1
+            )
+
+        if window_number < len(window_bounds) - 1:
+            overlap_after = max(0, stop - window_bounds[window_number + 1][0])
+            if overlap_after > 0:
+                weights[-overlap_after:] = np.minimum(
+                    weights[-overlap_after:],
+                    np.arange(overlap_after, 0, -1) / (overlap_after + 1),
+                )
+
+        weights_list.append(weights)
+    return weights_list
+
+
+def optim_points_in_window(camera_group, points_window, p3ds_window, optim_kwargs):
+    """solve one window of `CameraGroup.optim_points_windowed` (module level so it can be sent to a worker process)"""
+    if np.sum(np.isfinite(p3ds_window[:, :, 0])) < 20:
+        return p3ds_window
+    return camera_group.optim_points(points_window, p3ds_window, **optim_kwargs)
+
+
 def nan_helper(y):
     return np.isnan(y), lambda z: z.nonzero()[0]
 
@@ -213,6 +323,7 @@ class Camera:
         self.set_translation(tvec)
         self.set_name(name)
         self.extra_dist = extra_dist
+        self.undistortion_lookup = None
 
     def get_dict(self):
         return {
@@ -337,14 +448,39 @@ class Camera:
         )
         return out.reshape(shape)
 
-    def undistort_points(self, points):
+    def undistort_points(self, points, use_lookup=False):
+        """
+        opencv's iterative solver - or, with `use_lookup=True`, the precomputed undistortion lookup if there is a valid one
+        """
+        if (
+            use_lookup
+            and self.undistortion_lookup is not None
+            and self.undistortion_lookup.matches(self.matrix, self.dist)
+        ):
+            return self.undistortion_lookup.undistort_points(
+                points, camera=self
+            ).reshape(points.shape)
+        return self.iterative_undistort_points(points)
+
+    def iterative_undistort_points(self, points):
         shape = points.shape
-        points = points.reshape(-1, 1, 2)
+        points = np.ascontiguousarray(points, dtype="float64").reshape(-1, 1, 2)
         out = cv2.undistortPoints(
             points, self.matrix.astype("float64"), self.dist.astype("float64")
         )
         return out.reshape(shape)
 
+    def build_undistortion_lookup(self, grid_spacing_pixels=4.0, padding_fraction=0.1):
+        self.undistortion_lookup = UndistortionLookup.from_camera(
+            self,
+            grid_spacing_pixels=grid_spacing_pixels,
+            padding_fraction=padding_fraction,
+        )
+        return self.undistortion_lookup
+
+    def set_undistortion_lookup(self, undistortion_lookup):
+        self.undistortion_lookup = undistortion_lookup
+
     def project(self, points):
         points = points.reshape(-1, 1, 3)
         out, _ = cv2.projectPoints(
@@ -364,7 +500,7 @@ class Camera:
         return p2d - projecting_3d_points_onto_2d_image_plane
 
     def copy(self):
-        return Camera(
+        cam = Camera(
             matrix=self.get_camera_matrix().copy(),
             dist=self.get_distortions().copy(),
             size=self.get_size(),
@@ -373,6 +509,8 @@ class Camera:
             name=self.get_name(),
             extra_dist=self.extra_dist,
         )
+        cam.set_undistortion_lookup(self.undistortion_lookup)
+        return cam
 
 
 class FisheyeCamera(Camera):
@@ -393,6 +531,7 @@ class FisheyeCamera(Camera):
         self.set_translation(tvec)
         self.set_name(name)
         self.extra_dist = extra_dist
+        self.undistortion_lookup = None
 
     def from_dict(d):
         cam = FisheyeCamera()
@@ -417,7 +556,7 @@ class FisheyeCamera(Camera):
         )
         return out.reshape(shape)
 
-    def undistort_points(self, points):
+    def iterative_undistort_points(self, points):
         shape = points.shape
         points = points.reshape(-1, 1, 2)
         out = cv2.fisheye.undistortPoints(
@@ -465,7 +604,7 @@ class FisheyeCamera(Camera):
         return params
 
     def copy(self):
-        return FisheyeCamera(
+        cam = FisheyeCamera(
             matrix=self.get_camera_matrix().copy(),
             dist=self.get_distortions().copy(),
             size=self.get_size(),
@@ -474,6 +613,8 @@ class FisheyeCamera(Camera):
             name=self.get_name(),
             extra_dist=self.extra_dist,
         )
+        cam.set_undistortion_lookup(self.undistortion_lookup)
+        return cam
 
 
 class CameraGroup:
@@ -510,9 +651,12 @@ class CameraGroup:
 
         return out
 
-    def triangulate(self, points, undistort=True, progress=False):
+    def triangulate(
+        self, points, undistort=True, progress=False, use_undistortion_lookup=False
+    ):
         """Given an CxNx2 array, this returns an Nx3 array of points,
-        where N is the number of points and C is the number of cameras"""
+        where N is the number of points and C is the number of cameras.
+        `use_undistortion_lookup` undistorts with the cameras' precomputed lookups (see `build_undistortion_lookups`)"""
 
         assert points.shape[0] == len(self.cameras), (
             "Invalid points shape, first dim should be equal to"
@@ -529,9 +673,12 @@ class CameraGroup:
         if undistort:
             new_points = np.empty(points.shape)
             for cnum, cam in enumerate(self.cameras):
-                # must copy in order to satisfy opencv underneath
-                sub = np.copy(points[cnum])
-                new_points[cnum] = cam.undistort_points(sub)
+                # opencv needs contiguous float64 input, which `points[cnum]` usually already is,
+                # so this only copies when it has to (the lookup path doesn't care either way)
+                new_points[cnum] = cam.undistort_points(
+                    np.ascontiguousarray(points[cnum], dtype="float64"),
+                    use_lookup=use_undistortion_lookup,
+                )
             points = new_points
 
         n_cams, n_points, _ = points.shape
@@ -557,8 +704,140 @@ class CameraGroup:
 
         return out
 
+    def triangulate_with_outlier_rejection(
+        self,
+        points,
+        undistort=True,
+        reprojection_error_threshold=15,
+        max_rounds=2,
+        min_cams=2,
+        return_rejected_views=False,
+        use_undistortion_lookup=False,
+    ):
+        """Given an CxNx2 array, this returns an Nx3 array of points,
+        where N is the number of points and C is the number of cameras.
+
+        A cheap alternative to `triangulate_ransac`: every point is triangulated once (batched),
+        and the per-camera reprojection errors of that first solve are kept. For the points whose mean reprojection
+        error is above `reprojection_error_threshold` (pixels) the single worst camera is dropped and only those
+        points are re-solved, in batched passes. The worst camera is the one whose removal leaves the lowest error
+        (one batched re-solve per camera), since the view with the largest residual is often a good view
+        that the outlier dragged the first solution away from. This repeats for at most `max_rounds` rounds,
+        never dropping a point below `min_cams` cameras, and a re-solve is only kept if it lowers the point's error.
+
+        With `return_rejected_views=True` this also returns a CxN boolean array marking the dropped views.
+        """
+
+        assert points.shape[0] == len(self.cameras), (
+            "Invalid points shape, first dim should be equal to"
+            " number of cameras ({}), but shape is {}".format(
+                len(self.cameras), points.shape
+            )
+        )
+
+        one_point = False
+        if len(points.shape) == 2:
+            points = points.reshape(-1, 1, 2)
+            one_point = True
+
+        # copy, because rejected views get masked out in here
+        points = np.array(points, dtype="float64")
+
+        if undistort:
+            undistorted_points = np.empty(points.shape)
+            for cnum, cam in enumerate(self.cameras):
+                undistorted_points[cnum] = cam.undistort_points(
+                    points[cnum], use_lookup=use_undistortion_lookup
+                )
+        else:
+            undistorted_points = points.copy()
+
+        n_cams, n_points, _ = points.shape
+        cam_mats = np.array([cam.get_extrinsics_mat() for cam in self.cameras])
+
+        out = triangulate_simple_batched(undistorted_points, cam_mats)
+
+        # per-camera residuals of the first solve, CxN
+        errors_per_cam = np.linalg.norm(
+            self.reprojection_error(out, points, mean=False), axis=2
+        )
+        errors_mean = nanmean_over_cams(errors_per_cam)
+
+        rejected_views = np.zeros((n_cams, n_points), dtype=bool)
+        n_good_cams = np.sum(~np.isnan(points[:, :, 0]), axis=0)
+
+        for round_number in range(max_rounds):
+            bad = np.flatnonzero(
+                (errors_mean > reprojection_error_threshold) & (n_good_cams > min_cams)
+            )
+            if len(bad) == 0:
+                break
+
+            # A bad view drags the solution towards itself, so the camera with the largest residual
+            # is often a good one. Instead, re-solve the bad points once per camera with that camera left out
+            # and drop whichever camera leaves the lowest error behind (C batched solves over the bad points only)
+            sub_points = points[:, bad]
+            sub_undistorted = undistorted_points[:, bad]
+            candidate_out = np.full((n_cams, len(bad), 3), np.nan)
+            candidate_errors_per_cam = np.full((n_cams, n_cams, len(bad)), np.nan)
+            for cnum in range(n_cams):
+                left_out_points = sub_points.copy()
+                left_out_undistorted = sub_undistorted.copy()
+                left_out_points[cnum] = np.nan
+                left_out_undistorted[cnum] = np.nan
+                candidate_out[cnum] = triangulate_simple_batched(
+                    left_out_undistorted, cam_mats
+                )
+                candidate_errors_per_cam[cnum] = np.linalg.norm(
+                    self.reprojection_error(
+                        candidate_out[cnum], left_out_points, mean=False
+                    ),
+                    axis=2,
+                )
+
+            candidate_errors_mean = nanmean_over_cams(
+                candidate_errors_per_cam.transpose(1, 0, 2)
+            )
+            # leaving out a camera that didn't see the point changes nothing
+            candidate_errors_mean[np.isnan(sub_points[:, :, 0])] = np.inf
+            candidate_errors_mean[np.isnan(candidate_errors_mean)] = np.inf
+            worst_cam = np.argmin(candidate_errors_mean, axis=0)
+            bad_range = np.arange(len(bad))
+            sub_errors_mean = candidate_errors_mean[worst_cam, bad_range]
+
+            improved = sub_errors_mean < errors_mean[bad]
+            if not np.any(improved):
+                break
+
+            keep = bad[improved]
+            worst_cam = worst_cam[improved]
+            bad_range = bad_range[improved]
+            out[keep] = candidate_out[worst_cam, bad_range]
+            errors_per_cam[:, keep] = candidate_errors_per_cam[
+                worst_cam, :, bad_range
+            ].T
+            errors_mean[keep] = sub_errors_mean[improved]
+            points[worst_cam, keep] = np.nan
+            undistorted_points[worst_cam, keep] = np.nan
+            rejected_views[worst_cam, keep] = True
+            n_good_cams[keep] -= 1
+
+        if one_point:
+            out = out[0]
+            rejected_views = rejected_views[:, 0]
+
+        if return_rejected_views:
+            return out, rejected_views
+        return out
+
     def triangulate_possible(
-        self, points, undistort=True, min_cams=2, progress=False, threshold=0.5
+        self,
+        points,
+        undistort=True,
+        min_cams=2,
+        progress=False,
+        threshold=0.5,
+        use_undistortion_lookup=False,
     ):
         """Given an CxNxPx2 array, this returns an Nx3 array of points
         by triangulating all possible points and picking the ones with
@@ -620,7 +899,11 @@ class CameraGroup:
                 pts = points[cnums, point_ix, xnums]
                 cc = self.subset_cameras(cnums)
 
-                p3d = cc.triangulate(pts, undistort=undistort)
+                p3d = cc.triangulate(
+                    pts,
+                    undistort=undistort,
+                    use_undistortion_lookup=use_undistortion_lookup,
+                )
                 err = cc.reprojection_error(p3d, pts, mean=True)
 
                 if err < best_error:
@@ -647,7 +930,14 @@ class CameraGroup:
         # return out, picked_vals, points_2d, errors #original code from OG anipose
         return out  # simplify output so that `triangulate_ransac` can be used exactly the same way as `triangulate`
 
-    def triangulate_ransac(self, points, undistort=True, min_cams=2, progress=False):
+    def triangulate_ransac(
+        self,
+        points,
+        undistort=True,
+        min_cams=2,
+        progress=False,
+        use_undistortion_lookup=False,
+    ):
         """Given an CxNx2 array, this returns an Nx3 array of points,
         where N is the number of points and C is the number of cameras"""
 
@@ -663,7 +953,11 @@ class CameraGroup:
         points_ransac = points.reshape(n_cams, n_points, 1, 2)
 
         return self.triangulate_possible(
-            points_ransac, undistort=undistort, min_cams=min_cams, progress=progress
+            points_ransac,
+            undistort=undistort,
+            min_cams=min_cams,
+            progress=progress,
+            use_undistortion_lookup=use_undistortion_lookup,
         )
 
     @jit(parallel=True, forceobj=True)
@@ -1083,6 +1377,7 @@ class CameraGroup:
         n_deriv_smooth=1,
         scores=None,
         verbose=False,
+        default_smooth=None,
     ):
         """
         Take in an array of 2D points of shape CxNxJx2,
@@ -1099,6 +1394,8 @@ class CameraGroup:
         constraints = [[0, 1], [1, 2], [2, 3]]
         (meaning that lengths of segments 0->1, 1->2, 2->3 are all constant)
 
+        `default_smooth` overrides the smoothness scale that is otherwise estimated from `p3ds`
+        (used by `optim_points_windowed` so every window is weighted the same way)
         """
         assert points.shape[0] == len(self.cameras), (
             "Invalid points shape, first dim should be equal to"
@@ -1113,9 +1410,8 @@ class CameraGroup:
 
         p3ds_intp = np.apply_along_axis(interpolate_data, 0, p3ds)
 
-        p3ds_med = np.apply_along_axis(medfilt_data, 0, p3ds_intp, size=7)
-
-        default_smooth = 1.0 / np.mean(np.abs(np.diff(p3ds_med, axis=0)))
+        if default_smooth is None:
+            default_smooth = estimate_default_smooth(p3ds_intp)
         scale_smooth_full = scale_smooth * default_smooth
 
         t1 = time.time()
@@ -1278,7 +1574,12 @@ class CameraGroup:
         return p3ds_new2, alphas_norm
 
     def triangulate_optim(
-        self, points, init_ransac=False, init_progress=False, **kwargs
+        self,
+        points,
+        init_ransac=False,
+        init_progress=False,
+        use_undistortion_lookup=False,
+        **kwargs,
     ):
         """
         Take in an array of 2D points of shape CxNxJx2, and an array of constraints of shape Kx2, where
@@ -1309,11 +1610,17 @@ class CameraGroup:
         points_shaped = points.reshape(n_cams, n_frames * n_joints, 2)
         if init_ransac:
             p3ds, picked, p2ds, errors = self.triangulate_ransac(
-                points_shaped, progress=init_progress
+                points_shaped,
+                progress=init_progress,
+                use_undistortion_lookup=use_undistortion_lookup,
             )
             points = p2ds.reshape(points.shape)
         else:
-            p3ds = self.triangulate(points_shaped, progress=init_progress)
+            p3ds = self.triangulate(
+                points_shaped,
+                progress=init_progress,
+                use_undistortion_lookup=use_undistortion_lookup,
+            )
         p3ds = p3ds.reshape((n_frames, n_joints, 3))
 
         c = np.isfinite(p3ds[:, :, 0])
@@ -1325,6 +1632,134 @@ class CameraGroup:
 
         return self.optim_points(points, p3ds, **kwargs)
 
+    def triangulate_optim_windowed(
+        self,
+        points,
+        window_size=300,
+        window_overlap=30,
+        number_of_processes=None,
+        init_ransac=False,
+        init_progress=False,
+        use_undistortion_lookup=False,
+        **kwargs,
+    ):
+        """
+        Same as `triangulate_optim`, but the spatiotemporal optimization is solved in overlapping windows of frames
+        (see `optim_points_windowed`), so memory and run time grow linearly with the length of the recording.
+
+        Take in an array of 2D points of shape CxNxJx2, returns an optimized array of 3D points of shape NxJx3.
+        """
+        assert points.shape[0] == len(self.cameras), (
+            "Invalid points shape, first dim should be equal to"
+            " number of cameras ({}), but shape is {}".format(
+                len(self.cameras), points.shape
+            )
+        )
+
+        n_cams, n_frames, n_joints, _ = points.shape
+
+        points_shaped = points.reshape(n_cams, n_frames * n_joints, 2)
+        if init_ransac:
+            p3ds = self.triangulate_ransac(
+                points_shaped,
+                progress=init_progress,
+                use_undistortion_lookup=use_undistortion_lookup,
+            )
+        else:
+            p3ds = self.triangulate(
+                points_shaped,
+                progress=init_progress,
+                use_undistortion_lookup=use_undistortion_lookup,
+            )
+        p3ds = p3ds.reshape((n_frames, n_joints, 3))
+
+        c = np.isfinite(p3ds[:, :, 0])
+        if np.sum(c) < 20:
+            print(
+                "warning: not enough 3D points to calculate_center_of_mass optimization"
+            )
+            return p3ds
+
+        return self.optim_points_windowed(
+            points,
+            p3ds,
+            window_size=window_size,
+            window_overlap=window_overlap,
+            number_of_processes=number_of_processes,
+            **kwargs,
+        )
+
+    def optim_points_windowed(
+        self,
+        points,
+        p3ds,
+        window_size=300,
+        window_overlap=30,
+        number_of_processes=None,
+        **kwargs,
+    ):
+        """
+        Windowed version of `optim_points` (same inputs and outputs, CxNxJx2 2D points and NxJx3 3D points).
+
+        The frames are split into windows of `window_size` frames overlapping by `window_overlap` frames,
+        each window is optimized independently (in a pool of `number_of_processes` worker processes, `None` means one per CPU,
+        `1` means solve them one after another in this process) and the overlaps are cross-faded together.
+        The smoothness scale is estimated once from the whole recording so that every window is weighted the same way.
+        """
+        n_cams, n_frames, n_joints, _ = points.shape
+
+        if "default_smooth" not in kwargs:
+            kwargs["default_smooth"] = estimate_default_smooth(
+                np.apply_along_axis(interpolate_data, 0, p3ds)
+            )
+
+        window_bounds = get_window_bounds(n_frames, window_size, window_overlap)
+        window_weights = get_window_blend_weights(window_bounds)
+
+        points_windows = [points[:, start:stop] for start, stop in window_bounds]
+        p3ds_windows = [p3ds[start:stop] for start, stop in window_bounds]
+
+        t1 = time.time()
+        if number_of_processes == 1 or len(window_bounds) == 1:
+            optimized_windows = list(
+                map(
+                    optim_points_in_window,
+                    [self] * len(window_bounds),
+                    points_windows,
+                    p3ds_windows,
+                    [kwargs] * len(window_bounds),
+                )
+            )
+        else:
+            with ProcessPoolExecutor(max_workers=number_of_processes) as executor:
+                optimized_windows = list(
+                    executor.map(
+                        optim_points_in_window,
+                        [self] * len(window_bounds),
+                        points_windows,
+                        p3ds_windows,
+                        [kwargs] * len(window_bounds),
+                    )
+                )
+        t2 = time.time()
+
+        if kwargs.get("verbose", False):
+            print(
+                "optimizing {} windows of {} frames took {:.2f} seconds".format(
+                    len(window_bounds), window_size, t2 - t1
+                )
+            )
+
+        p3ds_sum = np.zeros(p3ds.shape, dtype="float64")
+        weights_sum = np.zeros(n_frames, dtype="float64")
+        for (start, stop), weights, optimized_window in zip(
+            window_bounds, window_weights, optimized_windows
+        ):
+            p3ds_sum[start:stop] += weights[:, None, None] * optimized_window
+            weights_sum[start:stop] += weights
+
+        return p3ds_sum / weights_sum[:, None, None]
+
     @jit(forceobj=True, parallel=True)
     def _error_fun_triangulation(
         self,
@@ -1814,3 +2249,52 @@ class CameraGroup:
     def resize_cameras(self, scale):
         for cam in self.cameras:
             cam.resize_camera(scale)
+
+    def build_undistortion_lookups(self, grid_spacing_pixels=4.0, padding_fraction=0.1):
+        """build a precomputed undistortion lookup for every camera (see `UndistortionLookup`)"""
+        for cam in self.cameras:
+            cam.build_undistortion_lookup(
+                grid_spacing_pixels=grid_spacing_pixels,
+                padding_fraction=padding_fraction,
+            )
+
+    def save_undistortion_lookups(self, fname):
+        """save every camera's undistortion lookup next to the calibration toml `fname`"""
+        arrays = {}
+        for cnum, cam in enumerate(self.cameras):
+            if cam.undistortion_lookup is not None:
+                arrays.update(cam.undistortion_lookup.to_npz_arrays(f"cam_{cnum}"))
+        lookup_path = get_undistortion_lookup_path(fname)
+        np.savez(str(lookup_path), **arrays)
+        return lookup_path
+
+    def load_undistortion_lookups(self, fname):
+        """
+        load the undistortion lookups saved next to the calibration toml `fname`.
+        Returns True if every camera got a lookup that matches its current intrinsics.
+        """
+        lookup_path = get_undistortion_lookup_path(fname)
+        if not lookup_path.exists():
+            return False
+
+        all_loaded = True
+        with np.load(str(lookup_path)) as arrays:
+            for cnum, cam in enumerate(self.cameras):
+                if f"cam_{cnum}__grid_normalized_xy" not in arrays:
+                    all_loaded = False
+                    continue
+                lookup = UndistortionLookup.from_npz_arrays(arrays, f"cam_{cnum}")
+                if lookup.matches(cam.get_camera_matrix(), cam.get_distortions()):
+                    cam.set_undistortion_lookup(lookup)
+                else:
+                    all_loaded = False
+        return all_loaded
+
+    def has_undistortion_lookups(self):
+        return all(
+            cam.undistortion_lookup is not None
+            and cam.undistortion_lookup.matches(
+                cam.get_camera_matrix(), cam.get_distortions()
+            )
+            for cam in self.cameras
+        )
@@ -0,0 +1,294 @@
+import logging
+import time
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+from numba import jit, prange
+
+logger = logging.getLogger(__name__)
+
+UNDISTORTION_LOOKUP_FILE_SUFFIX = "_undistortion_lookup.npz"
+
+
+def get_undistortion_lookup_path(calibration_toml_path: Union[str, Path]) -> Path:
+    """the lookup file lives right next to the calibration toml it was built from"""
+    calibration_toml_path = Path(calibration_toml_path)
+    return calibration_toml_path.parent / (
+        calibration_toml_path.stem + UNDISTORTION_LOOKUP_FILE_SUFFIX
+    )
+
+
+@jit(nopython=True, parallel=True)
+def _bilinear_interpolate_grid(
+    points_xy, grid, origin_x, origin_y, spacing, out, outside_grid
+):
+    number_of_rows, number_of_columns, _ = grid.shape
+    for point_number in prange(points_xy.shape[0]):
+        x = (points_xy[point_number, 0] - origin_x) / spacing
+        y = (points_xy[point_number, 1] - origin_y) / spacing
+        if np.isnan(x) or np.isnan(y):
+            out[point_number, 0] = np.nan
+            out[point_number, 1] = np.nan
+            continue
+
+        if x < 0 or y < 0 or x > number_of_columns - 1 or y > number_of_rows - 1:
+            outside_grid[point_number] = True
+
+        column = min(max(int(np.floor(x)), 0), number_of_columns - 2)
+        row = min(max(int(np.floor(y)), 0), number_of_rows - 2)
+        tx = x - column
+        ty = y - row
+        for dimension in range(2):
+            top = (
+                grid[row, column, dimension] * (1 - tx)
+                + grid[row, column + 1, dimension] * tx
+            )
+            bottom = (
+                grid[row + 1, column, dimension] * (1 - tx)
+                + grid[row + 1, column + 1, dimension] * tx
+            )
+            out[point_number, dimension] = top * (1 - ty) + bottom * ty
+
+
+class UndistortionLookup:
+    """
+    A precomputed grid of undistorted (normalized) image coordinates for one camera.
+
+    The grid is built once from the camera's own iterative `undistort_points` (i.e. OpenCV),
+    and afterwards points are undistorted by (numba compiled) bilinear interpolation on that grid
+    instead of an iterative solve per point.
+
+    Points that fall outside the grid (mediapipe happily returns landmarks outside the image)
+    are handed back to the iterative solver, so the result is always defined.
+    """
+
+    def __init__(
+        self,
+        grid_normalized_xy: np.ndarray,
+        grid_origin_xy: np.ndarray,
+        grid_spacing_pixels: float,
+        camera_matrix: np.ndarray,
+        distortion_coefficients: np.ndarray,
+        max_error_normalized: float = np.nan,
+    ):
+        self.grid_normalized_xy = np.ascontiguousarray(
+            grid_normalized_xy, dtype="float64"
+        )
+        self.grid_origin_xy = np.asarray(grid_origin_xy, dtype="float64")
+        self.grid_spacing_pixels = float(grid_spacing_pixels)
+        self.camera_matrix = np.array(camera_matrix, dtype="float64")
+        self.distortion_coefficients = np.array(
+            distortion_coefficients, dtype="float64"
+        ).ravel()
+        self.max_error_normalized = float(max_error_normalized)
+
+    @property
+    def max_error_pixels(self) -> float:
+        """max error vs the iterative solver (measured at build time, see `from_camera`) expressed in pixels of this camera"""
+        mean_focal_length = (self.camera_matrix[0, 0] + self.camera_matrix[1, 1]) / 2.0
+        return self.max_error_normalized * mean_focal_length
+
+    @classmethod
+    def from_camera(
+        cls,
+        camera,
+        grid_spacing_pixels: float = 4.0,
+        padding_fraction: float = 0.1,
+        number_of_error_sample_points: int = 10000,
+        random_seed: int = 0,
+    ) -> "UndistortionLookup":
+        """
+        Build the lookup grid for `camera` (a `Camera` or `FisheyeCamera` with a known size),
+        covering the image plus `padding_fraction` of its width/height on every side.
+
+        The max error gets measured against the iterative solver at every cell center plus
+        `number_of_error_sample_points` random points (seeded with `random_seed`) inside the image.
+        It's an observed max rather than a hard bound - other points can come out a bit worse.
+        """
+        size = camera.get_size()
+        if size is None:
+            raise ValueError(
+                f"Camera {camera.get_name()} has no frame size, cannot build an undistortion lookup"
+            )
+        width, height = float(size[0]), float(size[1])
+
+        grid_origin_xy = np.array(
+            [-padding_fraction * width, -padding_fraction * height]
+        )
+        number_of_columns = (
+            int(np.ceil(width * (1 + 2 * padding_fraction) / grid_spacing_pixels)) + 1
+        )
+        number_of_rows = (
+            int(np.ceil(height * (1 + 2 * padding_fraction) / grid_spacing_pixels)) + 1
+        )
+
+        grid_x = grid_origin_xy[0] + grid_spacing_pixels * np.arange(number_of_columns)
+        grid_y = grid_origin_xy[1] + grid_spacing_pixels * np.arange(number_of_rows)
+        grid_pixels_xy = np.stack(np.meshgrid(grid_x, grid_y), axis=-1)
+
+        grid_normalized_xy = camera.iterative_undistort_points(
+            grid_pixels_xy.reshape(-1, 2)
+        ).reshape(number_of_rows, number_of_columns, 2)
+
+        lookup = cls(
+            grid_normalized_xy=grid_normalized_xy,
+            grid_origin_xy=grid_origin_xy,
+            grid_spacing_pixels=grid_spacing_pixels,
+            camera_matrix=camera.get_camera_matrix(),
+            distortion_coefficients=camera.get_distortions(),
+        )
+
+        # interpolation error tends to be largest in the middle of each cell, but not always exactly there,
+        # so random points in between get measured as well
+        cell_centers_xy = (grid_pixels_xy[:-1, :-1] + grid_spacing_pixels / 2).reshape(
+            -1, 2
+        )
+        random_points_xy = np.random.default_rng(random_seed).uniform(
+            [0, 0], [width, height], size=(number_of_error_sample_points, 2)
+        )
+        error_sample_points_xy = np.concatenate([cell_centers_xy, random_points_xy])
+        lookup.max_error_normalized = float(
+            np.nanmax(
+                np.linalg.norm(
+                    lookup.interpolate(error_sample_points_xy)[0]
+                    - camera.iterative_undistort_points(error_sample_points_xy),
+                    axis=1,
+                )
+            )
+        )
+
+        logger.info(
+            f"Built {number_of_rows}x{number_of_columns} undistortion lookup for camera {camera.get_name()} "
+            f"(max error vs iterative solver: {lookup.max_error_pixels:.2e} pixels)"
+        )
+        return lookup
+
+    def matches(self, camera_matrix: np.ndarray, distortion_coefficients: np.ndarray):
+        """a lookup is only valid for the exact intrinsics it was built from"""
+        return np.array_equal(self.camera_matrix, camera_matrix) and np.array_equal(
+            self.distortion_coefficients, np.ravel(distortion_coefficients)
+        )
+
+    def interpolate(self, points_xy: np.ndarray):
+        """
+        Bilinear interpolation of the grid at `points_xy` (Nx2 pixel coordinates).
+        Returns the interpolated points and a boolean mask of the points that fell outside the grid
+        (those were clamped to the border cells). NaN points come back as NaN.
+        """
+        points_xy = np.ascontiguousarray(points_xy, dtype="float64").reshape(-1, 2)
+        out = np.empty(points_xy.shape, dtype="float64")
+        outside_grid = np.zeros(points_xy.shape[0], dtype=np.bool_)
+        _bilinear_interpolate_grid(
+            points_xy,
+            self.grid_normalized_xy,
+            self.grid_origin_xy[0],
+            self.grid_origin_xy[1],
+            self.grid_spacing_pixels,
+            out,
+            outside_grid,
+        )
+        return out, outside_grid
+
+    def undistort_points(self, points_xy: np.ndarray, camera=None) -> np.ndarray:
+        """
+        Undistort Nx2 pixel coordinates into normalized image coordinates.
+        NaN points stay NaN. Points outside the grid fall back to `camera.iterative_undistort_points`
+        (or come back as NaN if no camera is given).
+        """
+        out, outside_grid = self.interpolate(points_xy)
+        if np.any(outside_grid):
+            if camera is None:
+                out[outside_grid] = np.nan
+            else:
+                out[outside_grid] = camera.iterative_undistort_points(
+                    np.asarray(points_xy, dtype="float64").reshape(-1, 2)[outside_grid]
+                )
+        return out
+
+    def to_npz_arrays(self, name: str) -> dict:
+        """`name` keys this camera's arrays inside a (possibly shared) `npz` archive"""
+        return {
+            f"{name}__grid_normalized_xy": self.grid_normalized_xy,
+            f"{name}__grid_origin_xy": self.grid_origin_xy,
+            f"{name}__grid_spacing_pixels": np.array(self.grid_spacing_pixels),
+            f"{name}__camera_matrix": self.camera_matrix,
+            f"{name}__distortion_coefficients": self.distortion_coefficients,
+            f"{name}__max_error_normalized": np.array(self.max_error_normalized),
+        }
+
+    @classmethod
+    def from_npz_arrays(cls, npz_arrays, name: str) -> "UndistortionLookup":
+        return cls(
+            grid_normalized_xy=npz_arrays[f"{name}__grid_normalized_xy"],
+            grid_origin_xy=npz_arrays[f"{name}__grid_origin_xy"],
+            grid_spacing_pixels=float(npz_arrays[f"{name}__grid_spacing_pixels"]),
+            camera_matrix=npz_arrays[f"{name}__camera_matrix"],
+            distortion_coefficients=npz_arrays[f"{name}__distortion_coefficients"],
+            max_error_normalized=float(npz_arrays[f"{name}__max_error_normalized"]),
+        )
+
+
+def benchmark_undistortion_lookup(
+    camera,
+    number_of_points: int = 1_000_000,
+    grid_spacing_pixels: float = 4.0,
+    random_seed: int = 0,
+) -> dict:
+    """
+    Time the iterative solver against the lookup on `number_of_points` random points inside the image,
+    and report the observed error (in pixels) next to the max error the lookup measured at build time
+    (on a different set of random points).
+    """
+    random_number_generator = np.random.default_rng(random_seed)
+    width, height = camera.get_size()
+    points_xy = random_number_generator.uniform(
+        [0, 0], [width, height], size=(number_of_points, 2)
+    )
+
+    tic = time.perf_counter()
+    lookup = UndistortionLookup.from_camera(
+        camera, grid_spacing_pixels=grid_spacing_pixels, random_seed=random_seed + 1
+    )
+    build_duration = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    iterative_points = camera.iterative_undistort_points(points_xy)
+    iterative_duration = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    lookup_points = lookup.undistort_points(points_xy, camera=camera)
+    lookup_duration = time.perf_counter() - tic
+
+    mean_focal_length = camera.get_focal_length()
+    observed_error_pixels = (
+        np.linalg.norm(lookup_points - iterative_points, axis=1) * mean_focal_length
+    )
+
+    return {
+        "number_of_points": number_of_points,
+        "grid_spacing_pixels": grid_spacing_pixels,
+        "build_duration_seconds": build_duration,
+        "iterative_duration_seconds": iterative_duration,
+        "lookup_duration_seconds": lookup_duration,
+        "speedup": iterative_duration / lookup_duration,
+        "max_error_pixels_measured_at_build": lookup.max_error_pixels,
+        "max_error_pixels_observed": float(np.max(observed_error_pixels)),
+        "mean_error_pixels_observed": float(np.mean(observed_error_pixels)),
+    }
+
+
+if __name__ == "__main__":
+    from rich.pretty import pprint
+
+    from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+        Camera,
+    )
+
+    example_camera = Camera(
+        matrix=[[1000.0, 0, 960], [0, 1000.0, 540], [0, 0, 1]],
+        dist=[-0.25, 0.08, 0, 0, 0],
+        size=(1920, 1080),
+        name="example_camera",
+    )
+    pprint(benchmark_undistortion_lookup(example_camera))
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import numpy as np
 import logging
@@ -8,17 +8,25 @@ from src.config.home_dir import (
     MEDIAPIPE_3D_NPY_FILE_NAME,
     MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
 )
+from src.core_processes.utils.npy_data_manifest import (
+    save_npy_and_record_in_data_manifest,
+)
+from src.core_processes.utils.performance_recorder import (
+    measure_performance,
+    record_performance,
+)
 
 logger = logging.getLogger(__name__)
 
 
+@record_performance()
 def threshold_by_confidence(
     mediapipe_2d_data: np.ndarray,
     mediapipe_confidence_cutoff_threshold: float = 0.0,
 ):
     mediapipe_2d_data[
         mediapipe_2d_data <= mediapipe_confidence_cutoff_threshold
-    ] = np.NaN
+    ] = np.nan
 
     number_of_nans = np.sum(np.isnan(mediapipe_2d_data))
     number_of_points = np.prod(mediapipe_2d_data.shape)
@@ -31,6 +39,18 @@ def threshold_by_confidence(
     return mediapipe_2d_data
 
 
+def calculate_reprojection_error_threshold(
+    mean_reprojection_error_per_frame: np.ndarray,
+) -> float:
+    """the median plus 3 median absolute deviations of the mean reprojection error of each frame"""
+    reprojection_error_median = np.nanmedian(mean_reprojection_error_per_frame)
+    median_absolute_deviation = np.nanmedian(
+        np.abs(mean_reprojection_error_per_frame - reprojection_error_median)
+    )
+    return reprojection_error_median + 3 * median_absolute_deviation
+
+
+@record_performance()
 def remove_3d_data_with_high_reprojection_error(
     data3d_numFrames_numTrackedPoints_XYZ: np.ndarray,
     data3d_numFrames_numTrackedPoints_reprojectionError: np.ndarray,
@@ -53,7 +73,9 @@ def remove_3d_data_with_high_reprojection_error(
         f"\nInitial reprojection error - \nmean: {reprojection_error_mean:.3f},\nstandard deviation: {reprojection_error_std:.3f},\nmedian: {reprojection_error_median}\nmedian absolute deviation: {median_absolute_deviation:.3f}"
     )
 
-    error_threshold = reprojection_error_median + 3 * median_absolute_deviation
+    error_threshold = calculate_reprojection_error_threshold(
+        mean_reprojection_error_per_frame
+    )
 
     number_of_nans_before_thresholding = np.sum(
         np.isnan(data3d_numFrames_numTrackedPoints_XYZ)
@@ -84,12 +106,76 @@ def remove_3d_data_with_high_reprojection_error(
     return data3d_numFrames_numTrackedPoints_XYZ
 
 
+@record_performance()
+def triangulate_2d_points(
+    anipose_calibration_object,
+    data2d_flat: np.ndarray,
+    use_triangulate_ransac: bool = False,
+    use_triangulate_outlier_rejection: bool = False,
+    outlier_rejection_threshold_pixels: float = 15,
+    outlier_rejection_max_rounds: int = 2,
+    outlier_rejection_min_cameras: int = 2,
+    use_undistortion_lookup: bool = False,
+    progress: bool = True,
+) -> np.ndarray:
+    """
+    Triangulate [number_of_cameras, number_of_2d_points, XY] into [number_of_2d_points, XYZ]
+    with one of the methods that treat every point on its own (i.e. everything except `triangulate_optim_windowed`),
+    so it gives the same results whether it gets a whole recording or a few frames of it at a time
+    """
+    if use_triangulate_outlier_rejection:
+        logger.info(
+            f"Using `triangulate_with_outlier_rejection` method (threshold: {outlier_rejection_threshold_pixels} pixels, max rounds: {outlier_rejection_max_rounds})"
+        )
+        (
+            data3d_flat,
+            rejected_views_flat,
+        ) = anipose_calibration_object.triangulate_with_outlier_rejection(
+            data2d_flat,
+            reprojection_error_threshold=outlier_rejection_threshold_pixels,
+            max_rounds=outlier_rejection_max_rounds,
+            min_cams=outlier_rejection_min_cameras,
+            return_rejected_views=True,
+            use_undistortion_lookup=use_undistortion_lookup,
+        )
+        logger.info(
+            f"Rejected {np.sum(rejected_views_flat)} camera views out of {np.sum(~np.isnan(data2d_flat[:, :, 0]))}"
+        )
+    elif use_triangulate_ransac:
+        logger.info("Using `triangulate_ransac` method")
+        data3d_flat = anipose_calibration_object.triangulate_ransac(
+            data2d_flat,
+            progress=progress,
+            use_undistortion_lookup=use_undistortion_lookup,
+        )
+    else:
+        logger.info("Using simple `triangulate` method ")
+        data3d_flat = anipose_calibration_object.triangulate(
+            data2d_flat,
+            progress=progress,
+            use_undistortion_lookup=use_undistortion_lookup,
+        )
+
+    return data3d_flat
+
+
 def triangulate_3d_data(
     anipose_calibration_object,
     mediapipe_2d_data: np.ndarray,
     output_data_folder_path: Union[str, Path],
     mediapipe_confidence_cutoff_threshold: float,
     use_triangulate_ransac: bool = False,
+    use_undistortion_lookup: bool = False,
+    use_triangulate_optim_windowed: bool = False,
+    window_size_frames: int = 300,
+    window_overlap_frames: int = 30,
+    number_of_processes: Optional[int] = None,
+    use_limb_length_constraints: bool = True,
+    use_triangulate_outlier_rejection: bool = False,
+    outlier_rejection_threshold_pixels: float = 15,
+    outlier_rejection_max_rounds: int = 2,
+    outlier_rejection_min_cameras: int = 2,
+    storage_dtype: str = "float64",
 ):
     number_of_cameras = mediapipe_2d_data.shape[0]
     number_of_frames = mediapipe_2d_data.shape[1]
@@ -119,22 +205,65 @@ def triangulate_3d_data(
         f"number_of_spatial_dimensions: {number_of_spatial_dimensions}"
     )
 
-    if use_triangulate_ransac:
-        logger.info("Using `triangulate_ransac` method")
-        data3d_flat = anipose_calibration_object.triangulate_ransac(
-            data2d_flat, progress=True
+    # lookups that happen to be loaded (e.g. saved next to the calibration toml) only get used when they're asked for
+    if (
+        use_undistortion_lookup
+        and not anipose_calibration_object.has_undistortion_lookups()
+    ):
+        logger.info("Building undistortion lookups from camera calibration")
+        anipose_calibration_object.build_undistortion_lookups()
+
+    if use_triangulate_optim_windowed:
+        logger.info(
+            f"Using `triangulate_optim_windowed` method (windows of {window_size_frames} frames, overlapping by {window_overlap_frames} frames)"
         )
+        constraints = []
+        if use_limb_length_constraints:
+            from src.core_processes.mediapipe_stuff.mediapipe_skeleton_names_and_connections import (
+                mediapipe_body_connections,
+            )
+
+            # body points come first in the `mediapipe_2d_data` tracked points, so these indices line up
+            constraints = [
+                list(connection) for connection in mediapipe_body_connections
+            ]
+
+        with measure_performance(
+            "triangulate_optim_windowed", number_of_items=number_of_frames
+        ):
+            data3d_flat = anipose_calibration_object.triangulate_optim_windowed(
+                mediapipe_2d_data,
+                window_size=window_size_frames,
+                window_overlap=window_overlap_frames,
+                number_of_processes=number_of_processes,
+                init_ransac=use_triangulate_ransac,
+                init_progress=True,
+                use_undistortion_lookup=use_undistortion_lookup,
+                constraints=constraints,
+            ).reshape(-1, 3)
     else:
-        logger.info("Using simple `triangulate` method ")
-        data3d_flat = anipose_calibration_object.triangulate(data2d_flat, progress=True)
+        data3d_flat = triangulate_2d_points(
+            anipose_calibration_object=anipose_calibration_object,
+            data2d_flat=data2d_flat,
+            use_triangulate_ransac=use_triangulate_ransac,
+            use_triangulate_outlier_rejection=use_triangulate_outlier_rejection,
+            outlier_rejection_threshold_pixels=outlier_rejection_threshold_pixels,
+            outlier_rejection_max_rounds=outlier_rejection_max_rounds,
+            outlier_rejection_min_cameras=outlier_rejection_min_cameras,
+            use_undistortion_lookup=use_undistortion_lookup,
+        )
 
-    spatial_data3d_numFrames_numTrackedPoints_XYZ_og = data3d_flat.reshape(
-        number_of_frames, number_of_tracked_points, 3
-    )
+    # the reprojection error is computed from the float64 triangulation output, only the stored results get `storage_dtype`
+    with measure_performance(
+        "reprojection_error", number_of_items=data3d_flat.shape[0]
+    ):
+        data3d_reprojectionError_flat = anipose_calibration_object.reprojection_error(
+            data3d_flat, data2d_flat, mean=True
+        ).astype(storage_dtype, copy=False)
 
-    data3d_reprojectionError_flat = anipose_calibration_object.reprojection_error(
-        data3d_flat, data2d_flat, mean=True
-    )
+    spatial_data3d_numFrames_numTrackedPoints_XYZ_og = data3d_flat.astype(
+        storage_dtype, copy=False
+    ).reshape(number_of_frames, number_of_tracked_points, 3)
 
     reprojection_error_data3d_numFrames_numTrackedPoints = (
         data3d_reprojectionError_flat.reshape(
@@ -159,6 +288,7 @@ def triangulate_3d_data(
     )
 
 
+@record_performance()
 def save_mediapipe_3d_data_to_npy(
     data3d_numFrames_numTrackedPoints_XYZ: np.ndarray,
     data3d_numFrames_numTrackedPoints_reprojectionError: np.ndarray,
@@ -175,7 +305,9 @@ def save_mediapipe_3d_data_to_npy(
     )
 
     logger.info(f"saving: {mediapipe_3dData_save_path}")
-    np.save(str(mediapipe_3dData_save_path), data3d_numFrames_numTrackedPoints_XYZ)
+    save_npy_and_record_in_data_manifest(
+        mediapipe_3dData_save_path, data3d_numFrames_numTrackedPoints_XYZ
+    )
 
     # save reprojection error
     mediapipe_reprojection_error_save_path = (
@@ -184,8 +316,8 @@ def save_mediapipe_3d_data_to_npy(
     )
 
     logger.info(f"saving: {mediapipe_reprojection_error_save_path}")
-    np.save(
-        str(mediapipe_reprojection_error_save_path),
+    save_npy_and_record_in_data_manifest(
+        mediapipe_reprojection_error_save_path,
         data3d_numFrames_numTrackedPoints_reprojectionError,
     )
 
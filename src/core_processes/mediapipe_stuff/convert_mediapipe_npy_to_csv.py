@@ -1,24 +1,25 @@
 # %%
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
-import pandas as pd
 from mediapipe.python.solutions import holistic as mp_holistic
 
+from src.core_processes.utils.save_array_to_csv import save_array_to_csv
+
 logger = logging.getLogger(__name__)
 
+MEDIAPIPE_BODY_PART_NAMES = ["body", "right_hand", "left_hand", "face"]
 
-def convert_mediapipe_npy_to_csv(
-    mediapipe_3d_frame_trackedPoint_xyz: np.ndarray,
-    output_data_folder_path: Union[str, Path],
-):
-    logger.info(
-        f"Converting npy data with shape: {mediapipe_3d_frame_trackedPoint_xyz.shape} into `csv` and smaller `npy` files"
-    )
 
-    # %%
+@functools.lru_cache()
+def get_mediapipe_3d_xyz_csv_headers(
+    number_of_face_points: int,
+) -> Dict[str, Tuple[str, ...]]:
+    """the `csv` column names of each body part (these never change, so they only get built once)"""
     mediapipe_pose_landmark_names = [
         landmark.name.lower() for landmark in mp_holistic.PoseLandmark
     ]
@@ -26,340 +27,114 @@ def convert_mediapipe_npy_to_csv(
         landmark.name.lower() for landmark in mp_holistic.HandLandmark
     ]
     # face_landmark_names = [landmark.name.lower() for landmark in mp_holistic.PoseLandmark] #gonna have the clever for the face
-    # logger.info(f"Body tracked point names: {mediapipe_pose_landmark_names}")
-    # logger.info(mediapipe_hand_landmark_names)
-
-    # %%
-    # get number of points in body, hands, face
-
-    number_of_body_points = len(mediapipe_pose_landmark_names)
-    number_of_hand_points = len(mediapipe_hand_landmark_names)
-
-    first_body_marker_index = 0
-    last_body_marker_index = number_of_body_points - 1
-
-    first_right_hand_marker_index = last_body_marker_index + 1
-    last_right_hand_marker_index = number_of_body_points + number_of_hand_points - 1
 
-    first_left_hand_marker_index = last_right_hand_marker_index + 1
-    last_left_hand_marker_index = (
-        last_right_hand_marker_index + 1 + number_of_hand_points - 1
-    )
-
-    first_face_marker_index = last_left_hand_marker_index + 1
-    last_face_marker_index = mediapipe_3d_frame_trackedPoint_xyz.shape[1]
-
-    number_of_face_points = last_face_marker_index - first_face_marker_index
-
-    # logger.info(
-    #     f"body tracked point indices: {first_body_marker_index}:{last_body_marker_index}"
-    # )
-    # logger.info(
-    #     f"right hand tracked point indices: {first_right_hand_marker_index}:{last_right_hand_marker_index}"
-    # )
-    # logger.info(
-    #     f"left hand tracked point indices: {first_left_hand_marker_index}:{last_left_hand_marker_index}"
-    # )
-    # logger.info(
-    #     f"face tracked point indices: {first_face_marker_index}:{last_face_marker_index}"
-    # )
-    #
-    # logger.info(
-    #     f"number of body points: {last_body_marker_index - first_body_marker_index + 1}"
-    # )
-    # logger.info(
-    #     f"number of right hand points: {last_right_hand_marker_index - first_right_hand_marker_index + 1}"
-    # )
-    # logger.info(
-    #     f"number of left hand points: {last_left_hand_marker_index - first_left_hand_marker_index + 1}"
-    # )
-    # logger.info(
-    #     f"number of face points: {last_face_marker_index - first_face_marker_index + 1}"
-    # )
+    landmark_names_per_body_part = {
+        "body": mediapipe_pose_landmark_names,
+        "right_hand": [
+            f"right_hand_{landmark_name}"
+            for landmark_name in mediapipe_hand_landmark_names
+        ],
+        "left_hand": [
+            f"left_hand_{landmark_name}"
+            for landmark_name in mediapipe_hand_landmark_names
+        ],
+        "face": [
+            f"face_{str(landmark_number).zfill(4)}"
+            for landmark_number in range(number_of_face_points)
+        ],
+    }
+    return {
+        body_part_name: tuple(
+            f"{landmark_name}_{dimension}"
+            for landmark_name in landmark_names
+            for dimension in "xyz"
+        )
+        for body_part_name, landmark_names in landmark_names_per_body_part.items()
+    }
+
+
+def split_mediapipe_3d_data_into_body_parts(
+    mediapipe_3d_frame_trackedPoint_xyz: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """[number_of_frames, number_of_tracked_points, XYZ] -> {body part name: [number_of_frames, number_of_body_part_points, XYZ]}"""
+    number_of_body_points = len(mp_holistic.PoseLandmark)
+    number_of_hand_points = len(mp_holistic.HandLandmark)
+
+    first_right_hand_marker_index = number_of_body_points
+    first_left_hand_marker_index = first_right_hand_marker_index + number_of_hand_points
+    first_face_marker_index = first_left_hand_marker_index + number_of_hand_points
+
+    return {
+        "body": mediapipe_3d_frame_trackedPoint_xyz[:, :first_right_hand_marker_index],
+        "right_hand": mediapipe_3d_frame_trackedPoint_xyz[
+            :, first_right_hand_marker_index:first_left_hand_marker_index
+        ],
+        "left_hand": mediapipe_3d_frame_trackedPoint_xyz[
+            :, first_left_hand_marker_index:first_face_marker_index
+        ],
+        "face": mediapipe_3d_frame_trackedPoint_xyz[:, first_face_marker_index:],
+    }
 
-    # %%
-    body_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_body_marker_index : last_body_marker_index + 1, :
-    ]
-    right_hand_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_right_hand_marker_index : last_right_hand_marker_index + 1, :
-    ]
-    left_hand_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_left_hand_marker_index : last_left_hand_marker_index + 1, :
-    ]
-    face_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_face_marker_index : last_face_marker_index + 1, :
-    ]
 
-    # logger.info(f"body 3d xyz shape: {body_3d_xyz.shape}")
-    # logger.info(f"right hand 3d xyz shape: {right_hand_3d_xyz.shape}")
-    # logger.info(f"left hand 3d xyz shape: {left_hand_3d_xyz.shape}")
-    # logger.info(f"face 3d xyz shape: {face_3d_xyz.shape}")
+def convert_mediapipe_npy_to_csv(
+    mediapipe_3d_frame_trackedPoint_xyz: np.ndarray,
+    output_data_folder_path: Union[str, Path],
+    float_precision: Optional[int] = None,
+    save_face_csv: bool = True,
+):
+    """
+    Break up the big [number_of_frames, number_of_tracked_points, XYZ] array into one `npy` and one `csv` per body part.
 
-    # %%
-    # save broken up npy files
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_body_3d_xyz.npy"), body_3d_xyz
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_right_hand_3d_xyz.npy"),
-        right_hand_3d_xyz,
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_left_hand_3d_xyz.npy"),
-        left_hand_3d_xyz,
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_face_3d_xyz.npy"), face_3d_xyz
+    `float_precision` is the number of decimals to write in the `csv` files (`None` means as many as it takes to get the exact number back).
+    The face has ~10x more columns than everything else put together, so `save_face_csv=False` skips its `csv`
+    (the face `npy` still gets saved)
+    """
+    logger.info(
+        f"Converting npy data with shape: {mediapipe_3d_frame_trackedPoint_xyz.shape} into `csv` and smaller `npy` files"
     )
-
-    # %%
-    # create pandas data frame headers
-
-    body_3d_xyz_header = []
-    for landmark_name in mediapipe_pose_landmark_names:
-        body_3d_xyz_header.append(f"{landmark_name}_x")
-        body_3d_xyz_header.append(f"{landmark_name}_y")
-        body_3d_xyz_header.append(f"{landmark_name}_z")
-
-    right_hand_3d_xyz_header = []
-    for landmark_name in mediapipe_hand_landmark_names:
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_x")
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_y")
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_z")
-
-    left_hand_3d_xyz_header = []
-    for landmark_name in mediapipe_hand_landmark_names:
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_x")
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_y")
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_z")
-
-    face_3d_xyz_header = []
-    for landmark_number in range(last_face_marker_index - first_face_marker_index):
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_x")
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_y")
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_z")
-    #
-    # logger.debug(
-    #     f"length of body 3d xyz header: {len(body_3d_xyz_header)}, should be: {number_of_body_points * 3}"
-    # )
-    # logger.debug(
-    #     f"length of right hand 3d xyz header: {len(right_hand_3d_xyz_header)}, should be: {number_of_hand_points * 3}"
-    # )
-    # logger.debug(
-    #     f"length of left hand 3d xyz header: {len(left_hand_3d_xyz_header)}, should be: {number_of_hand_points * 3}"
-    # )
-    # logger.debug(
-    #     f"length of face 3d xyz header: {len(face_3d_xyz_header)}, should be: {number_of_face_points * 3}"
-    # )
-
-    # %%
+    output_data_folder_path = Path(output_data_folder_path)
     number_of_frames = mediapipe_3d_frame_trackedPoint_xyz.shape[0]
-    body_flat = body_3d_xyz.reshape(number_of_frames, number_of_body_points * 3)
 
-    body_dataframe = pd.DataFrame(body_flat, columns=body_3d_xyz_header)
-    body_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_body_3d_xyz.csv"), index=False
+    body_part_data = split_mediapipe_3d_data_into_body_parts(
+        mediapipe_3d_frame_trackedPoint_xyz
     )
-
-    right_hand_flat = right_hand_3d_xyz.reshape(
-        number_of_frames, number_of_hand_points * 3
-    )
-    right_hand_dataframe = pd.DataFrame(
-        right_hand_flat, columns=right_hand_3d_xyz_header
-    )
-    right_hand_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_right_hand_3d_xyz.csv"),
-        index=False,
+    headers = get_mediapipe_3d_xyz_csv_headers(
+        number_of_face_points=body_part_data["face"].shape[1]
     )
 
-    left_hand_flat = left_hand_3d_xyz.reshape(
-        number_of_frames, number_of_hand_points * 3
-    )
-    left_hand_dataframe = pd.DataFrame(left_hand_flat, columns=left_hand_3d_xyz_header)
-    left_hand_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_left_hand_3d_xyz.csv"),
-        index=False,
-    )
+    for body_part_name, body_part_3d_xyz in body_part_data.items():
+        logger.debug(f"{body_part_name} 3d xyz shape: {body_part_3d_xyz.shape}")
+        # save broken up npy files
+        np.save(
+            str(output_data_folder_path / f"mediapipe_{body_part_name}_3d_xyz.npy"),
+            body_part_3d_xyz,
+        )
 
-    face_flat = face_3d_xyz.reshape(number_of_frames, number_of_face_points * 3)
-    face_dataframe = pd.DataFrame(face_flat, columns=face_3d_xyz_header)
-    face_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_face_3d_xyz.csv"), index=False
-    )
-
-    # %%
-
-    # %%
-    mediapipe_pose_landmark_names = [
-        landmark.name.lower() for landmark in mp_holistic.PoseLandmark
+    body_part_names_to_save_as_csv = [
+        body_part_name
+        for body_part_name in MEDIAPIPE_BODY_PART_NAMES
+        if save_face_csv or body_part_name != "face"
     ]
-    mediapipe_hand_landmark_names = [
-        landmark.name.lower() for landmark in mp_holistic.HandLandmark
-    ]
-    # face_landmark_names = [landmark.name.lower() for landmark in mp_holistic.PoseLandmark] #gonna have the clever for the face
-
-    # logger.debug(f"Body tracked point names: {mediapipe_pose_landmark_names}")
-    # logger.debug(mediapipe_hand_landmark_names)
-
-    # %%
-    # get number of points in body, hands, face
-
-    number_of_body_points = len(mediapipe_pose_landmark_names)
-    number_of_hand_points = len(mediapipe_hand_landmark_names)
-
-    first_body_marker_index = 0
-    last_body_marker_index = number_of_body_points - 1
-
-    first_right_hand_marker_index = last_body_marker_index + 1
-    last_right_hand_marker_index = number_of_body_points + number_of_hand_points - 1
-
-    first_left_hand_marker_index = last_right_hand_marker_index + 1
-    last_left_hand_marker_index = (
-        last_right_hand_marker_index + 1 + number_of_hand_points - 1
-    )
-
-    first_face_marker_index = last_left_hand_marker_index + 1
-    last_face_marker_index = mediapipe_3d_frame_trackedPoint_xyz.shape[1]
-
-    number_of_face_points = last_face_marker_index - first_face_marker_index
-
-    # logger.debug(
-    #     f"body tracked point indices: {first_body_marker_index}:{last_body_marker_index}"
-    # )
-    # logger.debug(
-    #     f"right hand tracked point indices: {first_right_hand_marker_index}:{last_right_hand_marker_index}"
-    # )
-    # logger.debug(
-    #     f"left hand tracked point indices: {first_left_hand_marker_index}:{last_left_hand_marker_index}"
-    # )
-    # logger.debug(
-    #     f"face tracked point indices: {first_face_marker_index}:{last_face_marker_index}"
-    # )
-    #
-    # logger.debug(
-    #     f"number of body points: {last_body_marker_index - first_body_marker_index + 1}"
-    # )
-    # logger.debug(
-    #     f"number of right hand points: {last_right_hand_marker_index - first_right_hand_marker_index + 1}"
-    # )
-    # logger.debug(
-    #     f"number of left hand points: {last_left_hand_marker_index - first_left_hand_marker_index + 1}"
-    # )
-    # logger.debug(
-    #     f"number of face points: {last_face_marker_index - first_face_marker_index + 1}"
-    # )
-
-    # %%
-    body_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_body_marker_index : last_body_marker_index + 1, :
-    ]
-    right_hand_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_right_hand_marker_index : last_right_hand_marker_index + 1, :
-    ]
-    left_hand_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_left_hand_marker_index : last_left_hand_marker_index + 1, :
-    ]
-    face_3d_xyz = mediapipe_3d_frame_trackedPoint_xyz[
-        :, first_face_marker_index : last_face_marker_index + 1, :
-    ]
-
-    logger.debug(f"body 3d xyz shape: {body_3d_xyz.shape}")
-    logger.debug(f"right hand 3d xyz shape: {right_hand_3d_xyz.shape}")
-    logger.debug(f"left hand 3d xyz shape: {left_hand_3d_xyz.shape}")
-    logger.debug(f"face 3d xyz shape: {face_3d_xyz.shape}")
-
-    # %%
-    # save broken up npy files
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_body_3d_xyz.npy"), body_3d_xyz
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_right_hand_3d_xyz.npy"),
-        right_hand_3d_xyz,
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_left_hand_3d_xyz.npy"),
-        left_hand_3d_xyz,
-    )
-    np.save(
-        str(Path(output_data_folder_path) / "mediapipe_face_3d_xyz.npy"), face_3d_xyz
-    )
-
-    # %%
-    # create pandas data frame headers
-
-    body_3d_xyz_header = []
-    for landmark_name in mediapipe_pose_landmark_names:
-        body_3d_xyz_header.append(f"{landmark_name}_x")
-        body_3d_xyz_header.append(f"{landmark_name}_y")
-        body_3d_xyz_header.append(f"{landmark_name}_z")
-
-    right_hand_3d_xyz_header = []
-    for landmark_name in mediapipe_hand_landmark_names:
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_x")
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_y")
-        right_hand_3d_xyz_header.append(f"right_hand_{landmark_name}_z")
-
-    left_hand_3d_xyz_header = []
-    for landmark_name in mediapipe_hand_landmark_names:
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_x")
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_y")
-        left_hand_3d_xyz_header.append(f"left_hand_{landmark_name}_z")
-
-    face_3d_xyz_header = []
-    for landmark_number in range(last_face_marker_index - first_face_marker_index):
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_x")
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_y")
-        face_3d_xyz_header.append(f"face_{str(landmark_number).zfill(4)}_z")
 
-    logger.debug(
-        f"length of body 3d xyz `.csv` header: {len(body_3d_xyz_header)}, should be: {number_of_body_points * 3}"
-    )
-    logger.debug(
-        f"length of right hand 3d xyz `.csv` header: {len(right_hand_3d_xyz_header)}, should be: {number_of_hand_points * 3}"
-    )
-    logger.debug(
-        f"length of left hand 3d xyz `.csv` header: {len(left_hand_3d_xyz_header)}, should be: {number_of_hand_points * 3}"
-    )
-    logger.debug(
-        f"length of face 3d xyz `.csv` header: {len(face_3d_xyz_header)}, should be: {number_of_face_points * 3}"
-    )
-
-    # %%
-    number_of_frames = mediapipe_3d_frame_trackedPoint_xyz.shape[0]
-    body_flat = body_3d_xyz.reshape(number_of_frames, number_of_body_points * 3)
-
-    body_dataframe = pd.DataFrame(body_flat, columns=body_3d_xyz_header)
-    body_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_body_3d_xyz.csv"), index=False
-    )
-
-    right_hand_flat = right_hand_3d_xyz.reshape(
-        number_of_frames, number_of_hand_points * 3
-    )
-    right_hand_dataframe = pd.DataFrame(
-        right_hand_flat, columns=right_hand_3d_xyz_header
-    )
-    right_hand_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_right_hand_3d_xyz.csv"),
-        index=False,
-    )
-
-    left_hand_flat = left_hand_3d_xyz.reshape(
-        number_of_frames, number_of_hand_points * 3
-    )
-    left_hand_dataframe = pd.DataFrame(left_hand_flat, columns=left_hand_3d_xyz_header)
-    left_hand_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_left_hand_3d_xyz.csv"),
-        index=False,
-    )
-
-    face_flat = face_3d_xyz.reshape(number_of_frames, number_of_face_points * 3)
-    face_dataframe = pd.DataFrame(face_flat, columns=face_3d_xyz_header)
-    face_dataframe.to_csv(
-        str(Path(output_data_folder_path) / "mediapipe_face_3d_xyz.csv"), index=False
-    )
+    # the files get written at the same time - the formatting itself holds the GIL, but the writing doesn't
+    with ThreadPoolExecutor(
+        max_workers=len(body_part_names_to_save_as_csv)
+    ) as thread_pool:
+        futures = [
+            thread_pool.submit(
+                save_array_to_csv,
+                data_rows_columns=body_part_data[body_part_name].reshape(
+                    number_of_frames, -1
+                ),
+                header=headers[body_part_name],
+                csv_file_path=output_data_folder_path
+                / f"mediapipe_{body_part_name}_3d_xyz.csv",
+                float_precision=float_precision,
+            )
+            for body_part_name in body_part_names_to_save_as_csv
+        ]
+        for future in futures:
+            future.result()
 
     logger.info("Done saving out `csv` and broken up `npy` files")
 
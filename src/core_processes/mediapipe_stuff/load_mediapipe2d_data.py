@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import logging
 
@@ -8,14 +8,17 @@ import numpy as np
 logger = logging.getLogger(__name__)
 
 
-def load_mediapipe2d_data(output_data_folder_path: Union[str, Path]):
+def load_mediapipe2d_data(
+    output_data_folder_path: Union[str, Path], mmap_mode: Optional[str] = None
+):
+    """`mmap_mode` is passed to `np.load` - use "c" (copy-on-write) to memory-map it and still be able to edit it in place"""
     mediapipe2d_xy_file_path = (
         Path(output_data_folder_path)
         / "mediapipe_2dData_numCams_numFrames_numTrackedPoints_pixelXY.npy"
     )
     logger.info(f"loading: {mediapipe2d_xy_file_path}")
     mediapipe2d_numCams_numFrames_numTrackedPoints_pixelXY = np.load(
-        str(mediapipe2d_xy_file_path)
+        str(mediapipe2d_xy_file_path), mmap_mode=mmap_mode
     )
 
     return mediapipe2d_numCams_numFrames_numTrackedPoints_pixelXY
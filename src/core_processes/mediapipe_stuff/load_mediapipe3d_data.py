@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import logging
 
@@ -10,7 +10,10 @@ from src.config.home_dir import RAW_DATA_FOLDER_NAME, MEDIAPIPE_3D_NPY_FILE_NAME
 logger = logging.getLogger(__name__)
 
 
-def load_raw_mediapipe3d_data(output_data_folder_path: Union[str, Path]):
+def load_raw_mediapipe3d_data(
+    output_data_folder_path: Union[str, Path], mmap_mode: Optional[str] = None
+):
+    """`mmap_mode` is passed to `np.load` (e.g. "r" to memory-map the file instead of reading it all)"""
     mediapipe3d_xyz_file_path = (
         Path(output_data_folder_path)
         / RAW_DATA_FOLDER_NAME
@@ -18,23 +21,26 @@ def load_raw_mediapipe3d_data(output_data_folder_path: Union[str, Path]):
     )
     logger.info(f"loading: {mediapipe3d_xyz_file_path}")
     mediapipe_3dData_numFrames_numTrackedPoints_spatialXYZ = np.load(
-        str(mediapipe3d_xyz_file_path)
+        str(mediapipe3d_xyz_file_path), mmap_mode=mmap_mode
     )
 
     return mediapipe_3dData_numFrames_numTrackedPoints_spatialXYZ
 
 
-def load_post_processed_mediapipe3d_data(mediapipe3d_xyz_file_path: Union[str, Path]):
-
+def load_post_processed_mediapipe3d_data(
+    mediapipe3d_xyz_file_path: Union[str, Path], mmap_mode: Optional[str] = None
+):
     logger.info(f"loading: {mediapipe3d_xyz_file_path}")
     mediapipe_3dData_numFrames_numTrackedPoints_spatialXYZ = np.load(
-        str(mediapipe3d_xyz_file_path)
+        str(mediapipe3d_xyz_file_path), mmap_mode=mmap_mode
     )
 
     return mediapipe_3dData_numFrames_numTrackedPoints_spatialXYZ
 
 
-def load_skeleton_reprojection_error_data(output_data_folder_path: Union[str, Path]):
+def load_skeleton_reprojection_error_data(
+    output_data_folder_path: Union[str, Path], mmap_mode: Optional[str] = None
+):
     mediapipe3d_reprojection_error_file_path = (
         Path(output_data_folder_path)
         / "raw_data"
@@ -42,7 +48,7 @@ def load_skeleton_reprojection_error_data(output_data_folder_path: Union[str, Pa
     )
     logger.info(f"loading: {mediapipe3d_reprojection_error_file_path}")
     mediapipe_3dData_numFrames_numTrackedPoints_reprojectionError = np.load(
-        str(mediapipe3d_reprojection_error_file_path)
+        str(mediapipe3d_reprojection_error_file_path), mmap_mode=mmap_mode
     )
 
     return mediapipe_3dData_numFrames_numTrackedPoints_reprojectionError
@@ -1,7 +1,8 @@
 import logging
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Union, Any
+from typing import Iterator, List, Union, Any
 
 import cv2
 import numpy as np
@@ -18,6 +19,18 @@ from src.core_processes.mediapipe_stuff.medaipipe_tracked_points_names_dict impo
 from src.core_processes.batch_processing.session_processing_parameter_models import (
     MediaPipe2DParametersModel,
 )
+from src.core_processes.mediapipe_stuff.region_of_interest_tracker import (
+    RegionOfInterestBox,
+    RegionOfInterestTracker,
+    region_of_interest_normalized_to_full_frame_normalized,
+)
+from src.core_processes.utils.npy_data_manifest import (
+    save_npy_and_record_in_data_manifest,
+)
+from src.core_processes.utils.performance_recorder import (
+    measure_performance,
+    record_performance,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -99,11 +112,19 @@ class MediaPipeSkeletonDetector:
             thickness=1, circle_radius=1
         )
 
-        self._holistic_tracker = self._mp_holistic.Holistic(
-            model_complexity=parameter_model.model_complexity,
-            min_detection_confidence=parameter_model.min_detection_confidence,
-            min_tracking_confidence=parameter_model.min_tracking_confidence,
-        )
+        self._parameter_model = parameter_model
+        self._holistic_tracker = None
+        if not self._parameter_model.use_region_of_interest_tracking:
+            self._holistic_tracker = self._create_holistic_tracker()
+        # made on the first frame, once we know how big the images are
+        self._region_of_interest_tracker = None
+        # with region of interest tracking, `mediapipe`'s own tracking (which starts from where the landmarks were in
+        # the last image it got) only makes sense while it keeps getting the same crop - so the full-frame redetects get a
+        # tracker of their own that doesn't track, and the crop tracker gets reset whenever the crop moves.
+        # both get made once and kept (building a holistic graph costs about as much as ten frames of tracking)
+        self._full_frame_redetect_holistic_tracker = None
+        self._region_of_interest_holistic_tracker = None
+        self._region_of_interest_holistic_tracker_box = None
         self._mediapipe_tracked_point_names_dict = mediapipe_tracked_point_names_dict
 
         self.body_names_list = self._mediapipe_tracked_point_names_dict["body"]
@@ -137,7 +158,7 @@ class MediaPipeSkeletonDetector:
         annotated_image: np.ndarray = None,
     ) -> Mediapipe2dDataPayload:
 
-        mediapipe_results = self._holistic_tracker.process(
+        mediapipe_results = self._process_image(
             raw_image
         )  # <-this is where the magic happens, i.e. where the raw image is processed by a convolutional neural network to provide an estimate of joint position in pixel coordinates. Please don't forget that this is insane and should not be possible lol
 
@@ -168,6 +189,7 @@ class MediaPipeSkeletonDetector:
         path_to_folder_of_videos_to_process: Union[Path, str],
         output_data_folder_path: Union[str, Path],
         save_annotated_videos: bool = True,
+        storage_dtype: str = "float64",
     ) -> np.ndarray:
 
         path_to_folder_of_videos_to_process = Path(path_to_folder_of_videos_to_process)
@@ -191,6 +213,7 @@ class MediaPipeSkeletonDetector:
 
             this_video_mediapipe_results_list = []
             this_video_annotated_images_list = []
+            self.reset_region_of_interest_tracking()
 
             success, image = this_video_capture_object.read()
 
@@ -198,32 +221,36 @@ class MediaPipeSkeletonDetector:
                 this_video_capture_object.get(cv2.CAP_PROP_FRAME_COUNT)
             )
 
-            for frame_number in tqdm(
-                range(number_of_frames),
-                desc=f"mediapiping video: {this_synchronized_video_file_path.name}",
-                total=number_of_frames,
-                colour="magenta",
-                unit="frames",
-                dynamic_ncols=True,
-            ):
-                if not success or image is None:
-                    logger.error(
-                        f"Failed to load an image from: {str(this_synchronized_video_file_path)}"
+            with measure_performance(
+                "detect_skeletons_in_video", number_of_items=number_of_frames
+            ) as measurement:
+                measurement.details["video"] = this_synchronized_video_file_path.name
+                for frame_number in tqdm(
+                    range(number_of_frames),
+                    desc=f"mediapiping video: {this_synchronized_video_file_path.name}",
+                    total=number_of_frames,
+                    colour="magenta",
+                    unit="frames",
+                    dynamic_ncols=True,
+                ):
+                    if not success or image is None:
+                        logger.error(
+                            f"Failed to load an image from: {str(this_synchronized_video_file_path)}"
+                        )
+                        raise Exception
+
+                    mediapipe2d_data_payload = self.detect_skeleton_in_image(
+                        raw_image=image
                     )
-                    raise Exception
-
-                mediapipe2d_data_payload = self.detect_skeleton_in_image(
-                    raw_image=image
-                )
-                this_video_mediapipe_results_list.append(
-                    mediapipe2d_data_payload.mediapipe_results
-                )
-                annotated_image = self._annotate_image(
-                    image, mediapipe2d_data_payload.mediapipe_results
-                )
-                this_video_annotated_images_list.append(annotated_image)
+                    this_video_mediapipe_results_list.append(
+                        mediapipe2d_data_payload.mediapipe_results
+                    )
+                    annotated_image = self._annotate_image(
+                        image, mediapipe2d_data_payload.mediapipe_results
+                    )
+                    this_video_annotated_images_list.append(annotated_image)
 
-                success, image = this_video_capture_object.read()
+                    success, image = this_video_capture_object.read()
 
             if save_annotated_videos:
                 annotated_video_path = (
@@ -240,17 +267,21 @@ class MediaPipeSkeletonDetector:
                 logger.info(
                     f"Saving mediapipe annotated video to : {annotated_video_save_path}"
                 )
-                video_recorder.save_image_list_to_disk(
-                    image_list=this_video_annotated_images_list,
-                    path_to_save_video_file=annotated_video_save_path,
-                    frames_per_second=this_video_framerate,
-                )
+                with measure_performance(
+                    "save_annotated_video", number_of_items=number_of_frames
+                ):
+                    video_recorder.save_image_list_to_disk(
+                        image_list=this_video_annotated_images_list,
+                        path_to_save_video_file=annotated_video_save_path,
+                        frames_per_second=this_video_framerate,
+                    )
 
             this_camera_mediapipe_2d_single_camera_npy_arrays = (
                 self._list_of_mediapipe_results_to_npy_arrays(
                     this_video_mediapipe_results_list,
                     image_width=this_video_width,
                     image_height=this_video_height,
+                    dtype=storage_dtype,
                 )
             )
 
@@ -282,7 +313,8 @@ class MediaPipeSkeletonDetector:
                 number_of_frames,
                 number_of_tracked_points,
                 number_of_spatial_dimensions,
-            )
+            ),
+            dtype=storage_dtype,
         )
 
         for this_cam_num in range(number_of_cameras):
@@ -296,6 +328,212 @@ class MediaPipeSkeletonDetector:
         )
         return data2d_numCams_numFrames_numTrackedPts_XY
 
+    def detect_skeletons_in_video_in_chunks(
+        self,
+        video_file_path: Union[str, Path],
+        chunk_size_frames: int = 150,
+        annotated_video_save_path: Union[str, Path] = None,
+        stop_event: threading.Event = None,
+        storage_dtype: str = "float64",
+    ) -> Iterator[np.ndarray]:
+        """
+        Run `mediapipe` on one video, yielding [number_of_frames_in_chunk, number_of_tracked_points, XY] arrays
+        every `chunk_size_frames` frames (the last one can be shorter), so the next stages can get going before the video is done.
+
+        Unlike `process_folder_full_of_videos`, annotated frames get written out as they come instead of piling up in memory.
+        Stops early (without raising) if `stop_event` gets set.
+        """
+        video_file_path = Path(video_file_path)
+        video_capture_object = cv2.VideoCapture(str(video_file_path))
+        video_width = video_capture_object.get(cv2.CAP_PROP_FRAME_WIDTH)
+        video_height = video_capture_object.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        number_of_frames = int(video_capture_object.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.reset_region_of_interest_tracking()
+
+        annotated_video_writer = None
+        if annotated_video_save_path is not None:
+            Path(annotated_video_save_path).parent.mkdir(exist_ok=True, parents=True)
+            annotated_video_writer = cv2.VideoWriter(
+                str(annotated_video_save_path),
+                cv2.VideoWriter_fourcc(*"MP4V"),
+                video_capture_object.get(cv2.CAP_PROP_FPS),
+                (int(video_width), int(video_height)),
+            )
+
+        try:
+            for chunk_start_frame in range(0, number_of_frames, chunk_size_frames):
+                chunk_stop_frame = min(
+                    chunk_start_frame + chunk_size_frames, number_of_frames
+                )
+                chunk_mediapipe_results_list = []
+                for frame_number in range(chunk_start_frame, chunk_stop_frame):
+                    if stop_event is not None and stop_event.is_set():
+                        return
+
+                    success, image = video_capture_object.read()
+                    if not success or image is None:
+                        logger.error(
+                            f"Failed to load frame {frame_number} from: {str(video_file_path)}"
+                        )
+                        raise Exception
+
+                    mediapipe_results = self._process_image(image)
+                    chunk_mediapipe_results_list.append(mediapipe_results)
+
+                    if annotated_video_writer is not None:
+                        annotated_video_writer.write(
+                            self._annotate_image(image, mediapipe_results)
+                        )
+
+                chunk_npy_arrays = self._list_of_mediapipe_results_to_npy_arrays(
+                    chunk_mediapipe_results_list,
+                    image_width=video_width,
+                    image_height=video_height,
+                    dtype=storage_dtype,
+                )
+                # a single frame chunk gets squeezed down to [number_of_tracked_points, XY]
+                yield chunk_npy_arrays.all_data2d_nFrames_nTrackedPts_XY.reshape(
+                    chunk_stop_frame - chunk_start_frame,
+                    self.number_of_tracked_points_total,
+                    2,
+                )
+        finally:
+            video_capture_object.release()
+            if annotated_video_writer is not None:
+                annotated_video_writer.release()
+
+    @property
+    def region_of_interest_tracker(self) -> Union[RegionOfInterestTracker, None]:
+        return self._region_of_interest_tracker
+
+    def reset_region_of_interest_tracking(self):
+        """look at the whole frame again on the next image (e.g. because it's from a different video)"""
+        if self._region_of_interest_tracker is not None:
+            self._region_of_interest_tracker.reset()
+        # the crop tracker gets reset before it sees its next crop
+        self._region_of_interest_holistic_tracker_box = None
+
+    def _create_holistic_tracker(self, static_image_mode: bool = False):
+        return self._mp_holistic.Holistic(
+            static_image_mode=static_image_mode,
+            model_complexity=self._parameter_model.model_complexity,
+            min_detection_confidence=self._parameter_model.min_detection_confidence,
+            min_tracking_confidence=self._parameter_model.min_tracking_confidence,
+        )
+
+    def _get_holistic_tracker_for_region_of_interest_box(
+        self, region_of_interest_box: Union[RegionOfInterestBox, None]
+    ):
+        if region_of_interest_box is None:
+            if self._full_frame_redetect_holistic_tracker is None:
+                self._full_frame_redetect_holistic_tracker = (
+                    self._create_holistic_tracker(static_image_mode=True)
+                )
+            return self._full_frame_redetect_holistic_tracker
+
+        if self._region_of_interest_holistic_tracker is None:
+            self._region_of_interest_holistic_tracker = self._create_holistic_tracker()
+        elif region_of_interest_box != self._region_of_interest_holistic_tracker_box:
+            # the landmarks it remembers are normalized to the old crop, which would put them in the wrong place
+            self._region_of_interest_holistic_tracker.reset()
+        self._region_of_interest_holistic_tracker_box = region_of_interest_box
+        return self._region_of_interest_holistic_tracker
+
+    def _process_image(self, image: np.ndarray):
+        """
+        run the holistic tracker on `image` - or, with `use_region_of_interest_tracking`, on a crop around where the
+        subject was last time (see `RegionOfInterestTracker`). Either way the landmarks come back normalized to the full frame
+        """
+        if not self._parameter_model.use_region_of_interest_tracking:
+            return self._holistic_tracker.process(image)
+
+        image_height, image_width = image.shape[:2]
+        if self._region_of_interest_tracker is None or (
+            self._region_of_interest_tracker.image_size != (image_width, image_height)
+        ):
+            self._region_of_interest_tracker = RegionOfInterestTracker(
+                image_width=image_width,
+                image_height=image_height,
+                padding_fraction=self._parameter_model.region_of_interest_padding_fraction,
+                full_frame_redetect_interval_frames=self._parameter_model.region_of_interest_full_frame_redetect_interval_frames,
+                minimum_size_pixels=self._parameter_model.region_of_interest_minimum_size_pixels,
+                grid_size_pixels=self._parameter_model.region_of_interest_grid_size_pixels,
+            )
+
+        region_of_interest_box = (
+            self._region_of_interest_tracker.get_region_of_interest_box()
+        )
+        holistic_tracker = self._get_holistic_tracker_for_region_of_interest_box(
+            region_of_interest_box
+        )
+        if region_of_interest_box is None:
+            mediapipe_results = holistic_tracker.process(image)
+        else:
+            left, top, right, bottom = region_of_interest_box
+            mediapipe_results = holistic_tracker.process(
+                np.ascontiguousarray(image[top:bottom, left:right])
+            )
+            self._map_region_of_interest_results_to_full_frame(
+                mediapipe_results,
+                region_of_interest_box,
+                image_width=image_width,
+                image_height=image_height,
+            )
+
+        self._region_of_interest_tracker.update(
+            self._get_landmarks_xy_pixels(
+                mediapipe_results, image_width=image_width, image_height=image_height
+            )
+        )
+        return mediapipe_results
+
+    def _get_landmark_lists(self, mediapipe_results) -> List:
+        return [
+            landmark_list
+            for landmark_list in [
+                mediapipe_results.pose_landmarks,
+                mediapipe_results.right_hand_landmarks,
+                mediapipe_results.left_hand_landmarks,
+                mediapipe_results.face_landmarks,
+            ]
+            if landmark_list is not None
+        ]
+
+    def _map_region_of_interest_results_to_full_frame(
+        self,
+        mediapipe_results,
+        region_of_interest_box: RegionOfInterestBox,
+        image_width: int,
+        image_height: int,
+    ):
+        """rewrites the (crop-normalized) landmarks in `mediapipe_results` in place, so everything downstream can pretend mediapipe saw the whole frame"""
+        z_scale = (region_of_interest_box[2] - region_of_interest_box[0]) / image_width
+        for landmark_list in self._get_landmark_lists(mediapipe_results):
+            xy_normalized = region_of_interest_normalized_to_full_frame_normalized(
+                [[landmark.x, landmark.y] for landmark in landmark_list.landmark],
+                region_of_interest_box,
+                image_width=image_width,
+                image_height=image_height,
+            )
+            for landmark, (x, y) in zip(landmark_list.landmark, xy_normalized):
+                landmark.x = x
+                landmark.y = y
+                landmark.z *= z_scale  # `z` is on (roughly) the same scale as `x`
+
+    def _get_landmarks_xy_pixels(
+        self, mediapipe_results, image_width: int, image_height: int
+    ) -> Union[np.ndarray, None]:
+        """every landmark `mediapipe` found on this frame, [number_of_landmarks, XY] in pixels (`None` if it lost the subject)"""
+        if mediapipe_results.pose_landmarks is None:
+            return None
+        return np.array(
+            [
+                [landmark.x * image_width, landmark.y * image_height]
+                for landmark_list in self._get_landmark_lists(mediapipe_results)
+                for landmark in landmark_list.landmark
+            ]
+        )
+
     def _save_mediapipe2d_data_to_npy(
         self,
         data2d_numCams_numFrames_numTrackedPts_XY: np.ndarray,
@@ -306,8 +544,8 @@ class MediaPipeSkeletonDetector:
         )
         mediapipe_2dData_save_path.parent.mkdir(exist_ok=True, parents=True)
         logger.info(f"saving: {mediapipe_2dData_save_path}")
-        np.save(
-            str(mediapipe_2dData_save_path), data2d_numCams_numFrames_numTrackedPts_XY
+        save_npy_and_record_in_data_manifest(
+            mediapipe_2dData_save_path, data2d_numCams_numFrames_numTrackedPts_XY
         )
 
         return mediapipe_2dData_save_path
@@ -350,11 +588,13 @@ class MediaPipeSkeletonDetector:
         )
         return image
 
+    @record_performance()
     def _list_of_mediapipe_results_to_npy_arrays(
         self,
         mediapipe_results_list: List,
         image_width: Union[int, float],
         image_height: Union[int, float],
+        dtype: str = "float64",
     ) -> Mediapipe2dNumpyArrays:
 
         # apparently `mediapipe_results.pose_landmarks.landmark` returns something iterable ¯\_(ツ)_/¯
@@ -369,12 +609,13 @@ class MediaPipeSkeletonDetector:
                 number_of_frames,
                 self.number_of_body_tracked_points,
                 number_of_spatial_dimensions,
-            )
+            ),
+            dtype=dtype,
         )
         body2d_frameNumber_trackedPointNumber_XY[:] = np.nan
 
         body2d_frameNumber_trackedPointNumber_confidence = np.zeros(
-            (number_of_frames, self.number_of_body_tracked_points)
+            (number_of_frames, self.number_of_body_tracked_points), dtype=dtype
         )
         body2d_frameNumber_trackedPointNumber_confidence[
             :
@@ -385,7 +626,8 @@ class MediaPipeSkeletonDetector:
                 number_of_frames,
                 self.number_of_right_hand_tracked_points,
                 number_of_spatial_dimensions,
-            )
+            ),
+            dtype=dtype,
         )
         rightHand2d_frameNumber_trackedPointNumber_XY[:] = np.nan
 
@@ -394,7 +636,8 @@ class MediaPipeSkeletonDetector:
                 number_of_frames,
                 self.number_of_left_hand_tracked_points,
                 number_of_spatial_dimensions,
-            )
+            ),
+            dtype=dtype,
         )
         leftHand2d_frameNumber_trackedPointNumber_XY[:] = np.nan
 
@@ -403,7 +646,8 @@ class MediaPipeSkeletonDetector:
                 number_of_frames,
                 self.number_of_face_tracked_points,
                 number_of_spatial_dimensions,
-            )
+            ),
+            dtype=dtype,
         )
         face2d_frameNumber_trackedPointNumber_XY[:] = np.nan
 
@@ -0,0 +1,216 @@
+"""
+Keeps track of where the subject is, so `mediapipe` only has to look at a padded crop around them instead of the
+whole (mostly empty) frame. Only needs `numpy`, the `mediapipe` side lives in `MediaPipeSkeletonDetector`.
+
+Boxes are `(left, top, right, bottom)` in full-frame pixels, `right`/`bottom` exclusive (i.e. `image[top:bottom, left:right]`)
+"""
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RegionOfInterestBox = Tuple[int, int, int, int]
+
+# fewer good landmarks than this on the last frame counts as "lost track"
+MINIMUM_NUMBER_OF_LANDMARKS_FOR_REGION_OF_INTEREST = 4
+
+
+def compute_region_of_interest_box(
+    landmarks_xy_pixels: np.ndarray,
+    image_width: int,
+    image_height: int,
+    padding_fraction: float,
+    minimum_size_pixels: int,
+) -> Optional[RegionOfInterestBox]:
+    """
+    box around the (non-nan) `landmarks_xy_pixels` [number_of_landmarks, XY], padded by `padding_fraction` of its
+    size on every side, at least `minimum_size_pixels` on a side and clipped to the image.
+    `None` if there aren't enough landmarks to go on
+    """
+    landmarks_xy_pixels = np.asarray(landmarks_xy_pixels, dtype=np.float64).reshape(
+        -1, 2
+    )
+    good_landmarks_xy_pixels = landmarks_xy_pixels[
+        np.isfinite(landmarks_xy_pixels).all(axis=1)
+    ]
+    if (
+        good_landmarks_xy_pixels.shape[0]
+        < MINIMUM_NUMBER_OF_LANDMARKS_FOR_REGION_OF_INTEREST
+    ):
+        return None
+
+    landmarks_min_xy = good_landmarks_xy_pixels.min(axis=0)
+    landmarks_max_xy = good_landmarks_xy_pixels.max(axis=0)
+    landmarks_center_xy = (landmarks_min_xy + landmarks_max_xy) / 2
+    box_size_xy = (landmarks_max_xy - landmarks_min_xy) * (1 + 2 * padding_fraction)
+    box_size_xy = np.maximum(box_size_xy, minimum_size_pixels)
+
+    box_min_xy = np.floor(landmarks_center_xy - box_size_xy / 2)
+    box_max_xy = np.ceil(landmarks_center_xy + box_size_xy / 2)
+    left, top = np.clip(box_min_xy, 0, [image_width, image_height]).astype(int)
+    right, bottom = np.clip(box_max_xy, 0, [image_width, image_height]).astype(int)
+    if right <= left or bottom <= top:
+        # the "subject" is entirely off screen
+        return None
+    return int(left), int(top), int(right), int(bottom)
+
+
+def snap_box_to_grid(
+    box: RegionOfInterestBox,
+    grid_size_pixels: int,
+    image_width: int,
+    image_height: int,
+) -> RegionOfInterestBox:
+    """grows `box` out to the nearest multiples of `grid_size_pixels` (clipped to the image)"""
+    left, top, right, bottom = box
+    return (
+        left // grid_size_pixels * grid_size_pixels,
+        top // grid_size_pixels * grid_size_pixels,
+        min(-(-right // grid_size_pixels) * grid_size_pixels, image_width),
+        min(-(-bottom // grid_size_pixels) * grid_size_pixels, image_height),
+    )
+
+
+def box_contains_box(
+    outer_box: RegionOfInterestBox, inner_box: RegionOfInterestBox
+) -> bool:
+    return (
+        outer_box[0] <= inner_box[0]
+        and outer_box[1] <= inner_box[1]
+        and outer_box[2] >= inner_box[2]
+        and outer_box[3] >= inner_box[3]
+    )
+
+
+def box_area(box: RegionOfInterestBox) -> int:
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def region_of_interest_normalized_to_full_frame_normalized(
+    xy_normalized: np.ndarray,
+    region_of_interest_box: RegionOfInterestBox,
+    image_width: int,
+    image_height: int,
+) -> np.ndarray:
+    """`[..., XY]` normalized to the crop (what `mediapipe` gives back) -> normalized to the full frame"""
+    left, top, right, bottom = region_of_interest_box
+    xy_normalized = np.asarray(xy_normalized, dtype=np.float64)
+    return (
+        np.array([left, top]) + xy_normalized * np.array([right - left, bottom - top])
+    ) / np.array([image_width, image_height])
+
+
+class RegionOfInterestTracker:
+    """
+    Decides, frame by frame, which part of the image `mediapipe` gets to look at:
+
+        box = region_of_interest_tracker.get_region_of_interest_box()  # `None` means "use the whole frame"
+        ... run `mediapipe` on the crop, map its landmarks back to full-frame pixels ...
+        region_of_interest_tracker.update(landmarks_xy_pixels)  # `None` if it lost track
+
+    The whole frame gets used on the first frame, after tracking gets lost and every `full_frame_redetect_interval_frames`
+    frames (so a subject who walked out of the crop gets picked up again). The box only moves once the subject gets
+    close to its edge (or it gets more than twice as big as it needs to be), and its edges sit on a `grid_size_pixels` grid,
+    since `mediapipe`'s own tracking has to start over every time the crop moves
+    """
+
+    def __init__(
+        self,
+        image_width: int,
+        image_height: int,
+        padding_fraction: float = 0.25,
+        full_frame_redetect_interval_frames: int = 30,
+        minimum_size_pixels: int = 256,
+        grid_size_pixels: int = 128,
+    ):
+        if padding_fraction < 0:
+            logger.error(
+                f"`padding_fraction` can't be negative, got {padding_fraction}"
+            )
+            raise ValueError(
+                f"`padding_fraction` can't be negative, got {padding_fraction}"
+            )
+        self._image_width = int(image_width)
+        self._image_height = int(image_height)
+        self._padding_fraction = padding_fraction
+        self._full_frame_redetect_interval_frames = full_frame_redetect_interval_frames
+        self._minimum_size_pixels = minimum_size_pixels
+        self._grid_size_pixels = grid_size_pixels
+
+        self._region_of_interest_box = None
+        self._frames_since_full_frame_detection = 0
+        self.number_of_full_frame_detections = 0
+        self.number_of_region_of_interest_detections = 0
+        # times the box moved while it was tracking the subject (i.e. not counting the first box after a full frame)
+        self.number_of_region_of_interest_box_moves = 0
+
+    @property
+    def image_size(self) -> Tuple[int, int]:
+        return self._image_width, self._image_height
+
+    def reset(self):
+        """forget the subject, i.e. look at the whole frame next time (e.g. at the start of a new video)"""
+        self._region_of_interest_box = None
+        self._frames_since_full_frame_detection = 0
+
+    def get_region_of_interest_box(self) -> Optional[RegionOfInterestBox]:
+        """the box to run `mediapipe` on this frame, `None` for the whole frame"""
+        if (
+            self._region_of_interest_box is None
+            or self._frames_since_full_frame_detection
+            >= self._full_frame_redetect_interval_frames
+        ):
+            self._frames_since_full_frame_detection = 0
+            self.number_of_full_frame_detections += 1
+            return None
+
+        self._frames_since_full_frame_detection += 1
+        self.number_of_region_of_interest_detections += 1
+        return self._region_of_interest_box
+
+    def update(self, landmarks_xy_pixels: Optional[np.ndarray]):
+        """`landmarks_xy_pixels` - [number_of_landmarks, XY] full-frame pixels from this frame (`None`/nan if nothing was found)"""
+        if landmarks_xy_pixels is None:
+            self._region_of_interest_box = None
+            return
+
+        new_box = compute_region_of_interest_box(
+            landmarks_xy_pixels,
+            image_width=self._image_width,
+            image_height=self._image_height,
+            padding_fraction=self._padding_fraction,
+            minimum_size_pixels=self._minimum_size_pixels,
+        )
+        if new_box is None:
+            logger.debug("lost track of the subject, going back to the whole frame")
+            self._region_of_interest_box = None
+            return
+        new_box = snap_box_to_grid(
+            new_box,
+            grid_size_pixels=self._grid_size_pixels,
+            image_width=self._image_width,
+            image_height=self._image_height,
+        )
+
+        # the subject (with half the padding) still fits in the current box, so leave it where it is
+        subject_box = compute_region_of_interest_box(
+            landmarks_xy_pixels,
+            image_width=self._image_width,
+            image_height=self._image_height,
+            padding_fraction=self._padding_fraction / 2,
+            minimum_size_pixels=0,
+        )
+        if (
+            self._region_of_interest_box is not None
+            and box_contains_box(self._region_of_interest_box, subject_box)
+            and box_area(self._region_of_interest_box) <= 2 * box_area(new_box)
+        ):
+            return
+        if (
+            self._region_of_interest_box is not None
+            and self._region_of_interest_box != new_box
+        ):
+            self.number_of_region_of_interest_box_moves += 1
+        self._region_of_interest_box = new_box
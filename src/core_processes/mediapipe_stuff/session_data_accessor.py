@@ -0,0 +1,156 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.config.home_dir import (
+    MEDIAPIPE_2D_NPY_FILE_NAME,
+    MEDIAPIPE_3D_NPY_FILE_NAME,
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
+    PARTIALLY_PROCESSED_DATA_FOLDER_NAME,
+    RAW_DATA_FOLDER_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+MEDIAPIPE_2D_DATA_NAME = "mediapipe_2d"
+RAW_MEDIAPIPE_3D_DATA_NAME = "raw_mediapipe_3d"
+REPROJECTION_ERROR_DATA_NAME = "reprojection_error"
+POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME = "post_processed_mediapipe_3d"
+
+
+class SessionDataAccessor:
+    """
+    Lazy, memory-mapped access to the `.npy` files of one session's `output_data` folder.
+
+    Nothing is read when the accessor is created, and "opening" an array only reads its `.npy` header,
+    so this is (nearly) free no matter how big the session is. Only the pages that actually get sliced
+    are read from disk.
+
+    `get_frames`/`get_marker_range` return small in-memory copies, so they stay valid after `close()`.
+    The `*_data` properties return the memory-mapped arrays themselves (read-only) - the file stays open
+    for as long as something references those, so drop them before overwriting the file.
+    Use this as a context manager (or call `close()`) to release the file handles deterministically.
+    """
+
+    def __init__(self, output_data_folder_path: Union[str, Path]):
+        self._output_data_folder_path = Path(output_data_folder_path)
+        self._opened_arrays: Dict[str, np.ndarray] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_candidate_paths(self, data_name: str) -> List[Path]:
+        """where each array can live, in order of preference (the GUI and the batch processing save some in different places)"""
+        raw_data_folder_path = self._output_data_folder_path / RAW_DATA_FOLDER_NAME
+        if data_name == MEDIAPIPE_2D_DATA_NAME:
+            return [
+                raw_data_folder_path / MEDIAPIPE_2D_NPY_FILE_NAME,
+                self._output_data_folder_path / MEDIAPIPE_2D_NPY_FILE_NAME,
+            ]
+        if data_name == RAW_MEDIAPIPE_3D_DATA_NAME:
+            return [raw_data_folder_path / MEDIAPIPE_3D_NPY_FILE_NAME]
+        if data_name == REPROJECTION_ERROR_DATA_NAME:
+            return [raw_data_folder_path / MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME]
+        if data_name == POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME:
+            return [
+                self._output_data_folder_path
+                / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
+                / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+                self._output_data_folder_path
+                / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+            ]
+        raise ValueError(f"Unknown session data name: {data_name}")
+
+    def get_path(self, data_name: str) -> Optional[Path]:
+        for path in self.get_candidate_paths(data_name):
+            if path.exists():
+                return path
+        return None
+
+    def has_data(self, data_name: str) -> bool:
+        return self.get_path(data_name) is not None
+
+    def open(self, data_name: str) -> np.ndarray:
+        """the (read-only) memory-mapped array, opened on first use"""
+        if data_name not in self._opened_arrays:
+            path = self.get_path(data_name)
+            if path is None:
+                raise FileNotFoundError(
+                    f"Could not find `{data_name}` data in any of: {[str(path) for path in self.get_candidate_paths(data_name)]}"
+                )
+            logger.info(f"memory-mapping: {path}")
+            self._opened_arrays[data_name] = np.load(str(path), mmap_mode="r")
+        return self._opened_arrays[data_name]
+
+    @property
+    def mediapipe_2d_data(self) -> np.ndarray:
+        """[number_of_cameras, number_of_frames, number_of_tracked_points, XY]"""
+        return self.open(MEDIAPIPE_2D_DATA_NAME)
+
+    @property
+    def raw_mediapipe_3d_data(self) -> np.ndarray:
+        """[number_of_frames, number_of_tracked_points, XYZ]"""
+        return self.open(RAW_MEDIAPIPE_3D_DATA_NAME)
+
+    @property
+    def reprojection_error_data(self) -> np.ndarray:
+        """[number_of_frames, number_of_tracked_points]"""
+        return self.open(REPROJECTION_ERROR_DATA_NAME)
+
+    @property
+    def post_processed_mediapipe_3d_data(self) -> np.ndarray:
+        """[number_of_frames, number_of_tracked_points, XYZ]"""
+        return self.open(POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME)
+
+    def _frame_axis(self, data_name: str) -> int:
+        # the 2d data has cameras first, everything else is frames first
+        return 1 if data_name == MEDIAPIPE_2D_DATA_NAME else 0
+
+    def get_number_of_frames(self, data_name: str) -> int:
+        return self.open(data_name).shape[self._frame_axis(data_name)]
+
+    def get_frames(
+        self,
+        data_name: str,
+        start_frame: int,
+        stop_frame: Optional[int] = None,
+    ) -> np.ndarray:
+        """an in-memory copy of frames [start_frame, stop_frame) (or just `start_frame` if `stop_frame` is None)"""
+        array = self.open(data_name)
+        frame_index = (
+            start_frame if stop_frame is None else slice(start_frame, stop_frame)
+        )
+        if self._frame_axis(data_name) == 0:
+            return np.array(array[frame_index])
+        return np.array(array[:, frame_index])
+
+    def get_marker_range(
+        self,
+        data_name: str,
+        first_marker: int,
+        stop_marker: int,
+        start_frame: int = 0,
+        stop_frame: Optional[int] = None,
+    ) -> np.ndarray:
+        """an in-memory copy of tracked points [first_marker, stop_marker) over frames [start_frame, stop_frame)"""
+        array = self.open(data_name)
+        frame_slice = slice(start_frame, stop_frame)
+        marker_slice = slice(first_marker, stop_marker)
+        if self._frame_axis(data_name) == 0:
+            return np.array(array[frame_slice, marker_slice])
+        return np.array(array[:, frame_slice, marker_slice])
+
+    def close(self):
+        """
+        Drop the accessor's references to the memory maps, which closes the underlying files
+        (unless something else is still holding on to one of the `*_data` arrays)
+        """
+        for data_name in list(self._opened_arrays.keys()):
+            logger.debug(f"releasing memory-mapped `{data_name}` data")
+            del self._opened_arrays[data_name]
@@ -0,0 +1,140 @@
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from src.config.home_dir import (
+    MEDIAPIPE_2D_NPY_FILE_NAME,
+    MEDIAPIPE_3D_NPY_FILE_NAME,
+    MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
+)
+from src.core_processes.utils.npy_data_manifest import (
+    check_npy_against_data_manifest,
+    get_data_manifest_entry,
+    record_existing_npy_in_data_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _check_npy_against_data_manifest_or_record_it(
+    npy_file_path: Path, expected_shape: tuple
+) -> dict:
+    if get_data_manifest_entry(npy_file_path) is None and npy_file_path.exists():
+        logger.warning(
+            f"{npy_file_path} was saved without a data manifest entry, recording it now"
+        )
+        record_existing_npy_in_data_manifest(npy_file_path)
+    return check_npy_against_data_manifest(npy_file_path, expected_shape=expected_shape)
+
+
+def validate_mediapipe_2d_data(
+    synchronized_videos_folder: Union[str, Path],
+    path_to_folder_where_data_is_saved: Union[str, Path],
+    mediapipe_2d_data: np.ndarray,
+) -> dict:
+    """
+    Check that the `mediapipe 2d detection` process worked, from the data manifest that got written along with the `npy`
+    (i.e. without loading it again):
+
+    1. The `.npy` file containing the mediapipe 2d data is in the `output_data_folder`, unchanged since it was saved
+    2. It has the same shape as `mediapipe_2d_data`: (number of cameras, number of frames, number of tracked points, [pixelX, pixelY]),
+    with one camera per video in the `synchronized videos` folder
+
+    Returns the manifest entry of the 2d data
+    """
+    mediapipe_2d_entry = _check_npy_against_data_manifest_or_record_it(
+        Path(path_to_folder_where_data_is_saved) / MEDIAPIPE_2D_NPY_FILE_NAME,
+        expected_shape=mediapipe_2d_data.shape,
+    )
+
+    number_of_videos = len(list(Path(synchronized_videos_folder).glob("*.mp4")))
+    if mediapipe_2d_data.shape[0] != number_of_videos:
+        logger.error(
+            f"mediapipe 2d data has {mediapipe_2d_data.shape[0]} cameras, but there are {number_of_videos} videos in {synchronized_videos_folder}"
+        )
+        raise ValueError(
+            f"mediapipe 2d data has {mediapipe_2d_data.shape[0]} cameras, but there are {number_of_videos} videos"
+        )
+
+    if mediapipe_2d_data.shape[3] != 2:
+        logger.error(
+            f"mediapipe 2d data should be [pixelX, pixelY], but its shape is {mediapipe_2d_data.shape}"
+        )
+        raise ValueError(
+            f"mediapipe 2d data should be [pixelX, pixelY], but its shape is {mediapipe_2d_data.shape}"
+        )
+
+    return mediapipe_2d_entry
+
+
+def validate_mediapipe_3d_data(
+    path_to_folder_where_data_is_saved: Union[str, Path],
+    skel3d_frame_marker_xyz: np.ndarray,
+    skeleton_reprojection_error_fr_mar: np.ndarray,
+    expected_number_of_frames: Optional[int] = None,
+) -> dict:
+    """
+    Check that the `mediapipe 3d triangulation` process worked, from the data manifest that got written along with the `npy` files:
+
+    1. The `.npy` files containing the 3d data and the reprojection error are in the `output_data_folder`, unchanged since they were saved
+    2. They have the same shapes as `skel3d_frame_marker_xyz` (number of frames, number of tracked points, [X,Y,Z])
+    and `skeleton_reprojection_error_fr_mar` (number of frames, number of tracked points)
+    3. They have as many frames as the 2d data (if it's in the same folder's manifest), or `expected_number_of_frames`
+    if it's given (e.g. when the 2d data got put on a common time base first, see `session_frame_timing`)
+
+    Returns the manifest entry of the 3d data
+    """
+    path_to_folder_where_data_is_saved = Path(path_to_folder_where_data_is_saved)
+    mediapipe_3d_entry = _check_npy_against_data_manifest_or_record_it(
+        path_to_folder_where_data_is_saved / MEDIAPIPE_3D_NPY_FILE_NAME,
+        expected_shape=skel3d_frame_marker_xyz.shape,
+    )
+    _check_npy_against_data_manifest_or_record_it(
+        path_to_folder_where_data_is_saved / MEDIAPIPE_REPROJECTION_ERROR_NPY_FILE_NAME,
+        expected_shape=skeleton_reprojection_error_fr_mar.shape,
+    )
+
+    if skel3d_frame_marker_xyz.shape[2] != 3:
+        logger.error(
+            f"mediapipe 3d data should be [X,Y,Z], but its shape is {skel3d_frame_marker_xyz.shape}"
+        )
+        raise ValueError(
+            f"mediapipe 3d data should be [X,Y,Z], but its shape is {skel3d_frame_marker_xyz.shape}"
+        )
+
+    number_of_frames = skel3d_frame_marker_xyz.shape[0]
+    if skeleton_reprojection_error_fr_mar.shape[0] != number_of_frames:
+        logger.error(
+            f"mediapipe 3d data has {number_of_frames} frames, but its reprojection error has {skeleton_reprojection_error_fr_mar.shape[0]}"
+        )
+        raise ValueError(
+            f"mediapipe 3d data has {number_of_frames} frames, but its reprojection error has {skeleton_reprojection_error_fr_mar.shape[0]}"
+        )
+
+    if expected_number_of_frames is not None:
+        if number_of_frames != expected_number_of_frames:
+            logger.error(
+                f"mediapipe 3d data has {number_of_frames} frames, but it should have {expected_number_of_frames}"
+            )
+            raise ValueError(
+                f"mediapipe 3d data has {number_of_frames} frames, but it should have {expected_number_of_frames}"
+            )
+        return mediapipe_3d_entry
+
+    mediapipe_2d_entry = get_data_manifest_entry(
+        path_to_folder_where_data_is_saved / MEDIAPIPE_2D_NPY_FILE_NAME
+    )
+    if (
+        mediapipe_2d_entry is not None
+        and mediapipe_2d_entry["shape"][1] != number_of_frames
+    ):
+        logger.error(
+            f"mediapipe 3d data has {number_of_frames} frames, but the 2d data it came from has {mediapipe_2d_entry['shape'][1]}"
+        )
+        raise ValueError(
+            f"mediapipe 3d data has {number_of_frames} frames, but the 2d data it came from has {mediapipe_2d_entry['shape'][1]}"
+        )
+
+    return mediapipe_3d_entry
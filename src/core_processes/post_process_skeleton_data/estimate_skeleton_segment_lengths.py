@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import Union
+from typing import List, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -8,6 +8,12 @@ import json
 
 from rich import print
 
+from src.config.home_dir import SKELETON_SEGMENT_LENGTHS_JSON_FILE_NAME
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    mediapipe_landmark_names,
+)
+from src.core_processes.utils.performance_recorder import record_performance
+
 logger = logging.getLogger(__name__)
 
 mediapipe_skeleton_segment_definitions = {
@@ -33,124 +39,151 @@ mediapipe_skeleton_segment_definitions = {
 }
 
 
-def estimate_skeleton_segment_lengths(
-    skeleton_dataframe: pd.DataFrame, skeleton_segment_definitions: dict
+# virtual markers are the mean of other markers (which can be virtual markers defined above them)
+mediapipe_virtual_marker_definitions = {
+    "hips_center": ["left_hip", "right_hip"],
+    "neck_center": ["left_shoulder", "right_shoulder"],
+    "head_center": ["left_ear", "right_ear"],
+    "chest_center": ["hips_center", "neck_center"],
+}
+
+
+def get_virtual_marker_component_indices(
+    tracked_point_names: List[str], virtual_marker_definitions: dict
+) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    The names of all the markers (the tracked points followed by the virtual markers) and, for each virtual marker,
+    the indices (into that list of names) of the markers it's the mean of
+    """
+    marker_names = list(tracked_point_names)
+    virtual_marker_component_indices = []
+    for (
+        virtual_marker_name,
+        component_marker_names,
+    ) in virtual_marker_definitions.items():
+        virtual_marker_component_indices.append(
+            np.array(
+                [
+                    marker_names.index(component_marker_name)
+                    for component_marker_name in component_marker_names
+                ]
+            )
+        )
+        marker_names.append(virtual_marker_name)
+    return marker_names, virtual_marker_component_indices
+
+
+@record_performance()
+def estimate_skeleton_segment_lengths_from_3d_data(
+    skel3d_frame_marker_xyz: np.ndarray,
+    skeleton_segment_definitions: dict = mediapipe_skeleton_segment_definitions,
+    tracked_point_names: List[str] = mediapipe_landmark_names,
+    virtual_marker_definitions: dict = mediapipe_virtual_marker_definitions,
 ) -> dict:
-    """Estimate the length of each skeleton segment.
+    """Estimate the length of each skeleton segment, all segments at once.
 
     Args:
-        skeleton_data_dictionary (dict): Dictionary containing the skeleton data.
+        skel3d_frame_marker_xyz (np.ndarray): [number_of_frames, number_of_tracked_points, XYZ] 3d data (can be memory-mapped),
+            whose first tracked points are the ones in `tracked_point_names` (e.g. the whole mediapipe skeleton, which starts with the body)
         skeleton_segment_definitions (dict): Dictionary containing the definitions of each segment (i.e. the proximal and distal joints).
+        tracked_point_names (list): The names of the first tracked points in `skel3d_frame_marker_xyz`.
+        virtual_marker_definitions (dict): Dictionary containing the markers that each virtual marker is the mean of.
 
     Returns:
         dict: Dictionary containing the estimated length of each skeleton segment.
     """
     logger.debug("Estimating skeleton segment lengths (mm)...")
-    skeleton_data_dictionary = create_skeleton_dictionary_from_skeleton_body_data_frame(
-        skeleton_dataframe
+    (
+        marker_names,
+        virtual_marker_component_indices,
+    ) = get_virtual_marker_component_indices(
+        tracked_point_names, virtual_marker_definitions
     )
+    number_of_tracked_points = len(tracked_point_names)
 
-    skeleton_segment_lengths_dict = {}
-    for segment_name, segment_definition_dict in skeleton_segment_definitions.items():
-        print(
-            f"Estimating length of segment '{segment_name}' "
-            f"based on proximal joint: '{segment_definition_dict['proximal']}' and "
-            f"distal joint:'{segment_definition_dict['distal']}'"
-        )
-        proximal_joint_name = segment_definition_dict["proximal"]
-        distal_joint_name = segment_definition_dict["distal"]
-
-        proximal_x = skeleton_data_dictionary[f"{proximal_joint_name}_x"]
-        proximal_y = skeleton_data_dictionary[f"{proximal_joint_name}_y"]
-        proximal_z = skeleton_data_dictionary[f"{proximal_joint_name}_z"]
-
-        distal_x = skeleton_data_dictionary[f"{distal_joint_name}_x"]
-        distal_y = skeleton_data_dictionary[f"{distal_joint_name}_y"]
-        distal_z = skeleton_data_dictionary[f"{distal_joint_name}_z"]
-
-        # logger.debug(f"proximal_x nans: {np.isnan(proximal_x).sum()}")
-        # logger.debug(f"len proximal_x: {len(proximal_x)}")
-        # logger.debug(f"distal_x nans: {np.isnan(distal_x).sum()}")
-        # logger.debug(f"len distal_x: {len(distal_x)}")
-
-        # good ol pythag <3
-        segment_length_per_frame = np.sqrt(
-            (proximal_x - distal_x) ** 2
-            + (proximal_y - distal_y) ** 2
-            + (proximal_z - distal_z) ** 2
-        )
-        skeleton_segment_lengths_dict[segment_name] = {}
-        skeleton_segment_lengths_dict[segment_name]["median"] = np.nanmedian(
-            segment_length_per_frame
-        )
-        skeleton_segment_lengths_dict[segment_name]["mean"] = np.nanmean(
-            segment_length_per_frame
-        )
-        skeleton_segment_lengths_dict[segment_name]["standard_deviation"] = np.nanstd(
-            segment_length_per_frame
+    skel3d_frame_marker_xyz = np.asarray(skel3d_frame_marker_xyz)
+    marker_data_frame_marker_xyz = np.empty(
+        (skel3d_frame_marker_xyz.shape[0], len(marker_names), 3), dtype=np.float64
+    )
+    marker_data_frame_marker_xyz[
+        :, :number_of_tracked_points
+    ] = skel3d_frame_marker_xyz[:, :number_of_tracked_points]
+    for virtual_marker_index, component_indices in enumerate(
+        virtual_marker_component_indices, start=number_of_tracked_points
+    ):
+        marker_data_frame_marker_xyz[:, virtual_marker_index] = np.mean(
+            marker_data_frame_marker_xyz[:, component_indices], axis=1
         )
 
-    return skeleton_segment_lengths_dict
-
-
-def create_virtual_markers(
-    skeleton_data_dictionary, virtual_marker_name: str, marker_name_list: list
-) -> dict:
-    # print(
-    #     f"Creating virtual marker '{virtual_marker_name}' from markers: {marker_name_list}"
-    # )
-
-    x = []
-    y = []
-    z = []
-
-    for marker_name in marker_name_list:
-        x.append(skeleton_data_dictionary[f"{marker_name}_x"])
-        y.append(skeleton_data_dictionary[f"{marker_name}_y"])
-        z.append(skeleton_data_dictionary[f"{marker_name}_z"])
-
-    skeleton_data_dictionary[f"{virtual_marker_name}_x"] = np.mean(
-        np.asarray(x), axis=0
+    segment_names = list(skeleton_segment_definitions.keys())
+    proximal_indices = np.array(
+        [
+            marker_names.index(segment_definition_dict["proximal"])
+            for segment_definition_dict in skeleton_segment_definitions.values()
+        ]
     )
-    skeleton_data_dictionary[f"{virtual_marker_name}_y"] = np.mean(
-        np.asarray(y), axis=0
-    )
-    skeleton_data_dictionary[f"{virtual_marker_name}_z"] = np.mean(
-        np.asarray(z), axis=0
+    distal_indices = np.array(
+        [
+            marker_names.index(segment_definition_dict["distal"])
+            for segment_definition_dict in skeleton_segment_definitions.values()
+        ]
     )
 
-    return skeleton_data_dictionary
+    proximal_minus_distal_frame_segment_xyz = (
+        marker_data_frame_marker_xyz[:, proximal_indices]
+        - marker_data_frame_marker_xyz[:, distal_indices]
+    )
+    # good ol pythag <3
+    segment_length_frame_segment = np.sqrt(
+        proximal_minus_distal_frame_segment_xyz[..., 0] ** 2
+        + proximal_minus_distal_frame_segment_xyz[..., 1] ** 2
+        + proximal_minus_distal_frame_segment_xyz[..., 2] ** 2
+    )
+    # one row per segment, so each segment gets summed up the same way as on its own
+    segment_length_segment_frame = np.ascontiguousarray(segment_length_frame_segment.T)
 
+    median_per_segment = np.nanmedian(segment_length_segment_frame, axis=1)
+    mean_per_segment = np.nanmean(segment_length_segment_frame, axis=1)
+    standard_deviation_per_segment = np.nanstd(segment_length_segment_frame, axis=1)
 
-def create_skeleton_dictionary_from_skeleton_body_data_frame(
-    skeleton_body_dataframe: pd.DataFrame,
-) -> dict:
-    skeleton_data_dictionary = skeleton_body_dataframe.to_dict(orient="list")
+    return {
+        segment_name: {
+            "median": median_per_segment[segment_number],
+            "mean": mean_per_segment[segment_number],
+            "standard_deviation": standard_deviation_per_segment[segment_number],
+        }
+        for segment_number, segment_name in enumerate(segment_names)
+    }
 
-    for key, value in skeleton_data_dictionary.items():
-        skeleton_data_dictionary[key] = np.asarray(value)
 
-    skeleton_data_dictionary = create_virtual_markers(
-        skeleton_data_dictionary, "hips_center", ["left_hip", "right_hip"]
-    )
-    skeleton_data_dictionary = create_virtual_markers(
-        skeleton_data_dictionary, "neck_center", ["left_shoulder", "right_shoulder"]
-    )
-    skeleton_data_dictionary = create_virtual_markers(
-        skeleton_data_dictionary, "head_center", ["left_ear", "right_ear"]
-    )
-
-    skeleton_data_dictionary = create_virtual_markers(
-        skeleton_data_dictionary, "chest_center", ["hips_center", "neck_center"]
+def estimate_skeleton_segment_lengths(
+    skeleton_dataframe: pd.DataFrame, skeleton_segment_definitions: dict
+) -> dict:
+    """Estimate the length of each skeleton segment from a `{marker_name}_x, {marker_name}_y, {marker_name}_z, ...` dataframe
+    (e.g. `mediapipe_body_3d_xyz.csv`). See `estimate_skeleton_segment_lengths_from_3d_data`.
+    """
+    tracked_point_names = [
+        column_name[:-2] for column_name in skeleton_dataframe.columns[::3]
+    ]
+    skel3d_frame_marker_xyz = skeleton_dataframe[
+        [
+            f"{tracked_point_name}_{dimension}"
+            for tracked_point_name in tracked_point_names
+            for dimension in "xyz"
+        ]
+    ].to_numpy(dtype=np.float64)
+    return estimate_skeleton_segment_lengths_from_3d_data(
+        skel3d_frame_marker_xyz.reshape(skeleton_dataframe.shape[0], -1, 3),
+        skeleton_segment_definitions=skeleton_segment_definitions,
+        tracked_point_names=tracked_point_names,
     )
-    return skeleton_data_dictionary
 
 
 def save_skeleton_segment_lengths_to_json(
     save_path: Union[Path, str], skeleton_segment_lengths_dict: dict
 ):
     logger.info("Saving skeleton segment lengths to JSON file...")
-    json_file_path = Path(save_path) / "skeleton_segment_lengths.json"
+    json_file_path = Path(save_path) / SKELETON_SEGMENT_LENGTHS_JSON_FILE_NAME
 
     with open(json_file_path, "w") as file:
         json.dump(skeleton_segment_lengths_dict, file, indent=4)
@@ -12,9 +12,14 @@ from scipy import signal
 
 from src.config.home_dir import (
     CENTER_OF_MASS_FOLDER_NAME,
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
     SEGMENT_CENTER_OF_MASS_NPY_FILE_NAME,
     TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME,
 )
+from src.core_processes.utils.npy_data_manifest import (
+    save_npy_and_record_in_data_manifest,
+)
+from src.core_processes.utils.performance_recorder import record_performance
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +80,7 @@ def find_good_clean_frame_reprojection_error_method(
 
 
 # %%
+@record_performance()
 def fill_gaps_in_freemocap_data(freemocap_marker_data: np.ndarray) -> np.ndarray:
     """
     Takes in a 3d skeleton numpy array from freemocap and interpolates missing NaN values
@@ -83,7 +89,9 @@ def fill_gaps_in_freemocap_data(freemocap_marker_data: np.ndarray) -> np.ndarray
     num_frames = freemocap_marker_data.shape[0]
     num_markers = freemocap_marker_data.shape[1]
 
-    freemocap_interpolated_data = np.empty((num_frames, num_markers, 3))
+    freemocap_interpolated_data = np.empty(
+        (num_frames, num_markers, 3), dtype=freemocap_marker_data.dtype
+    )
 
     for marker in track(
         range(num_markers),
@@ -121,18 +129,22 @@ def butterworth_lowpass_zerolag_filter(data, cutoff, sampling_rate, order):
     return y
 
 
+@record_performance()
 def butterworth_filter_skeleton(skeleton_3d_data, cutoff, sampling_rate, order):
     """Take in a 3d skeleton numpy array and calculate_center_of_mass a low pass butterworth filter on each marker in the data"""
     number_of_frames = skeleton_3d_data.shape[0]
     number_of_markers = skeleton_3d_data.shape[1]
-    butterworth_filtered_data = np.empty((number_of_frames, number_of_markers, 3))
+    butterworth_filtered_data = np.empty(
+        (number_of_frames, number_of_markers, 3), dtype=skeleton_3d_data.dtype
+    )
 
     for marker_number in range(number_of_markers):
         for dimension in range(3):
+            # filter in float64 even when the data is stored as float32
             butterworth_filtered_data[
                 :, marker_number, dimension
             ] = butterworth_lowpass_zerolag_filter(
-                skeleton_3d_data[:, marker_number, dimension],
+                skeleton_3d_data[:, marker_number, dimension].astype(np.float64),
                 cutoff,
                 sampling_rate,
                 order,
@@ -787,6 +799,7 @@ def build_virtual_trunk_marker(
 # %%
 
 
+@record_performance()
 def build_mediapipe_skeleton(
     mediapipe_pose_data, segment_dataframe, mediapipe_indices
 ) -> list:
@@ -1066,6 +1079,7 @@ def build_anthropometric_dataframe(
     return segment_conn_len_perc_dataframe
 
 
+@record_performance()
 def calculate_center_of_mass(
     freemocap_marker_data_array: np.ndarray,
     pose_estimation_skeleton: list,
@@ -1163,6 +1177,21 @@ def gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
         freemocap_interpolated_data, cut_off, sampling_rate, order
     )
 
+    return origin_align_3d_data_and_then_calculate_center_of_mass(
+        butterworth_filtered_skeleton_data=butterworth_filtered_skeleton_data,
+        path_to_folder_where_we_will_save_this_data=path_to_folder_where_we_will_save_this_data,
+    )
+
+
+def origin_align_3d_data_and_then_calculate_center_of_mass(
+    butterworth_filtered_skeleton_data: np.ndarray,
+    path_to_folder_where_we_will_save_this_data: [str, Path],
+):
+    """the part of the post-processing that comes after gap-filling and filtering (the streaming pipeline does those chunk by chunk)"""
+    path_to_folder_where_we_will_save_this_data = Path(
+        path_to_folder_where_we_will_save_this_data
+    )
+
     # pin skeleton to origin (set to mean positin of skeletonin this recording)
     zeroed_skeleton_data = butterworth_filtered_skeleton_data.copy()
     zeroed_skeleton_data[:, :, 0] -= np.nanmean(zeroed_skeleton_data[:, :, 0])
@@ -1204,11 +1233,9 @@ def gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
 
     logger.info("Saving Origin Aligned Data")
     Path(path_to_folder_where_we_will_save_this_data).mkdir(parents=True, exist_ok=True)
-    np.save(
-        str(
-            path_to_folder_where_we_will_save_this_data
-            / "mediaPipeSkel_3d_origin_aligned"
-        ),
+    save_npy_and_record_in_data_manifest(
+        path_to_folder_where_we_will_save_this_data
+        / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
         origin_aligned_freemocap_marker_data,
     )
 
@@ -1233,21 +1260,21 @@ def gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
     Path(
         path_to_folder_where_we_will_save_this_data / CENTER_OF_MASS_FOLDER_NAME
     ).mkdir(parents=True, exist_ok=True)
-    np.save(
-        str(
-            path_to_folder_where_we_will_save_this_data
-            / CENTER_OF_MASS_FOLDER_NAME
-            / SEGMENT_CENTER_OF_MASS_NPY_FILE_NAME
+    save_npy_and_record_in_data_manifest(
+        path_to_folder_where_we_will_save_this_data
+        / CENTER_OF_MASS_FOLDER_NAME
+        / SEGMENT_CENTER_OF_MASS_NPY_FILE_NAME,
+        segment_COM_frame_imgPoint_XYZ.astype(
+            origin_aligned_freemocap_marker_data.dtype, copy=False
         ),
-        segment_COM_frame_imgPoint_XYZ,
     )
-    np.save(
-        str(
-            path_to_folder_where_we_will_save_this_data
-            / CENTER_OF_MASS_FOLDER_NAME
-            / TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME
+    save_npy_and_record_in_data_manifest(
+        path_to_folder_where_we_will_save_this_data
+        / CENTER_OF_MASS_FOLDER_NAME
+        / TOTAL_BODY_CENTER_OF_MASS_NPY_FILE_NAME,
+        totalBodyCOM_frame_XYZ.astype(
+            origin_aligned_freemocap_marker_data.dtype, copy=False
         ),
-        totalBodyCOM_frame_XYZ,
     )
 
     logger.info("Done with gap filling, filtering, aligning, and COM calculation")
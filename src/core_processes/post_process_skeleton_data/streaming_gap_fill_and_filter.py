@@ -0,0 +1,303 @@
+import logging
+from collections import defaultdict
+from typing import Union
+
+import numpy as np
+from scipy import signal
+
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    fill_gaps_in_freemocap_data,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def calculate_butterworth_filter_settling_frames(
+    cutoff: Union[float, int],
+    sampling_rate: Union[float, int],
+    order: int,
+    settling_tolerance: float = 1e-9,
+) -> int:
+    """
+    How many frames it takes for the filter's response to something (e.g. the edge of a window) to die down
+    below `settling_tolerance`, based on the slowest pole of the filter
+    """
+    nyquist_freq = 0.5 * sampling_rate
+    b, a = signal.butter(order, cutoff / nyquist_freq, btype="low", analog=False)
+    slowest_pole_magnitude = np.max(np.abs(np.roots(a)))
+    settling_frames = int(
+        np.ceil(np.log(settling_tolerance) / np.log(slowest_pole_magnitude))
+    )
+    # `filtfilt` needs windows longer than its padding
+    minimum_frames = 3 * max(len(a), len(b)) + 1
+    return max(settling_frames, minimum_frames)
+
+
+class StreamingGapFillAndButterworthFilter:
+    """
+    Gap-fill (`fill_gaps_in_freemocap_data`) and zero-lag Butterworth filter (`butterworth_filter_skeleton`)
+    3d skeleton data that arrives a few frames at a time.
+
+    Works like overlap-save: a frame gets filtered once there are `settling_frames` of (gap-filled) data on
+    either side of it, in a window that runs `settling_frames` past the frames it keeps. The filter's response
+    to the window edges has died down (below `settling_tolerance`) by the time it reaches the kept frames,
+    so they match filtering the whole recording at once. Windows that touch the first/last frame of the
+    recording get the same edge padding as the whole-recording filter.
+
+    Linear interpolation across a gap only needs the valid frames on either side of it, so it can also
+    happen as data arrives. Everything that depends on the whole recording (gaps before the first/after
+    the last valid frame of a tracked point are filled with values from the whole recording) waits for
+    `finish`, which also re-does any tracked point whose raw data changed after it was streamed in.
+
+    Each column (tracked point and X/Y/Z) keeps track of its own progress, so e.g. a hand
+    that drops out for a while doesn't hold back the rest of the body.
+    """
+
+    def __init__(
+        self,
+        number_of_frames: int,
+        number_of_tracked_points: int,
+        sampling_rate: Union[float, int],
+        cutoff: Union[float, int],
+        order: int,
+        dtype: str = "float64",
+        settling_tolerance: float = 1e-9,
+    ):
+        self._number_of_frames = number_of_frames
+        self._number_of_tracked_points = number_of_tracked_points
+        self._dtype = np.dtype(dtype)
+
+        nyquist_freq = 0.5 * sampling_rate
+        self._b, self._a = signal.butter(
+            order, cutoff / nyquist_freq, btype="low", analog=False
+        )
+        self._settling_frames = calculate_butterworth_filter_settling_frames(
+            cutoff=cutoff,
+            sampling_rate=sampling_rate,
+            order=order,
+            settling_tolerance=settling_tolerance,
+        )
+
+        shape = (number_of_frames, number_of_tracked_points * 3)
+        self._raw_data = np.full(shape, np.nan, dtype=self._dtype)
+        self._gap_filled_data = np.full(shape, np.nan, dtype=self._dtype)
+        self._filtered_data = np.full(shape, np.nan, dtype=self._dtype)
+
+        number_of_columns = number_of_tracked_points * 3
+        self._first_valid_frame = np.full(number_of_columns, -1)
+        self._last_valid_frame = np.full(number_of_columns, -1)
+        # frames [emitted_start, emitted_stop) of each column are filtered and final
+        self._emitted_start = np.zeros(number_of_columns, dtype=int)
+        self._emitted_stop = np.zeros(number_of_columns, dtype=int)
+
+        self._number_of_frames_received = 0
+
+    @property
+    def settling_frames(self) -> int:
+        return self._settling_frames
+
+    @property
+    def number_of_frames_received(self) -> int:
+        return self._number_of_frames_received
+
+    def add_frames(self, data3d_numFrames_numTrackedPoints_XYZ: np.ndarray):
+        """add the next frames of raw 3d data (with `nan` for missing points)"""
+        first_frame = self._number_of_frames_received
+        stop_frame = first_frame + data3d_numFrames_numTrackedPoints_XYZ.shape[0]
+        if stop_frame > self._number_of_frames:
+            raise ValueError(
+                f"Got frames up to {stop_frame}, but this recording only has {self._number_of_frames} frames"
+            )
+
+        self._raw_data[first_frame:stop_frame] = np.reshape(
+            data3d_numFrames_numTrackedPoints_XYZ, (stop_frame - first_frame, -1)
+        )
+        self._number_of_frames_received = stop_frame
+
+        self._gap_fill_new_frames(first_frame, stop_frame)
+        self._filter_settled_frames()
+
+    def finish(
+        self, final_raw_data3d_numFrames_numTrackedPoints_XYZ: np.ndarray = None
+    ):
+        """
+        Gap-fill and filter everything that's left, and return the filtered data [number_of_frames, number_of_tracked_points, XYZ].
+
+        If the raw data changed after it was added (e.g. points with a high reprojection error got removed
+        with a threshold from the whole recording), pass in the final version - the columns that changed are re-done from scratch
+        """
+        if self._number_of_frames_received != self._number_of_frames:
+            raise ValueError(
+                f"Only got {self._number_of_frames_received} out of {self._number_of_frames} frames"
+            )
+
+        if final_raw_data3d_numFrames_numTrackedPoints_XYZ is not None:
+            final_raw_data = np.reshape(
+                final_raw_data3d_numFrames_numTrackedPoints_XYZ,
+                (self._number_of_frames, -1),
+            ).astype(self._dtype, copy=False)
+            changed_columns = ~np.all(
+                (final_raw_data == self._raw_data)
+                | (np.isnan(final_raw_data) & np.isnan(self._raw_data)),
+                axis=0,
+            )
+            if np.any(changed_columns):
+                logger.info(
+                    f"Re-doing {np.sum(changed_columns)} out of {changed_columns.size} columns whose raw data changed after they were streamed in"
+                )
+                self._raw_data[:, changed_columns] = final_raw_data[:, changed_columns]
+                self._emitted_start[changed_columns] = 0
+                self._emitted_stop[changed_columns] = 0
+
+        unfinished_columns = (self._emitted_start > 0) | (
+            self._emitted_stop < self._number_of_frames
+        )
+        logger.info(
+            f"Finishing {np.sum(unfinished_columns)} out of {unfinished_columns.size} columns that couldn't be streamed all the way through"
+        )
+
+        # gap-fill the whole recording, the same way as the non-streaming post-processing
+        unfinished_tracked_points = np.unique(np.flatnonzero(unfinished_columns) // 3)
+        if unfinished_tracked_points.size > 0:
+            gap_filled_tracked_points = fill_gaps_in_freemocap_data(
+                self._raw_data.reshape(self._number_of_frames, -1, 3)[
+                    :, unfinished_tracked_points
+                ]
+            )
+            for tracked_point_number, tracked_point in enumerate(
+                unfinished_tracked_points
+            ):
+                columns = slice(3 * tracked_point, 3 * tracked_point + 3)
+                self._gap_filled_data[:, columns] = gap_filled_tracked_points[
+                    :, tracked_point_number
+                ]
+
+        windows = defaultdict(list)
+        for column in np.flatnonzero(unfinished_columns):
+            emitted_start = self._emitted_start[column]
+            emitted_stop = self._emitted_stop[column]
+            if emitted_stop <= emitted_start:
+                # nothing streamed out yet
+                windows[(0, 0, self._number_of_frames, self._number_of_frames)].append(
+                    column
+                )
+                continue
+            if emitted_start > 0:
+                windows[
+                    (
+                        0,
+                        0,
+                        emitted_start,
+                        min(
+                            emitted_start + self._settling_frames,
+                            self._number_of_frames,
+                        ),
+                    )
+                ].append(column)
+            if emitted_stop < self._number_of_frames:
+                windows[
+                    (
+                        max(emitted_stop - self._settling_frames, 0),
+                        emitted_stop,
+                        self._number_of_frames,
+                        self._number_of_frames,
+                    )
+                ].append(column)
+
+        for window, columns in windows.items():
+            self._filter_window(*window, columns=np.array(columns))
+
+        self._emitted_start[:] = 0
+        self._emitted_stop[:] = self._number_of_frames
+
+        return self._filtered_data.reshape(self._number_of_frames, -1, 3)
+
+    def get_filtered_frames(self, start_frame: int, stop_frame: int) -> np.ndarray:
+        """filtered frames, with `nan` for the columns that aren't done yet"""
+        filtered_frames = self._filtered_data[start_frame:stop_frame].copy()
+        frame_numbers = np.arange(start_frame, stop_frame)[:, np.newaxis]
+        not_done_yet = (frame_numbers < self._emitted_start) | (
+            frame_numbers >= self._emitted_stop
+        )
+        filtered_frames[not_done_yet] = np.nan
+        return filtered_frames.reshape(stop_frame - start_frame, -1, 3)
+
+    def _gap_fill_new_frames(self, first_frame: int, stop_frame: int):
+        """linearly interpolate across the gaps that the new frames close"""
+        new_frames_are_valid = ~np.isnan(self._raw_data[first_frame:stop_frame])
+        for column in np.flatnonzero(np.any(new_frames_are_valid, axis=0)):
+            valid_frames = np.flatnonzero(new_frames_are_valid[:, column]) + first_frame
+            previous_valid_frame = self._last_valid_frame[column]
+            if previous_valid_frame < 0:
+                self._first_valid_frame[column] = valid_frames[0]
+                # the frames before the first valid one get filled in `finish`
+                known_frames = valid_frames
+            else:
+                known_frames = np.concatenate([[previous_valid_frame], valid_frames])
+
+            frames_to_fill = np.arange(known_frames[0], known_frames[-1] + 1)
+            self._gap_filled_data[frames_to_fill, column] = np.interp(
+                frames_to_fill,
+                known_frames,
+                self._raw_data[known_frames, column],
+            )
+            self._last_valid_frame[column] = valid_frames[-1]
+
+            if previous_valid_frame < 0:
+                # a window can only start at the first valid frame if that's the start of the recording,
+                # otherwise the frames right after it still feel the window's edge
+                self._emitted_start[column] = (
+                    0
+                    if valid_frames[0] == 0
+                    else min(
+                        valid_frames[0] + self._settling_frames, self._number_of_frames
+                    )
+                )
+                self._emitted_stop[column] = self._emitted_start[column]
+
+    def _filter_settled_frames(self):
+        has_valid_frames = self._first_valid_frame >= 0
+        # gap-filled values are final up to the last valid frame (or the end of the recording)
+        settled_stop = np.where(
+            self._last_valid_frame + 1 == self._number_of_frames,
+            self._number_of_frames,
+            self._last_valid_frame + 1 - self._settling_frames,
+        )
+        windows = defaultdict(list)
+        for column in np.flatnonzero(
+            has_valid_frames & (settled_stop > self._emitted_stop)
+        ):
+            emitted_stop = self._emitted_stop[column]
+            window_start = max(
+                emitted_stop - self._settling_frames, self._first_valid_frame[column]
+            )
+            window_stop = min(
+                settled_stop[column] + self._settling_frames,
+                self._last_valid_frame[column] + 1,
+            )
+            windows[
+                (window_start, emitted_stop, settled_stop[column], window_stop)
+            ].append(column)
+
+        for window, columns in windows.items():
+            self._filter_window(*window, columns=np.array(columns))
+            self._emitted_stop[columns] = window[2]
+
+    def _filter_window(
+        self,
+        window_start: int,
+        keep_start: int,
+        keep_stop: int,
+        window_stop: int,
+        columns: np.ndarray,
+    ):
+        # filter in float64 even when the data is stored as float32, like `butterworth_filter_skeleton`
+        filtered_window = signal.filtfilt(
+            self._b,
+            self._a,
+            self._gap_filled_data[window_start:window_stop, columns].astype(np.float64),
+            axis=0,
+        )
+        self._filtered_data[keep_start:keep_stop, columns] = filtered_window[
+            keep_start - window_start : keep_stop - window_start
+        ]
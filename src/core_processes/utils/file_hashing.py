@@ -0,0 +1,14 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+FILE_HASH_CHUNK_SIZE_BYTES = 2**20
+
+
+def hash_file_contents(file_path: Union[str, Path]) -> str:
+    """sha256 of the file, read a chunk at a time so big `npy`/video files never have to fit in memory"""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(FILE_HASH_CHUNK_SIZE_BYTES), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
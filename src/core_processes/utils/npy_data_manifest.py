@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from src.config.home_dir import DATA_MANIFEST_FILE_NAME
+from src.core_processes.utils.file_hashing import hash_file_contents
+from src.core_processes.utils.performance_recorder import record_performance
+
+logger = logging.getLogger(__name__)
+
+# this many values get checked for `nan` at a time, so there's never a big temporary array
+NAN_COUNT_CHUNK_SIZE_VALUES = 2**22
+
+_data_manifest_lock = threading.Lock()
+
+
+class _HashingFileWriter:
+    """
+    Wraps a file so everything written to it also goes into a sha256 -
+    `np.save` streams the array into it a buffer at a time, so the data never gets read back
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self.file_hash = hashlib.sha256()
+
+    def write(self, data):
+        self.file_hash.update(data)
+        return self._file.write(data)
+
+
+def get_data_manifest_path(npy_file_path: Union[str, Path]) -> Path:
+    """every folder of `npy` files gets its own manifest, so a folder can be moved around on its own"""
+    return Path(npy_file_path).parent / DATA_MANIFEST_FILE_NAME
+
+
+def load_data_manifest(data_manifest_path: Union[str, Path]) -> dict:
+    data_manifest_path = Path(data_manifest_path)
+    if not data_manifest_path.exists():
+        return {}
+    try:
+        return json.loads(data_manifest_path.read_text())
+    except json.JSONDecodeError:
+        logger.warning(
+            f"Could not read data manifest at {data_manifest_path}, starting from an empty one"
+        )
+        return {}
+
+
+def count_nans(array: np.ndarray) -> int:
+    if not np.issubdtype(array.dtype, np.floating):
+        return 0
+    values = np.asarray(array).reshape(-1)
+    return int(
+        sum(
+            np.count_nonzero(
+                np.isnan(values[start : start + NAN_COUNT_CHUNK_SIZE_VALUES])
+            )
+            for start in range(0, values.size, NAN_COUNT_CHUNK_SIZE_VALUES)
+        )
+    )
+
+
+def _record_in_data_manifest(
+    npy_file_path: Path, array: np.ndarray, sha256: str
+) -> dict:
+    stat = npy_file_path.stat()
+    entry = {
+        "shape": list(array.shape),
+        "dtype": str(array.dtype),
+        "number_of_nans": count_nans(array),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "saved": time.strftime("%Y-%m-%d_%H_%M_%S"),
+    }
+
+    data_manifest_path = get_data_manifest_path(npy_file_path)
+    with _data_manifest_lock:
+        data_manifest = load_data_manifest(data_manifest_path)
+        data_manifest[npy_file_path.name] = entry
+        # write a new file and swap it in, so a crash never leaves a half-written manifest
+        temporary_data_manifest_path = data_manifest_path.with_suffix(".tmp")
+        temporary_data_manifest_path.write_text(json.dumps(data_manifest, indent=4))
+        os.replace(temporary_data_manifest_path, data_manifest_path)
+    return entry
+
+
+@record_performance()
+def save_npy_and_record_in_data_manifest(
+    npy_file_path: Union[str, Path], array: np.ndarray
+) -> dict:
+    """
+    `np.save` the array, and record its shape, dtype, number of `nan`s and the sha256 of the file
+    (computed while it's being written) in the folder's data manifest. Returns the manifest entry
+    """
+    npy_file_path = Path(npy_file_path)
+    with open(npy_file_path, "wb") as npy_file:
+        hashing_file_writer = _HashingFileWriter(npy_file)
+        np.save(hashing_file_writer, array)
+    return _record_in_data_manifest(
+        npy_file_path, array, hashing_file_writer.file_hash.hexdigest()
+    )
+
+
+def record_existing_npy_in_data_manifest(npy_file_path: Union[str, Path]) -> dict:
+    """for `npy` files that were saved without a manifest entry (e.g. by an older version) - this has to read the whole file once"""
+    npy_file_path = Path(npy_file_path)
+    logger.info(f"Recording {npy_file_path} in its data manifest")
+    return _record_in_data_manifest(
+        npy_file_path,
+        np.load(str(npy_file_path), mmap_mode="r"),
+        hash_file_contents(npy_file_path),
+    )
+
+
+def get_data_manifest_entry(npy_file_path: Union[str, Path]) -> Optional[dict]:
+    """`None` if the file was never recorded"""
+    npy_file_path = Path(npy_file_path)
+    return load_data_manifest(get_data_manifest_path(npy_file_path)).get(
+        npy_file_path.name
+    )
+
+
+def check_npy_against_data_manifest(
+    npy_file_path: Union[str, Path],
+    expected_shape: Optional[tuple] = None,
+    expected_dtype: Optional[Union[str, np.dtype]] = None,
+    verify_checksum: bool = False,
+) -> dict:
+    """
+    Check that an `npy` file is still exactly the one that was recorded in the data manifest,
+    without reading it - its size and modification time have to match (and, if given, its shape and dtype).
+    `verify_checksum=True` also re-hashes the whole file. Returns the manifest entry
+    """
+    npy_file_path = Path(npy_file_path)
+    if not npy_file_path.exists():
+        logger.error(f"{npy_file_path} does not exist")
+        raise FileNotFoundError(f"{npy_file_path} does not exist")
+
+    entry = get_data_manifest_entry(npy_file_path)
+    if entry is None:
+        logger.error(f"{npy_file_path} is not in its data manifest")
+        raise ValueError(f"{npy_file_path} is not in its data manifest")
+
+    problems = []
+    stat = npy_file_path.stat()
+    if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+        problems.append(
+            f"file changed since it was saved (size {stat.st_size} vs {entry['size']})"
+        )
+    if expected_shape is not None and tuple(expected_shape) != tuple(entry["shape"]):
+        problems.append(
+            f"shape {tuple(entry['shape'])} vs expected {tuple(expected_shape)}"
+        )
+    if expected_dtype is not None and np.dtype(expected_dtype) != np.dtype(
+        entry["dtype"]
+    ):
+        problems.append(
+            f"dtype {entry['dtype']} vs expected {np.dtype(expected_dtype)}"
+        )
+    if verify_checksum:
+        if hash_file_contents(npy_file_path) != entry["sha256"]:
+            problems.append("sha256 doesn't match")
+
+    if problems:
+        logger.error(f"{npy_file_path} doesn't match its data manifest: {problems}")
+        raise ValueError(f"{npy_file_path} doesn't match its data manifest: {problems}")
+    return entry
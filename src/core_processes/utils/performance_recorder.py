@@ -0,0 +1,417 @@
+import functools
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+
+from src.config.home_dir import PERFORMANCE_REPORTS_FOLDER_NAME
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+MEMORY_SAMPLER_THREAD_NAME = "performance_recorder_memory_sampler"
+SAMPLING_PROFILER_THREAD_NAME = "performance_recorder_sampling_profiler"
+# the sampling profiler leaves these out, so the profile is only about the code being measured
+INSTRUMENTATION_THREAD_NAMES = {
+    MEMORY_SAMPLER_THREAD_NAME,
+    SAMPLING_PROFILER_THREAD_NAME,
+}
+
+
+def get_current_rss_bytes() -> Optional[int]:
+    """the process's resident memory right now (`None` if there's no way to tell on this system)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """the process's peak resident memory so far (`None` if there's no way to tell on this system)"""
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes, except on macOS
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss)
+    return None
+
+
+class PerformanceMeasurement:
+    """wall time, CPU time, peak memory and number of items processed of one stage/sub-step"""
+
+    def __init__(
+        self,
+        name: str,
+        parent_path: Optional[str] = None,
+        number_of_items: Optional[int] = None,
+    ):
+        self.name = name
+        self.path = name if parent_path is None else f"{parent_path}/{name}"
+        self.number_of_items = number_of_items
+        self.details = {}
+        self.sub_steps: List["PerformanceMeasurement"] = []
+
+        self.started_seconds = None
+        self.wall_time_seconds = None
+        self.cpu_time_seconds = None
+        self.thread_cpu_time_seconds = None
+        self.rss_change_bytes = None
+        self.peak_rss_bytes = None
+        self.error = None
+
+        self._start_wall_time = None
+        self._start_cpu_time = None
+        self._start_thread_cpu_time = None
+        self._start_rss_bytes = None
+
+    def add_items(self, number_of_items: int):
+        self.number_of_items = (self.number_of_items or 0) + number_of_items
+
+    def update_peak_rss(self, rss_bytes: Optional[int]):
+        if rss_bytes is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, rss_bytes)
+
+    def start(self, run_start_wall_time: float):
+        self._start_rss_bytes = get_current_rss_bytes()
+        self.update_peak_rss(self._start_rss_bytes)
+        self._start_wall_time = time.perf_counter()
+        self._start_cpu_time = time.process_time()
+        self._start_thread_cpu_time = time.thread_time()
+        self.started_seconds = self._start_wall_time - run_start_wall_time
+
+    def stop(self):
+        self.wall_time_seconds = time.perf_counter() - self._start_wall_time
+        self.cpu_time_seconds = time.process_time() - self._start_cpu_time
+        self.thread_cpu_time_seconds = time.thread_time() - self._start_thread_cpu_time
+        rss_bytes = get_current_rss_bytes()
+        self.update_peak_rss(rss_bytes)
+        if rss_bytes is not None and self._start_rss_bytes is not None:
+            self.rss_change_bytes = rss_bytes - self._start_rss_bytes
+
+    def to_dict(self) -> dict:
+        items_per_second = None
+        if self.number_of_items is not None and self.wall_time_seconds:
+            items_per_second = self.number_of_items / self.wall_time_seconds
+        return {
+            "name": self.name,
+            "path": self.path,
+            "started_seconds": self.started_seconds,
+            "wall_time_seconds": self.wall_time_seconds,
+            # the whole process (i.e. all threads and numpy/BLAS workers), vs. just the thread that ran the step
+            "cpu_time_seconds": self.cpu_time_seconds,
+            "thread_cpu_time_seconds": self.thread_cpu_time_seconds,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_change_bytes": self.rss_change_bytes,
+            "number_of_items": self.number_of_items,
+            "items_per_second": items_per_second,
+            "details": self.details,
+            "error": self.error,
+            "sub_step_totals": self.get_sub_step_totals(),
+            "sub_steps": [sub_step.to_dict() for sub_step in self.sub_steps],
+        }
+
+    def get_sub_step_totals(self) -> dict:
+        """sub-steps added up by name (e.g. one entry for all the chunks of a streaming stage)"""
+        sub_step_totals = {}
+        for sub_step in self.sub_steps:
+            totals = sub_step_totals.setdefault(
+                sub_step.name,
+                {
+                    "count": 0,
+                    "wall_time_seconds": 0.0,
+                    "thread_cpu_time_seconds": 0.0,
+                    "number_of_items": None,
+                },
+            )
+            totals["count"] += 1
+            totals["wall_time_seconds"] += sub_step.wall_time_seconds or 0.0
+            totals["thread_cpu_time_seconds"] += sub_step.thread_cpu_time_seconds or 0.0
+            if sub_step.number_of_items is not None:
+                totals["number_of_items"] = (
+                    totals["number_of_items"] or 0
+                ) + sub_step.number_of_items
+        return sub_step_totals
+
+
+class SamplingProfiler:
+    """
+    Every `sampling_interval_seconds`, grab the call stack of every thread (`sys._current_frames`) and count how often each one shows up.
+    Saved in the "collapsed stacks" format (one `thread;outer_function;...;inner_function count` line per stack)
+    that flame graph tools (e.g. speedscope, flamegraph.pl) read.
+    """
+
+    def __init__(self, sampling_interval_seconds: float = 0.01):
+        self._sampling_interval_seconds = sampling_interval_seconds
+        self._stack_counts = Counter()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=SAMPLING_PROFILER_THREAD_NAME, daemon=True
+        )
+        self.number_of_samples = 0
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        thread_names = {}
+        while not self._stop_event.wait(self._sampling_interval_seconds):
+            for thread in threading.enumerate():
+                thread_names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if (
+                    thread_id == threading.get_ident()
+                    or thread_names.get(thread_id) in INSTRUMENTATION_THREAD_NAMES
+                ):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self._stack_counts[";".join(reversed(stack))] += 1
+            self.number_of_samples += 1
+
+    def save_collapsed_stacks(self, file_path: Union[str, Path]):
+        with open(file_path, "w") as file:
+            for stack, count in self._stack_counts.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+_active_performance_recorder = None
+
+
+class PerformanceRecorder:
+    """
+    Records how long each stage (and the sub-steps inside it) of a run takes, how much CPU time and memory it uses,
+    and how many items (frames, points, ...) it gets through. Saved as a json run report, so runs and machines can be compared.
+
+        performance_recorder = PerformanceRecorder("process_session_folder")
+        with performance_recorder:
+            with measure_performance("triangulation", number_of_items=number_of_frames):
+                ...
+        performance_recorder.save_report(output_data_folder_path)
+
+    Code anywhere in the pipeline uses `measure_performance`/`@record_performance`, which record into the active recorder
+    (and do nothing if there isn't one). Measurements that start in other threads go under the step that is open in the
+    thread that started the recorder. Memory is sampled every `memory_sampling_interval_seconds` in the background,
+    and `sampling_profiler_interval_seconds` turns on the `SamplingProfiler`.
+    """
+
+    def __init__(
+        self,
+        run_name: str,
+        memory_sampling_interval_seconds: float = 0.05,
+        sampling_profiler_interval_seconds: Optional[float] = None,
+    ):
+        self._run_name = run_name
+        self._memory_sampling_interval_seconds = memory_sampling_interval_seconds
+        self._sampling_profiler = (
+            None
+            if sampling_profiler_interval_seconds is None
+            else SamplingProfiler(sampling_profiler_interval_seconds)
+        )
+
+        self._root = PerformanceMeasurement(run_name)
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+        self._main_thread_stack = None
+        self._open_measurements = []
+        self._stop_event = threading.Event()
+        self._memory_sampling_thread = None
+        self._started = None
+        self._run_start_wall_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop(error=None if exc_type is None else exc_type.__name__)
+
+    def start(self):
+        global _active_performance_recorder
+        if _active_performance_recorder is not None:
+            logger.warning(
+                "Another performance recorder is already running, replacing it"
+            )
+        _active_performance_recorder = self
+
+        self._started = time.strftime("%Y-%m-%d_%H_%M_%S")
+        self._run_start_wall_time = time.perf_counter()
+        self._root.start(run_start_wall_time=self._run_start_wall_time)
+        self._main_thread_stack = self._get_thread_stack()
+        self._main_thread_stack.append(self._root)
+        self._open_measurements.append(self._root)
+
+        self._stop_event.clear()
+        self._memory_sampling_thread = threading.Thread(
+            target=self._sample_memory, name=MEMORY_SAMPLER_THREAD_NAME, daemon=True
+        )
+        self._memory_sampling_thread.start()
+        if self._sampling_profiler is not None:
+            self._sampling_profiler.start()
+
+    def stop(self, error: Optional[str] = None):
+        global _active_performance_recorder
+        if self._sampling_profiler is not None:
+            self._sampling_profiler.stop()
+        self._stop_event.set()
+        self._memory_sampling_thread.join()
+
+        self._root.stop()
+        self._root.error = error
+        self._main_thread_stack.remove(self._root)
+        with self._lock:
+            self._open_measurements.remove(self._root)
+        if _active_performance_recorder is self:
+            _active_performance_recorder = None
+
+    def _get_thread_stack(self) -> List[PerformanceMeasurement]:
+        if not hasattr(self._thread_local, "stack"):
+            self._thread_local.stack = []
+        return self._thread_local.stack
+
+    def _sample_memory(self):
+        while not self._stop_event.wait(self._memory_sampling_interval_seconds):
+            rss_bytes = get_current_rss_bytes()
+            with self._lock:
+                for measurement in self._open_measurements:
+                    measurement.update_peak_rss(rss_bytes)
+
+    @contextmanager
+    def measure(self, name: str, number_of_items: Optional[int] = None):
+        """yields the `PerformanceMeasurement`, so the step can `add_items` or fill in `details` as it goes"""
+        stack = self._get_thread_stack()
+        if stack:
+            parent = stack[-1]
+        else:
+            # started in another thread, so it goes under whatever the main thread is doing
+            with self._lock:
+                parent = (
+                    self._main_thread_stack[-1]
+                    if self._main_thread_stack
+                    else self._root
+                )
+
+        measurement = PerformanceMeasurement(
+            name, parent_path=parent.path, number_of_items=number_of_items
+        )
+        with self._lock:
+            parent.sub_steps.append(measurement)
+            self._open_measurements.append(measurement)
+        stack.append(measurement)
+        measurement.start(run_start_wall_time=self._run_start_wall_time)
+        try:
+            yield measurement
+        except BaseException as error:
+            measurement.error = type(error).__name__
+            raise
+        finally:
+            measurement.stop()
+            stack.pop()
+            with self._lock:
+                self._open_measurements.remove(measurement)
+
+    def get_report(self) -> dict:
+        return {
+            "run_name": self._run_name,
+            "started": self._started,
+            "wall_time_seconds": self._root.wall_time_seconds,
+            "cpu_time_seconds": self._root.cpu_time_seconds,
+            "peak_rss_bytes": self._root.peak_rss_bytes,
+            "process_peak_rss_bytes": get_peak_rss_bytes(),
+            "error": self._root.error,
+            "system": {
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "cpu_count": os.cpu_count(),
+                "python_version": platform.python_version(),
+                "numpy_version": np.__version__,
+            },
+            "stages": [stage.to_dict() for stage in self._root.sub_steps],
+        }
+
+    def save_report(self, output_data_folder_path: Union[str, Path]) -> Path:
+        """saves `{run_name}_{start time}.json` (and the sampling profile, if there is one) in the `performance_reports` folder"""
+        performance_reports_folder_path = (
+            Path(output_data_folder_path) / PERFORMANCE_REPORTS_FOLDER_NAME
+        )
+        performance_reports_folder_path.mkdir(exist_ok=True, parents=True)
+        report = self.get_report()
+
+        if self._sampling_profiler is not None:
+            sampling_profile_path = (
+                performance_reports_folder_path
+                / f"{self._run_name}_{self._started}_sampling_profile.folded"
+            )
+            self._sampling_profiler.save_collapsed_stacks(sampling_profile_path)
+            report["sampling_profile_file_name"] = sampling_profile_path.name
+            report[
+                "sampling_profile_number_of_samples"
+            ] = self._sampling_profiler.number_of_samples
+
+        report_path = (
+            performance_reports_folder_path / f"{self._run_name}_{self._started}.json"
+        )
+        report_path.write_text(json.dumps(report, indent=4))
+        logger.info(f"Saved performance report to: {report_path}")
+        return report_path
+
+
+@contextmanager
+def measure_performance(name: str, number_of_items: Optional[int] = None):
+    """
+    Record a stage/sub-step in the active `PerformanceRecorder`.
+    If no recorder is running, this only yields a `PerformanceMeasurement` that doesn't get recorded
+    """
+    performance_recorder = _active_performance_recorder
+    if performance_recorder is None:
+        yield PerformanceMeasurement(name, number_of_items=number_of_items)
+        return
+    with performance_recorder.measure(name, number_of_items) as measurement:
+        yield measurement
+
+
+def record_performance(name: Optional[str] = None) -> Callable:
+    """decorator version of `measure_performance` (named after the function by default)"""
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure_performance(name or function.__name__):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,55 @@
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.core_processes.utils.performance_recorder import record_performance
+
+logger = logging.getLogger(__name__)
+
+# rows get formatted this many at a time, which keeps the formatted text of a chunk to a few MB even for the mediapipe face
+CSV_CHUNK_SIZE_ROWS = 500
+
+
+@record_performance()
+def save_array_to_csv(
+    data_rows_columns: np.ndarray,
+    header: Sequence[str],
+    csv_file_path: Union[str, Path],
+    float_precision: Optional[int] = None,
+):
+    """
+    Save a [number_of_rows, number_of_columns] array to `csv`, byte-for-byte the same as
+    `pd.DataFrame(data_rows_columns, columns=header).to_csv(csv_file_path, index=False, float_format=f"%.{float_precision}f")`
+    (or without `float_format` if `float_precision` is None), just a lot faster:
+    instead of formatting every value on its own, a whole chunk of rows gets formatted with one `%` operation.
+
+    `float32` data without a `float_precision` goes through pandas, since only pandas knows how to write those as short as possible
+    """
+    data_rows_columns = np.asarray(data_rows_columns)
+    if float_precision is None and data_rows_columns.dtype != np.float64:
+        pd.DataFrame(data_rows_columns, columns=list(header)).to_csv(
+            str(csv_file_path), index=False
+        )
+        return
+
+    # `%r` is the shortest repr, which is what pandas writes for float64
+    value_format = "%r" if float_precision is None else f"%.{int(float_precision)}f"
+    row_format = ",".join([value_format] * data_rows_columns.shape[1])
+
+    with open(csv_file_path, "w", newline="") as csv_file:
+        csv_file.write(",".join(header) + os.linesep)
+        for chunk_start_row in range(
+            0, data_rows_columns.shape[0], CSV_CHUNK_SIZE_ROWS
+        ):
+            chunk = data_rows_columns[
+                chunk_start_row : chunk_start_row + CSV_CHUNK_SIZE_ROWS
+            ]
+            chunk_format = os.linesep.join([row_format] * chunk.shape[0]) + os.linesep
+            # pandas writes `nan` as an empty field (and no other number has "nan" in it)
+            csv_file.write(
+                (chunk_format % tuple(chunk.ravel().tolist())).replace("nan", "")
+            )
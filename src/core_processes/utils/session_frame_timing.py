@@ -0,0 +1,341 @@
+"""
+Finds the frames each camera dropped (or repeated) while recording, from the timestamps saved next to the
+synchronized videos, and lines every camera's frames up on one evenly spaced time base.
+
+Without this, everything downstream assumes frame `i` of every video is the same instant and that frames are evenly
+spaced - which stops being true as soon as a USB camera drops a frame under load. Note that `save_synchronized_videos`
+fills a camera's missing frame with its nearest neighbour, so in the synchronized videos a drop usually shows up as a
+*duplicated* frame (the same timestamp twice), or as a gap in every camera if the camera with the fewest frames dropped it.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from src.config.home_dir import (
+    FRAME_TIMING_NPZ_FILE_NAME,
+    FRAME_TIMING_REPORT_JSON_FILE_NAME,
+)
+from src.core_processes.utils.timestamped_stream_resampling import (
+    get_shared_time_span,
+)
+
+logger = logging.getLogger(__name__)
+
+# (`VideoRecorder` saves them in here, one `<video name>_binary.npy` per video)
+TIMESTAMPS_FOLDER_NAME = "timestamps"
+
+# consecutive frames closer together than this fraction of a frame are the same frame twice
+DUPLICATE_FRAME_THRESHOLD_FRACTION = 0.25
+
+
+@dataclass
+class SessionFrameTiming:
+    camera_names: List[str]
+    # [number_of_frames] seconds from the start of the recording, evenly spaced
+    common_timestamps: np.ndarray
+    # [number_of_cameras, number_of_frames] - which frame of each video goes with each common timestamp (nan where that camera has none)
+    frame_index_maps: np.ndarray
+    frames_per_second: float
+    camera_reports: List[dict]
+
+    @property
+    def number_of_frames(self) -> int:
+        return self.common_timestamps.shape[0]
+
+    @property
+    def has_missing_frames(self) -> bool:
+        return bool(np.isnan(self.frame_index_maps).any())
+
+
+def get_frame_duration_seconds(timestamps: np.ndarray) -> float:
+    """median time between (different) frames"""
+    frame_intervals = np.diff(np.asarray(timestamps, dtype=np.float64))
+    frame_intervals = frame_intervals[frame_intervals > 0]
+    if frame_intervals.size == 0:
+        logger.error("Need at least two frames with different timestamps")
+        raise ValueError("Need at least two frames with different timestamps")
+    return float(np.median(frame_intervals))
+
+
+def find_dropped_and_duplicated_frames(
+    timestamps: np.ndarray, frame_duration_seconds: Optional[float] = None
+) -> dict:
+    """
+    - duplicated frames - frames with (about) the same timestamp as the one before them
+    - dropped frames - gaps of more than one and a half frames, each worth `round(gap / frame duration) - 1` frames
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if frame_duration_seconds is None:
+        frame_duration_seconds = get_frame_duration_seconds(timestamps)
+    frame_intervals_in_frames = np.diff(timestamps) / frame_duration_seconds
+
+    duplicated_frame_indices = (
+        np.flatnonzero(frame_intervals_in_frames < DUPLICATE_FRAME_THRESHOLD_FRACTION)
+        + 1
+    )
+    gap_frame_indices = np.flatnonzero(frame_intervals_in_frames >= 1.5)
+    number_of_frames_dropped_per_gap = (
+        np.round(frame_intervals_in_frames[gap_frame_indices]).astype(int) - 1
+    )
+
+    return {
+        "number_of_frames": int(timestamps.shape[0]),
+        "frames_per_second": 1 / frame_duration_seconds,
+        "number_of_duplicated_frames": int(duplicated_frame_indices.size),
+        "duplicated_frame_indices": duplicated_frame_indices.tolist(),
+        "number_of_dropped_frames": int(number_of_frames_dropped_per_gap.sum()),
+        "dropped_frame_gaps": [
+            {
+                "after_frame_index": int(frame_index),
+                "timestamp_seconds": float(timestamps[frame_index]),
+                "number_of_frames_dropped": int(number_of_frames_dropped),
+            }
+            for frame_index, number_of_frames_dropped in zip(
+                gap_frame_indices, number_of_frames_dropped_per_gap
+            )
+        ],
+    }
+
+
+def build_common_time_base(
+    list_of_timestamps: List[np.ndarray], frame_duration_seconds: float
+) -> np.ndarray:
+    """one timestamp every `frame_duration_seconds`, over the time span every camera has frames for"""
+    start_time, end_time = get_shared_time_span(list_of_timestamps)
+    # (a bit of slack, so a last frame that's a hair early still counts)
+    number_of_frames = (
+        int(np.floor((end_time - start_time) / frame_duration_seconds + 0.5)) + 1
+    )
+    return start_time + np.arange(number_of_frames) * frame_duration_seconds
+
+
+def build_frame_index_map(
+    timestamps: np.ndarray,
+    common_timestamps: np.ndarray,
+    frame_duration_seconds: float,
+    matching_tolerance_fraction: float = 0.75,
+) -> np.ndarray:
+    """
+    [number_of_common_timestamps] - the index of this camera's frame nearest to each common timestamp, or nan if there's
+    none within `matching_tolerance_fraction` of a frame (i.e. it got dropped). Duplicated frames never get used twice,
+    and neither does any other frame
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    # the first of each run of duplicated frames
+    unique_frame_indices = np.flatnonzero(
+        np.concatenate(
+            [
+                [True],
+                np.diff(timestamps)
+                >= DUPLICATE_FRAME_THRESHOLD_FRACTION * frame_duration_seconds,
+            ]
+        )
+    )
+    unique_timestamps = timestamps[unique_frame_indices]
+
+    # nearest unique frame to each common timestamp
+    following_index = np.clip(
+        np.searchsorted(unique_timestamps, common_timestamps),
+        1,
+        len(unique_timestamps) - 1,
+    )
+    preceding_index = following_index - 1
+    nearest_index = np.where(
+        np.abs(unique_timestamps[preceding_index] - common_timestamps)
+        <= np.abs(unique_timestamps[following_index] - common_timestamps),
+        preceding_index,
+        following_index,
+    )
+    time_errors = np.abs(unique_timestamps[nearest_index] - common_timestamps)
+    is_matched = time_errors <= matching_tolerance_fraction * frame_duration_seconds
+
+    # if a frame is the nearest one to more than one common timestamp, it only goes with the closest
+    matched_common_indices = np.flatnonzero(is_matched)
+    closest_first_order = np.lexsort(
+        (time_errors[matched_common_indices], nearest_index[matched_common_indices])
+    )
+    _, first_of_each_frame = np.unique(
+        nearest_index[matched_common_indices][closest_first_order], return_index=True
+    )
+    is_matched[:] = False
+    is_matched[matched_common_indices[closest_first_order][first_of_each_frame]] = True
+
+    frame_index_map = np.full(common_timestamps.shape[0], np.nan)
+    frame_index_map[is_matched] = unique_frame_indices[nearest_index[is_matched]]
+    return frame_index_map
+
+
+def compute_session_frame_timing(
+    timestamps_by_camera: Dict[str, np.ndarray],
+    matching_tolerance_fraction: float = 0.75,
+) -> SessionFrameTiming:
+    camera_names = list(timestamps_by_camera)
+    list_of_timestamps = [
+        np.asarray(timestamps_by_camera[camera_name], dtype=np.float64)
+        for camera_name in camera_names
+    ]
+    # every camera should be running at the same rate, so the median camera is a good guess at it
+    frame_duration_seconds = float(
+        np.median(
+            [
+                get_frame_duration_seconds(timestamps)
+                for timestamps in list_of_timestamps
+            ]
+        )
+    )
+    common_timestamps = build_common_time_base(
+        list_of_timestamps, frame_duration_seconds
+    )
+
+    frame_index_maps = np.empty((len(camera_names), common_timestamps.shape[0]))
+    camera_reports = []
+    for camera_number, (camera_name, timestamps) in enumerate(
+        zip(camera_names, list_of_timestamps)
+    ):
+        frame_index_maps[camera_number] = build_frame_index_map(
+            timestamps,
+            common_timestamps,
+            frame_duration_seconds,
+            matching_tolerance_fraction=matching_tolerance_fraction,
+        )
+        camera_report = find_dropped_and_duplicated_frames(
+            timestamps, frame_duration_seconds=frame_duration_seconds
+        )
+        camera_report["camera_name"] = camera_name
+        camera_report["number_of_missing_common_frames"] = int(
+            np.isnan(frame_index_maps[camera_number]).sum()
+        )
+        camera_reports.append(camera_report)
+
+    return SessionFrameTiming(
+        camera_names=camera_names,
+        common_timestamps=common_timestamps,
+        frame_index_maps=frame_index_maps,
+        frames_per_second=1 / frame_duration_seconds,
+        camera_reports=camera_reports,
+    )
+
+
+def load_camera_timestamps(
+    synchronized_videos_folder_path: Union[str, Path]
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    {video name: timestamps (seconds from the start of the recording)} for every video in the folder, in the same order
+    `MediaPipeSkeletonDetector` goes through them (i.e. the camera order of the 2d data).
+    `None` if any of them is missing its timestamps (e.g. older sessions)
+    """
+    synchronized_videos_folder_path = Path(synchronized_videos_folder_path)
+    timestamps_by_camera = {}
+    for video_file_path in synchronized_videos_folder_path.glob("*.mp4"):
+        timestamps_npy_path = (
+            synchronized_videos_folder_path
+            / TIMESTAMPS_FOLDER_NAME
+            / f"{video_file_path.stem}_binary.npy"
+        )
+        if not timestamps_npy_path.exists():
+            logger.info(
+                f"No timestamps for {video_file_path.name} at {timestamps_npy_path}"
+            )
+            return None
+        timestamps = np.load(str(timestamps_npy_path))
+        if timestamps.ndim != 1 or timestamps.shape[0] < 2:
+            logger.warning(f"{timestamps_npy_path} doesn't hold usable timestamps")
+            return None
+        timestamps_by_camera[video_file_path.stem] = timestamps
+
+    if not timestamps_by_camera:
+        return None
+    return timestamps_by_camera
+
+
+def load_session_frame_timing(
+    synchronized_videos_folder_path: Union[str, Path],
+    matching_tolerance_fraction: float = 0.75,
+) -> Optional[SessionFrameTiming]:
+    """`None` if the session doesn't have (usable) timestamps"""
+    timestamps_by_camera = load_camera_timestamps(synchronized_videos_folder_path)
+    if timestamps_by_camera is None:
+        return None
+    session_frame_timing = compute_session_frame_timing(
+        timestamps_by_camera, matching_tolerance_fraction=matching_tolerance_fraction
+    )
+    for camera_report in session_frame_timing.camera_reports:
+        if (
+            camera_report["number_of_dropped_frames"]
+            or camera_report["number_of_duplicated_frames"]
+        ):
+            logger.warning(
+                f"{camera_report['camera_name']}: {camera_report['number_of_dropped_frames']} dropped and "
+                f"{camera_report['number_of_duplicated_frames']} duplicated frames (out of {camera_report['number_of_frames']})"
+            )
+    return session_frame_timing
+
+
+def save_session_frame_timing(
+    session_frame_timing: SessionFrameTiming,
+    output_data_folder_path: Union[str, Path],
+) -> Path:
+    """the arrays go in an `npz`, the per-camera dropped/duplicated frames in a `json` next to it"""
+    output_data_folder_path = Path(output_data_folder_path)
+    output_data_folder_path.mkdir(exist_ok=True, parents=True)
+    frame_timing_npz_path = output_data_folder_path / FRAME_TIMING_NPZ_FILE_NAME
+    np.savez(
+        frame_timing_npz_path,
+        camera_names=np.array(session_frame_timing.camera_names),
+        common_timestamps=session_frame_timing.common_timestamps,
+        frame_index_maps=session_frame_timing.frame_index_maps,
+        frames_per_second=np.array(session_frame_timing.frames_per_second),
+    )
+    (output_data_folder_path / FRAME_TIMING_REPORT_JSON_FILE_NAME).write_text(
+        json.dumps(
+            {
+                "frames_per_second": session_frame_timing.frames_per_second,
+                "number_of_common_frames": session_frame_timing.number_of_frames,
+                "cameras": session_frame_timing.camera_reports,
+            },
+            indent=4,
+        )
+    )
+    logger.info(f"Saved frame timing to {frame_timing_npz_path}")
+    return frame_timing_npz_path
+
+
+def reindex_onto_common_time_base(
+    data_cams_frames: np.ndarray, frame_index_maps: np.ndarray
+) -> np.ndarray:
+    """
+    `data_cams_frames` is [number_of_cameras, number_of_video_frames, ...any other dimensions] (e.g. the mediapipe 2d
+    data), this returns [number_of_cameras, number_of_common_frames, ...], nan wherever a camera is missing a frame
+    """
+    data_cams_frames = np.asarray(data_cams_frames)
+    number_of_cameras, number_of_common_frames = frame_index_maps.shape
+    if data_cams_frames.shape[0] != number_of_cameras:
+        logger.error(
+            f"Got data for {data_cams_frames.shape[0]} cameras, but frame index maps for {number_of_cameras}"
+        )
+        raise ValueError(
+            f"Got data for {data_cams_frames.shape[0]} cameras, but frame index maps for {number_of_cameras}"
+        )
+    if np.nanmax(frame_index_maps, initial=-1) >= data_cams_frames.shape[1]:
+        logger.error(
+            f"The frame index maps point at frame {int(np.nanmax(frame_index_maps))}, but the data only has {data_cams_frames.shape[1]} frames"
+        )
+        raise ValueError(
+            f"The frame index maps point at frame {int(np.nanmax(frame_index_maps))}, but the data only has {data_cams_frames.shape[1]} frames"
+        )
+
+    reindexed_data = np.full(
+        (number_of_cameras, number_of_common_frames) + data_cams_frames.shape[2:],
+        np.nan,
+        dtype=np.result_type(data_cams_frames.dtype, np.float32),
+    )
+    for camera_number in range(number_of_cameras):
+        is_matched = ~np.isnan(frame_index_maps[camera_number])
+        reindexed_data[camera_number, is_matched] = data_cams_frames[
+            camera_number, frame_index_maps[camera_number, is_matched].astype(int)
+        ]
+    return reindexed_data
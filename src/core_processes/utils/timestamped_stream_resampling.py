@@ -0,0 +1,168 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def get_shared_time_span(list_of_timestamps: List[np.ndarray]) -> Tuple[float, float]:
+    """(latest start, earliest end) - the time span every stream has data for"""
+    start_time = max(timestamps[0] for timestamps in list_of_timestamps)
+    end_time = min(timestamps[-1] for timestamps in list_of_timestamps)
+    if start_time > end_time:
+        logger.error(
+            f"These streams don't overlap in time - latest start: {start_time}, earliest end: {end_time}"
+        )
+        raise ValueError(
+            f"These streams don't overlap in time - latest start: {start_time}, earliest end: {end_time}"
+        )
+    return start_time, end_time
+
+
+def get_frame_range_within_time_span(
+    timestamps: np.ndarray, start_time: float, end_time: float
+) -> Tuple[int, int]:
+    """(first frame at or after `start_time`, one past the last frame at or before `end_time`) - i.e. slice bounds"""
+    start_frame = int(np.searchsorted(timestamps, start_time, side="left"))
+    end_frame = int(np.searchsorted(timestamps, end_time, side="right"))
+    return start_frame, end_frame
+
+
+def resample_to_timestamps(
+    source_timestamps: np.ndarray,
+    source_data: np.ndarray,
+    target_timestamps: np.ndarray,
+) -> np.ndarray:
+    """
+    Linear interpolation of `source_data` ([number_of_source_frames, ...any other dimensions]) at `target_timestamps`,
+    for all channels at once (same result as `np.interp` on every channel, including holding the edge values outside
+    of `source_timestamps`)
+    """
+    source_timestamps = np.asarray(source_timestamps, dtype=np.float64)
+    source_data = np.asarray(source_data)
+    if source_timestamps.shape[0] != source_data.shape[0]:
+        logger.error(
+            f"Got {source_timestamps.shape[0]} timestamps for {source_data.shape[0]} frames of data"
+        )
+        raise ValueError(
+            f"Got {source_timestamps.shape[0]} timestamps for {source_data.shape[0]} frames of data"
+        )
+    if np.any(np.diff(source_timestamps) < 0):
+        logger.error("Timestamps must be in order (non-decreasing) to resample them")
+        raise ValueError(
+            "Timestamps must be in order (non-decreasing) to resample them"
+        )
+
+    if source_timestamps.shape[0] == 1:
+        return np.repeat(source_data, len(target_timestamps), axis=0)
+
+    # the source frame just before (or at) each target time, and how far along it is to the next one
+    previous_frame_indices = np.clip(
+        np.searchsorted(source_timestamps, target_timestamps, side="right") - 1,
+        0,
+        source_timestamps.shape[0] - 2,
+    )
+    previous_frame_timestamps = source_timestamps[previous_frame_indices]
+    seconds_between_frames = (
+        source_timestamps[previous_frame_indices + 1] - previous_frame_timestamps
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interpolation_weights = np.where(
+            seconds_between_frames > 0,
+            (target_timestamps - previous_frame_timestamps) / seconds_between_frames,
+            1.0,
+        )
+    interpolation_weights = np.clip(interpolation_weights, 0, 1)
+
+    source_data_2d = source_data.reshape(source_data.shape[0], -1)
+    previous_frame_data_2d = source_data_2d[previous_frame_indices]
+    next_frame_data_2d = source_data_2d[previous_frame_indices + 1]
+    resampled_data_2d = (
+        previous_frame_data_2d * (1 - interpolation_weights)[:, np.newaxis]
+        + next_frame_data_2d * interpolation_weights[:, np.newaxis]
+    )
+    # right on a source frame (or past either end) use it as-is, so a nan next to it can't leak in (`0 * nan` is nan)
+    resampled_data_2d = np.where(
+        (interpolation_weights == 0)[:, np.newaxis],
+        previous_frame_data_2d,
+        resampled_data_2d,
+    )
+    resampled_data_2d = np.where(
+        (interpolation_weights == 1)[:, np.newaxis],
+        next_frame_data_2d,
+        resampled_data_2d,
+    )
+    return resampled_data_2d.reshape((len(target_timestamps),) + source_data.shape[1:])
+
+
+def synchronize_timestamped_streams(
+    timestamps_by_stream: Dict[str, np.ndarray],
+    data_by_stream: Dict[str, np.ndarray],
+    reference_stream_name: Optional[str] = None,
+    clock_offsets_seconds: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Line up any number of timestamped streams on the clock of `reference_stream_name` (the fastest stream, if `None`),
+    clipped to the time span they all cover. Whichever stream is faster, the others get linearly interpolated
+    onto the reference timestamps (the reference stream itself just gets clipped).
+
+    `clock_offsets_seconds` get added to a stream's timestamps first (for streams that aren't on the same clock)
+
+    returns (reference timestamps within the shared time span, {stream name: data at those timestamps})
+    """
+    if set(timestamps_by_stream) != set(data_by_stream):
+        logger.error(
+            f"Need timestamps and data for every stream - timestamps: {list(timestamps_by_stream)}, data: {list(data_by_stream)}"
+        )
+        raise ValueError(
+            f"Need timestamps and data for every stream - timestamps: {list(timestamps_by_stream)}, data: {list(data_by_stream)}"
+        )
+
+    clock_offsets_seconds = clock_offsets_seconds or {}
+    timestamps_by_stream = {
+        stream_name: np.asarray(timestamps, dtype=np.float64)
+        + clock_offsets_seconds.get(stream_name, 0.0)
+        for stream_name, timestamps in timestamps_by_stream.items()
+    }
+
+    start_time, end_time = get_shared_time_span(list(timestamps_by_stream.values()))
+
+    if reference_stream_name is None:
+        reference_stream_name = max(
+            timestamps_by_stream,
+            key=lambda stream_name: np.diff(
+                get_frame_range_within_time_span(
+                    timestamps_by_stream[stream_name], start_time, end_time
+                )
+            )[0],
+        )
+        logger.debug(
+            f"Using the fastest stream as the reference clock: {reference_stream_name}"
+        )
+    if reference_stream_name not in timestamps_by_stream:
+        logger.error(
+            f"Reference stream: {reference_stream_name} isn't one of: {list(timestamps_by_stream)}"
+        )
+        raise ValueError(
+            f"Reference stream: {reference_stream_name} isn't one of: {list(timestamps_by_stream)}"
+        )
+
+    reference_start_frame, reference_end_frame = get_frame_range_within_time_span(
+        timestamps_by_stream[reference_stream_name], start_time, end_time
+    )
+    reference_timestamps = timestamps_by_stream[reference_stream_name][
+        reference_start_frame:reference_end_frame
+    ]
+
+    synchronized_data_by_stream = {}
+    for stream_name, timestamps in timestamps_by_stream.items():
+        if stream_name == reference_stream_name:
+            synchronized_data_by_stream[stream_name] = np.asarray(
+                data_by_stream[stream_name]
+            )[reference_start_frame:reference_end_frame]
+            continue
+        synchronized_data_by_stream[stream_name] = resample_to_timestamps(
+            timestamps, data_by_stream[stream_name], reference_timestamps
+        )
+    return reference_timestamps, synchronized_data_by_stream
@@ -59,12 +59,18 @@ class VisualizeMotionCaptureDataPanel(QWidget):
         self._blender_path_form_layout = self._make_blender_path_layout()
         self._layout.addLayout(self._blender_path_form_layout)
 
-        self._generate_blend_file_button = QPushButton(
-            "Generate `.blend` file (Freezes GUI, sorry!)"
-        )
+        self._generate_blend_file_button = QPushButton("Generate `.blend` file")
         self._generate_blend_file_button.setEnabled(True)
         self._layout.addWidget(self._generate_blend_file_button)
 
+        self._cancel_blender_export_button = QPushButton("Cancel Blender export")
+        self._cancel_blender_export_button.setEnabled(False)
+        self._layout.addWidget(self._cancel_blender_export_button)
+
+        self._blender_export_progress_label = QLabel("")
+        self._blender_export_progress_label.setWordWrap(True)
+        self._layout.addWidget(self._blender_export_progress_label)
+
         blender_output_warning_label = QLabel(
             "NOTE:\n "
             + "- In Blender, press `Z` and select `Material Preview` to see the videos in the 3D viewport.\n"
@@ -87,6 +93,30 @@ class VisualizeMotionCaptureDataPanel(QWidget):
     def generate_blend_file_button(self):
         return self._generate_blend_file_button
 
+    @property
+    def cancel_blender_export_button(self):
+        return self._cancel_blender_export_button
+
+    def show_blender_export_started(self):
+        self._generate_blend_file_button.setEnabled(False)
+        self._cancel_blender_export_button.setEnabled(True)
+        self._blender_export_progress_label.setText("Starting Blender...")
+
+    def show_blender_export_progress(self, progress: dict):
+        self._blender_export_progress_label.setText(
+            f"{progress['stage']} - frame {progress['frames_done']} of {progress['total_frames']}"
+        )
+
+    def show_blender_export_finished(self, blender_file_path: str):
+        self._generate_blend_file_button.setEnabled(True)
+        self._cancel_blender_export_button.setEnabled(False)
+        if blender_file_path:
+            self._blender_export_progress_label.setText(f"Saved {blender_file_path}")
+        else:
+            self._blender_export_progress_label.setText(
+                "Blender export didn't finish - see `blender_export_log.txt` in the session folder"
+            )
+
     @property
     def play_button(self):
         return self._play_button
@@ -3,12 +3,10 @@ import shutil
 from pathlib import Path
 from typing import Union
 
-import pandas as pd
 from PyQt6 import QtGui
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import QMainWindow, QSplitter, QFileDialog, QMenuBar, QMenu
 
-from src.blender_stuff.export_to_blender import export_to_blender
 from src.cameras.detection.models import FoundCamerasResponse
 from src.config.home_dir import (
     get_calibration_videos_folder_path,
@@ -19,7 +17,6 @@ from src.config.home_dir import (
     get_most_recent_session_id,
     get_freemocap_data_folder_path,
     get_annotated_videos_folder_path,
-    get_skeleton_body_csv_path,
     get_blender_file_path,
     get_raw_data_folder_path,
     PARTIALLY_PROCESSED_DATA_FOLDER_NAME,
@@ -28,11 +25,6 @@ from src.config.home_dir import (
 from src.core_processes.capture_volume_calibration.charuco_board_detection.dataclasses.charuco_board_definition import (
     CharucoBoardDefinition,
 )
-from src.core_processes.capture_volume_calibration.get_anipose_calibration_object import (
-    load_most_recent_anipose_calibration_toml,
-    load_calibration_from_session_id,
-    load_anipose_calibration_toml_from_path,
-)
 from src.core_processes.mediapipe_stuff.load_mediapipe2d_data import (
     load_mediapipe2d_data,
 )
@@ -41,10 +33,8 @@ from src.core_processes.mediapipe_stuff.load_mediapipe3d_data import (
     load_post_processed_mediapipe3d_data,
     load_skeleton_reprojection_error_data,
 )
-from src.core_processes.post_process_skeleton_data.estimate_skeleton_segment_lengths import (
-    mediapipe_skeleton_segment_definitions,
-    estimate_skeleton_segment_lengths,
-    save_skeleton_segment_lengths_to_json,
+from src.core_processes.mediapipe_stuff.session_data_accessor import (
+    SessionDataAccessor,
 )
 
 from src.gui.main.app import get_qt_app
@@ -62,10 +52,6 @@ import logging
 from src.gui.main.workers.thread_worker_manager import ThreadWorkerManager
 from src.log.config import LOG_FILE_PATH
 
-from src.sending_anonymous_user_info_to_places.send_pipedream_ping import (
-    send_pipedream_ping,
-)
-
 # reboot GUI method based on this - https://stackoverflow.com/a/56563926/14662833
 EXIT_CODE_REBOOT = -123456789
 
@@ -120,6 +106,7 @@ class MainWindow(QMainWindow):
         self._cameras_are_popped_out = False
 
         self._session_id = None
+        self._session_data_accessor = None
 
     def _create_main_layout(self):
         main_layout = QSplitter()
@@ -410,8 +397,8 @@ class MainWindow(QMainWindow):
             self._generate_blend_file
         )
 
-        self._control_panel.visualize_session_data_panel.generate_blend_file_button.clicked.connect(
-            self._open_blender_file
+        self._control_panel.visualize_session_data_panel.cancel_blender_export_button.clicked.connect(
+            self._thread_worker_manager.cancel_export_to_blender
         )
         # (right side) File viewer panel
         self._right_side_panel.file_system_view_widget.show_current_session_folder_button.clicked.connect(
@@ -463,6 +450,14 @@ class MainWindow(QMainWindow):
             self._generate_blend_file
         )
 
+        self._thread_worker_manager.blender_export_progress_signal.connect(
+            self._control_panel.visualize_session_data_panel.show_blender_export_progress
+        )
+
+        self._thread_worker_manager.blender_file_created_signal.connect(
+            self._handle_blender_file_created
+        )
+
         self._thread_worker_manager.start_session_data_visualization_signal.connect(
             self._visualize_motion_capture_data
         )
@@ -711,6 +706,13 @@ class MainWindow(QMainWindow):
     def _setup_and_launch_triangulate_3d_thread_worker(
         self, auto_process_next_stage: bool = False
     ):
+        # anipose (and scipy with it) only gets imported once it's needed, so the GUI opens fast
+        from src.core_processes.capture_volume_calibration.get_anipose_calibration_object import (
+            load_most_recent_anipose_calibration_toml,
+            load_calibration_from_session_id,
+            load_anipose_calibration_toml_from_path,
+        )
+
         if (
             self._control_panel.calibrate_capture_volume_panel.use_previous_calibration_box_is_checked
         ):
@@ -745,7 +747,7 @@ class MainWindow(QMainWindow):
             )
 
         raw_data_folder_path = get_raw_data_folder_path(self._session_id)
-        mediapipe_2d_data = load_mediapipe2d_data(raw_data_folder_path)
+        mediapipe_2d_data = load_mediapipe2d_data(raw_data_folder_path, mmap_mode="c")
 
         self._thread_worker_manager.launch_triangulate_3d_data_thread_worker(
             anipose_calibration_object=anipose_calibration_object,
@@ -761,9 +763,11 @@ class MainWindow(QMainWindow):
     ):
         output_data_folder_path = Path(get_output_data_folder_path(self._session_id))
 
-        skel3d_frame_marker_xyz = load_raw_mediapipe3d_data(output_data_folder_path)
+        skel3d_frame_marker_xyz = load_raw_mediapipe3d_data(
+            output_data_folder_path, mmap_mode="r"
+        )
         skeleton_reprojection_error_fr_mar = load_skeleton_reprojection_error_data(
-            output_data_folder_path
+            output_data_folder_path, mmap_mode="r"
         )
 
         data_save_path = output_data_folder_path / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
@@ -796,7 +800,7 @@ class MainWindow(QMainWindow):
             / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME
         )
         skel3d_frame_marker_xyz = load_post_processed_mediapipe3d_data(
-            mediapipe3d_xyz_file_path
+            mediapipe3d_xyz_file_path, mmap_mode="r"
         )
 
         self._thread_worker_manager.launch_convert_npy_to_csv_thread_worker(
@@ -806,17 +810,21 @@ class MainWindow(QMainWindow):
         )
 
     def _generate_blend_file(self):
-        logger.debug(
-            "Generating `.blend` file (this will freeze the GUI while it is running, sorry! I tried to calculate_center_of_mass it in a thread instead of a 'subprocess' but I got some kind of permission error when it tried to save the `.blend` file, so.... here we are. Frozen in the GUI.  How are you? "
+        from src.core_processes.post_process_skeleton_data.estimate_skeleton_segment_lengths import (
+            mediapipe_skeleton_segment_definitions,
+            estimate_skeleton_segment_lengths_from_3d_data,
+            save_skeleton_segment_lengths_to_json,
+        )
+
+        skel3d_frame_marker_xyz = load_post_processed_mediapipe3d_data(
+            Path(get_output_data_folder_path(self._session_id))
+            / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
+            / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+            mmap_mode="r",
         )
-        # self._thread_worker_manager.launch_export_to_blender_thread_worker(
-        #     get_session_folder_path(self._session_id)
-        # )
-        path_to_skeleton_body_csv = get_skeleton_body_csv_path(self._session_id)
-        skeleton_dataframe = pd.read_csv(path_to_skeleton_body_csv)
 
-        skeleton_segment_lengths_dict = estimate_skeleton_segment_lengths(
-            skeleton_dataframe=skeleton_dataframe,
+        skeleton_segment_lengths_dict = estimate_skeleton_segment_lengths_from_3d_data(
+            skel3d_frame_marker_xyz=skel3d_frame_marker_xyz,
             skeleton_segment_definitions=mediapipe_skeleton_segment_definitions,
         )
 
@@ -824,11 +832,17 @@ class MainWindow(QMainWindow):
             get_output_data_folder_path(self._session_id), skeleton_segment_lengths_dict
         )
 
-        blender_file_path = export_to_blender(
+        # Blender runs in a sub-process watched by a thread worker, so the GUI keeps going (and can cancel it)
+        self._control_panel.visualize_session_data_panel.show_blender_export_started()
+        self._thread_worker_manager.launch_export_to_blender_thread_worker(
             session_folder_path=get_session_folder_path(self._session_id),
             blender_exe_path=self._control_panel.visualize_session_data_panel.blender_exe_path_str,
         )
 
+    def _handle_blender_file_created(self, blender_file_path: str):
+        self._control_panel.visualize_session_data_panel.show_blender_export_finished(
+            blender_file_path
+        )
         if (
             self._control_panel.process_session_data_panel.open_in_blender_automatically_checkbox.isChecked()
         ):
@@ -850,11 +864,12 @@ class MainWindow(QMainWindow):
     def _visualize_motion_capture_data(self):
         logger.info("Loading data for visualization...")
 
-        skeleton_3d_npy = load_post_processed_mediapipe3d_data(
-            Path(get_output_data_folder_path(self._session_id))
-            / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
-            / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME
+        # memory-mapped, so playback only reads the frames it shows
+        self._close_session_data_accessor()
+        self._session_data_accessor = SessionDataAccessor(
+            get_output_data_folder_path(self._session_id)
         )
+        skeleton_3d_npy = self._session_data_accessor.post_processed_mediapipe_3d_data
 
         video_path_iterator = Path(
             get_annotated_videos_folder_path(self._session_id)
@@ -876,6 +891,11 @@ class MainWindow(QMainWindow):
             update_3d_skeleton_callback=self._middle_viewing_panel.session_playback_view.update_3d_skeleton_callback,
         )
 
+    def _close_session_data_accessor(self):
+        if self._session_data_accessor is not None:
+            self._session_data_accessor.close()
+            self._session_data_accessor = None
+
     def _reboot_gui(self):
         logger.info("Rebooting GUI... ")
         get_qt_app().exit(EXIT_CODE_REBOOT)
@@ -892,10 +912,16 @@ class MainWindow(QMainWindow):
                 pipedream_ping_dict["blender_file_created"] = True
             else:
                 pipedream_ping_dict["blender_file_created"] = False
+
+            from src.sending_anonymous_user_info_to_places.send_pipedream_ping import (
+                send_pipedream_ping,
+            )
+
             send_pipedream_ping(pipedream_ping_dict)
 
         logger.info("Close Event detected for main window... ")
         self._middle_viewing_panel.camera_stream_grid_view.close_camera_widgets()
+        self._close_session_data_accessor()
 
         if self._session_id is not None:
             session_folder = get_session_folder_path(self._session_id)
@@ -7,8 +7,10 @@ import pyqtgraph.opengl as gl
 from PyQt6.QtWidgets import QWidget, QVBoxLayout
 from pyqtgraph.dockarea.Dock import Dock
 
-from src.core_processes.mediapipe_stuff.mediapipe_skeleton_names_and_connections import (
-    mediapipe_body_connections,
+from src.gui.main.visualize_session.skeleton_line_segments import (
+    SKELETON_LINE_COLORS,
+    gather_line_segment_vertices,
+    get_mediapipe_connection_index_arrays,
 )
 from src.pipelines.session_pipeline.data_classes.data_3d_single_frame_payload import (
     Data3dMultiFramePayload,
@@ -25,9 +27,11 @@ class Gl3dViewPort(QWidget):
         self._base_scalar = 2e3  # 2 meters, probably
         self._frame_number = -1
 
-        self._mediapipe_connections_dict = {}
         self._mediapipe_skeleton_scatter_item = None
-        self._mediapipe_body_connections = mediapipe_body_connections
+        # one line item per body part (body, hands, face), each drawn from its own vertex buffer
+        self._mediapipe_connection_index_arrays = {}
+        self._skeleton_line_vertex_buffers = {}
+        self._skeleton_line_items = {}
 
         self._layout = QVBoxLayout()
         self.setLayout(self._layout)
@@ -100,18 +104,28 @@ class Gl3dViewPort(QWidget):
     def _initialize_mediapipe_skeleton_connections(
         self, mediapipe3d_trackedPoint_xyz: np.ndarray
     ):
-        self._skeleton_connections_list = []
-        for this_connection in self._mediapipe_body_connections:
-            this_skel_line = gl.GLLinePlotItem(
-                pos=mediapipe3d_trackedPoint_xyz[this_connection, :]
+        self._mediapipe_connection_index_arrays = get_mediapipe_connection_index_arrays(
+            number_of_tracked_points=mediapipe3d_trackedPoint_xyz.shape[0]
+        )
+        for (
+            body_part_name,
+            connection_index_array,
+        ) in self._mediapipe_connection_index_arrays.items():
+            vertex_buffer = gather_line_segment_vertices(
+                mediapipe3d_trackedPoint_xyz, connection_index_array
+            )
+            line_item = gl.GLLinePlotItem(
+                pos=vertex_buffer,
+                color=SKELETON_LINE_COLORS[body_part_name],
+                mode="lines",
             )
-            self._skeleton_connections_list.append(this_skel_line)
-            self._opengl_3d_plot_widget.addItem(this_skel_line)
+            self._skeleton_line_vertex_buffers[body_part_name] = vertex_buffer
+            self._skeleton_line_items[body_part_name] = line_item
+            self._opengl_3d_plot_widget.addItem(line_item)
 
     def initialize_mediapipe_3d_skeleton(
         self, mediapipe3d_trackedPoint_xyz: np.ndarray
     ):
-
         self._initialize_mediapipe_skeleton_dottos(mediapipe3d_trackedPoint_xyz)
         self._initialize_mediapipe_skeleton_connections(mediapipe3d_trackedPoint_xyz)
 
@@ -122,10 +136,11 @@ class Gl3dViewPort(QWidget):
             pos=mediapipe3d_trackedPoint_xyz,
         )
 
-        # update skel lines
-        for this_skeleton_line_number, this_connection in enumerate(
-            self._mediapipe_body_connections
-        ):
-            self._skeleton_connections_list[this_skeleton_line_number].setData(
-                pos=mediapipe3d_trackedPoint_xyz[this_connection, :]
+        # update skel lines - one gather + one `setData` per body part
+        for body_part_name, line_item in self._skeleton_line_items.items():
+            vertex_buffer = gather_line_segment_vertices(
+                mediapipe3d_trackedPoint_xyz,
+                self._mediapipe_connection_index_arrays[body_part_name],
+                out=self._skeleton_line_vertex_buffers[body_part_name],
             )
+            line_item.setData(pos=vertex_buffer)
@@ -0,0 +1,366 @@
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ~1 second of video at 30fps - enough to ride out a slow keyframe without holding on to too many images
+DEFAULT_PLAYBACK_BUFFER_SIZE_FRAMES = 30
+
+# how often to check back on a video whose frame isn't decoded yet (instead of waiting for the next frame)
+DECODED_FRAME_POLL_INTERVAL_SECONDS = 0.002
+
+
+def get_video_frame_count(video_path: Union[str, Path]) -> int:
+    video_capture = cv2.VideoCapture(str(video_path))
+    number_of_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_capture.release()
+    return number_of_frames
+
+
+class VideoFrameDecoder:
+    """
+    Decodes one video in its own thread, keeping up to `buffer_size_frames` decoded frames ready ahead of playback.
+
+    `get_frame` never waits for the decoder - it hands back the requested frame if it's ready (or, if the decoder
+    is running late, the newest frame it has that playback already moved past), throws away the frames in between,
+    and jumps the decoder to the requested frame if it's too far off to catch up.
+    Playback loops, so after the last frame the decoder carries on from frame 0.
+    A frame that can't be read still takes its place in the buffer, but with `None` for its image
+    """
+
+    def __init__(
+        self,
+        video_path: Union[str, Path],
+        number_of_frames: int,
+        buffer_size_frames: int = DEFAULT_PLAYBACK_BUFFER_SIZE_FRAMES,
+    ):
+        self._video_path = Path(video_path)
+        self._number_of_frames = number_of_frames
+        self._buffer_size_frames = buffer_size_frames
+
+        # (frame_number, image) in decode order
+        self._frame_buffer = deque()
+        self._condition = threading.Condition()
+        self._next_frame_number_to_decode = 0
+        # goes up with every seek, so a frame that was being decoded during a seek gets thrown away
+        self._seek_count = 0
+        self._should_continue = True
+
+        self.number_of_frames_decoded = 0
+        self.number_of_frames_dropped = 0
+        self.number_of_failed_reads = 0
+
+        self._decoder_thread = threading.Thread(
+            target=self._decode_frames,
+            name=f"video_frame_decoder_{self._video_path.stem}",
+            daemon=True,
+        )
+        self._decoder_thread.start()
+
+    @property
+    def number_of_seeks(self) -> int:
+        return self._seek_count
+
+    def get_frame(self, frame_number: int) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        (frame number, image) of `frame_number` if it's decoded, else of the newest decoded frame before it
+        (if there is one), else `None`. The image is `None` if that frame couldn't be read
+        """
+        with self._condition:
+            newest_late_frame = None
+            while self._frame_buffer:
+                buffered_frame_number, image = self._frame_buffer[0]
+                if buffered_frame_number == frame_number:
+                    self._frame_buffer.popleft()
+                    self._condition.notify()
+                    if newest_late_frame is not None:
+                        self.number_of_frames_dropped += 1
+                    return buffered_frame_number, image
+                if not self._is_before(buffered_frame_number, frame_number):
+                    # the buffer is ahead of playback (i.e. it went backwards)
+                    break
+                # playback already moved past this one
+                self._frame_buffer.popleft()
+                if newest_late_frame is not None:
+                    self.number_of_frames_dropped += 1
+                newest_late_frame = (buffered_frame_number, image)
+
+            frames_until_decoded = (
+                frame_number - self._next_frame_number_to_decode
+            ) % self._number_of_frames
+            if self._frame_buffer or frames_until_decoded > self._buffer_size_frames:
+                self._seek(frame_number)
+            self._condition.notify()
+            return newest_late_frame
+
+    def seek(self, frame_number: int):
+        with self._condition:
+            self._seek(frame_number)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._should_continue = False
+            self._condition.notify()
+        self._decoder_thread.join()
+
+    def _seek(self, frame_number: int):
+        self._frame_buffer.clear()
+        self._next_frame_number_to_decode = frame_number % self._number_of_frames
+        self._seek_count += 1
+
+    def _is_before(self, frame_number: int, other_frame_number: int) -> bool:
+        """whether `frame_number` comes (less than half a loop) before `other_frame_number`"""
+        frames_between = (other_frame_number - frame_number) % self._number_of_frames
+        return 0 < frames_between <= self._number_of_frames // 2
+
+    def _decode_frames(self):
+        video_capture = cv2.VideoCapture(str(self._video_path))
+        # the frame `video_capture` will read next
+        video_capture_frame_number = 0
+        try:
+            while True:
+                with self._condition:
+                    while (
+                        self._should_continue
+                        and len(self._frame_buffer) >= self._buffer_size_frames
+                    ):
+                        self._condition.wait()
+                    if not self._should_continue:
+                        return
+                    frame_number = self._next_frame_number_to_decode
+                    seek_count = self._seek_count
+
+                # the decoding happens outside of the lock, so playback never waits on it
+                if video_capture_frame_number != frame_number:
+                    self._seek_video_capture(video_capture, frame_number)
+                success, image = video_capture.read()
+                video_capture_frame_number = frame_number + 1
+                if not success:
+                    logger.warning(
+                        f"Failed to read frame {frame_number} from video: {self._video_path.name}"
+                    )
+                    image = None
+
+                with self._condition:
+                    if seek_count != self._seek_count:
+                        continue
+                    if image is None:
+                        self.number_of_failed_reads += 1
+                    self._frame_buffer.append((frame_number, image))
+                    self._next_frame_number_to_decode = (
+                        frame_number + 1
+                    ) % self._number_of_frames
+                    self.number_of_frames_decoded += 1
+        finally:
+            video_capture.release()
+
+    @staticmethod
+    def _seek_video_capture(video_capture: cv2.VideoCapture, frame_number: int):
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        if int(video_capture.get(cv2.CAP_PROP_POS_FRAMES)) != frame_number:
+            # some backends can only land on keyframes, so go from the start and skip ahead without decoding
+            video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            for _ in range(frame_number):
+                video_capture.grab()
+
+
+class PlaybackClock:
+    """
+    Which frame should be on screen right now - worked out from the time since playback (re)started,
+    so a slow frame never pushes the ones after it back (frames get skipped instead)
+    """
+
+    def __init__(
+        self,
+        frames_per_second: Union[int, float],
+        number_of_frames: int,
+        get_time: Callable[[], float] = time.perf_counter,
+    ):
+        self._frames_per_second = frames_per_second
+        self._number_of_frames = number_of_frames
+        self._get_time = get_time
+
+        self._lock = threading.Lock()
+        self._start_frame_number = 0
+        self._start_time = None
+
+    @property
+    def is_playing(self) -> bool:
+        return self._start_time is not None
+
+    @property
+    def frames_per_second(self) -> Union[int, float]:
+        return self._frames_per_second
+
+    def play(self):
+        with self._lock:
+            if self._start_time is None:
+                self._start_time = self._get_time()
+
+    def pause(self):
+        with self._lock:
+            self._start_frame_number = self._get_frames_since_start()
+            self._start_time = None
+
+    def seek(self, frame_number: int):
+        with self._lock:
+            self._start_frame_number = frame_number % self._number_of_frames
+            if self._start_time is not None:
+                self._start_time = self._get_time()
+
+    def get_current_frame_number(self) -> int:
+        with self._lock:
+            return self._get_frames_since_start() % self._number_of_frames
+
+    def get_seconds_until_next_frame(self) -> float:
+        with self._lock:
+            if self._start_time is None:
+                return self._frames_per_second**-1
+            seconds_since_start = self._get_time() - self._start_time
+            return (
+                int(seconds_since_start * self._frames_per_second) + 1
+            ) / self._frames_per_second - seconds_since_start
+
+    def _get_frames_since_start(self) -> int:
+        if self._start_time is None:
+            return self._start_frame_number
+        return self._start_frame_number + int(
+            (self._get_time() - self._start_time) * self._frames_per_second
+        )
+
+
+class SessionPlaybackEngine:
+    """
+    Plays a session's videos in sync: every video gets its own `VideoFrameDecoder` (so a slow one can't stall the
+    others) and a shared `PlaybackClock` says which frame should be showing.
+
+        with SessionPlaybackEngine(list_of_video_paths, frames_per_second=30) as playback_engine:
+            playback_engine.play()
+            while keep_playing:
+                frame_number, new_video_images = playback_engine.get_new_frames()
+                ...  # show `new_video_images` (and the skeleton at `frame_number`)
+                playback_engine.wait_for_next_frame()
+
+    `seek` works while playing or paused (i.e. for scrubbing)
+    """
+
+    def __init__(
+        self,
+        list_of_video_paths: List[Union[str, Path]],
+        frames_per_second: Union[int, float],
+        number_of_frames: Optional[int] = None,
+        buffer_size_frames: int = DEFAULT_PLAYBACK_BUFFER_SIZE_FRAMES,
+        get_time: Callable[[], float] = time.perf_counter,
+    ):
+        if number_of_frames is None:
+            number_of_frames = min(
+                get_video_frame_count(video_path) for video_path in list_of_video_paths
+            )
+        if number_of_frames < 1:
+            logger.error(f"Nothing to play, number_of_frames: {number_of_frames}")
+            raise ValueError(f"Nothing to play, number_of_frames: {number_of_frames}")
+        self._number_of_frames = number_of_frames
+
+        self._playback_clock = PlaybackClock(
+            frames_per_second, number_of_frames, get_time=get_time
+        )
+        self._video_frame_decoders = {
+            Path(video_path).stem: VideoFrameDecoder(
+                video_path,
+                number_of_frames=number_of_frames,
+                buffer_size_frames=buffer_size_frames,
+            )
+            for video_path in list_of_video_paths
+        }
+        self._shown_frame_numbers: Dict[str, Optional[int]] = {
+            video_name: None for video_name in self._video_frame_decoders
+        }
+        self._number_of_frames_shown = {
+            video_name: 0 for video_name in self._video_frame_decoders
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def number_of_frames(self) -> int:
+        return self._number_of_frames
+
+    @property
+    def is_playing(self) -> bool:
+        return self._playback_clock.is_playing
+
+    def play(self):
+        self._playback_clock.play()
+
+    def pause(self):
+        self._playback_clock.pause()
+
+    def seek(self, frame_number: int):
+        frame_number %= self._number_of_frames
+        self._playback_clock.seek(frame_number)
+        for video_name, video_frame_decoder in self._video_frame_decoders.items():
+            video_frame_decoder.seek(frame_number)
+            self._shown_frame_numbers[video_name] = None
+
+    def get_current_frame_number(self) -> int:
+        return self._playback_clock.get_current_frame_number()
+
+    def get_new_frames(self) -> Tuple[int, Dict[str, np.ndarray]]:
+        """
+        The frame number that should be showing, and new images for the videos that aren't showing it yet -
+        a video that's running behind gets the newest frame it has decoded, so it stutters instead of drifting
+        """
+        frame_number = self._playback_clock.get_current_frame_number()
+        new_video_images = {}
+        for video_name, video_frame_decoder in self._video_frame_decoders.items():
+            if self._shown_frame_numbers[video_name] == frame_number:
+                continue
+            decoded_frame = video_frame_decoder.get_frame(frame_number)
+            if decoded_frame is None:
+                continue
+            self._shown_frame_numbers[video_name], image = decoded_frame
+            if image is None:
+                # the decoder couldn't read this frame, so the video keeps showing the last one it could
+                continue
+            new_video_images[video_name] = image
+            self._number_of_frames_shown[video_name] += 1
+        return frame_number, new_video_images
+
+    def wait_for_next_frame(self):
+        """sleeps until the next frame is due (or for a moment, if a video is still waiting on the current frame)"""
+        seconds_to_wait = self._playback_clock.get_seconds_until_next_frame()
+        current_frame_number = self._playback_clock.get_current_frame_number()
+        if any(
+            shown_frame_number != current_frame_number
+            for shown_frame_number in self._shown_frame_numbers.values()
+        ):
+            seconds_to_wait = min(seconds_to_wait, DECODED_FRAME_POLL_INTERVAL_SECONDS)
+        time.sleep(max(seconds_to_wait, 0))
+
+    def get_playback_statistics(self) -> Dict[str, dict]:
+        return {
+            video_name: {
+                "number_of_frames_shown": self._number_of_frames_shown[video_name],
+                "number_of_frames_decoded": video_frame_decoder.number_of_frames_decoded,
+                "number_of_frames_dropped": video_frame_decoder.number_of_frames_dropped,
+                "number_of_seeks": video_frame_decoder.number_of_seeks,
+                "number_of_failed_reads": video_frame_decoder.number_of_failed_reads,
+            }
+            for video_name, video_frame_decoder in self._video_frame_decoders.items()
+        }
+
+    def close(self):
+        for video_frame_decoder in self._video_frame_decoders.values():
+            video_frame_decoder.close()
@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# what each body part's lines get drawn in (RGBA, 0-1)
+SKELETON_LINE_COLORS = {
+    "body": (1, 1, 1, 1),
+    "right_hand": (1, 0.4, 0.4, 1),
+    "left_hand": (0.4, 0.4, 1, 1),
+    "face": (0.8, 0.8, 0.8, 0.3),
+}
+
+
+def get_connection_index_array(
+    list_of_connections: Iterable[Sequence[int]], first_tracked_point_index: int = 0
+) -> np.ndarray:
+    """
+    Flattens [(start, end), ...] into [start, end, start, end, ...] (shifted to where this body part starts in
+    the full skeleton array), i.e. the vertex order a `GLLinePlotItem(mode="lines")` draws as separate segments
+    """
+    connection_index_array = np.asarray(list(list_of_connections), dtype=np.intp)
+    return connection_index_array.reshape(-1) + first_tracked_point_index
+
+
+def get_mediapipe_connection_index_arrays(
+    number_of_tracked_points: int, include_hands: bool = True, include_face: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    A connection index array per body part, for a mediapipe skeleton laid out [body, right hand, left hand, face].
+    Body parts that don't fit in `number_of_tracked_points` (e.g. body-only data) get left out
+    """
+    # mediapipe only gets imported once there's a skeleton to show, so the GUI opens fast
+    from src.core_processes.mediapipe_stuff.mediapipe_skeleton_names_and_connections import (
+        mediapipe_body_connections,
+        mediapipe_body_landmark_names,
+        mediapipe_face_connections,
+        mediapipe_hand_connections,
+        mediapipe_hand_landmark_names,
+    )
+
+    number_of_body_tracked_points = len(mediapipe_body_landmark_names)
+    number_of_hand_tracked_points = len(mediapipe_hand_landmark_names)
+
+    connections_by_body_part = {"body": (mediapipe_body_connections, 0)}
+    if include_hands:
+        connections_by_body_part["right_hand"] = (
+            mediapipe_hand_connections,
+            number_of_body_tracked_points,
+        )
+        connections_by_body_part["left_hand"] = (
+            mediapipe_hand_connections,
+            number_of_body_tracked_points + number_of_hand_tracked_points,
+        )
+    if include_face:
+        connections_by_body_part["face"] = (
+            mediapipe_face_connections,
+            number_of_body_tracked_points + 2 * number_of_hand_tracked_points,
+        )
+
+    connection_index_arrays = {}
+    for body_part_name, (
+        list_of_connections,
+        first_tracked_point_index,
+    ) in connections_by_body_part.items():
+        connection_index_array = get_connection_index_array(
+            list_of_connections, first_tracked_point_index
+        )
+        if connection_index_array.max() >= number_of_tracked_points:
+            logger.debug(
+                f"Skipping {body_part_name} lines, skeleton only has {number_of_tracked_points} tracked points"
+            )
+            continue
+        connection_index_arrays[body_part_name] = connection_index_array
+    return connection_index_arrays
+
+
+def gather_line_segment_vertices(
+    skeleton_xyz: np.ndarray,
+    connection_index_array: np.ndarray,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    [number_of_tracked_points, 3] -> [2 * number_of_connections, 3] in one go (into `out` if given, so the vertex
+    buffer gets reused every frame). Vertices come out as float32, which is what gets uploaded to the GPU anyway
+    """
+    return np.take(
+        np.asarray(skeleton_xyz, dtype=np.float32),
+        connection_index_array,
+        axis=0,
+        out=out,
+    )
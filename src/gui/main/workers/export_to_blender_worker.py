@@ -1,23 +1,44 @@
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
 import logging
 
-from src.blender_stuff import export_to_blender
+from src.blender_stuff.export_to_blender import export_to_blender
 
 logger = logging.getLogger(__name__)
 
 
 class ExportToBlenderThreadWorker(QThread):
+    # path to the `.blend` file, or "" if the export failed, timed out or got cancelled
     finished = pyqtSignal(str)
-
-    def __init__(self, session_folder_path: Union[str, Path]):
+    # {"stage": ..., "frames_done": ..., "total_frames": ...} (see `blender_progress_lines`)
+    progress = pyqtSignal(object)
+
+    def __init__(
+        self,
+        session_folder_path: Union[str, Path],
+        blender_exe_path: Union[str, Path],
+        timeout_seconds: Optional[float] = None,
+    ):
         super().__init__()
         self._session_folder_path = session_folder_path
+        self._blender_exe_path = blender_exe_path
+        self._timeout_seconds = timeout_seconds
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
 
     def run(self):
         logger.info("Starting `export_to_blender` thread worker...")
-        blender_file_path = export_to_blender(self._session_folder_path)
-        self.finished.emit(blender_file_path)
+        blender_file_path = export_to_blender(
+            self._session_folder_path,
+            blender_exe_path=self._blender_exe_path,
+            timeout_seconds=self._timeout_seconds,
+            progress_callback=self.progress.emit,
+            cancel_event=self._cancel_event,
+        )
+        self.finished.emit(blender_file_path or "")
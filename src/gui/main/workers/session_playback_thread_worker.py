@@ -1,13 +1,12 @@
-import time
 from pathlib import Path
 from typing import Union, Callable, List, Dict
 
-import cv2
 import numpy as np
-from PyQt6.QtCore import QThread, pyqtSignal, QTimer
+from PyQt6.QtCore import QThread
 
-from src.cameras.detection.cam_singleton import get_or_create_cams
-from src.cameras.detection.models import FoundCamerasResponse
+from src.gui.main.visualize_session.session_playback_engine import (
+    SessionPlaybackEngine,
+)
 
 import logging
 
@@ -24,7 +23,7 @@ class SessionPlaybackThreadWorker(QThread):
         update_3d_skeleton_callback: Callable,
     ):
         super().__init__()
-        self._frame_duration = frames_per_second**-1
+        self._frames_per_second = frames_per_second
         self._list_of_video_paths = list_of_video_paths
         self._dictionary_of_video_image_update_callbacks = (
             dictionary_of_video_image_update_callbacks
@@ -33,61 +32,68 @@ class SessionPlaybackThreadWorker(QThread):
         self._skeleton_3d_frame_trackedPoint_dimension = skeleton_3d_npy
         self._update_3d_skeleton_callback = update_3d_skeleton_callback
 
+        self._session_playback_engine = None
         self._should_continue = True
 
-    def _create_video_capture_dictionary(self):
-        video_capture_object_dict = {}
-        for video_path in self._list_of_video_paths:
-            video_name = Path(video_path).stem
-            video_capture_object_dict[video_name] = cv2.VideoCapture(str(video_path))
-
-        return video_capture_object_dict
-
     def run(self):
         logger.info(
-            f"Starting session_playback_thread_worker with frame_duration set to {self._frame_duration:.4f} seconds"
+            f"Starting session_playback_thread_worker with frame_duration set to {self._frames_per_second**-1:.4f} seconds"
         )
-        self._video_capture_object_dict = self._create_video_capture_dictionary()
-        last_update_time = time.perf_counter()
-        frame_number = -1
-        reset_frame_number = False
+        number_of_frames = self._skeleton_3d_frame_trackedPoint_dimension.shape[0]
+        if self._list_of_video_paths:
+            number_of_frames = None  # the shortest video decides
+
+        with SessionPlaybackEngine(
+            list_of_video_paths=self._list_of_video_paths,
+            frames_per_second=self._frames_per_second,
+            number_of_frames=number_of_frames,
+        ) as self._session_playback_engine:
+            self._session_playback_engine.play()
+            shown_skeleton_frame_number = None
+
+            while self._should_continue:
+                (
+                    frame_number,
+                    new_video_images,
+                ) = self._session_playback_engine.get_new_frames()
+                self._update_video_images(new_video_images)
+                if frame_number != shown_skeleton_frame_number:
+                    self._update_skeleton(frame_number=frame_number)
+                    shown_skeleton_frame_number = frame_number
+                self._session_playback_engine.wait_for_next_frame()
 
-        number_of_frames = list(self._video_capture_object_dict.values())[0].get(
-            cv2.CAP_PROP_FRAME_COUNT
+        logger.info(
+            f"Stopped session playback - {self._session_playback_engine.get_playback_statistics()}"
         )
+        self._session_playback_engine = None
+
+    def stop(self):
+        self._should_continue = False
+
+    def play(self):
+        if self._session_playback_engine is not None:
+            self._session_playback_engine.play()
+
+    def pause(self):
+        if self._session_playback_engine is not None:
+            self._session_playback_engine.pause()
+
+    def seek(self, frame_number: int):
+        """jump (or scrub) to `frame_number`, playing or paused"""
+        if self._session_playback_engine is not None:
+            self._session_playback_engine.seek(frame_number)
 
-        while self._should_continue:
-            current_time = time.perf_counter()
-
-            if current_time - last_update_time > self._frame_duration:
-                last_update_time = current_time
-                frame_number += 1
-                if frame_number >= number_of_frames:
-                    frame_number = 0
-
-                reset_frame_number = True
-                self._update_video_images(frame_number=frame_number)
-                self._update_skeleton(frame_number=frame_number)
-
-    def _update_video_images(self, frame_number: int):
-
-        # update videos
-        for (
-            video_name,
-            video_update,
-        ) in self._dictionary_of_video_image_update_callbacks.items():
-            if frame_number == 0:
-                self._video_capture_object_dict[video_name].set(
-                    cv2.CAP_PROP_POS_FRAMES, 0
-                )
-            success, image = self._video_capture_object_dict[video_name].read()
-            if not success:
-                logger.error(f"Failed to read a frame from video : {video_name}")
-                raise Exception
-
-            video_update(image)
+    def _update_video_images(self, new_video_images: Dict[str, np.ndarray]):
+        for video_name, image in new_video_images.items():
+            video_update = self._dictionary_of_video_image_update_callbacks.get(
+                video_name
+            )
+            if video_update is not None:
+                video_update(image)
 
     def _update_skeleton(self, frame_number: int):
+        if frame_number >= self._skeleton_3d_frame_trackedPoint_dimension.shape[0]:
+            return
 
         this_frame_skeleton_data = self._skeleton_3d_frame_trackedPoint_dimension[
             frame_number, :, :
@@ -1,45 +1,28 @@
 from pathlib import Path
-from typing import Dict, Union, Callable, List
+from typing import TYPE_CHECKING, Dict, Optional, Union, Callable, List
 
 import numpy as np
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QWidget
 from src.cameras.detection.models import FoundCamerasResponse
-from src.cameras.persistence.video_writer.video_recorder import VideoRecorder
 from src.core_processes.capture_volume_calibration.charuco_board_detection.dataclasses.charuco_board_definition import (
     CharucoBoardDefinition,
 )
 
-from src.gui.main.workers.anipose_calibration_thread_worker import (
-    AniposeCalibrationThreadWorker,
-)
-from src.gui.main.workers.cam_detection_thread_worker import CameraDetectionThreadWorker
-
 import logging
 
-from src.gui.main.workers.convert_npy_to_csv_thread_worker import (
-    ConvertNpyToCsvThreadWorker,
-)
-from src.gui.main.workers.export_to_blender_worker import ExportToBlenderThreadWorker
-from src.gui.main.workers.mediapipe_2d_detection_thread_worker import (
-    Mediapipe2dDetectionThreadWorker,
-)
-from src.gui.main.workers.post_process_3d_data_thread_worker import (
-    PostProcess3dDataThreadWorker,
-)
-from src.gui.main.workers.save_to_video_thread_worker import SaveToVideoThreadWorker
-from src.gui.main.workers.session_playback_thread_worker import (
-    SessionPlaybackThreadWorker,
-)
-from src.gui.main.workers.triangulate_3d_data_thread_worker import (
-    Triangulate3dDataThreadWorker,
-)
+if TYPE_CHECKING:
+    from src.cameras.persistence.video_writer.video_recorder import VideoRecorder
 
 logger = logging.getLogger(__name__)
 
 
 class ThreadWorkerManager(QWidget):
-    """This guy's job is to hold on to the parts of threads that need to be kept alive while they are running"""
+    """
+    This guy's job is to hold on to the parts of threads that need to be kept alive while they are running
+
+    (each worker gets imported when it's first launched, so mediapipe, anipose & co don't slow down opening the GUI)
+    """
 
     camera_detection_finished = pyqtSignal(FoundCamerasResponse)
     videos_saved_signal = pyqtSignal(bool)
@@ -49,6 +32,7 @@ class ThreadWorkerManager(QWidget):
     start_session_data_visualization_signal = pyqtSignal()
     start_blender_processing_signal = pyqtSignal()
     blender_file_created_signal = pyqtSignal(str)
+    blender_export_progress_signal = pyqtSignal(object)
 
     def __init__(self, session_progress_dictionary: dict):
         super().__init__()
@@ -59,6 +43,10 @@ class ThreadWorkerManager(QWidget):
         return self._session_progress_dictionary
 
     def launch_detect_cameras_worker(self):
+        from src.gui.main.workers.cam_detection_thread_worker import (
+            CameraDetectionThreadWorker,
+        )
+
         logger.info("Launching `Camera Detection` thread worker")
 
         self._session_progress_dictionary["camera_detection"] = "launched"
@@ -72,9 +60,13 @@ class ThreadWorkerManager(QWidget):
     def launch_save_videos_thread_worker(
         self,
         folder_to_save_videos: Union[str, Path],
-        dictionary_of_video_recorders: Dict[str, VideoRecorder],
+        dictionary_of_video_recorders: Dict[str, "VideoRecorder"],
         calibration_videos: bool = False,
     ):
+        from src.gui.main.workers.save_to_video_thread_worker import (
+            SaveToVideoThreadWorker,
+        )
+
         logger.info("Launching `Save Videos` thread worker...")
 
         if calibration_videos:
@@ -99,6 +91,10 @@ class ThreadWorkerManager(QWidget):
         session_id: str,
         jupyter_console_print_function_callable: Callable,
     ):
+        from src.gui.main.workers.anipose_calibration_thread_worker import (
+            AniposeCalibrationThreadWorker,
+        )
+
         logger.info("Launching `Anipose (Charuco Board) Calibration` thread worker")
         self._session_progress_dictionary["anipose_calibration"] = "launched"
         self._anipose_calibration_worker = AniposeCalibrationThreadWorker(
@@ -118,6 +114,10 @@ class ThreadWorkerManager(QWidget):
         output_data_folder_path: Union[str, Path],
         auto_process_next_stage: bool = True,
     ):
+        from src.gui.main.workers.mediapipe_2d_detection_thread_worker import (
+            Mediapipe2dDetectionThreadWorker,
+        )
+
         logger.info("Launching `Detect Mediapipe 2d Skeleton` thread worker...")
         self._session_progress_dictionary["medipipe"] = "launched"
         self._mediapipe_2d_detection_thread_worker = Mediapipe2dDetectionThreadWorker(
@@ -141,6 +141,10 @@ class ThreadWorkerManager(QWidget):
         auto_process_next_stage: bool = False,
         use_triangulate_ransac: bool = False,
     ):
+        from src.gui.main.workers.triangulate_3d_data_thread_worker import (
+            Triangulate3dDataThreadWorker,
+        )
+
         logger.info("Launching `Triangulate 3d Data` thread worker...")
         self._session_progress_dictionary["triangulate"] = "launched"
         self._triangulate_3d_data_thread_worker = Triangulate3dDataThreadWorker(
@@ -170,6 +174,10 @@ class ThreadWorkerManager(QWidget):
         reference_frame_number: int = None,
         auto_process_next_stage: bool = False,
     ):
+        from src.gui.main.workers.post_process_3d_data_thread_worker import (
+            PostProcess3dDataThreadWorker,
+        )
+
         logger.info("Launching `Post Process 3d Data` thread worker...")
         self._session_progress_dictionary["post_process"] = "launched"
         self._post_process_3d_data_thread_worker = PostProcess3dDataThreadWorker(
@@ -195,6 +203,10 @@ class ThreadWorkerManager(QWidget):
         output_data_folder_path: Union[str, Path],
         auto_process_next_stage: bool = False,
     ):
+        from src.gui.main.workers.convert_npy_to_csv_thread_worker import (
+            ConvertNpyToCsvThreadWorker,
+        )
+
         logger.info("Launching `Convert Npy to Csv` thread worker...")
         self._session_progress_dictionary["convert_to_csv"] = "launched"
         self._convert_npy_to_csv_thread_worker = ConvertNpyToCsvThreadWorker(
@@ -221,6 +233,10 @@ class ThreadWorkerManager(QWidget):
         skeleton_3d_npy: np.ndarray,
         update_3d_skeleton_callback: Callable,
     ):
+        from src.gui.main.workers.session_playback_thread_worker import (
+            SessionPlaybackThreadWorker,
+        )
+
         logger.info(
             f"Launching `session_playback_thread_worker` with frames_per_second set to {frames_per_second} "
         )
@@ -233,3 +249,39 @@ class ThreadWorkerManager(QWidget):
             update_3d_skeleton_callback=update_3d_skeleton_callback,
         )
         self._session_playback_viewer_thread_worker.start()
+
+    def launch_export_to_blender_thread_worker(
+        self,
+        session_folder_path: Union[str, Path],
+        blender_exe_path: Union[str, Path],
+        timeout_seconds: Optional[float] = None,
+    ):
+        from src.gui.main.workers.export_to_blender_worker import (
+            ExportToBlenderThreadWorker,
+        )
+
+        logger.info("Launching `Export to Blender` thread worker...")
+        self._session_progress_dictionary["export_to_blender"] = "launched"
+        self._export_to_blender_thread_worker = ExportToBlenderThreadWorker(
+            session_folder_path=session_folder_path,
+            blender_exe_path=blender_exe_path,
+            timeout_seconds=timeout_seconds,
+        )
+        self._export_to_blender_thread_worker.progress.connect(
+            self.blender_export_progress_signal.emit
+        )
+        self._export_to_blender_thread_worker.finished.connect(
+            self.blender_file_created_signal.emit
+        )
+        self._export_to_blender_thread_worker.start()
+
+    def cancel_export_to_blender(self):
+        export_to_blender_thread_worker = getattr(
+            self, "_export_to_blender_thread_worker", None
+        )
+        if (
+            export_to_blender_thread_worker is not None
+            and export_to_blender_thread_worker.isRunning()
+        ):
+            logger.info("Cancelling `Export to Blender` thread worker...")
+            export_to_blender_thread_worker.cancel()
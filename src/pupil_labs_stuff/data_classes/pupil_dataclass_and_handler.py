@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Union
+from typing import Dict, Union
 
 import numpy as np
 import pandas as pd
@@ -34,7 +34,13 @@ class PupilDataHandler:
     Class for handling data from Pupil Labs eye tracker
     """
 
-    def __init__(self, pupil_dataframe: pd.DataFrame = None):
+    def __init__(
+        self,
+        pupil_dataframe: pd.DataFrame = None,
+        pupil_data_by_eye: Dict[str, PupilLabsDataClass] = None,
+    ):
+        # {"right": ..., "left": ...} if the data was already split up by eye (see `pupil_export_loader`)
+        self._pupil_data_by_eye = pupil_data_by_eye
         if pupil_dataframe is not None:
             self.load_from_dataframe(pupil_dataframe)
 
@@ -78,6 +84,9 @@ class PupilDataHandler:
 
         pull out data according to `eye_d` (right_eye == 0, left_eye==1) and tracking method (because pupil interleaves 2d and 3d data)
         """
+        if self._pupil_data_by_eye is not None:
+            return self._pupil_data_by_eye[eye_str]
+
         if eye_str == "right":
             eye_d = 0
 
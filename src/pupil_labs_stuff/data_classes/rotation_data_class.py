@@ -1,13 +1,60 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
 
 import numpy as np
+from scipy.spatial.transform import Rotation
 
 
 @dataclass
 class RotationDataClass:
-    rotation_matricies: List[np.ndarray]
-    local_origin_fr_xyz: np.ndarray = np.array([0, 0, 0])
-    x_hat_norm_fr_xyz: np.ndarray = np.array([1, 0, 0])
-    y_hat_norm_fr_xyz: np.ndarray = np.array([0, 1, 0])
-    z_hat_norm_fr_xyz: np.ndarray = np.array([0, 0, 1])
+    """
+    A rotation matrix and origin on every frame, as contiguous stacks - `rotation_matricies` is [number_of_frames, 3, 3]
+    (rows are x_hat, y_hat, z_hat) and `local_origin_fr_xyz` is [number_of_frames, 3].
+    Frames where the basis couldn't be defined (`nan` or degenerate markers) are all `nan` and `False` in `valid_frames`
+    """
+
+    rotation_matricies: np.ndarray
+    local_origin_fr_xyz: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    x_hat_norm_fr_xyz: np.ndarray = field(default_factory=lambda: np.array([1, 0, 0]))
+    y_hat_norm_fr_xyz: np.ndarray = field(default_factory=lambda: np.array([0, 1, 0]))
+    z_hat_norm_fr_xyz: np.ndarray = field(default_factory=lambda: np.array([0, 0, 1]))
+    valid_frames: np.ndarray = None
+
+    def __post_init__(self):
+        # (still takes a list of 3x3 matricies)
+        self.rotation_matricies = np.ascontiguousarray(
+            self.rotation_matricies, dtype=np.float64
+        )
+        if self.valid_frames is None:
+            self.valid_frames = ~np.isnan(self.rotation_matricies).any(axis=(1, 2))
+
+    @property
+    def number_of_frames(self) -> int:
+        return self.rotation_matricies.shape[0]
+
+    def as_quaternions(self, scalar_first: bool = False) -> np.ndarray:
+        """[number_of_frames, 4] quaternions of `rotation_matricies` ([x, y, z, w], or [w, x, y, z] if `scalar_first`) - `nan` on invalid frames"""
+        quaternions_fr_xyzw = self._get_valid_frame_export(
+            lambda rotations: rotations.as_quat(), number_of_values=4
+        )
+        if scalar_first:
+            return np.roll(quaternions_fr_xyzw, 1, axis=1)
+        return quaternions_fr_xyzw
+
+    def as_euler_angles(
+        self, sequence: str = "xyz", degrees: bool = False
+    ) -> np.ndarray:
+        """[number_of_frames, 3] euler angles of `rotation_matricies` (`scipy`'s `sequence` convention) - `nan` on invalid frames"""
+        return self._get_valid_frame_export(
+            lambda rotations: rotations.as_euler(sequence, degrees=degrees),
+            number_of_values=3,
+        )
+
+    def _get_valid_frame_export(
+        self, export_function, number_of_values: int
+    ) -> np.ndarray:
+        exported_values = np.full((self.number_of_frames, number_of_values), np.nan)
+        if self.valid_frames.any():
+            exported_values[self.valid_frames] = export_function(
+                Rotation.from_matrix(self.rotation_matricies[self.valid_frames])
+            )
+        return exported_values
@@ -0,0 +1,213 @@
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from src.config.home_dir import (
+    FREEMOCAP_UNIX_TIMESTAMPS_CACHE_FILE_NAME,
+    PUPIL_POSITIONS_CACHE_FILE_NAME,
+)
+from src.pupil_labs_stuff.data_classes.pupil_dataclass_and_handler import (
+    PupilLabsDataClass,
+)
+
+logger = logging.getLogger(__name__)
+
+# bump this whenever what goes into a cache file changes, so old ones get re-made instead of misread
+PUPIL_EXPORT_CACHE_VERSION = 1
+
+# the only columns of `pupil_positions.csv` we use (it has ~30 more)
+PUPIL_POSITIONS_COLUMN_DTYPES = {
+    "pupil_timestamp": np.float64,
+    "eye_id": np.int8,
+    "method": "category",
+    "theta": np.float64,
+    "phi": np.float64,
+    "circle_3d_normal_x": np.float64,
+    "circle_3d_normal_y": np.float64,
+    "circle_3d_normal_z": np.float64,
+}
+
+# pupil interleaves 2d and 3d detections, we want the 3d ones
+PUPIL_2D_DETECTION_METHOD_NAME = "2d c++"
+
+EYE_ID_BY_EYE_NAME = {"right": 0, "left": 1}
+
+PUPIL_DATA_FIELD_NAME_BY_COLUMN_NAME = {
+    "pupil_timestamp": "timestamps",
+    "theta": "theta",
+    "phi": "phi",
+    "circle_3d_normal_x": "pupil_center_normal_x",
+    "circle_3d_normal_y": "pupil_center_normal_y",
+    "circle_3d_normal_z": "pupil_center_normal_z",
+}
+
+
+def get_file_signature(file_path: Union[str, Path]) -> dict:
+    """(size, modification time) - cheap enough to check every time, and changes whenever the file gets re-exported"""
+    stat = Path(file_path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _get_cache_key(source_file_paths: List[Union[str, Path]]) -> str:
+    return json.dumps(
+        {
+            "version": PUPIL_EXPORT_CACHE_VERSION,
+            "source_files": {
+                Path(file_path).name: get_file_signature(file_path)
+                for file_path in source_file_paths
+            },
+        },
+        sort_keys=True,
+    )
+
+
+def load_arrays_with_sidecar_cache(
+    cache_file_path: Union[str, Path],
+    source_file_paths: List[Union[str, Path]],
+    load_arrays_function: Callable[[], Dict[str, np.ndarray]],
+    use_cache: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    `load_arrays_function()`, unless `cache_file_path` (an `.npz` next to the source files) was saved from
+    `source_file_paths` with the same size and modification time - then just read the arrays back out of it.
+    A cache that can't be read or written is only ever a warning, the data can always come from the source files
+    """
+    cache_file_path = Path(cache_file_path)
+    cache_key = _get_cache_key(source_file_paths)
+
+    if use_cache and cache_file_path.exists():
+        try:
+            with np.load(cache_file_path, allow_pickle=False) as cache_file:
+                if str(cache_file["cache_key"]) == cache_key:
+                    logger.debug(f"loading cached arrays from {cache_file_path}")
+                    return {
+                        array_name: cache_file[array_name]
+                        for array_name in cache_file.files
+                        if array_name != "cache_key"
+                    }
+            logger.info(f"source files changed since {cache_file_path} was saved")
+        except (OSError, ValueError, KeyError) as error:
+            logger.warning(f"Could not read cache file {cache_file_path} - {error}")
+
+    arrays_by_name = load_arrays_function()
+
+    if use_cache:
+        try:
+            # write a new file and swap it in, so a crash never leaves a half-written cache
+            temporary_cache_file_path = cache_file_path.with_suffix(".tmp.npz")
+            np.savez(
+                temporary_cache_file_path,
+                cache_key=np.array(cache_key),
+                **arrays_by_name,
+            )
+            temporary_cache_file_path.replace(cache_file_path)
+        except OSError as error:
+            logger.warning(f"Could not save cache file {cache_file_path} - {error}")
+
+    return arrays_by_name
+
+
+def parse_pupil_positions_by_eye(
+    pupil_positions_csv_path: Union[str, Path],
+    pupil_recording_info_json_path: Union[str, Path],
+) -> Dict[str, np.ndarray]:
+    """
+    read the columns we need out of `pupil_positions.csv`, drop the 2d detections, shift the timestamps from
+    pupil time to unix time (with `info.player.json`) and split it up by eye -
+    returns {"right_timestamps": ..., "right_theta": ..., "left_timestamps": ..., ...}
+    """
+    with open(pupil_recording_info_json_path) as pupil_recording_info_file:
+        pupil_recording_info_json = json.load(pupil_recording_info_file)
+
+    pupil_dataframe = pd.read_csv(
+        pupil_positions_csv_path,
+        usecols=list(PUPIL_POSITIONS_COLUMN_DTYPES),
+        dtype=PUPIL_POSITIONS_COLUMN_DTYPES,
+    )
+    pupil_dataframe = pupil_dataframe[
+        pupil_dataframe["method"] != PUPIL_2D_DETECTION_METHOD_NAME
+    ]
+    eye_id_array = pupil_dataframe["eye_id"].to_numpy()
+    unix_timestamps = (
+        pupil_dataframe["pupil_timestamp"].to_numpy()
+        - pupil_recording_info_json["start_time_synced_s"]
+        + pupil_recording_info_json["start_time_system_s"]
+    )
+
+    arrays_by_name = {}
+    for eye_name, eye_id in EYE_ID_BY_EYE_NAME.items():
+        this_eye_logical_indicies = eye_id_array == eye_id
+        for column_name, field_name in PUPIL_DATA_FIELD_NAME_BY_COLUMN_NAME.items():
+            if column_name == "pupil_timestamp":
+                column_array = unix_timestamps
+            else:
+                column_array = pupil_dataframe[column_name].to_numpy()
+            arrays_by_name[f"{eye_name}_{field_name}"] = np.ascontiguousarray(
+                column_array[this_eye_logical_indicies]
+            )
+    return arrays_by_name
+
+
+def load_pupil_data_by_eye(
+    pupil_positions_csv_path: Union[str, Path],
+    pupil_recording_info_json_path: Union[str, Path],
+    use_cache: bool = True,
+) -> Dict[str, PupilLabsDataClass]:
+    """
+    {"right": ..., "left": ...} 3d pupil data, with unix timestamps - the parsed arrays get cached next to
+    `pupil_positions.csv`, so re-opening a session only reads the csv again if either file changed
+    """
+    pupil_positions_csv_path = Path(pupil_positions_csv_path)
+    arrays_by_name = load_arrays_with_sidecar_cache(
+        cache_file_path=pupil_positions_csv_path.parent
+        / PUPIL_POSITIONS_CACHE_FILE_NAME,
+        source_file_paths=[pupil_positions_csv_path, pupil_recording_info_json_path],
+        load_arrays_function=lambda: parse_pupil_positions_by_eye(
+            pupil_positions_csv_path, pupil_recording_info_json_path
+        ),
+        use_cache=use_cache,
+    )
+
+    pupil_data_by_eye = {}
+    for eye_name, eye_id in EYE_ID_BY_EYE_NAME.items():
+        pupil_data_by_eye[eye_name] = PupilLabsDataClass(
+            eye_d=eye_id,
+            **{
+                field_name: arrays_by_name[f"{eye_name}_{field_name}"]
+                for field_name in PUPIL_DATA_FIELD_NAME_BY_COLUMN_NAME.values()
+            },
+        )
+    return pupil_data_by_eye
+
+
+def parse_freemocap_unix_timestamps(
+    freemocap_unix_timestamps_csv_path: Union[str, Path]
+) -> Dict[str, np.ndarray]:
+    """mean of each camera's timestamp on each frame (`-1` means that camera didn't get that frame)"""
+    cameras_timestamp_array = pd.read_csv(
+        freemocap_unix_timestamps_csv_path,
+        usecols=lambda column_name: "Cam" in column_name,
+        dtype=np.float64,
+    ).to_numpy()
+    cameras_timestamp_array[cameras_timestamp_array == -1] = np.nan
+    return {"freemocap_timestamps": np.nanmean(cameras_timestamp_array, axis=1)}
+
+
+def load_freemocap_unix_timestamps(
+    freemocap_unix_timestamps_csv_path: Union[str, Path],
+    use_cache: bool = True,
+) -> np.ndarray:
+    freemocap_unix_timestamps_csv_path = Path(freemocap_unix_timestamps_csv_path)
+    return load_arrays_with_sidecar_cache(
+        cache_file_path=freemocap_unix_timestamps_csv_path.parent
+        / FREEMOCAP_UNIX_TIMESTAMPS_CACHE_FILE_NAME,
+        source_file_paths=[freemocap_unix_timestamps_csv_path],
+        load_arrays_function=lambda: parse_freemocap_unix_timestamps(
+            freemocap_unix_timestamps_csv_path
+        ),
+        use_cache=use_cache,
+    )["freemocap_timestamps"]
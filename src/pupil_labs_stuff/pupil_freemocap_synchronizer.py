@@ -10,6 +10,9 @@ from jon_scratch.pupil_calibration_pipeline.data_classes.freemocap_session_data_
 from jon_scratch.pupil_calibration_pipeline.data_classes.pupil_dataclass_and_handler import (
     PupilLabsDataClass,
 )
+from src.core_processes.utils.timestamped_stream_resampling import (
+    synchronize_timestamped_streams,
+)
 
 matplotlib.use("qt5agg")
 logger = logging.getLogger(__name__)
@@ -29,83 +32,46 @@ class PupilFreemocapSynchronizer:
         debug: bool = False,
         vor_frame_start: int = None,
         vor_frame_end: int = None,
+        reference_stream_name: str = "freemocap",
     ):
         """
-        align freemocap and pupil timestamps and clip the starts and ends of the various data traces so that everything covers the same timespacn
+        align freemocap and pupil timestamps and clip the starts and ends of the various data traces so that everything covers the same timespacn,
+        then resample everything onto the clock of `reference_stream_name` ("freemocap", "right_eye", or "left_eye" - works whichever one is faster)
         """
-        # find start and end frames shared by all datastreams
-        freemocap_timestamps = self.raw_session_data.timestamps
-        right_eye_timestamps = (
-            self.raw_session_data.right_eye_pupil_labs_data.timestamps
-        )
-        left_eye_timestamps = self.raw_session_data.left_eye_pupil_labs_data.timestamps
-
-        start_time_unix = np.max(
-            (freemocap_timestamps[0], right_eye_timestamps[0], left_eye_timestamps[0])
-        )
-        end_time_unix = np.min(
-            (
-                freemocap_timestamps[-1],
-                right_eye_timestamps[-1],
-                left_eye_timestamps[-1],
-            )
-        )
-
-        # freemocap
-        if any(freemocap_timestamps >= start_time_unix):
-            freemocap_start_frame = np.where(freemocap_timestamps >= start_time_unix)[
-                0
-            ][0]
-        else:
-            freemocap_start_frame = 0
-
-        if any(freemocap_timestamps <= end_time_unix):
-            freemocap_end_frame = np.where(freemocap_timestamps <= end_time_unix)[0][-1]
-        else:
-            freemocap_end_frame = len(freemocap_timestamps)
-
-        # right eye
-        if any(right_eye_timestamps >= start_time_unix):
-            right_eye_start_frame = np.where(right_eye_timestamps >= start_time_unix)[
-                0
-            ][0]
-        else:
-            right_eye_start_frame = 0
-
-        if any(right_eye_timestamps <= end_time_unix):
-            right_eye_end_frame = np.where(right_eye_timestamps <= end_time_unix)[0][-1]
-        else:
-            right_eye_end_frame = len(right_eye_timestamps)
-
-        # left eye
-        if any(left_eye_timestamps >= start_time_unix):
-            left_eye_start_frame = np.where(left_eye_timestamps >= start_time_unix)[0][
-                0
-            ]
-        else:
-            left_eye_start_frame = 0
-
-        if any(left_eye_timestamps <= end_time_unix):
-            left_eye_end_frame = np.where(left_eye_timestamps <= end_time_unix)[0][-1]
-        else:
-            left_eye_end_frame = len(left_eye_timestamps)
-
-        self.right_eye_start_frame = right_eye_start_frame
-        self.right_eye_end_frame = right_eye_end_frame
-        self.left_eye_start_frame = left_eye_start_frame
-        self.left_eye_end_frame = left_eye_end_frame
-
-        # rebase time onto freemocap's framerate (b/c it's slower than pupil) <- sloppy, assumes mocap slower than eye tracker, which is untrue for, say, GoPros
-        self.synchronized_timestamps = self.raw_session_data.timestamps[
-            freemocap_start_frame:freemocap_end_frame
-        ]
-
-        logger.warning(
-            "SLOPPY ASSUMPTION: assuming freemocap framerate is always slower than eye tracker (true for webcams, not true for GoPros)"
-        )
+        right_eye_pupil_labs_data = self.raw_session_data.right_eye_pupil_labs_data
+        left_eye_pupil_labs_data = self.raw_session_data.left_eye_pupil_labs_data
 
-        self.clip_eye_data()
-        self.resample_eye_data()
+        (
+            self.synchronized_timestamps,
+            synchronized_data_by_stream,
+        ) = synchronize_timestamped_streams(
+            timestamps_by_stream={
+                "freemocap": self.raw_session_data.timestamps,
+                "right_eye": right_eye_pupil_labs_data.timestamps,
+                "left_eye": left_eye_pupil_labs_data.timestamps,
+            },
+            data_by_stream={
+                "freemocap": self.raw_session_data.mediapipe_skel_fr_mar_xyz,
+                "right_eye": self._stack_eye_data_channels(right_eye_pupil_labs_data),
+                "left_eye": self._stack_eye_data_channels(left_eye_pupil_labs_data),
+            },
+            reference_stream_name=reference_stream_name,
+        )
+
+        (
+            self.right_eye_pupil_center_normal_x,
+            self.right_eye_pupil_center_normal_y,
+            self.right_eye_pupil_center_normal_z,
+            self.right_eye_theta,
+            self.right_eye_phi,
+        ) = synchronized_data_by_stream["right_eye"].T
+        (
+            self.left_eye_pupil_center_normal_x,
+            self.left_eye_pupil_center_normal_y,
+            self.left_eye_pupil_center_normal_z,
+            self.left_eye_theta,
+            self.left_eye_phi,
+        ) = synchronized_data_by_stream["left_eye"].T
         # self.normalize_eye_data()
 
         self.synchronized_timestamps = (
@@ -139,134 +105,25 @@ class PupilFreemocapSynchronizer:
 
         synchronized_session_data = FreemocapSessionDataClass(
             timestamps=self.synchronized_timestamps,
-            mediapipe_skel_fr_mar_dim=self.raw_session_data.mediapipe_skel_fr_mar_xyz[
-                freemocap_start_frame:freemocap_end_frame, :, :
-            ],
+            mediapipe_skel_fr_mar_dim=synchronized_data_by_stream["freemocap"],
             right_eye_pupil_labs_data=synchronized_right_eye_data,
             left_eye_pupil_labs_data=synchronized_left_eye_data,
         )
         return synchronized_session_data
 
-    def clip_eye_data(self):
-        self.right_eye_timestamps_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.timestamps[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.right_eye_pupil_center_normal_x_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.pupil_center_normal_x[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.right_eye_pupil_center_normal_y_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.pupil_center_normal_y[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.right_eye_pupil_center_normal_z_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.pupil_center_normal_z[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.right_eye_theta_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.theta[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.right_eye_phi_clipped = (
-            self.raw_session_data.right_eye_pupil_labs_data.phi[
-                self.right_eye_start_frame : self.right_eye_end_frame
-            ]
-        )
-
-        self.left_eye_timestamps_clipped = (
-            self.raw_session_data.left_eye_pupil_labs_data.timestamps[
-                self.left_eye_start_frame : self.left_eye_end_frame
-            ]
-        )
-
-        self.left_eye_pupil_center_normal_x_clipped = (
-            self.raw_session_data.left_eye_pupil_labs_data.pupil_center_normal_x[
-                self.left_eye_start_frame : self.left_eye_end_frame
-            ]
-        )
-
-        self.left_eye_pupil_center_normal_y_clipped = (
-            self.raw_session_data.left_eye_pupil_labs_data.pupil_center_normal_y[
-                self.left_eye_start_frame : self.left_eye_end_frame
-            ]
-        )
-
-        self.left_eye_pupil_center_normal_z_clipped = (
-            self.raw_session_data.left_eye_pupil_labs_data.pupil_center_normal_z[
-                self.left_eye_start_frame : self.left_eye_end_frame
-            ]
-        )
-
-        self.left_eye_theta_clipped = (
-            self.raw_session_data.left_eye_pupil_labs_data.theta[
-                self.left_eye_start_frame : self.left_eye_end_frame
+    @staticmethod
+    def _stack_eye_data_channels(pupil_labs_data: PupilLabsDataClass) -> np.ndarray:
+        """[number_of_frames, 5] - pupil_center_normal_x/y/z, theta, phi - so they all get resampled in one go"""
+        return np.column_stack(
+            [
+                pupil_labs_data.pupil_center_normal_x,
+                pupil_labs_data.pupil_center_normal_y,
+                pupil_labs_data.pupil_center_normal_z,
+                pupil_labs_data.theta,
+                pupil_labs_data.phi,
             ]
         )
 
-        self.left_eye_phi_clipped = self.raw_session_data.left_eye_pupil_labs_data.phi[
-            self.left_eye_start_frame : self.left_eye_end_frame
-        ]
-
-    def resample_eye_data(self):
-        freemocap_timestamps = self.synchronized_timestamps
-        right_eye_timestamps = self.right_eye_timestamps_clipped
-        left_eye_timestamps = self.left_eye_timestamps_clipped
-
-        self.right_eye_pupil_center_normal_x = np.interp(
-            freemocap_timestamps,
-            right_eye_timestamps,
-            self.right_eye_pupil_center_normal_x_clipped,
-        )
-        self.right_eye_pupil_center_normal_y = np.interp(
-            freemocap_timestamps,
-            right_eye_timestamps,
-            self.right_eye_pupil_center_normal_y_clipped,
-        )
-        self.right_eye_pupil_center_normal_z = np.interp(
-            freemocap_timestamps,
-            right_eye_timestamps,
-            self.right_eye_pupil_center_normal_z_clipped,
-        )
-        self.right_eye_theta = np.interp(
-            freemocap_timestamps, right_eye_timestamps, self.right_eye_theta_clipped
-        )
-        self.right_eye_phi = np.interp(
-            freemocap_timestamps, right_eye_timestamps, self.right_eye_phi_clipped
-        )
-
-        self.left_eye_pupil_center_normal_x = np.interp(
-            freemocap_timestamps,
-            left_eye_timestamps,
-            self.left_eye_pupil_center_normal_x_clipped,
-        )
-        self.left_eye_pupil_center_normal_y = np.interp(
-            freemocap_timestamps,
-            left_eye_timestamps,
-            self.left_eye_pupil_center_normal_y_clipped,
-        )
-        self.left_eye_pupil_center_normal_z = np.interp(
-            freemocap_timestamps,
-            left_eye_timestamps,
-            self.left_eye_pupil_center_normal_z_clipped,
-        )
-        self.left_eye_theta = np.interp(
-            freemocap_timestamps, left_eye_timestamps, self.left_eye_theta_clipped
-        )
-        self.left_eye_phi = np.interp(
-            freemocap_timestamps, left_eye_timestamps, self.left_eye_phi_clipped
-        )
-
     def normalize_eye_data(self):
         self.right_eye_pupil_center_normal_x = (
             self.right_eye_pupil_center_normal_x
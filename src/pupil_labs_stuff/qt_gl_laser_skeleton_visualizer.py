@@ -8,7 +8,6 @@ import pyqtgraph.opengl as gl
 import pyqtgraph as pg
 import numpy as np
 import sys
-from mediapipe.python.solutions import holistic as mp_holistic
 
 from jon_scratch.pupil_calibration_pipeline.data_classes.freemocap_session_data_class import (
     FreemocapSessionDataClass,
@@ -17,6 +16,11 @@ from jon_scratch.pupil_calibration_pipeline.data_classes.rotation_data_class imp
     RotationDataClass,
 )
 from jon_scratch.pupil_calibration_pipeline.session_data_loader import SessionDataLoader
+from src.gui.main.visualize_session.skeleton_line_segments import (
+    SKELETON_LINE_COLORS,
+    gather_line_segment_vertices,
+    get_mediapipe_connection_index_arrays,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -101,15 +105,10 @@ class QtGlLaserSkeletonVisualizer:
         self.gl_view_widget.addItem(grid_plane_z)
 
     def get_mediapipe_connections(self):
-        self.mediapipe_body_connections = [
-            this_connection for this_connection in mp_holistic.POSE_CONNECTIONS
-        ]
-        self.mediapipe_hand_connections = [
-            this_connection for this_connection in mp_holistic.HAND_CONNECTIONS
-        ]
-        self.mediapipe_face_connections = [
-            this_connection for this_connection in mp_holistic.FACEMESH_TESSELATION
-        ]
+        # body, hands and face (whichever are in the data), as flat [start, end, start, end...] index arrays
+        self.mediapipe_connection_index_arrays = get_mediapipe_connection_index_arrays(
+            number_of_tracked_points=self.mediapipe_fr_mar_xyz.shape[1]
+        )
 
     def initialize_skel_dottos(self):
         self.skeleton_scatter_item = gl.GLScatterPlotItem(
@@ -121,15 +120,25 @@ class QtGlLaserSkeletonVisualizer:
         self.gl_view_widget.addItem(self.skeleton_scatter_item)
 
     def initialize_skel_lines(self):
-        self.skeleton_connections_list = []
-        for this_connection in self.mediapipe_body_connections:
-            this_skel_line = gl.GLLinePlotItem(
-                pos=self.mediapipe_fr_mar_xyz[
-                    self.current_frame_number, this_connection, :
-                ]
+        # one line item per body part, so even the full face mesh is a single draw call
+        self.skeleton_line_vertex_buffers = {}
+        self.skeleton_line_items = {}
+        for (
+            body_part_name,
+            connection_index_array,
+        ) in self.mediapipe_connection_index_arrays.items():
+            vertex_buffer = gather_line_segment_vertices(
+                self.mediapipe_fr_mar_xyz[self.current_frame_number],
+                connection_index_array,
+            )
+            skeleton_line_item = gl.GLLinePlotItem(
+                pos=vertex_buffer,
+                color=SKELETON_LINE_COLORS[body_part_name],
+                mode="lines",
             )
-            self.skeleton_connections_list.append(this_skel_line)
-            self.gl_view_widget.addItem(this_skel_line)
+            self.skeleton_line_vertex_buffers[body_part_name] = vertex_buffer
+            self.skeleton_line_items[body_part_name] = skeleton_line_item
+            self.gl_view_widget.addItem(skeleton_line_item)
 
     def initialize_gaze_lasers(self):
         # right eye
@@ -361,14 +370,13 @@ class QtGlLaserSkeletonVisualizer:
             self.update_gaze_laser_tails()
 
     def update_skeleton_lines(self):
-        for this_skeleton_line_number, this_connection in enumerate(
-            self.mediapipe_body_connections
-        ):
-            self.skeleton_connections_list[this_skeleton_line_number].setData(
-                pos=self.mediapipe_fr_mar_xyz[
-                    self.current_frame_number, this_connection, :
-                ]
+        for body_part_name, skeleton_line_item in self.skeleton_line_items.items():
+            vertex_buffer = gather_line_segment_vertices(
+                self.mediapipe_fr_mar_xyz[self.current_frame_number],
+                self.mediapipe_connection_index_arrays[body_part_name],
+                out=self.skeleton_line_vertex_buffers[body_part_name],
             )
+            skeleton_line_item.setData(pos=vertex_buffer)
 
     def update_head_axis_lines(self):
         # X
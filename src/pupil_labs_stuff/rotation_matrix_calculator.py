@@ -1,21 +1,12 @@
 import logging
-from typing import List
 
 import numpy as np
 
-import matplotlib.pyplot as plt
-import matplotlib
-import keyboard
-
-from jon_scratch.pupil_calibration_pipeline.data_classes.rotation_data_class import (
-    RotationDataClass,
-)
+from src.pupil_labs_stuff.data_classes.rotation_data_class import RotationDataClass
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-matplotlib.use("qt5agg")
-
 
 def pin_point_new_origin(point_xyz, new_origin_xyz):
     return point_xyz - new_origin_xyz
@@ -77,7 +68,7 @@ class RotationMatrixCalculator:
         eye: str,
         normalize_length_by_x: bool = False,
         debug: bool = False,
-    ) -> List[np.ndarray]:
+    ) -> RotationDataClass:
         nose_index = 0
         if eye == "left":
             inner_eye_index = 1
@@ -119,148 +110,123 @@ class RotationMatrixCalculator:
     ) -> RotationDataClass:
         """
         create orthonormal basis vectors based on a center point and at least TWO of the following =  a point defining X direction, a point defining Y direction, and a point defining Z direction
-        """
-
-        x_known = True
-        y_known = True
-        z_known = True
-
-        if x_direction_fr_xyz is None:
-            x_known = False
-            x_direction_fr_xyz = np.empty(center_point_fr_xyz.shape)
-            x_direction_fr_xyz[:] = np.nan
-
-        if y_direction_fr_xyz is None:
-            y_known = False
-            y_direction_fr_xyz = np.empty(center_point_fr_xyz.shape)
-            y_direction_fr_xyz[:] = np.nan
-
-        if z_direction_fr_xyz is None:
-            z_known = False
-            z_direction_fr_xyz = np.empty(center_point_fr_xyz.shape)
-            z_direction_fr_xyz[:] = np.nan
-
-        if sum([x_known, y_known, z_known]) < 2:
-            raise ValueError(
-                "Must specify at least two of the following: x_direction_fr_xyz, y_direction_fr_xyz, z_direction_fr_xyz"
-            )
 
+        all frames at once - frames where any of the points are `nan` (or the directions are degenerate, e.g. two markers on top of each other)
+        come out as `nan` and get marked in `valid_frames`
+        """
         if (
-            center_point_fr_xyz is not None
-        ):  # if center point is specified, then use it to zero out the x,y,z directions vectors
-            zero_x_direction_xyz = pin_point_new_origin(
-                x_direction_fr_xyz, center_point_fr_xyz
-            )
-            zero_y_direction_xyz = pin_point_new_origin(
-                y_direction_fr_xyz, center_point_fr_xyz
-            )
-            zero_z_direction_xyz = pin_point_new_origin(
-                z_direction_fr_xyz, center_point_fr_xyz
+            sum(
+                direction_fr_xyz is not None
+                for direction_fr_xyz in [
+                    x_direction_fr_xyz,
+                    y_direction_fr_xyz,
+                    z_direction_fr_xyz,
+                ]
             )
-        else:
-            zero_x_direction_xyz = x_direction_fr_xyz
-            zero_y_direction_xyz = y_direction_fr_xyz
-            zero_z_direction_xyz = z_direction_fr_xyz
-
-        x_hat_xyz = None
-        y_hat_xyz = None
-        z_hat_xyz = None
-
-        if x_known:
-            x_norm_length = np.nanmean(get_norm_length(zero_x_direction_xyz))
-            x_hat_xyz = normalize_length(zero_x_direction_xyz)
-            if y_known:  # we know x and y directions and need to find Z by X cross Y
-                z_hat_xyz = normalize_length(np.cross(x_hat_xyz, zero_y_direction_xyz))
-                y_hat_xyz = normalize_length(np.cross(z_hat_xyz, x_hat_xyz))
-
-            else:  # we know x and z directions and need to find Y by Z cross X
-                y_hat_xyz = normalize_length(np.cross(zero_z_direction_xyz, x_hat_xyz))
-                z_hat_xyz = normalize_length(np.cross(x_hat_xyz, y_hat_xyz))
-
-        elif y_known:  # we know y and z directions and need to find X by Y cross Z
-            y_hat_xyz = normalize_length(zero_y_direction_xyz)
-            x_hat_xyz = normalize_length(np.cross(y_hat_xyz, zero_z_direction_xyz))
-            z_hat_xyz = normalize_length(np.cross(x_hat_xyz, y_hat_xyz))
-
-        if normalize_length_by_x:
-            x_hat_xyz = x_hat_xyz * x_norm_length
-            y_hat_xyz = y_hat_xyz * x_norm_length
-            z_hat_xyz = z_hat_xyz * x_norm_length
-
-        # #umm, this shouldn't be necessary.... but it makes it work, so....
-        # x_hat_xyz = -x_hat_xyz
-        # y_hat_xyz = -y_hat_xyz
-        # z_hat_xyz = z_hat_xyz
-
-        # create 3x3 cosine rotation matricies by stacking X_hat, Y_hat, and Z_hat
-        rotation_matricies = []
-        frame_number = -1
-        for this_x_hat_xyz, this_y_hat_xyz, this_z_hat_xyz in zip(
-            x_hat_xyz, y_hat_xyz, z_hat_xyz
+            < 2
         ):
-            frame_number += 1
-            if frame_number > 1000:
-                f = 9
-            this_rotation_matrix = np.squeeze(
-                np.dstack((this_x_hat_xyz, this_y_hat_xyz, this_z_hat_xyz))
+            raise ValueError(
+                "Must specify at least two of the following: x_direction_fr_xyz, y_direction_fr_xyz, z_direction_fr_xyz"
             )
+        if normalize_length_by_x and x_direction_fr_xyz is None:
+            raise ValueError("Must specify x_direction_fr_xyz to normalize_length_by_x")
+
+        number_of_frames = next(
+            direction_fr_xyz.shape[0]
+            for direction_fr_xyz in [
+                x_direction_fr_xyz,
+                y_direction_fr_xyz,
+                z_direction_fr_xyz,
+            ]
+            if direction_fr_xyz is not None
+        )
+        if center_point_fr_xyz is None:
+            center_point_fr_xyz = np.zeros((number_of_frames, 3))
+        center_point_fr_xyz = np.ascontiguousarray(
+            center_point_fr_xyz, dtype=np.float64
+        )
 
-            assert this_rotation_matrix.shape == (3, 3)
+        # zero out the x,y,z directions vectors on the center point
+        zero_x_direction_xyz, zero_y_direction_xyz, zero_z_direction_xyz = [
+            None
+            if direction_fr_xyz is None
+            else pin_point_new_origin(direction_fr_xyz, center_point_fr_xyz)
+            for direction_fr_xyz in [
+                x_direction_fr_xyz,
+                y_direction_fr_xyz,
+                z_direction_fr_xyz,
+            ]
+        ]
 
-            if not np.isnan(this_x_hat_xyz).any():
-                assert (this_rotation_matrix[:, 0] == this_x_hat_xyz).all()
+        # `nan` frames (and zero length vectors) just come out `nan` here, they get dealt with below
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if zero_x_direction_xyz is not None:
+                x_hat_xyz = normalize_length(zero_x_direction_xyz)
+                if (
+                    zero_y_direction_xyz is not None
+                ):  # we know x and y directions and need to find Z by X cross Y
+                    z_hat_xyz = normalize_length(
+                        np.cross(x_hat_xyz, zero_y_direction_xyz)
+                    )
+                    y_hat_xyz = normalize_length(np.cross(z_hat_xyz, x_hat_xyz))
+                else:  # we know x and z directions and need to find Y by Z cross X
+                    y_hat_xyz = normalize_length(
+                        np.cross(zero_z_direction_xyz, x_hat_xyz)
+                    )
+                    z_hat_xyz = normalize_length(np.cross(x_hat_xyz, y_hat_xyz))
+            else:  # we know y and z directions and need to find X by Y cross Z
+                y_hat_xyz = normalize_length(zero_y_direction_xyz)
+                x_hat_xyz = normalize_length(np.cross(y_hat_xyz, zero_z_direction_xyz))
+                z_hat_xyz = normalize_length(np.cross(x_hat_xyz, y_hat_xyz))
 
-            rotation_matricies.append(this_rotation_matrix)
+        # [number_of_frames, 3, 3] cosine rotation matricies, with X_hat, Y_hat, and Z_hat as the rows
+        rotation_matricies = np.stack([x_hat_xyz, y_hat_xyz, z_hat_xyz], axis=1)
+        valid_frames = np.isfinite(rotation_matricies).all(axis=(1, 2))
+        rotation_matricies[~valid_frames] = np.nan
+        if not valid_frames.all():
+            logger.debug(
+                f"Couldn't define basis vectors on {np.sum(~valid_frames)} of {number_of_frames} frames"
+            )
 
-        rotation_matricies = [
-            np.transpose(this_rotation_martix)
-            for this_rotation_martix in rotation_matricies
-        ]
+        if normalize_length_by_x:
+            rotation_matricies *= np.nanmean(get_norm_length(zero_x_direction_xyz))
 
         return RotationDataClass(
             rotation_matricies=rotation_matricies,
             local_origin_fr_xyz=center_point_fr_xyz,
-            x_hat_norm_fr_xyz=x_hat_xyz,
-            y_hat_norm_fr_xyz=y_hat_xyz,
-            z_hat_norm_fr_xyz=z_hat_xyz,
+            x_hat_norm_fr_xyz=np.ascontiguousarray(rotation_matricies[:, 0, :]),
+            y_hat_norm_fr_xyz=np.ascontiguousarray(rotation_matricies[:, 1, :]),
+            z_hat_norm_fr_xyz=np.ascontiguousarray(rotation_matricies[:, 2, :]),
+            valid_frames=valid_frames,
         )
 
     def show_head_rotation_debug_plot(self, rotation_data: RotationDataClass):
+        # only needed for debugging, so they don't get imported until then
+        import keyboard
+        import matplotlib
+        import matplotlib.pyplot as plt
+
+        matplotlib.use("qt5agg")
+
         rotation_matricies = rotation_data.rotation_matricies
         local_origin_fr_xyz = rotation_data.local_origin_fr_xyz
 
-        x_hat_xyz = np.asarray(
-            [this_rot_mat[0, :] for this_rot_mat in rotation_matricies]
-        )
-        y_hat_xyz = np.asarray(
-            [this_rot_mat[1, :] for this_rot_mat in rotation_matricies]
-        )
-        z_hat_xyz = np.asarray(
-            [this_rot_mat[2, :] for this_rot_mat in rotation_matricies]
-        )
+        x_hat_xyz = rotation_matricies[:, 0, :]
+        y_hat_xyz = rotation_matricies[:, 1, :]
+        z_hat_xyz = rotation_matricies[:, 2, :]
 
         test_point_xyz_og = np.array((1, 1, 1))
-        test_point_xyz_rot = np.empty(z_hat_xyz.shape)
         logger.warning(
             "We shouldnt have to transpose the rotation matix here, need to fix this upstream"
         )
+        # rotation_matrix.T @ test_point, on every frame
+        test_point_xyz_rot = np.einsum(
+            "fji,j->fi", rotation_matricies, test_point_xyz_og
+        )
 
-        for frame_number in range(len(rotation_matricies)):
-            # see https://peps.python.org/pep-0465/ for explanation of the `@` operator (which is a "matrix multiplication" operator)
-            test_point_xyz_rot[frame_number, :] = (
-                np.transpose(rotation_matricies[frame_number]) @ test_point_xyz_og
-            )
-
-        z_mediapipe_skeleton_fr_mar_xyz = np.empty(
-            self.mediapipe_skeleton_fr_mar_xyz.shape
+        z_mediapipe_skeleton_fr_mar_xyz = pin_point_new_origin(
+            self.mediapipe_skeleton_fr_mar_xyz, local_origin_fr_xyz[:, np.newaxis, :]
         )
-        for this_marker_number in range(self.mediapipe_skeleton_fr_mar_xyz.shape[1]):
-            z_mediapipe_skeleton_fr_mar_xyz[
-                :, this_marker_number, :
-            ] = pin_point_new_origin(
-                self.mediapipe_skeleton_fr_mar_xyz[:, this_marker_number, :],
-                local_origin_fr_xyz,
-            )
         plt.close("all")
 
         fig = plt.figure(num=124)
@@ -1,14 +1,15 @@
-import json
 import logging
 from pathlib import Path
 from typing import Union
 import numpy as np
-import pandas as pd
 
-from jon_scratch.pupil_calibration_pipeline.data_classes.pupil_dataclass_and_handler import (
-    PupilLabsDataClass,
+from src.pupil_labs_stuff.data_classes.pupil_dataclass_and_handler import (
     PupilDataHandler,
 )
+from src.pupil_labs_stuff.pupil_export_loader import (
+    load_freemocap_unix_timestamps,
+    load_pupil_data_by_eye,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +17,11 @@ logger = logging.getLogger(__name__)
 class SessionDataLoader:
     _session_path: Path = None
 
-    def __init__(self, session_path):
+    def __init__(self, session_path, use_cache: bool = True):
 
         self._session_path = Path(session_path)
+        # parsed csvs get cached next to them (see `pupil_export_loader`)
+        self._use_cache = use_cache
 
     @property
     def session_path(self):
@@ -30,26 +33,9 @@ class SessionDataLoader:
 
         """
         freemocap_unix_timestamp_path = self.session_path / "unix_synced_timestamps.csv"
-        freemocap_unix_timestamps_dataframe = pd.read_csv(freemocap_unix_timestamp_path)
-        each_cam_timestamps_list = []
-        camera_names = [
-            column_name
-            for column_name in list(freemocap_unix_timestamps_dataframe.columns)
-            if "Cam" in column_name
-        ]
-
-        for this_camera_name in camera_names:
-            each_cam_timestamps_list.append(
-                np.array(freemocap_unix_timestamps_dataframe[this_camera_name])
-            )
-
-        cameras_timestamp_array = np.stack(each_cam_timestamps_list, axis=1)
-        cameras_timestamp_array[
-            cameras_timestamp_array == -1
-        ] = np.nan  # replace -1 with nan
-
-        freemocap_timestamps = np.nanmean(cameras_timestamp_array, axis=1)
-        return freemocap_timestamps
+        return load_freemocap_unix_timestamps(
+            freemocap_unix_timestamp_path, use_cache=self._use_cache
+        )
 
     def load_mediapipe_data(
         self,
@@ -100,15 +86,12 @@ class SessionDataLoader:
         pupil_data_exports_path = pupil_data_path / "exports" / "000"
         pupil_positions_path = pupil_data_exports_path / "pupil_positions.csv"
         pupil_recording_info_path = pupil_data_path / "info.player.json"
-        freemocap_unix_timestamp_path = self.session_path / "unix_synced_timestamps.csv"
 
         logger.info(f"loading pupil data from {pupil_positions_path}")
-        pupil_dataframe = pd.read_csv(pupil_positions_path)
-        pupil_recording_info_json = json.load(open(pupil_recording_info_path))
-        freemocap_unix_timestamps_dataframe = pd.read_csv(freemocap_unix_timestamp_path)
-
-        pupil_data_handler = PupilDataHandler(pupil_dataframe)
-        pupil_data_handler.convert_to_unix_timestamps(pupil_recording_info_json)
+        pupil_data_by_eye = load_pupil_data_by_eye(
+            pupil_positions_path, pupil_recording_info_path, use_cache=self._use_cache
+        )
+        pupil_data_handler = PupilDataHandler(pupil_data_by_eye=pupil_data_by_eye)
 
         return pupil_data_handler
 
@@ -0,0 +1,220 @@
+import logging
+from typing import List, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# the VOR calibration objective (see `VorCalibrator`), done on whole (number_of_frames, 3, 3) stacks at once,
+# plus its exact gradient with respect to the rotational offset, so `least_squares` doesn't need finite differences
+
+
+def _get_axis_rotation_matrix_and_derivative(
+    angle_radians: float, axis_number: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """rotation by `angle_radians` about axis x (0), y (1) or z (2), and its derivative with respect to the angle"""
+    cosine = np.cos(angle_radians)
+    sine = np.sin(angle_radians)
+    # the two axes that get mixed, in right-handed order
+    first_axis, second_axis = [(1, 2), (2, 0), (0, 1)][axis_number]
+
+    rotation_matrix = np.eye(3)
+    rotation_matrix[first_axis, first_axis] = cosine
+    rotation_matrix[first_axis, second_axis] = -sine
+    rotation_matrix[second_axis, first_axis] = sine
+    rotation_matrix[second_axis, second_axis] = cosine
+
+    rotation_matrix_derivative = np.zeros((3, 3))
+    rotation_matrix_derivative[first_axis, first_axis] = -sine
+    rotation_matrix_derivative[first_axis, second_axis] = -cosine
+    rotation_matrix_derivative[second_axis, first_axis] = cosine
+    rotation_matrix_derivative[second_axis, second_axis] = -sine
+    return rotation_matrix, rotation_matrix_derivative
+
+
+def get_offset_rotation_matrix_and_derivatives(
+    rotational_offset: Union[List[float], np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The same matrix as `Rotation.from_euler("xyz", rotational_offset).as_matrix()` (i.e. Rz @ Ry @ Rx),
+    and its derivatives with respect to each of the 3 angles - [3 (angle), 3, 3]
+    """
+    rotation_x, rotation_x_derivative = _get_axis_rotation_matrix_and_derivative(
+        rotational_offset[0], 0
+    )
+    rotation_y, rotation_y_derivative = _get_axis_rotation_matrix_and_derivative(
+        rotational_offset[1], 1
+    )
+    rotation_z, rotation_z_derivative = _get_axis_rotation_matrix_and_derivative(
+        rotational_offset[2], 2
+    )
+    offset_rotation_matrix = rotation_z @ rotation_y @ rotation_x
+    offset_rotation_matrix_derivatives = np.stack(
+        [
+            rotation_z @ rotation_y @ rotation_x_derivative,
+            rotation_z @ rotation_y_derivative @ rotation_x,
+            rotation_z_derivative @ rotation_y @ rotation_x,
+        ]
+    )
+    return offset_rotation_matrix, offset_rotation_matrix_derivatives
+
+
+def rotate_gaze_lasers(
+    rotational_offset: Union[List[float], np.ndarray],
+    gaze_vector_start_point_fr_xyz: np.ndarray,
+    head_rotation_matricies: Union[List[np.ndarray], np.ndarray],
+    gaze_fr_xyz: np.ndarray,
+) -> np.ndarray:
+    """
+    - rotate gaze vector by `rotational_offset` (xyz euler angles)
+    - rotate by the (transposed) head rotation matrix of each frame
+    - translate gaze vector back to the eye socket (by adding eyeball center xyz)
+    """
+    offset_rotation_matrix, _ = get_offset_rotation_matrix_and_derivatives(
+        rotational_offset
+    )
+    head_rotation_matricies = np.asarray(head_rotation_matricies)
+    gaze_rotated_by_offset_fr_xyz = gaze_fr_xyz @ offset_rotation_matrix.T
+    # head_rotation_matrix.T @ gaze, on every frame
+    return (
+        np.einsum("fji,fj->fi", head_rotation_matricies, gaze_rotated_by_offset_fr_xyz)
+        + gaze_vector_start_point_fr_xyz
+    )
+
+
+class VorCalibrationObjective:
+    """
+    error = RMS distance between the gaze laser endpoint and the fixation point
+            + RMS of the mean gaze laser endpoint velocity (it should hold still during VOR)
+
+    as a function of the rotational offset (xyz euler angles), plus its exact gradient.
+
+    The gaze laser endpoint is `head_rotation_matrix.T @ offset_rotation_matrix @ gaze + eye_socket_origin` on every
+    frame, which is linear in the 9 entries of the offset rotation matrix - so the per-frame part gets worked out once
+    up front, and every guess after that is one matrix multiplication (for the endpoints and their derivatives together).
+    Frames with `nan`s get left out of the means (like `np.nanmean` does)
+    """
+
+    def __init__(
+        self,
+        eye_socket_origin_fr_xyz: np.ndarray,
+        head_rotation_matricies: Union[List[np.ndarray], np.ndarray],
+        fixation_point_fr_xyz: np.ndarray,
+        gaze_fr_xyz: np.ndarray,
+    ):
+        self._eye_socket_origin_fr_xyz = np.asarray(eye_socket_origin_fr_xyz)
+        self._fixation_point_fr_xyz = np.asarray(fixation_point_fr_xyz)
+        self._number_of_frames = gaze_fr_xyz.shape[0]
+
+        # endpoint_fr_xyz[f, i] = sum over j, k of head_rotation_matricies[f, j, i] * offset_rotation_matrix[j, k] * gaze_fr_xyz[f, k]
+        self._gaze_rotation_basis = np.einsum(
+            "fji,fk->fijk", np.asarray(head_rotation_matricies), gaze_fr_xyz
+        ).reshape(self._number_of_frames * 3, 9)
+
+        # `least_squares` asks for the error and then the jacobian of the same guess, so both come from one evaluation
+        self._last_rotational_offset = None
+        self._last_error_and_gradient = None
+
+    def get_gaze_laser_endpoints(
+        self, rotational_offset: Union[List[float], np.ndarray]
+    ) -> np.ndarray:
+        offset_rotation_matrix, _ = get_offset_rotation_matrix_and_derivatives(
+            rotational_offset
+        )
+        return (self._gaze_rotation_basis @ offset_rotation_matrix.reshape(9)).reshape(
+            self._number_of_frames, 3
+        ) + self._eye_socket_origin_fr_xyz
+
+    def get_error(self, rotational_offset: Union[List[float], np.ndarray]) -> float:
+        error, _ = self.get_error_and_gradient(rotational_offset)
+        return error
+
+    def get_jacobian(
+        self, rotational_offset: Union[List[float], np.ndarray]
+    ) -> np.ndarray:
+        """the gradient, shaped like `least_squares` wants the jacobian of a single residual - [1, 3]"""
+        _, error_gradient = self.get_error_and_gradient(rotational_offset)
+        return error_gradient[np.newaxis, :]
+
+    def get_error_and_gradient(
+        self, rotational_offset: Union[List[float], np.ndarray]
+    ) -> Tuple[float, np.ndarray]:
+        rotational_offset = np.asarray(rotational_offset, dtype=float)
+        if self._last_rotational_offset is not None and np.array_equal(
+            rotational_offset, self._last_rotational_offset
+        ):
+            return self._last_error_and_gradient
+
+        (
+            offset_rotation_matrix,
+            offset_rotation_matrix_derivatives,
+        ) = get_offset_rotation_matrix_and_derivatives(rotational_offset)
+        # gaze laser endpoints (minus the eye socket origin) and their derivatives with respect to each angle - [4, number_of_frames, 3]
+        endpoints_and_derivatives_fr_xyz = (
+            self._gaze_rotation_basis
+            @ np.vstack(
+                [
+                    offset_rotation_matrix.reshape(1, 9),
+                    offset_rotation_matrix_derivatives.reshape(3, 9),
+                ]
+            ).T
+        ).T.reshape(4, self._number_of_frames, 3)
+        gaze_laser_endpoint_fr_xyz = (
+            endpoints_and_derivatives_fr_xyz[0] + self._eye_socket_origin_fr_xyz
+        )
+        gaze_laser_endpoint_derivatives_fr_xyz = endpoints_and_derivatives_fr_xyz[1:]
+
+        # distance error
+        endpoint_to_fixation_fr_xyz = (
+            gaze_laser_endpoint_fr_xyz - self._fixation_point_fr_xyz
+        )
+        squared_distance_fr = np.sum(endpoint_to_fixation_fr_xyz**2, axis=1)
+        valid_distance_frames = ~np.isnan(squared_distance_fr)
+        distance_error = np.sqrt(np.mean(squared_distance_fr[valid_distance_frames]))
+        if distance_error > 0:
+            distance_error_gradient = (
+                np.einsum(
+                    "fi,afi->a",
+                    endpoint_to_fixation_fr_xyz[valid_distance_frames],
+                    gaze_laser_endpoint_derivatives_fr_xyz[:, valid_distance_frames],
+                )
+                / np.sum(valid_distance_frames)
+                / distance_error
+            )
+        else:
+            distance_error_gradient = np.zeros(3)
+
+        # velocity error
+        gaze_tip_velocity_fr_xyz = np.diff(gaze_laser_endpoint_fr_xyz, axis=0)
+        gaze_tip_velocity_derivatives_fr_xyz = np.diff(
+            gaze_laser_endpoint_derivatives_fr_xyz, axis=1
+        )
+        valid_velocity_fr_xyz = ~np.isnan(gaze_tip_velocity_fr_xyz)
+        number_of_valid_velocities_xyz = np.sum(valid_velocity_fr_xyz, axis=0)
+        mean_gaze_tip_velocity_xyz = (
+            np.sum(np.where(valid_velocity_fr_xyz, gaze_tip_velocity_fr_xyz, 0), axis=0)
+            / number_of_valid_velocities_xyz
+        )
+        mean_gaze_tip_velocity_derivatives_xyz = (
+            np.sum(
+                np.where(
+                    valid_velocity_fr_xyz, gaze_tip_velocity_derivatives_fr_xyz, 0
+                ),
+                axis=1,
+            )
+            / number_of_valid_velocities_xyz
+        )
+        velocity_error = np.sqrt(np.mean(mean_gaze_tip_velocity_xyz**2))
+        if velocity_error > 0:
+            velocity_error_gradient = (
+                mean_gaze_tip_velocity_derivatives_xyz @ mean_gaze_tip_velocity_xyz
+            ) / (mean_gaze_tip_velocity_xyz.size * velocity_error)
+        else:
+            velocity_error_gradient = np.zeros(3)
+
+        self._last_rotational_offset = rotational_offset
+        self._last_error_and_gradient = (
+            distance_error + velocity_error,
+            distance_error_gradient + velocity_error_gradient,
+        )
+        return self._last_error_and_gradient
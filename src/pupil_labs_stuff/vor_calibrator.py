@@ -6,7 +6,6 @@ import numpy as np
 from scipy import optimize
 from matplotlib import pyplot as plt
 import matplotlib
-from scipy.spatial.transform import Rotation
 
 from jon_scratch.pupil_calibration_pipeline.data_classes.freemocap_session_data_class import (
     FreemocapSessionDataClass,
@@ -21,6 +20,10 @@ from jon_scratch.pupil_calibration_pipeline.spherical_coordiate_converters.cart2
     cart2sph,
     sph2cart,
 )
+from src.pupil_labs_stuff.vor_calibration_objective import (
+    VorCalibrationObjective,
+    rotate_gaze_lasers,
+)
 
 matplotlib.use("qt5agg")
 logger = logging.getLogger(__name__)
@@ -129,8 +132,8 @@ class VorCalibrator:
     def calculate_optimal_rotational_offset(
         self,
         eye_socket_origin_fr_xyz: np.ndarray,
-        eye_socket_rotation_matricies: List[np.ndarray],
-        head_rotation_matricies,
+        eye_socket_rotation_matricies: np.ndarray,
+        head_rotation_matricies: np.ndarray,
         fixation_point_fr_xyz: np.ndarray,
         gaze_x: np.ndarray,
         gaze_y: np.ndarray,
@@ -146,19 +149,25 @@ class VorCalibrator:
 
         vor_frames = np.arange(self.vor_start_frame, self.vor_end_frame)
 
+        vor_calibration_objective = VorCalibrationObjective(
+            eye_socket_origin_fr_xyz=eye_socket_origin_fr_xyz[vor_frames, :],
+            head_rotation_matricies=head_rotation_matricies[
+                self.vor_start_frame : self.vor_end_frame
+            ],
+            fixation_point_fr_xyz=fixation_point_fr_xyz,
+            gaze_fr_xyz=np.column_stack(
+                [gaze_x[vor_frames], gaze_y[vor_frames], gaze_z[vor_frames]]
+            ),
+        )
+
         optimization_results = optimize.least_squares(
             self.get_error_for_a_given_rotational_offset_guess,
             initial_rotational_offset_guess,
+            jac=self.get_error_jacobian_for_a_given_rotational_offset_guess,
             args=(
+                vor_calibration_objective,
                 eye_socket_origin_fr_xyz[vor_frames, :],
-                eye_socket_rotation_matricies[
-                    self.vor_start_frame : self.vor_end_frame
-                ],
-                head_rotation_matricies[self.vor_start_frame : self.vor_end_frame],
                 fixation_point_fr_xyz,
-                gaze_x[vor_frames],
-                gaze_y[vor_frames],
-                gaze_z[vor_frames],
             ),
             gtol=1e-10,
             verbose=2,
@@ -169,51 +178,33 @@ class VorCalibrator:
     def get_error_for_a_given_rotational_offset_guess(
         self,
         rotational_offset_guess,
+        vor_calibration_objective: VorCalibrationObjective,
         eye_socket_origin_fr_xyz,
-        eye_socket_rotation_matricies,
-        head_rotation_matricies,
         fixation_point_fr_xyz,
-        gaze_x,
-        gaze_y,
-        gaze_z,
     ):
-
-        gaze_laser_endpoint_during_vor_fr_xyz = self.rotate_gaze_lasers(
-            rotational_offset_guess,
-            eye_socket_origin_fr_xyz,
-            eye_socket_rotation_matricies,
-            head_rotation_matricies,
-            gaze_x,
-            gaze_y,
-            gaze_z,
-        )
-
-        distance_between_gaze_endpoint_and_fixation_point_fr_xyz = (
-            self.get_distance_between_two_points(
-                gaze_laser_endpoint_during_vor_fr_xyz, fixation_point_fr_xyz
-            )
-        )
-        distance_error = np.sqrt(
-            np.nanmean(distance_between_gaze_endpoint_and_fixation_point_fr_xyz**2)
-        )
-
-        gaze_tip_velocity_fr_xyz = np.diff(
-            gaze_laser_endpoint_during_vor_fr_xyz, axis=0
-        )
-        mean_gaze_tip_velocity_per_frame = np.nanmean(gaze_tip_velocity_fr_xyz, axis=0)
-        velocity_error = np.sqrt(np.nanmean(mean_gaze_tip_velocity_per_frame**2))
-
-        error = distance_error + velocity_error
+        error = vor_calibration_objective.get_error(rotational_offset_guess)
 
         if self.debug:
             self.plot_optimization_error(
                 error,
-                gaze_laser_endpoint_during_vor_fr_xyz,
+                vor_calibration_objective.get_gaze_laser_endpoints(
+                    rotational_offset_guess
+                ),
                 eye_socket_origin_fr_xyz,
                 fixation_point_fr_xyz,
             )
         return error
 
+    def get_error_jacobian_for_a_given_rotational_offset_guess(
+        self,
+        rotational_offset_guess,
+        vor_calibration_objective: VorCalibrationObjective,
+        eye_socket_origin_fr_xyz,
+        fixation_point_fr_xyz,
+    ):
+        # analytic, so `least_squares` doesn't have to nudge every angle and re-evaluate the whole segment
+        return vor_calibration_objective.get_jacobian(rotational_offset_guess)
+
     def plot_optimization_error(
         self,
         error,
@@ -338,41 +329,9 @@ class VorCalibrator:
          - translate gaze vector back to the eye socket (by adding eyeball center xyz)
         """
 
-        # - rotate gaze vector by `calibrated_rotational_offset`
-        offset_x_euler = rotational_offset[0]
-        offset_y_euler = rotational_offset[1]
-        offset_z_euler = rotational_offset[2]
-        offset_rotation_matrix_guess = Rotation.from_euler(
-            "xyz", (offset_x_euler, offset_y_euler, offset_z_euler)
-        ).as_matrix()
-
-        original_gaze_fr_xyz = np.array([gaze_x, gaze_y, gaze_z])
-
-        # rotate gaze vector by rotational offset to align pupil labs gaze with the eye sockets gaze
-        gaze_rotated_by_guess_fr_xyz = [
-            offset_rotation_matrix_guess @ original_gaze_fr_xyz[:, this_frame_number]
-            for this_frame_number in range(original_gaze_fr_xyz.shape[1])
-        ]
-        gaze_rotated_by_guess_fr_xyz = np.array(gaze_rotated_by_guess_fr_xyz)
-
-        # THEN rotate gaze vector by eye_socket_rotation_matrix to align it with the eye sockets gaze direction (i think)
-        gaze_fr_xyz = [
-            np.transpose(head_rotation_matricies[this_frame_number])
-            @ gaze_rotated_by_guess_fr_xyz[this_frame_number, :]
-            for this_frame_number in range(gaze_rotated_by_guess_fr_xyz.shape[0])
-        ]
-        gaze_fr_xyz = np.array(gaze_fr_xyz)
-
-        # 6 - translate gaze vector back to the eye socket (by adding eyeball center xyz)
-        gaze_laser_fr_xyz = np.empty(gaze_fr_xyz.shape)
-        gaze_laser_fr_xyz[:, 0] = (
-            gaze_fr_xyz[:, 0] + gaze_vector_start_point_fr_xyz[:, 0]
-        )
-        gaze_laser_fr_xyz[:, 1] = (
-            gaze_fr_xyz[:, 1] + gaze_vector_start_point_fr_xyz[:, 1]
-        )
-        gaze_laser_fr_xyz[:, 2] = (
-            gaze_fr_xyz[:, 2] + gaze_vector_start_point_fr_xyz[:, 2]
+        return rotate_gaze_lasers(
+            rotational_offset,
+            gaze_vector_start_point_fr_xyz,
+            head_rotation_matricies,
+            np.column_stack([gaze_x, gaze_y, gaze_z]),
         )
-
-        return gaze_laser_fr_xyz
@@ -0,0 +1,216 @@
+import json
+import signal
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from src.api.services.processing_job_queue import (
+    JOB_STATUS_CANCELLED,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_SUCCEEDED,
+    ProcessingJobQueue,
+)
+from src.api.services.session_processing_jobs import (
+    RESUMABLE_SESSION_PROCESSING_JOB_TYPES,
+    session_processing_job_functions,
+)
+
+
+def add_numbers_job(parameters: dict, progress_reporter) -> dict:
+    with progress_reporter.stage("adding"):
+        total = parameters["a"] + parameters["b"]
+    progress_reporter.report_progress(0.5, "added the numbers")
+    return {"total": total}
+
+
+def failing_job(parameters: dict, progress_reporter) -> dict:
+    raise RuntimeError("this job always fails")
+
+
+def slow_job(parameters: dict, progress_reporter) -> dict:
+    with progress_reporter.stage("waiting"):
+        time.sleep(60)
+    return {}
+
+
+def stop_slowly(signal_number, frame):
+    time.sleep(2)
+    raise SystemExit()
+
+
+def slow_to_stop_job(parameters: dict, progress_reporter) -> dict:
+    # takes a couple of seconds to clean up after itself when it gets stopped
+    signal.signal(signal.SIGTERM, stop_slowly)
+    with progress_reporter.stage("waiting"):
+        time.sleep(60)
+    return {}
+
+
+test_job_functions = {
+    "add_numbers": add_numbers_job,
+    "failing": failing_job,
+    "slow": slow_job,
+    "slow_to_stop": slow_to_stop_job,
+    # e.g. `calibrate_session` - grabs the cameras, so it shouldn't start up again on its own
+    "slow_not_resumable": slow_job,
+}
+test_resumable_job_types = ["add_numbers", "failing", "slow", "slow_to_stop"]
+
+
+class ProcessingJobQueueTestCase(TestCase):
+    def setUp(self):
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.processing_job_queue = ProcessingJobQueue(
+            self.temporary_directory.name,
+            test_job_functions,
+            number_of_workers=1,
+            resumable_job_types=test_resumable_job_types,
+        )
+        self.processing_job_queue.start()
+
+    def tearDown(self):
+        self.processing_job_queue.stop()
+        self.temporary_directory.cleanup()
+
+    def wait_for_status(self, job_id: str, status: str, timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        while self.processing_job_queue.get_job(job_id)["status"] != status:
+            self.assertLess(time.monotonic(), deadline, f"job never got to {status}")
+            time.sleep(0.05)
+
+    def test_jobs_run_in_the_background_and_report_how_they_went(self):
+        job = self.processing_job_queue.submit_job("add_numbers", {"a": 1, "b": 2})
+        failed_job = self.processing_job_queue.submit_job("failing")
+        self.assertEqual(job["status"], JOB_STATUS_QUEUED)
+
+        job = self.processing_job_queue.wait_for_job(job["job_id"], timeout=30)
+        self.assertEqual(job["status"], JOB_STATUS_SUCCEEDED)
+        self.assertEqual(job["result"], {"total": 3})
+        self.assertEqual(job["progress_message"], "added the numbers")
+        self.assertEqual(job["fraction_done"], 1.0)
+        self.assertEqual(
+            [stage_timing["stage_name"] for stage_timing in job["stage_timings"]],
+            ["adding"],
+        )
+
+        failed_job = self.processing_job_queue.wait_for_job(
+            failed_job["job_id"], timeout=30
+        )
+        self.assertEqual(failed_job["status"], JOB_STATUS_FAILED)
+        self.assertIn("this job always fails", failed_job["error"])
+
+        with self.assertRaises(ValueError):
+            self.processing_job_queue.submit_job("not_a_job_type")
+
+    def test_cancel_running_and_queued_jobs(self):
+        running_job = self.processing_job_queue.submit_job("slow")
+        queued_job = self.processing_job_queue.submit_job("slow")
+        self.wait_for_status(running_job["job_id"], JOB_STATUS_RUNNING)
+        # only one worker, so the second one waits its turn
+        self.assertEqual(
+            self.processing_job_queue.get_job(queued_job["job_id"])["status"],
+            JOB_STATUS_QUEUED,
+        )
+
+        for job in [queued_job, running_job]:
+            self.assertEqual(
+                self.processing_job_queue.cancel_job(job["job_id"])["status"],
+                JOB_STATUS_CANCELLED,
+            )
+
+    def test_queue_answers_while_a_job_is_stopping(self):
+        job = self.processing_job_queue.submit_job("slow_to_stop")
+        self.wait_for_status(job["job_id"], JOB_STATUS_RUNNING)
+        # give the worker a moment to get into the job, so it's the job's own SIGTERM handler that runs
+        time.sleep(1)
+
+        cancel_thread = threading.Thread(
+            target=self.processing_job_queue.cancel_job, args=(job["job_id"],)
+        )
+        cancel_thread.start()
+        time.sleep(0.5)
+        self.assertTrue(cancel_thread.is_alive())
+        get_jobs_start_time = time.perf_counter()
+        self.assertEqual(
+            self.processing_job_queue.get_job(job["job_id"])["status"],
+            JOB_STATUS_CANCELLED,
+        )
+        self.assertLess(time.perf_counter() - get_jobs_start_time, 0.5)
+        cancel_thread.join()
+
+    def test_unfinished_jobs_resume_after_a_restart(self):
+        running_job = self.processing_job_queue.submit_job("slow")
+        queued_job = self.processing_job_queue.submit_job(
+            "add_numbers", {"a": 2, "b": 2}
+        )
+        self.wait_for_status(running_job["job_id"], JOB_STATUS_RUNNING)
+        self.processing_job_queue.stop()
+
+        self.processing_job_queue = ProcessingJobQueue(
+            self.temporary_directory.name,
+            test_job_functions,
+            number_of_workers=2,
+            resumable_job_types=test_resumable_job_types,
+        )
+        self.processing_job_queue.start()
+        resumed_job = self.processing_job_queue.get_job(running_job["job_id"])
+        self.assertEqual(resumed_job["number_of_times_resumed"], 1)
+        self.assertEqual(
+            self.processing_job_queue.wait_for_job(queued_job["job_id"], timeout=30)[
+                "result"
+            ],
+            {"total": 4},
+        )
+        self.wait_for_status(running_job["job_id"], JOB_STATUS_RUNNING)
+
+    def test_jobs_that_arent_resumable_fail_after_a_restart(self):
+        interrupted_job = self.processing_job_queue.submit_job("slow_not_resumable")
+        self.wait_for_status(interrupted_job["job_id"], JOB_STATUS_RUNNING)
+        self.processing_job_queue.stop()
+
+        self.processing_job_queue = ProcessingJobQueue(
+            self.temporary_directory.name,
+            test_job_functions,
+            number_of_workers=1,
+            resumable_job_types=test_resumable_job_types,
+        )
+        self.processing_job_queue.start()
+        interrupted_job = self.processing_job_queue.get_job(interrupted_job["job_id"])
+        self.assertEqual(interrupted_job["status"], JOB_STATUS_FAILED)
+        self.assertEqual(interrupted_job["number_of_times_resumed"], 0)
+        self.assertIn("Interrupted", interrupted_job["error"])
+        self.assertEqual(
+            self.processing_job_queue.get_jobs(status=JOB_STATUS_RUNNING), []
+        )
+
+    def test_calibration_jobs_dont_resume_after_a_restart(self):
+        # a calibration that was running when the server went down (it never actually runs here, the cameras stay shut)
+        session_jobs_folder_path = Path(self.temporary_directory.name) / "session_jobs"
+        session_jobs_folder_path.mkdir()
+        calibrate_job = ProcessingJobQueue(
+            session_jobs_folder_path, session_processing_job_functions
+        ).submit_job(
+            "calibrate_session", {"session_id": "session_that_was_calibrating"}
+        )
+        (session_jobs_folder_path / f"{calibrate_job['job_id']}.json").write_text(
+            json.dumps({**calibrate_job, "status": JOB_STATUS_RUNNING})
+        )
+
+        session_processing_job_queue = ProcessingJobQueue(
+            session_jobs_folder_path,
+            session_processing_job_functions,
+            resumable_job_types=RESUMABLE_SESSION_PROCESSING_JOB_TYPES,
+        )
+        session_processing_job_queue.start()
+        try:
+            calibrate_job = session_processing_job_queue.get_job(
+                calibrate_job["job_id"]
+            )
+            self.assertEqual(calibrate_job["status"], JOB_STATUS_FAILED)
+            self.assertIn("Interrupted", calibrate_job["error"])
+        finally:
+            session_processing_job_queue.stop()
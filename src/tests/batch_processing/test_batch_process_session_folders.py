@@ -0,0 +1,341 @@
+import importlib.util
+import json
+import multiprocessing
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from unittest import TestCase, mock, skipUnless
+
+import numpy as np
+
+from src.benchmarks.synthetic_camera_rig import create_synthetic_camera_group
+from src.config.home_dir import (
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    OUTPUT_DATA_FOLDER_NAME,
+)
+
+# the session processing imports `mediapipe` all over the place
+MEDIAPIPE_IS_INSTALLED = importlib.util.find_spec("mediapipe") is not None
+if MEDIAPIPE_IS_INSTALLED:
+    from src.core_processes.batch_processing.batch_process_session_folders import (
+        MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES,
+        batch_process_session_folders,
+    )
+    from src.core_processes.batch_processing.process_session_folder import (
+        process_session_folder,
+    )
+    from src.core_processes.batch_processing.session_processing_parameter_models import (
+        SessionProcessingParameterModel,
+    )
+
+FAILING_FAKE_BLENDER_SCRIPT_TEMPLATE = """\
+#!{python_executable}
+import sys
+
+print("Blender 3.2.0 (fake) - Error: something went wrong in the megascript", flush=True)
+sys.exit(1)
+"""
+
+STUB_SESSION_DURATION_SECONDS = 1.0
+STUB_LOG_FILE_NAME = "stub_log.json"
+
+
+def stub_process_session_folder(
+    session_processing_parameter_model,
+    mediapipe_2d_semaphore=None,
+    cancel_event=None,
+):
+    """
+    stands in for `process_session_folder` - holds the mediapipe semaphore for a bit and logs when it did
+    (`..._crash` sessions take their worker process down with them, `..._fail` sessions raise)
+    """
+    session_folder_path = Path(
+        session_processing_parameter_model.path_to_session_folder
+    )
+    if session_folder_path.name.endswith("crash"):
+        os._exit(1)
+
+    with mediapipe_2d_semaphore or nullcontext():
+        start_time = time.time()
+        time.sleep(STUB_SESSION_DURATION_SECONDS)
+        stop_time = time.time()
+    (session_folder_path / STUB_LOG_FILE_NAME).write_text(
+        json.dumps({"start_time": start_time, "stop_time": stop_time})
+    )
+
+    if session_folder_path.name.endswith("fail"):
+        raise ValueError("this session is broken")
+
+
+@skipUnless(MEDIAPIPE_IS_INSTALLED, "needs mediapipe")
+class BatchProcessSessionFoldersTestCase(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.folder_path = Path(self._temporary_directory.name)
+        self.folder_of_session_folders_path = self.folder_path / "sessions"
+        for session_number in range(2):
+            (
+                self.folder_of_session_folders_path
+                / f"session_{session_number}"
+                / "synchronized_videos"
+            ).mkdir(parents=True)
+
+        self.camera_group = create_synthetic_camera_group(number_of_cameras=3)
+        self.calibration_toml_path = self.folder_path / "camera_calibration.toml"
+        self.camera_group.dump(self.calibration_toml_path)
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def test_cancelled_batch_doesnt_start_any_more_sessions(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        summary_report_path = self.folder_path / "summary.json"
+
+        batch_process_session_folders(
+            path_to_folder_of_session_folders=self.folder_of_session_folders_path,
+            path_to_camera_calibration_toml=self.calibration_toml_path,
+            path_to_blender_executable=self.folder_path / "no_blender_here",
+            path_to_summary_report=summary_report_path,
+            cancel_event=cancel_event,
+        )
+
+        summary_report = json.loads(summary_report_path.read_text())
+        self.assertTrue(summary_report["cancelled"])
+        self.assertEqual(summary_report["number_of_sessions_failed"], 2)
+        for session_result in summary_report["sessions"]:
+            self.assertIn("cancelled", session_result["error"])
+            # never got as far as making its output folder
+            self.assertFalse(
+                (
+                    Path(session_result["session_folder_path"])
+                    / OUTPUT_DATA_FOLDER_NAME
+                ).exists()
+            )
+
+    @skipUnless(os.name != "nt", "the fake blender executable is a shebang script")
+    def test_failed_blender_export_fails_the_session(self):
+        session_folder_path = self.folder_of_session_folders_path / "session_0"
+        output_data_folder_path = session_folder_path / OUTPUT_DATA_FOLDER_NAME
+        output_data_folder_path.mkdir()
+        np.save(
+            output_data_folder_path / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+            np.random.default_rng(0).normal(size=(10, 543, 3)),
+        )
+        fake_blender_path = self.folder_path / "fake_blender"
+        fake_blender_path.write_text(
+            FAILING_FAKE_BLENDER_SCRIPT_TEMPLATE.format(
+                python_executable=sys.executable
+            )
+        )
+        fake_blender_path.chmod(fake_blender_path.stat().st_mode | stat.S_IEXEC)
+
+        session_processing_parameter_model = SessionProcessingParameterModel(
+            path_to_session_folder=session_folder_path,
+            path_to_output_data_folder=output_data_folder_path,
+            path_to_folder_of_synchronized_videos=session_folder_path
+            / "synchronized_videos",
+            anipose_calibration_object=self.camera_group,
+            path_to_blender_executable=fake_blender_path,
+            start_processing_at_stage=3,
+        )
+        with self.assertRaisesRegex(Exception, "Blender export failed"):
+            process_session_folder(session_processing_parameter_model)
+
+
+@skipUnless(MEDIAPIPE_IS_INSTALLED, "needs mediapipe")
+@skipUnless(
+    multiprocessing.get_start_method() == "fork",
+    "the worker processes only see the patched `process_session_folder` if they're forked",
+)
+class ParallelBatchProcessingTestCase(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.folder_path = Path(self._temporary_directory.name)
+        self.calibration_toml_path = self.folder_path / "camera_calibration.toml"
+        create_synthetic_camera_group(number_of_cameras=3).dump(
+            self.calibration_toml_path
+        )
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def run_batch(
+        self, session_names, session_names_without_videos=(), **kwargs
+    ) -> dict:
+        """runs `stub_process_session_folder` on a fresh folder full of (empty) sessions, returns the saved summary"""
+        folder_of_session_folders_path = self.folder_path / f"batch_{time.time_ns()}"
+        for session_name in session_names:
+            (
+                folder_of_session_folders_path / session_name / "synchronized_videos"
+            ).mkdir(parents=True)
+        for session_name in session_names_without_videos:
+            (folder_of_session_folders_path / session_name).mkdir(parents=True)
+        summary_report_path = folder_of_session_folders_path / "summary.json"
+
+        with mock.patch(
+            "src.core_processes.batch_processing.batch_process_session_folders.process_session_folder",
+            stub_process_session_folder,
+        ):
+            batch_process_session_folders(
+                path_to_folder_of_session_folders=folder_of_session_folders_path,
+                path_to_camera_calibration_toml=self.calibration_toml_path,
+                path_to_blender_executable=self.folder_path / "no_blender_here",
+                path_to_summary_report=summary_report_path,
+                **kwargs,
+            )
+        return json.loads(summary_report_path.read_text())
+
+    def get_stub_time_spans(self, summary_report: dict) -> list:
+        """(start, stop) of every session that got as far as logging it, in order of when they started"""
+        time_spans = []
+        for session_result in summary_report["sessions"]:
+            stub_log_path = (
+                Path(session_result["session_folder_path"]) / STUB_LOG_FILE_NAME
+            )
+            if stub_log_path.exists():
+                stub_log = json.loads(stub_log_path.read_text())
+                time_spans.append((stub_log["start_time"], stub_log["stop_time"]))
+        return sorted(time_spans)
+
+    def count_max_overlap(self, time_spans: list) -> int:
+        events = sorted(
+            [(start_time, 1) for start_time, _ in time_spans]
+            + [(stop_time, -1) for _, stop_time in time_spans]
+        )
+        number_running = 0
+        max_number_running = 0
+        for _, change in events:
+            number_running += change
+            max_number_running = max(max_number_running, number_running)
+        return max_number_running
+
+    def test_sessions_run_at_the_same_time_unless_the_semaphore_says_otherwise(self):
+        session_names = ["session_0", "session_1", "session_2"]
+        summary_report = self.run_batch(session_names, number_of_processes=3)
+        self.assertEqual(summary_report["number_of_sessions_succeeded"], 3)
+        self.assertGreater(
+            self.count_max_overlap(self.get_stub_time_spans(summary_report)), 1
+        )
+
+        summary_report = self.run_batch(
+            session_names, number_of_processes=3, max_concurrent_mediapipe_workers=1
+        )
+        self.assertEqual(summary_report["number_of_sessions_succeeded"], 3)
+        self.assertEqual(
+            self.count_max_overlap(self.get_stub_time_spans(summary_report)), 1
+        )
+
+    def test_sessions_wait_for_memory(self):
+        # every (empty) session is estimated at the worker baseline, so only one fits at a time
+        summary_report = self.run_batch(
+            ["session_0", "session_1", "session_2"],
+            number_of_processes=3,
+            max_total_memory_gb=1.5
+            * MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES
+            / 1024**3,
+        )
+        self.assertEqual(summary_report["number_of_sessions_succeeded"], 3)
+        self.assertEqual(
+            self.count_max_overlap(self.get_stub_time_spans(summary_report)), 1
+        )
+
+    def test_batch_carries_on_after_a_failed_session(self):
+        summary_report = self.run_batch(
+            ["session_0", "session_1_fail", "session_2"], number_of_processes=2
+        )
+        self.assertEqual(
+            [
+                (
+                    Path(session_result["session_folder_path"]).name,
+                    session_result["succeeded"],
+                )
+                for session_result in summary_report["sessions"]
+            ],
+            [("session_0", True), ("session_1_fail", False), ("session_2", True)],
+        )
+        failed_session_result = summary_report["sessions"][1]
+        self.assertIn("this session is broken", failed_session_result["error"])
+        self.assertIn("ValueError", failed_session_result["traceback"])
+
+    def test_worker_pool_gets_restarted_after_a_worker_dies(self):
+        # `session_0` is still running when `session_1_crash` takes the pool down, the rest start in a new pool
+        summary_report = self.run_batch(
+            ["session_0", "session_1_crash", "session_2", "session_3"],
+            number_of_processes=2,
+        )
+        session_results_by_name = {
+            Path(session_result["session_folder_path"]).name: session_result
+            for session_result in summary_report["sessions"]
+        }
+        self.assertFalse(session_results_by_name["session_1_crash"]["succeeded"])
+        self.assertIn(
+            "BrokenProcessPool", session_results_by_name["session_1_crash"]["error"]
+        )
+        self.assertFalse(session_results_by_name["session_0"]["succeeded"])
+        self.assertTrue(session_results_by_name["session_2"]["succeeded"])
+        self.assertTrue(session_results_by_name["session_3"]["succeeded"])
+        self.assertEqual(summary_report["number_of_sessions_succeeded"], 2)
+        self.assertEqual(summary_report["number_of_sessions_failed"], 2)
+
+    def test_summary_report(self):
+        summary_report = self.run_batch(
+            ["session_0", "session_1_fail"],
+            session_names_without_videos=["not_a_session"],
+            number_of_processes=2,
+            max_concurrent_mediapipe_workers=2,
+            max_total_memory_gb=100,
+        )
+
+        self.assertEqual(
+            summary_report["path_to_camera_calibration_toml"],
+            str(self.calibration_toml_path),
+        )
+        self.assertEqual(summary_report["number_of_processes"], 2)
+        self.assertEqual(summary_report["max_concurrent_mediapipe_workers"], 2)
+        self.assertEqual(summary_report["max_total_memory_gb"], 100)
+        self.assertFalse(summary_report["use_undistortion_lookup"])
+        self.assertFalse(summary_report["cancelled"])
+        self.assertEqual(summary_report["number_of_sessions_succeeded"], 1)
+        self.assertEqual(summary_report["number_of_sessions_failed"], 2)
+        self.assertGreaterEqual(
+            summary_report["total_duration_seconds"], STUB_SESSION_DURATION_SECONDS
+        )
+        # sessions without synchronized videos come first (they fail straight away), then the rest in order
+        self.assertEqual(
+            [
+                Path(session_result["session_folder_path"]).name
+                for session_result in summary_report["sessions"]
+            ],
+            ["not_a_session", "session_0", "session_1_fail"],
+        )
+        self.assertEqual(
+            summary_report["sessions"][0]["error"],
+            "No folder full of synchronized videos found",
+        )
+        for session_result in summary_report["sessions"][1:]:
+            self.assertEqual(
+                set(session_result),
+                {
+                    "session_folder_path",
+                    "succeeded",
+                    "duration_seconds",
+                    "error",
+                    "traceback",
+                    "estimated_memory_gb",
+                },
+            )
+            self.assertAlmostEqual(
+                session_result["estimated_memory_gb"],
+                MEDIAPIPE_WORKER_BASELINE_MEMORY_BYTES / 1024**3,
+            )
+            if session_result["succeeded"]:
+                self.assertGreaterEqual(
+                    session_result["duration_seconds"], STUB_SESSION_DURATION_SECONDS
+                )
+                self.assertIsNone(session_result["error"])
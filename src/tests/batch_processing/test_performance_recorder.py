@@ -0,0 +1,67 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.core_processes.utils.performance_recorder import (
+    PerformanceRecorder,
+    measure_performance,
+    record_performance,
+)
+
+
+@record_performance()
+def allocate_and_sum(number_of_values: int) -> float:
+    return float(np.ones(number_of_values).sum())
+
+
+class PerformanceRecorderTestCase(TestCase):
+    def test_run_report(self):
+        performance_recorder = PerformanceRecorder(
+            "test_run",
+            memory_sampling_interval_seconds=0.001,
+            sampling_profiler_interval_seconds=0.001,
+        )
+        with performance_recorder:
+            with measure_performance("stage_1", number_of_items=10) as measurement:
+                measurement.details["note"] = "hello"
+                for _ in range(3):
+                    allocate_and_sum(10**6)
+                time.sleep(0.05)
+
+                worker_thread = threading.Thread(
+                    target=allocate_and_sum, args=(10**5,)
+                )
+                worker_thread.start()
+                worker_thread.join()
+
+            with self.assertRaises(ZeroDivisionError):
+                with measure_performance("stage_2"):
+                    1 / 0
+
+        with tempfile.TemporaryDirectory() as temp_folder:
+            report_path = performance_recorder.save_report(temp_folder)
+            report = json.loads(report_path.read_text())
+            assert (report_path.parent / report["sampling_profile_file_name"]).exists()
+
+        assert [stage["name"] for stage in report["stages"]] == ["stage_1", "stage_2"]
+        stage_1 = report["stages"][0]
+        assert stage_1["wall_time_seconds"] >= 0.05
+        assert stage_1["number_of_items"] == 10
+        assert stage_1["details"] == {"note": "hello"}
+        # the worker thread's step goes under the stage that was open when it started
+        assert len(stage_1["sub_steps"]) == 4
+        assert stage_1["sub_steps"][0]["path"] == "test_run/stage_1/allocate_and_sum"
+        assert stage_1["sub_step_totals"]["allocate_and_sum"]["count"] == 4
+        assert report["stages"][1]["error"] == "ZeroDivisionError"
+
+    def test_nothing_gets_recorded_without_a_recorder(self):
+        with measure_performance("stage", number_of_items=5) as measurement:
+            measurement.add_items(5)
+        assert measurement.number_of_items == 10
+        assert measurement.wall_time_seconds is None
+        assert allocate_and_sum(10) == 10
@@ -0,0 +1,60 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from src.core_processes.batch_processing.session_stage_cache import (
+    SessionStageCache,
+)
+
+
+class SessionStageCacheTestCase(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.folder_path = Path(self._temporary_directory.name)
+        self.manifest_path = self.folder_path / "stage_cache_manifest.json"
+        self.input_path = self.folder_path / "input.txt"
+        self.output_path = self.folder_path / "output.txt"
+        self.input_path.write_text("some input")
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def run_stage(self, parameters: dict) -> bool:
+        """returns whether the stage actually ran (uses a fresh cache object, like a new run of the pipeline would)"""
+        stage_cache = SessionStageCache(self.manifest_path)
+        with stage_cache.run_stage(
+            "uppercase",
+            input_file_paths=[self.input_path],
+            parameters=parameters,
+            output_file_paths=[self.output_path],
+        ) as needs_to_run:
+            if needs_to_run:
+                self.output_path.write_text(self.input_path.read_text().upper())
+        return needs_to_run
+
+    def test_stage_is_skipped_until_its_inputs_or_parameters_change(self):
+        assert self.run_stage({"some_parameter": 1})
+        assert not self.run_stage({"some_parameter": 1})
+
+        assert self.run_stage({"some_parameter": 2})
+        assert not self.run_stage({"some_parameter": 2})
+
+        self.input_path.write_text("some other input")
+        assert self.run_stage({"some_parameter": 2})
+        assert not self.run_stage({"some_parameter": 2})
+
+    def test_stage_reruns_if_its_output_was_deleted_or_changed(self):
+        assert self.run_stage({})
+
+        self.output_path.unlink()
+        assert self.run_stage({})
+
+        self.output_path.write_text("tampered with")
+        assert self.run_stage({})
+        assert self.output_path.read_text() == "SOME INPUT"
+
+    def test_manifest_records_wall_time(self):
+        self.run_stage({})
+        stage_record = SessionStageCache(self.manifest_path).stages["uppercase"]
+        assert stage_record["duration_seconds"] >= 0
+        assert "output.txt" in stage_record["output_files"]
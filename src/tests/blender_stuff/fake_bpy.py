@@ -0,0 +1,115 @@
+from typing import Dict, List
+
+import numpy as np
+
+# just enough of `bpy.data` / `bpy.types.Object` (as far as animation goes) to check what the megascript asks
+# Blender to do, without Blender. Every call gets counted in `call_counts`
+
+
+class FakeKeyframePoints:
+    def __init__(self, call_counts: Dict[str, int]):
+        self._call_counts = call_counts
+        self.co = np.zeros((0, 2), dtype=np.float32)
+
+    def __len__(self):
+        return self.co.shape[0]
+
+    def add(self, count: int):
+        self._call_counts["keyframe_points.add"] += 1
+        self.co = np.vstack([self.co, np.zeros((count, 2), dtype=np.float32)])
+
+    def foreach_set(self, attribute_name: str, sequence):
+        self._call_counts["keyframe_points.foreach_set"] += 1
+        if attribute_name != "co":
+            raise AttributeError(f"FakeKeyframePoints has no {attribute_name}")
+        # blender wants exactly one value per keyframe per component
+        sequence = np.asarray(sequence)
+        if sequence.size != self.co.size:
+            raise RuntimeError(
+                f"foreach_set got {sequence.size} values for {self.co.size} slots"
+            )
+        self.co = sequence.reshape(self.co.shape).astype(np.float32)
+
+
+class FakeFCurve:
+    def __init__(self, data_path: str, index: int, call_counts: Dict[str, int]):
+        self._call_counts = call_counts
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = FakeKeyframePoints(call_counts)
+
+    def update(self):
+        self._call_counts["fcurve.update"] += 1
+
+
+class FakeFCurves(list):
+    def __init__(self, call_counts: Dict[str, int]):
+        super().__init__()
+        self._call_counts = call_counts
+
+    def new(self, data_path: str, index: int = 0, action_group: str = ""):
+        self._call_counts["fcurves.new"] += 1
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                raise RuntimeError(f"F-Curve {data_path}[{index}] already exists")
+        fcurve = FakeFCurve(data_path, index, self._call_counts)
+        self.append(fcurve)
+        return fcurve
+
+
+class FakeAction:
+    def __init__(self, name: str, call_counts: Dict[str, int]):
+        self.name = name
+        self.fcurves = FakeFCurves(call_counts)
+
+
+class FakeActions(list):
+    def __init__(self, call_counts: Dict[str, int]):
+        super().__init__()
+        self._call_counts = call_counts
+
+    def new(self, name: str):
+        self._call_counts["actions.new"] += 1
+        action = FakeAction(name, self._call_counts)
+        self.append(action)
+        return action
+
+
+class FakeAnimationData:
+    def __init__(self):
+        self.action = None
+
+
+class FakeBlenderData:
+    """stands in for `bpy.data`"""
+
+    def __init__(self):
+        self.call_counts = _CallCounts()
+        self.actions = FakeActions(self.call_counts)
+        self.objects: List[FakeObject] = []
+
+    def new_object(self, name: str) -> "FakeObject":
+        blender_object = FakeObject(name, self.call_counts)
+        self.objects.append(blender_object)
+        return blender_object
+
+
+class FakeObject:
+    def __init__(self, name: str, call_counts: Dict[str, int]):
+        self._call_counts = call_counts
+        self.name = name
+        self.location = [0.0, 0.0, 0.0]
+        self.animation_data = None
+
+    def animation_data_create(self):
+        self._call_counts["animation_data_create"] += 1
+        self.animation_data = FakeAnimationData()
+        return self.animation_data
+
+    def keyframe_insert(self, data_path: str, frame: int):
+        self._call_counts["keyframe_insert"] += 1
+
+
+class _CallCounts(dict):
+    def __missing__(self, key):
+        return 0
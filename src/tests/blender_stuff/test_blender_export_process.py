@@ -0,0 +1,149 @@
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import TestCase
+
+from src.blender_stuff.blender_export_process import (
+    BLENDER_EXPORT_STATUS_CANCELLED,
+    BLENDER_EXPORT_STATUS_FAILED,
+    BLENDER_EXPORT_STATUS_SUCCEEDED,
+    BLENDER_EXPORT_STATUS_TIMED_OUT,
+)
+from src.blender_stuff.blender_progress_lines import parse_blender_progress_line
+from src.blender_stuff.create_blend_file_from_session_data import (
+    create_blend_file_from_session_data,
+)
+from src.config.home_dir import BLENDER_EXPORT_LOG_FILE_NAME
+
+# stands in for `blender --background --python <megascript> -- <session folder> ...`: prints some chatter and a
+# progress line per frame (like the megascript does), then saves a "`.blend` file" in the session folder
+FAKE_BLENDER_SCRIPT_TEMPLATE = """\
+#!{python_executable}
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, {blender_stuff_folder_path!r})
+from blender_progress_lines import format_blender_progress_line
+
+arguments = sys.argv[sys.argv.index("--") + 1 :]
+session_folder_path = Path(arguments[0])
+print("Blender 3.2.0 (fake)", flush=True)
+for frame_number in range({number_of_frames}):
+    time.sleep({seconds_per_frame})
+    print(format_blender_progress_line("keyframing_empties", frame_number + 1, {number_of_frames}), flush=True)
+(session_folder_path / (session_folder_path.stem + ".blend")).write_text("not really a blend file")
+sys.exit({exit_code})
+"""
+
+
+@unittest.skipIf(os.name == "nt", "the fake blender executable is a shebang script")
+class TestBlenderExportProcess(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.session_folder_path = Path(self._temporary_directory.name) / "session_0"
+        self.session_folder_path.mkdir()
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def make_fake_blender(
+        self, number_of_frames: int, seconds_per_frame: float, exit_code: int = 0
+    ) -> Path:
+        fake_blender_path = Path(self._temporary_directory.name) / "fake_blender"
+        fake_blender_path.write_text(
+            FAKE_BLENDER_SCRIPT_TEMPLATE.format(
+                python_executable=sys.executable,
+                blender_stuff_folder_path=str(
+                    Path(__file__).parents[2] / "blender_stuff"
+                ),
+                number_of_frames=number_of_frames,
+                seconds_per_frame=seconds_per_frame,
+                exit_code=exit_code,
+            )
+        )
+        fake_blender_path.chmod(fake_blender_path.stat().st_mode | stat.S_IEXEC)
+        return fake_blender_path
+
+    def test_progress_gets_streamed_and_logged(self):
+        received_progress = []
+        blender_export_result = create_blend_file_from_session_data(
+            self.session_folder_path,
+            blender_exe_path=self.make_fake_blender(
+                number_of_frames=5, seconds_per_frame=0
+            ),
+            timeout_seconds=60,
+            progress_callback=received_progress.append,
+        )
+
+        self.assertEqual(
+            blender_export_result["status"], BLENDER_EXPORT_STATUS_SUCCEEDED
+        )
+        self.assertEqual(blender_export_result["return_code"], 0)
+        self.assertEqual(
+            [progress["frames_done"] for progress in received_progress], [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(
+            blender_export_result["latest_progress"],
+            {"stage": "keyframing_empties", "frames_done": 5, "total_frames": 5},
+        )
+        self.assertTrue((self.session_folder_path / "session_0.blend").exists())
+
+        log_text = (self.session_folder_path / BLENDER_EXPORT_LOG_FILE_NAME).read_text()
+        self.assertIn("Blender 3.2.0 (fake)", log_text)
+        self.assertIn("--python-exit-code", log_text)
+
+    def test_failure_shows_up_in_the_status(self):
+        blender_export_result = create_blend_file_from_session_data(
+            self.session_folder_path,
+            blender_exe_path=self.make_fake_blender(
+                number_of_frames=1, seconds_per_frame=0, exit_code=1
+            ),
+        )
+        self.assertEqual(blender_export_result["status"], BLENDER_EXPORT_STATUS_FAILED)
+        self.assertEqual(blender_export_result["return_code"], 1)
+
+    def test_timeout_stops_blender(self):
+        tic = time.perf_counter()
+        blender_export_result = create_blend_file_from_session_data(
+            self.session_folder_path,
+            blender_exe_path=self.make_fake_blender(
+                number_of_frames=100, seconds_per_frame=1
+            ),
+            timeout_seconds=0.5,
+        )
+        self.assertEqual(
+            blender_export_result["status"], BLENDER_EXPORT_STATUS_TIMED_OUT
+        )
+        self.assertLess(time.perf_counter() - tic, 10)
+        self.assertFalse((self.session_folder_path / "session_0.blend").exists())
+
+    def test_cancel_from_another_thread(self):
+        cancel_event = threading.Event()
+
+        def cancel_after_first_frame(progress: dict):
+            cancel_event.set()
+
+        blender_export_result = create_blend_file_from_session_data(
+            self.session_folder_path,
+            blender_exe_path=self.make_fake_blender(
+                number_of_frames=100, seconds_per_frame=0.1
+            ),
+            progress_callback=cancel_after_first_frame,
+            cancel_event=cancel_event,
+        )
+        self.assertEqual(
+            blender_export_result["status"], BLENDER_EXPORT_STATUS_CANCELLED
+        )
+        self.assertLess(blender_export_result["latest_progress"]["frames_done"], 100)
+
+    def test_parse_blender_progress_line(self):
+        self.assertIsNone(parse_blender_progress_line("Blender 3.2.0"))
+        self.assertIsNone(
+            parse_blender_progress_line("FREEMOCAP_BLENDER_PROGRESS {oops")
+        )
@@ -0,0 +1,134 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.blender_stuff.blender_keyframe_arrays import (
+    VIRTUAL_MARKER_DEFINITIONS,
+    get_location_keyframes_by_object_name,
+    insert_location_keyframes,
+    load_keyframe_arrays,
+)
+from src.blender_stuff.create_blend_file_from_session_data import (
+    save_blender_keyframe_arrays,
+)
+from src.config.home_dir import (
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    OUTPUT_DATA_FOLDER_NAME,
+    PARTIALLY_PROCESSED_DATA_FOLDER_NAME,
+)
+from src.core_processes.mediapipe_stuff.medaipipe_tracked_points_names_dict import (
+    mediapipe_tracked_point_names_dict,
+)
+from src.tests.blender_stuff.fake_bpy import FakeBlenderData
+
+
+class TestBlenderKeyframeArrays(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.session_folder_path = Path(self._temporary_directory.name)
+        partially_processed_data_folder_path = (
+            self.session_folder_path
+            / OUTPUT_DATA_FOLDER_NAME
+            / PARTIALLY_PROCESSED_DATA_FOLDER_NAME
+        )
+        partially_processed_data_folder_path.mkdir(parents=True)
+
+        # body + hands + face, in mm
+        self.number_of_frames = 120
+        self.mediapipe_skel_fr_mar_xyz = np.random.default_rng(0).normal(
+            0, 500, (self.number_of_frames, 33 + 21 + 21 + 478, 3)
+        )
+        np.save(
+            partially_processed_data_folder_path
+            / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+            self.mediapipe_skel_fr_mar_xyz,
+        )
+        self.tracked_point_names = (
+            mediapipe_tracked_point_names_dict["body"]
+            + mediapipe_tracked_point_names_dict["right_hand"]
+            + mediapipe_tracked_point_names_dict["left_hand"]
+        )
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def test_saved_keyframe_arrays_layout(self):
+        keyframe_arrays_path = save_blender_keyframe_arrays(self.session_folder_path)
+        keyframe_arrays = load_keyframe_arrays(keyframe_arrays_path)
+
+        number_of_objects = len(self.tracked_point_names) + len(
+            VIRTUAL_MARKER_DEFINITIONS
+        )
+        self.assertEqual(
+            list(keyframe_arrays["object_names"]),
+            self.tracked_point_names + list(VIRTUAL_MARKER_DEFINITIONS),
+        )
+        self.assertEqual(
+            keyframe_arrays["locations_obj_xyz_fr"].shape,
+            (number_of_objects, 3, self.number_of_frames),
+        )
+        self.assertEqual(keyframe_arrays["locations_obj_xyz_fr"].dtype, np.float32)
+        np.testing.assert_array_equal(
+            keyframe_arrays["frame_numbers"], np.arange(self.number_of_frames)
+        )
+
+        location_keyframes_by_object_name = get_location_keyframes_by_object_name(
+            keyframe_arrays
+        )
+        mediapipe_skel_fr_mar_xyz_meters = self.mediapipe_skel_fr_mar_xyz / 1000
+        np.testing.assert_allclose(
+            location_keyframes_by_object_name["left_hand_wrist"],
+            mediapipe_skel_fr_mar_xyz_meters[:, 33 + 21, :].T,
+            rtol=1e-6,
+        )
+        np.testing.assert_allclose(
+            location_keyframes_by_object_name["chest_center"],
+            np.mean(mediapipe_skel_fr_mar_xyz_meters[:, [11, 12, 23, 24], :], axis=1).T,
+            rtol=1e-5,
+        )
+
+    def test_insert_location_keyframes_fills_each_fcurve_at_once(self):
+        keyframe_arrays = load_keyframe_arrays(
+            save_blender_keyframe_arrays(self.session_folder_path)
+        )
+        location_keyframes_by_object_name = get_location_keyframes_by_object_name(
+            keyframe_arrays
+        )
+
+        blender_data = FakeBlenderData()
+        for object_name, location_xyz_fr in location_keyframes_by_object_name.items():
+            insert_location_keyframes(
+                blender_data,
+                blender_data.new_object(object_name),
+                keyframe_arrays["frame_numbers"],
+                location_xyz_fr,
+            )
+
+        # a handful of calls per object, no matter how many frames there are
+        number_of_objects = len(location_keyframes_by_object_name)
+        self.assertEqual(blender_data.call_counts["keyframe_insert"], 0)
+        self.assertEqual(blender_data.call_counts["actions.new"], number_of_objects)
+        for call_name in [
+            "fcurves.new",
+            "keyframe_points.add",
+            "keyframe_points.foreach_set",
+            "fcurve.update",
+        ]:
+            self.assertEqual(blender_data.call_counts[call_name], 3 * number_of_objects)
+
+        nose = blender_data.objects[0]
+        self.assertEqual(nose.name, "nose")
+        for axis_index, fcurve in enumerate(nose.animation_data.action.fcurves):
+            self.assertEqual(fcurve.data_path, "location")
+            self.assertEqual(fcurve.array_index, axis_index)
+            self.assertEqual(len(fcurve.keyframe_points), self.number_of_frames)
+            np.testing.assert_array_equal(
+                fcurve.keyframe_points.co[:, 0], np.arange(self.number_of_frames)
+            )
+            np.testing.assert_allclose(
+                fcurve.keyframe_points.co[:, 1],
+                self.mediapipe_skel_fr_mar_xyz[:, 0, axis_index] / 1000,
+                rtol=1e-6,
+            )
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_skeleton_data,
+)
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+    triangulate_simple,
+    triangulate_simple_batched,
+)
+
+
+class OutlierRejectionTriangulationTestCase(TestCase):
+    def setUp(self):
+        self.camera_group = create_synthetic_camera_group(number_of_cameras=4)
+        synthetic_data = create_synthetic_skeleton_data(
+            self.camera_group,
+            number_of_frames=50,
+            number_of_tracked_points=40,
+            outlier_fraction=0.03,
+        )
+        self.data2d_flat = synthetic_data.skeleton_2d_camera_frame_marker_xy.reshape(
+            4, -1, 2
+        )
+        self.true_data3d_flat = synthetic_data.skeleton_3d_frame_marker_xyz.reshape(
+            -1, 3
+        )
+
+    def test_batched_triangulation_matches_triangulate_simple(self):
+        undistorted_points = np.stack(
+            [
+                camera.undistort_points(self.data2d_flat[camera_number, :200])
+                for camera_number, camera in enumerate(self.camera_group.cameras)
+            ]
+        )
+        camera_mats = np.array(
+            [camera.get_extrinsics_mat() for camera in self.camera_group.cameras]
+        )
+
+        batched = triangulate_simple_batched(undistorted_points, camera_mats)
+
+        for point_number in range(200):
+            good = ~np.isnan(undistorted_points[:, point_number, 0])
+            if np.sum(good) < 2:
+                assert np.all(np.isnan(batched[point_number]))
+                continue
+            np.testing.assert_allclose(
+                batched[point_number],
+                triangulate_simple(
+                    undistorted_points[good, point_number], camera_mats[good]
+                ),
+                atol=1e-3,
+            )
+
+    def test_outlier_rejection_removes_most_bad_points(self):
+        def fraction_of_points_off_by_more_than_100mm(data3d_flat):
+            return np.nanmean(
+                np.linalg.norm(data3d_flat - self.true_data3d_flat, axis=1) > 100
+            )
+
+        data3d_plain = self.camera_group.triangulate(self.data2d_flat)
+        (
+            data3d_rejected,
+            rejected_views,
+        ) = self.camera_group.triangulate_with_outlier_rejection(
+            self.data2d_flat, return_rejected_views=True
+        )
+
+        assert rejected_views.shape == self.data2d_flat.shape[:2]
+        assert np.any(rejected_views)
+        assert not np.any(rejected_views & np.isnan(self.data2d_flat[:, :, 0]))
+        assert fraction_of_points_off_by_more_than_100mm(
+            data3d_rejected
+        ) < 0.5 * fraction_of_points_off_by_more_than_100mm(data3d_plain)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_skeleton_data,
+)
+
+
+class SyntheticCameraRigTestCase(TestCase):
+    def setUp(self):
+        self.camera_group = create_synthetic_camera_group(number_of_cameras=4)
+        self.synthetic_data = create_synthetic_skeleton_data(
+            self.camera_group,
+            number_of_frames=30,
+            number_of_tracked_points=50,
+            pixel_noise=0.0,
+            dropout_fraction=0.0,
+            outlier_fraction=0.0,
+        )
+        self.data2d_flat = (
+            self.synthetic_data.skeleton_2d_camera_frame_marker_xy.reshape(4, -1, 2)
+        )
+        self.true_data3d_flat = (
+            self.synthetic_data.skeleton_3d_frame_marker_xyz.reshape(-1, 3)
+        )
+
+    def test_noise_free_points_reproject_onto_themselves(self):
+        reprojection_error = self.camera_group.reprojection_error(
+            self.true_data3d_flat, self.data2d_flat, mean=True
+        )
+        self.assertLess(np.max(reprojection_error), 1e-6)
+
+        data3d_flat = self.camera_group.triangulate(self.data2d_flat)
+        self.assertLess(
+            np.max(np.linalg.norm(data3d_flat - self.true_data3d_flat, axis=1)), 0.1
+        )
+
+    def test_every_camera_sees_the_whole_skeleton(self):
+        for camera_number, camera in enumerate(self.camera_group.cameras):
+            width, height = camera.get_size()
+            data2d = self.data2d_flat[camera_number]
+            self.assertTrue(np.all((data2d >= 0) & (data2d < [width, height])))
+
+            # and it's in front of the camera, not behind it
+            rotation_matrix, _ = cv2.Rodrigues(camera.get_rotation())
+            depth = (
+                self.true_data3d_flat @ rotation_matrix.T + camera.get_translation()
+            )[:, 2]
+            self.assertTrue(np.all(depth > 0))
@@ -0,0 +1,147 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import cv2
+import numpy as np
+
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_skeleton_data,
+)
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+    Camera,
+    CameraGroup,
+    FisheyeCamera,
+)
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.undistortion_lookup import (
+    UndistortionLookup,
+)
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import (
+    triangulate_3d_data,
+)
+
+
+class UndistortionLookupTestCase(TestCase):
+    def setUp(self):
+        self.camera = Camera(
+            matrix=[[1000.0, 0, 960], [0, 1000.0, 540], [0, 0, 1]],
+            dist=[-0.25, 0.08, 0, 0, 0],
+            size=(1920, 1080),
+            name="test_camera",
+        )
+        self.points_xy = np.random.default_rng(12345).uniform(
+            [0, 0], [1920, 1080], size=(10000, 2)
+        )
+
+    def test_lookup_error_on_points_off_the_grid(self):
+        # `self.points_xy` comes from a different seed than the points the lookup measures itself on
+        iterative_points = self.camera.iterative_undistort_points(self.points_xy)
+        self.camera.build_undistortion_lookup()
+        lookup_points = self.camera.undistort_points(self.points_xy, use_lookup=True)
+
+        error_pixels = (
+            np.linalg.norm(lookup_points - iterative_points, axis=1)
+            * self.camera.get_focal_length()
+        )
+        assert np.max(error_pixels) < 0.05
+        # the measured max is an observed one, so unseen points can come out slightly worse, but not by much
+        assert (
+            np.max(error_pixels)
+            <= 1.1 * self.camera.undistortion_lookup.max_error_pixels
+        )
+        assert self.camera.undistortion_lookup.max_error_pixels < 0.05
+
+    def test_nan_and_out_of_grid_points(self):
+        self.camera.build_undistortion_lookup()
+        points_xy = np.array([[np.nan, np.nan], [5000.0, -3000.0], [960.0, 540.0]])
+        undistorted = self.camera.undistort_points(points_xy, use_lookup=True)
+
+        assert np.all(np.isnan(undistorted[0]))
+        np.testing.assert_allclose(
+            undistorted[1], self.camera.iterative_undistort_points(points_xy[1:2])[0]
+        )
+
+    def test_fisheye_lookup(self):
+        camera = FisheyeCamera(
+            matrix=[[800.0, 0, 640], [0, 800.0, 360], [0, 0, 1]],
+            dist=[0.05, -0.01, 0, 0],
+            size=(1280, 720),
+        )
+        points_xy = self.points_xy * [1280 / 1920, 720 / 1080]
+        iterative_points = camera.iterative_undistort_points(points_xy)
+        camera.build_undistortion_lookup()
+
+        error_pixels = (
+            np.linalg.norm(
+                camera.undistort_points(points_xy, use_lookup=True) - iterative_points,
+                axis=1,
+            )
+            * camera.get_focal_length()
+        )
+        assert np.max(error_pixels) <= 1.1 * camera.undistortion_lookup.max_error_pixels
+
+    def test_stale_lookup_is_ignored(self):
+        self.camera.build_undistortion_lookup()
+        self.camera.set_distortions([-0.1, 0, 0, 0, 0])
+        np.testing.assert_array_equal(
+            self.camera.undistort_points(self.points_xy, use_lookup=True),
+            self.camera.iterative_undistort_points(self.points_xy),
+        )
+
+    def test_lookup_is_only_used_when_asked_for(self):
+        self.camera.build_undistortion_lookup()
+        np.testing.assert_array_equal(
+            self.camera.undistort_points(self.points_xy),
+            self.camera.iterative_undistort_points(self.points_xy),
+        )
+
+    def test_save_and_load_next_to_calibration_toml(self):
+        camera_group = CameraGroup([self.camera, self.camera.copy()])
+        camera_group.build_undistortion_lookups()
+
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            calibration_toml_path = (
+                Path(temporary_folder) / "camera_calibration_data.toml"
+            )
+            camera_group.dump(calibration_toml_path)
+            camera_group.save_undistortion_lookups(calibration_toml_path)
+
+            loaded_camera_group = CameraGroup.load(calibration_toml_path)
+            assert not loaded_camera_group.has_undistortion_lookups()
+            assert loaded_camera_group.load_undistortion_lookups(calibration_toml_path)
+            assert loaded_camera_group.has_undistortion_lookups()
+
+    def test_triangulation_only_uses_lookups_when_switched_on(self):
+        camera_group = create_synthetic_camera_group(number_of_cameras=3)
+        synthetic_data = create_synthetic_skeleton_data(
+            camera_group,
+            number_of_frames=5,
+            number_of_tracked_points=10,
+            outlier_fraction=0.0,
+        )
+        # e.g. loaded from next to the calibration toml by the batch runner
+        camera_group.build_undistortion_lookups()
+
+        def triangulate(use_undistortion_lookup: bool):
+            with tempfile.TemporaryDirectory() as temporary_folder, mock.patch.object(
+                cv2, "undistortPoints", wraps=cv2.undistortPoints
+            ) as mock_undistort_points, mock.patch.object(
+                UndistortionLookup,
+                "undistort_points",
+                autospec=True,
+                side_effect=UndistortionLookup.undistort_points,
+            ) as mock_lookup_undistort_points:
+                triangulate_3d_data(
+                    anipose_calibration_object=camera_group,
+                    mediapipe_2d_data=synthetic_data.skeleton_2d_camera_frame_marker_xy.copy(),
+                    output_data_folder_path=temporary_folder,
+                    mediapipe_confidence_cutoff_threshold=0.0,
+                    use_undistortion_lookup=use_undistortion_lookup,
+                )
+            return mock_undistort_points.called, mock_lookup_undistort_points.called
+
+        self.assertEqual(triangulate(use_undistortion_lookup=False), (True, False))
+        # the lookups are still there afterwards for whoever does want them
+        self.assertTrue(camera_group.has_undistortion_lookups())
+        self.assertEqual(triangulate(use_undistortion_lookup=True)[1], True)
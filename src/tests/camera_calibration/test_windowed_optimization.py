@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_skeleton_data,
+)
+from src.core_processes.capture_volume_calibration.anipose_camera_calibration.freemocap_anipose import (
+    get_window_blend_weights,
+    get_window_bounds,
+)
+
+
+class WindowedOptimizationTestCase(TestCase):
+    def test_windows_cover_every_frame_with_full_length_windows(self):
+        window_bounds = get_window_bounds(
+            n_frames=1000, window_size=300, window_overlap=30
+        )
+
+        assert window_bounds[0][0] == 0
+        assert window_bounds[-1][1] == 1000
+        assert all(stop - start == 300 for start, stop in window_bounds)
+        for (_, previous_stop), (next_start, _) in zip(
+            window_bounds[:-1], window_bounds[1:]
+        ):
+            assert previous_stop - next_start >= 30
+
+    def test_short_recording_is_a_single_window(self):
+        assert get_window_bounds(n_frames=100, window_size=300, window_overlap=30) == [
+            (0, 100)
+        ]
+
+    def test_blend_weights_sum_to_one(self):
+        for n_frames in [301, 600, 1000, 1234]:
+            window_bounds = get_window_bounds(
+                n_frames, window_size=300, window_overlap=30
+            )
+            weights_sum = np.zeros(n_frames)
+            for (start, stop), weights in zip(
+                window_bounds, get_window_blend_weights(window_bounds)
+            ):
+                assert np.all(weights > 0)
+                weights_sum[start:stop] += weights
+            np.testing.assert_allclose(weights_sum, 1)
+
+    def test_windowed_optimization_matches_optimizing_the_whole_recording(self):
+        camera_group = create_synthetic_camera_group(number_of_cameras=4)
+        synthetic_data = create_synthetic_skeleton_data(
+            camera_group,
+            number_of_frames=90,
+            number_of_tracked_points=10,
+            pixel_noise=1.0,
+            dropout_fraction=0.05,
+            outlier_fraction=0.0,
+        )
+        data2d = synthetic_data.skeleton_2d_camera_frame_marker_xy
+
+        data3d = camera_group.triangulate_optim(data2d)
+        data3d_windowed = camera_group.triangulate_optim_windowed(
+            data2d, window_size=40, window_overlap=10, number_of_processes=1
+        )
+
+        self.assertEqual(data3d_windowed.shape, data3d.shape)
+        distance_mm = np.linalg.norm(data3d_windowed - data3d, axis=-1)
+        self.assertFalse(np.isnan(distance_mm).any())
+        # the same almost everywhere, only a couple of mm apart at worst where the windows get cross-faded
+        self.assertLess(np.median(distance_mm), 0.01)
+        self.assertLess(np.max(distance_mm), 5)
+
+        true_data3d = synthetic_data.skeleton_3d_frame_marker_xyz
+        error_mm = np.median(np.linalg.norm(data3d - true_data3d, axis=-1))
+        windowed_error_mm = np.median(
+            np.linalg.norm(data3d_windowed - true_data3d, axis=-1)
+        )
+        self.assertLess(windowed_error_mm, error_mm * 1.05)
@@ -0,0 +1,44 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.core_processes.utils.save_array_to_csv import save_array_to_csv
+
+
+class SaveArrayToCsvTestCase(TestCase):
+    def setUp(self):
+        random_number_generator = np.random.default_rng(0)
+        # more rows than one chunk, with some missing values
+        self.data_rows_columns = random_number_generator.normal(0, 500, (1234, 99))
+        self.data_rows_columns[
+            random_number_generator.random(self.data_rows_columns.shape) < 0.05
+        ] = np.nan
+        self.header = [f"column_{column}" for column in range(99)]
+
+    def test_csv_matches_pandas(self):
+        with tempfile.TemporaryDirectory() as temp_folder:
+            csv_file_path = Path(temp_folder) / "data.csv"
+            expected_csv_file_path = Path(temp_folder) / "expected.csv"
+            for dtype in ["float64", "float32"]:
+                for float_precision in [None, 3, 6]:
+                    data_rows_columns = self.data_rows_columns.astype(dtype)
+                    save_array_to_csv(
+                        data_rows_columns,
+                        self.header,
+                        csv_file_path,
+                        float_precision=float_precision,
+                    )
+                    pd.DataFrame(data_rows_columns, columns=self.header).to_csv(
+                        str(expected_csv_file_path),
+                        index=False,
+                        float_format=None
+                        if float_precision is None
+                        else f"%.{float_precision}f",
+                    )
+                    assert (
+                        csv_file_path.read_bytes()
+                        == expected_csv_file_path.read_bytes()
+                    ), f"{dtype} with float_precision={float_precision}"
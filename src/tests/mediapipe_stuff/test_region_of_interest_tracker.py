@@ -0,0 +1,288 @@
+import importlib.util
+from types import SimpleNamespace
+from unittest import TestCase, mock, skipUnless
+
+import numpy as np
+
+from src.core_processes.batch_processing.session_processing_parameter_models import (
+    MediaPipe2DParametersModel,
+)
+from src.core_processes.mediapipe_stuff.region_of_interest_tracker import (
+    RegionOfInterestTracker,
+    compute_region_of_interest_box,
+    region_of_interest_normalized_to_full_frame_normalized,
+    snap_box_to_grid,
+)
+
+MEDIAPIPE_IS_INSTALLED = importlib.util.find_spec("mediapipe") is not None
+if MEDIAPIPE_IS_INSTALLED:
+    import mediapipe as mp
+
+    from src.core_processes.mediapipe_stuff.mediapipe_skeleton_detector import (
+        MediaPipeSkeletonDetector,
+    )
+
+IMAGE_WIDTH = 1920
+IMAGE_HEIGHT = 1080
+
+
+def make_subject_landmarks_xy_pixels(
+    center_x: float, center_y: float, width: float = 200, height: float = 500
+) -> np.ndarray:
+    """a (very) rough skeleton - a grid of points filling a width x height box"""
+    x, y = np.meshgrid(
+        np.linspace(center_x - width / 2, center_x + width / 2, 5),
+        np.linspace(center_y - height / 2, center_y + height / 2, 11),
+    )
+    return np.column_stack([x.ravel(), y.ravel()])
+
+
+class TestRegionOfInterestTracker(TestCase):
+    def test_box_is_padded_and_clipped(self):
+        landmarks_xy_pixels = make_subject_landmarks_xy_pixels(960, 540)
+        landmarks_xy_pixels[:3] = np.nan
+        tiny_subject_landmarks_xy_pixels = make_subject_landmarks_xy_pixels(
+            960, 540, width=20, height=20
+        )
+        self.assertEqual(
+            compute_region_of_interest_box(
+                landmarks_xy_pixels,
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+                padding_fraction=0.25,
+                minimum_size_pixels=256,
+            ),
+            # 200 x 500 padded to 300 x 750
+            (810, 165, 1110, 915),
+        )
+        self.assertEqual(
+            compute_region_of_interest_box(
+                tiny_subject_landmarks_xy_pixels,
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+                padding_fraction=0.25,
+                minimum_size_pixels=256,
+            ),
+            (832, 412, 1088, 668),
+        )
+        self.assertEqual(
+            compute_region_of_interest_box(
+                make_subject_landmarks_xy_pixels(1900, 1000),
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+                padding_fraction=0.25,
+                minimum_size_pixels=256,
+            ),
+            (1750, 625, IMAGE_WIDTH, IMAGE_HEIGHT),
+        )
+        self.assertIsNone(
+            compute_region_of_interest_box(
+                np.full((33, 2), np.nan),
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+                padding_fraction=0.25,
+                minimum_size_pixels=256,
+            )
+        )
+
+    def test_crop_landmarks_map_back_to_the_full_frame(self):
+        region_of_interest_box = (800, 100, 1200, 900)
+        landmarks_xy_pixels = make_subject_landmarks_xy_pixels(960, 540)
+        crop_normalized_xy = (landmarks_xy_pixels - [800, 100]) / [400, 800]
+
+        np.testing.assert_allclose(
+            region_of_interest_normalized_to_full_frame_normalized(
+                crop_normalized_xy,
+                region_of_interest_box,
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+            ),
+            landmarks_xy_pixels / [IMAGE_WIDTH, IMAGE_HEIGHT],
+        )
+
+    def test_full_frame_on_start_lost_track_and_interval(self):
+        region_of_interest_tracker = RegionOfInterestTracker(
+            image_width=IMAGE_WIDTH,
+            image_height=IMAGE_HEIGHT,
+            full_frame_redetect_interval_frames=3,
+        )
+        used_boxes = []
+        for frame_number in range(8):
+            used_boxes.append(region_of_interest_tracker.get_region_of_interest_box())
+            # subject drifts a couple of pixels per frame, and gets lost on frame 5
+            region_of_interest_tracker.update(
+                None
+                if frame_number == 5
+                else make_subject_landmarks_xy_pixels(960 + 2 * frame_number, 540)
+            )
+
+        self.assertEqual(
+            [box is None for box in used_boxes],
+            [True, False, False, False, True, False, True, False],
+        )
+        # the box holds still while the subject stays inside it
+        self.assertEqual(used_boxes[1], used_boxes[2])
+        self.assertEqual(used_boxes[2], used_boxes[3])
+        self.assertEqual(region_of_interest_tracker.number_of_full_frame_detections, 3)
+
+    def test_box_follows_the_subject(self):
+        region_of_interest_tracker = RegionOfInterestTracker(
+            image_width=IMAGE_WIDTH, image_height=IMAGE_HEIGHT
+        )
+        region_of_interest_tracker.get_region_of_interest_box()
+        region_of_interest_tracker.update(make_subject_landmarks_xy_pixels(960, 540))
+        first_box = region_of_interest_tracker.get_region_of_interest_box()
+
+        region_of_interest_tracker.update(make_subject_landmarks_xy_pixels(1400, 540))
+        moved_box = region_of_interest_tracker.get_region_of_interest_box()
+        self.assertGreater(moved_box[0], first_box[0])
+        self.assertLessEqual(moved_box[0], 1400 - 100)
+        self.assertGreaterEqual(moved_box[2], 1400 + 100)
+
+        region_of_interest_tracker.reset()
+        self.assertIsNone(region_of_interest_tracker.get_region_of_interest_box())
+
+    def test_box_snaps_to_a_coarse_grid_so_it_moves_less(self):
+        self.assertEqual(
+            snap_box_to_grid(
+                (810, 165, 1110, 915),
+                grid_size_pixels=128,
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+            ),
+            (768, 128, 1152, 1024),
+        )
+        self.assertEqual(
+            snap_box_to_grid(
+                (1750, 625, IMAGE_WIDTH, IMAGE_HEIGHT),
+                grid_size_pixels=128,
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+            ),
+            (1664, 512, IMAGE_WIDTH, IMAGE_HEIGHT),
+        )
+
+        number_of_box_moves_by_grid_size = {}
+        for grid_size_pixels in [1, 128]:
+            region_of_interest_tracker = RegionOfInterestTracker(
+                image_width=IMAGE_WIDTH,
+                image_height=IMAGE_HEIGHT,
+                grid_size_pixels=grid_size_pixels,
+            )
+            for frame_number in range(100):
+                region_of_interest_tracker.get_region_of_interest_box()
+                # walking across the frame at 10 pixels per frame
+                region_of_interest_tracker.update(
+                    make_subject_landmarks_xy_pixels(400 + 10 * frame_number, 540)
+                )
+            number_of_box_moves_by_grid_size[
+                grid_size_pixels
+            ] = region_of_interest_tracker.number_of_region_of_interest_box_moves
+        self.assertLess(
+            number_of_box_moves_by_grid_size[128],
+            number_of_box_moves_by_grid_size[1] / 2,
+        )
+
+
+class FakeHolistic:
+    """
+    stands in for `mp.solutions.holistic.Holistic` - "finds" the subject (the white pixels) in whatever image it gets,
+    and keeps a log of what it got
+    """
+
+    def __init__(self, process_log: list, static_image_mode: bool = False, **kwargs):
+        self.static_image_mode = static_image_mode
+        self.is_closed = False
+        self.number_of_resets = 0
+        self._process_log = process_log
+
+    def process(self, image: np.ndarray):
+        assert not self.is_closed
+        self._process_log.append((self, self.number_of_resets, image.shape))
+        subject_y, subject_x = np.nonzero(image[..., 0])
+        if subject_x.size == 0:
+            pose_landmarks = None
+        else:
+            landmarks_xy_pixels = make_subject_landmarks_xy_pixels(
+                center_x=(subject_x.min() + subject_x.max()) / 2,
+                center_y=(subject_y.min() + subject_y.max()) / 2,
+                width=subject_x.max() - subject_x.min(),
+                height=subject_y.max() - subject_y.min(),
+            )
+            pose_landmarks = SimpleNamespace(
+                landmark=[
+                    SimpleNamespace(x=x / image.shape[1], y=y / image.shape[0], z=0.0)
+                    for x, y in landmarks_xy_pixels
+                ]
+            )
+        return SimpleNamespace(
+            pose_landmarks=pose_landmarks,
+            right_hand_landmarks=None,
+            left_hand_landmarks=None,
+            face_landmarks=None,
+        )
+
+    def reset(self):
+        self.number_of_resets += 1
+
+    def close(self):
+        self.is_closed = True
+
+
+@skipUnless(MEDIAPIPE_IS_INSTALLED, "needs mediapipe")
+class TestMediaPipeSkeletonDetectorRegionOfInterest(TestCase):
+    def test_mediapipe_tracking_never_sees_the_crop_move(self):
+        process_log = []
+        with mock.patch.object(
+            mp.solutions.holistic,
+            "Holistic",
+            lambda **kwargs: FakeHolistic(process_log, **kwargs),
+        ):
+            mediapipe_skeleton_detector = MediaPipeSkeletonDetector(
+                parameter_model=MediaPipe2DParametersModel(
+                    use_region_of_interest_tracking=True,
+                    region_of_interest_full_frame_redetect_interval_frames=5,
+                )
+            )
+            self.assertIsNone(mediapipe_skeleton_detector._holistic_tracker)
+            boxes_by_tracking_run = {}
+            for frame_number in range(40):
+                # subject walks to the right, fast enough that the crop has to follow
+                image = np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH, 3), dtype=np.uint8)
+                left = 300 + 30 * frame_number
+                image[290:790, left : left + 200] = 255
+
+                mediapipe_results = mediapipe_skeleton_detector._process_image(image)
+
+                holistic_tracker, number_of_resets, image_shape = process_log[-1]
+                if holistic_tracker.static_image_mode:
+                    self.assertEqual(image_shape, image.shape)
+                else:
+                    boxes_by_tracking_run.setdefault(
+                        (holistic_tracker, number_of_resets), set()
+                    ).add(
+                        mediapipe_skeleton_detector._region_of_interest_holistic_tracker_box
+                    )
+                # and the landmarks still come back normalized to the full frame
+                self.assertAlmostEqual(
+                    mediapipe_results.pose_landmarks.landmark[0].x,
+                    left / IMAGE_WIDTH,
+                    delta=2 / IMAGE_WIDTH,
+                )
+
+        # the same two holistic trackers the whole way through - one for the full frames, one for the crops
+        holistic_trackers = {holistic_tracker for holistic_tracker, *_ in process_log}
+        self.assertEqual(
+            sorted(
+                holistic_tracker.static_image_mode
+                for holistic_tracker in holistic_trackers
+            ),
+            [False, True],
+        )
+        self.assertFalse(
+            any(holistic_tracker.is_closed for holistic_tracker in holistic_trackers)
+        )
+        # the crop did move, but the crop tracker got reset every time it did, so its tracking only ever saw the one crop
+        self.assertGreater(len(boxes_by_tracking_run), 1)
+        for boxes in boxes_by_tracking_run.values():
+            self.assertEqual(len(boxes), 1)
@@ -0,0 +1,154 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from src.core_processes.post_process_skeleton_data.estimate_skeleton_segment_lengths import (
+    estimate_skeleton_segment_lengths,
+    estimate_skeleton_segment_lengths_from_3d_data,
+    mediapipe_skeleton_segment_definitions,
+)
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    mediapipe_landmark_names,
+)
+
+
+def estimate_skeleton_segment_lengths_per_column(
+    skeleton_dataframe: pd.DataFrame, skeleton_segment_definitions: dict
+) -> dict:
+    """the way segment lengths used to get worked out - one dataframe column (and one virtual marker) at a time"""
+    skeleton_data_dictionary = {
+        column_name: np.asarray(column_values)
+        for column_name, column_values in skeleton_dataframe.to_dict(
+            orient="list"
+        ).items()
+    }
+    for virtual_marker_name, marker_name_list in [
+        ("hips_center", ["left_hip", "right_hip"]),
+        ("neck_center", ["left_shoulder", "right_shoulder"]),
+        ("head_center", ["left_ear", "right_ear"]),
+        ("chest_center", ["hips_center", "neck_center"]),
+    ]:
+        for dimension in "xyz":
+            skeleton_data_dictionary[f"{virtual_marker_name}_{dimension}"] = np.mean(
+                np.asarray(
+                    [
+                        skeleton_data_dictionary[f"{marker_name}_{dimension}"]
+                        for marker_name in marker_name_list
+                    ]
+                ),
+                axis=0,
+            )
+
+    skeleton_segment_lengths_dict = {}
+    for segment_name, segment_definition_dict in skeleton_segment_definitions.items():
+        proximal_joint_name = segment_definition_dict["proximal"]
+        distal_joint_name = segment_definition_dict["distal"]
+        segment_length_per_frame = np.sqrt(
+            sum(
+                (
+                    skeleton_data_dictionary[f"{proximal_joint_name}_{dimension}"]
+                    - skeleton_data_dictionary[f"{distal_joint_name}_{dimension}"]
+                )
+                ** 2
+                for dimension in "xyz"
+            )
+        )
+        skeleton_segment_lengths_dict[segment_name] = {
+            "median": np.nanmedian(segment_length_per_frame),
+            "mean": np.nanmean(segment_length_per_frame),
+            "standard_deviation": np.nanstd(segment_length_per_frame),
+        }
+    return skeleton_segment_lengths_dict
+
+
+class EstimateSkeletonSegmentLengthsTestCase(TestCase):
+    def setUp(self):
+        random_number_generator = np.random.default_rng(0)
+        # the whole mediapipe skeleton (body, hands and face)
+        self.skel3d_frame_marker_xyz = random_number_generator.normal(
+            0, 500, (200, 543, 3)
+        )
+        self.skel3d_frame_marker_xyz[
+            random_number_generator.random(self.skel3d_frame_marker_xyz.shape) < 0.1
+        ] = np.nan
+
+    def test_segment_lengths_match_the_per_column_csv_version(self):
+        body_column_names = [
+            f"{landmark_name}_{dimension}"
+            for landmark_name in mediapipe_landmark_names
+            for dimension in "xyz"
+        ]
+        with tempfile.TemporaryDirectory() as temp_folder:
+            body_csv_path = Path(temp_folder) / "mediapipe_body_3d_xyz.csv"
+            for dtype, rtol in [("float64", 1e-12), ("float32", 1e-6)]:
+                skel3d_frame_marker_xyz = self.skel3d_frame_marker_xyz.astype(dtype)
+                # the body csv the way the csv export used to write it (full precision)
+                pd.DataFrame(
+                    skel3d_frame_marker_xyz[:, : len(mediapipe_landmark_names)].reshape(
+                        200, -1
+                    ),
+                    columns=body_column_names,
+                ).to_csv(str(body_csv_path), index=False)
+                expected_segment_lengths_dict = (
+                    estimate_skeleton_segment_lengths_per_column(
+                        pd.read_csv(body_csv_path),
+                        mediapipe_skeleton_segment_definitions,
+                    )
+                )
+
+                for skeleton_segment_lengths_dict in [
+                    estimate_skeleton_segment_lengths_from_3d_data(
+                        skel3d_frame_marker_xyz
+                    ),
+                    estimate_skeleton_segment_lengths(
+                        pd.read_csv(body_csv_path),
+                        mediapipe_skeleton_segment_definitions,
+                    ),
+                ]:
+                    self.assertEqual(
+                        list(skeleton_segment_lengths_dict),
+                        list(expected_segment_lengths_dict),
+                    )
+                    for (
+                        segment_name,
+                        expected_lengths,
+                    ) in expected_segment_lengths_dict.items():
+                        for statistic_name, expected_value in expected_lengths.items():
+                            np.testing.assert_allclose(
+                                skeleton_segment_lengths_dict[segment_name][
+                                    statistic_name
+                                ],
+                                expected_value,
+                                rtol=rtol,
+                                err_msg=f"{dtype} {segment_name} {statistic_name}",
+                            )
+
+    def test_segment_lengths_with_virtual_markers(self):
+        left_shoulder = mediapipe_landmark_names.index("left_shoulder")
+        right_shoulder = mediapipe_landmark_names.index("right_shoulder")
+        left_hip = mediapipe_landmark_names.index("left_hip")
+        right_hip = mediapipe_landmark_names.index("right_hip")
+
+        neck_center = np.mean(
+            self.skel3d_frame_marker_xyz[:, [left_shoulder, right_shoulder]], axis=1
+        )
+        hips_center = np.mean(
+            self.skel3d_frame_marker_xyz[:, [left_hip, right_hip]], axis=1
+        )
+        chest_center = np.mean(np.stack([hips_center, neck_center], axis=1), axis=1)
+        upper_spine_length = np.linalg.norm(chest_center - neck_center, axis=1)
+
+        skeleton_segment_lengths_dict = estimate_skeleton_segment_lengths_from_3d_data(
+            self.skel3d_frame_marker_xyz
+        )
+        np.testing.assert_allclose(
+            skeleton_segment_lengths_dict["upper_spine"]["median"],
+            np.nanmedian(upper_spine_length),
+        )
+        np.testing.assert_allclose(
+            skeleton_segment_lengths_dict["upper_spine"]["standard_deviation"],
+            np.nanstd(upper_spine_length),
+        )
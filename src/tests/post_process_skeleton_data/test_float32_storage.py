@@ -0,0 +1,72 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.config.home_dir import MEDIAPIPE_3D_NPY_FILE_NAME
+from src.benchmarks.synthetic_camera_rig import (
+    create_synthetic_camera_group,
+    create_synthetic_skeleton_data,
+)
+from src.core_processes.capture_volume_calibration.triangulate_3d_data import (
+    triangulate_3d_data,
+)
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass,
+)
+
+# float32 has ~7 significant digits, i.e. ~0.0005mm at the ~3m scale of a capture volume
+FLOAT32_TRAJECTORY_TOLERANCE_MM = 0.05
+
+
+class Float32StorageTestCase(TestCase):
+    def process(self, mediapipe_2d_data: np.ndarray, storage_dtype: str):
+        with tempfile.TemporaryDirectory() as output_data_folder:
+            raw_skel3d_frame_marker_xyz, reprojection_error = triangulate_3d_data(
+                anipose_calibration_object=self.camera_group,
+                mediapipe_2d_data=mediapipe_2d_data.astype(storage_dtype),
+                output_data_folder_path=Path(output_data_folder) / "raw_data",
+                mediapipe_confidence_cutoff_threshold=0.7,
+                storage_dtype=storage_dtype,
+            )
+            assert raw_skel3d_frame_marker_xyz.dtype == storage_dtype
+            assert reprojection_error.dtype == storage_dtype
+
+            skel3d_frame_marker_xyz = (
+                gap_fill_filter_origin_align_3d_data_and_then_calculate_center_of_mass(
+                    skel3d_frame_marker_xyz=raw_skel3d_frame_marker_xyz,
+                    skeleton_reprojection_error_fr_mar=reprojection_error,
+                    path_to_folder_where_we_will_save_this_data=output_data_folder,
+                    sampling_rate=30,
+                    cut_off=7,
+                    order=4,
+                )
+            )
+            assert (
+                np.load(
+                    Path(output_data_folder) / "raw_data" / MEDIAPIPE_3D_NPY_FILE_NAME
+                ).dtype
+                == storage_dtype
+            )
+        return skel3d_frame_marker_xyz
+
+    def test_float32_trajectories_match_float64(self):
+        self.camera_group = create_synthetic_camera_group(number_of_cameras=3)
+        synthetic_data = create_synthetic_skeleton_data(
+            self.camera_group, number_of_frames=60
+        )
+
+        trajectories_float64 = self.process(
+            synthetic_data.skeleton_2d_camera_frame_marker_xy, "float64"
+        )
+        trajectories_float32 = self.process(
+            synthetic_data.skeleton_2d_camera_frame_marker_xy, "float32"
+        )
+
+        assert trajectories_float32.dtype == np.float32
+        np.testing.assert_allclose(
+            trajectories_float32,
+            trajectories_float64,
+            atol=FLOAT32_TRAJECTORY_TOLERANCE_MM,
+        )
@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.core_processes.post_process_skeleton_data.gap_fill_filter_and_origin_align_skeleton_data import (
+    butterworth_filter_skeleton,
+    fill_gaps_in_freemocap_data,
+)
+from src.core_processes.post_process_skeleton_data.streaming_gap_fill_and_filter import (
+    StreamingGapFillAndButterworthFilter,
+)
+
+# the filter settles to 1e-9 of the signal, i.e. ~1e-6mm at the ~1m scale of these trajectories
+STREAMING_FILTER_TOLERANCE_MM = 1e-5
+
+
+class StreamingGapFillAndButterworthFilterTestCase(TestCase):
+    def setUp(self):
+        random_number_generator = np.random.default_rng(0)
+        number_of_frames = 600
+        number_of_tracked_points = 20
+        frame_numbers = np.arange(number_of_frames)[:, np.newaxis, np.newaxis]
+        self.raw_data = 1000 * np.sin(
+            frame_numbers
+            / 30
+            * random_number_generator.uniform(0.5, 3, (1, number_of_tracked_points, 3))
+        ) + random_number_generator.normal(
+            0, 5, (number_of_frames, number_of_tracked_points, 3)
+        )
+        self.raw_data[
+            random_number_generator.random((number_of_frames, number_of_tracked_points))
+            < 0.1
+        ] = np.nan
+        self.raw_data[:150, 1] = np.nan  # shows up late
+        self.raw_data[200:450, 2] = np.nan  # long gap
+        self.raw_data[550:, 3] = np.nan  # drops out at the end
+
+    def stream(
+        self,
+        raw_data: np.ndarray,
+        chunk_size_frames: int,
+        number_of_frames_to_add: int = None,
+    ):
+        streaming_filter = StreamingGapFillAndButterworthFilter(
+            number_of_frames=raw_data.shape[0],
+            number_of_tracked_points=raw_data.shape[1],
+            sampling_rate=30,
+            cutoff=7,
+            order=4,
+        )
+        if number_of_frames_to_add is None:
+            number_of_frames_to_add = raw_data.shape[0]
+        for start_frame in range(0, number_of_frames_to_add, chunk_size_frames):
+            streaming_filter.add_frames(
+                raw_data[
+                    start_frame : min(
+                        start_frame + chunk_size_frames, number_of_frames_to_add
+                    )
+                ]
+            )
+        return streaming_filter
+
+    def test_streamed_data_matches_whole_recording(self):
+        expected = butterworth_filter_skeleton(
+            fill_gaps_in_freemocap_data(self.raw_data), 7, 30, 4
+        )
+        for chunk_size_frames in [1, 37, 600]:
+            streaming_filter = self.stream(self.raw_data, chunk_size_frames)
+            np.testing.assert_allclose(
+                streaming_filter.finish(),
+                expected,
+                atol=STREAMING_FILTER_TOLERANCE_MM,
+            )
+
+    def test_frames_get_filtered_before_the_recording_is_done(self):
+        streaming_filter = self.stream(
+            self.raw_data, chunk_size_frames=50, number_of_frames_to_add=300
+        )
+        filtered_frames = streaming_filter.get_filtered_frames(0, 300)
+        expected = butterworth_filter_skeleton(
+            fill_gaps_in_freemocap_data(self.raw_data), 7, 30, 4
+        )
+        # everything but the last few frames of the tracked points that are there from the start
+        np.testing.assert_allclose(
+            filtered_frames[:200, 0],
+            expected[:200, 0],
+            atol=STREAMING_FILTER_TOLERANCE_MM,
+        )
+        # the gap before a tracked point shows up gets filled with values from the whole recording
+        assert np.all(np.isnan(filtered_frames[:150, 1]))
+
+    def test_raw_data_that_changed_gets_redone(self):
+        final_raw_data = self.raw_data.copy()
+        final_raw_data[100:110, 5] = np.nan
+        streaming_filter = self.stream(self.raw_data, chunk_size_frames=50)
+        np.testing.assert_allclose(
+            streaming_filter.finish(final_raw_data),
+            butterworth_filter_skeleton(
+                fill_gaps_in_freemocap_data(final_raw_data), 7, 30, 4
+            ),
+            atol=STREAMING_FILTER_TOLERANCE_MM,
+        )
@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+
+from src.config.home_dir import PUPIL_POSITIONS_CACHE_FILE_NAME
+from src.pupil_labs_stuff.data_classes.pupil_dataclass_and_handler import (
+    PupilDataHandler,
+)
+from src.pupil_labs_stuff.session_data_loader import SessionDataLoader
+
+
+class TestPupilExportLoader(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.session_path = Path(self._temporary_directory.name)
+        pupil_data_path = self.session_path / "pupil_000"
+        self.pupil_positions_path = (
+            pupil_data_path / "exports" / "000" / "pupil_positions.csv"
+        )
+        self.pupil_positions_path.parent.mkdir(parents=True)
+
+        # interleaved eyes and 2d/3d detections, plus some columns we don't use
+        number_of_rows = 400
+        random_number_generator = np.random.default_rng(0)
+        self.pupil_dataframe = pd.DataFrame(
+            {
+                "pupil_timestamp": 1000 + np.arange(number_of_rows) / 240,
+                "world_index": np.arange(number_of_rows) // 8,
+                "eye_id": np.arange(number_of_rows) % 2,
+                "confidence": random_number_generator.uniform(size=number_of_rows),
+                "method": np.where(
+                    np.arange(number_of_rows) % 4 < 2, "2d c++", "pye3d 0.3.0 real-time"
+                ),
+                "theta": random_number_generator.normal(size=number_of_rows),
+                "phi": random_number_generator.normal(size=number_of_rows),
+                "circle_3d_normal_x": random_number_generator.normal(
+                    size=number_of_rows
+                ),
+                "circle_3d_normal_y": random_number_generator.normal(
+                    size=number_of_rows
+                ),
+                "circle_3d_normal_z": random_number_generator.normal(
+                    size=number_of_rows
+                ),
+            }
+        )
+        self.pupil_dataframe.to_csv(self.pupil_positions_path, index=False)
+
+        self.pupil_recording_info_json = {
+            "start_time_synced_s": 990.0,
+            "start_time_system_s": 1644944068.5,
+        }
+        (pupil_data_path / "info.player.json").write_text(
+            json.dumps(self.pupil_recording_info_json)
+        )
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def test_matches_the_dataframe_handler(self):
+        # (the way `SessionDataLoader` used to load it)
+        expected_pupil_data_handler = PupilDataHandler(
+            pd.read_csv(self.pupil_positions_path)
+        )
+        expected_pupil_data_handler.convert_to_unix_timestamps(
+            self.pupil_recording_info_json
+        )
+
+        session_data_loader = SessionDataLoader(self.session_path)
+        # once to parse it, once out of the cache
+        for _ in range(2):
+            pupil_data_handler = session_data_loader.load_pupil_data()
+            for eye_str in ["right", "left"]:
+                expected_eye_data = expected_pupil_data_handler.get_eye_data(eye_str)
+                eye_data = pupil_data_handler.get_eye_data(eye_str)
+                self.assertEqual(eye_data.timestamps.shape, (100,))
+                for field_name in [
+                    "timestamps",
+                    "theta",
+                    "phi",
+                    "pupil_center_normal_x",
+                    "pupil_center_normal_y",
+                    "pupil_center_normal_z",
+                ]:
+                    np.testing.assert_array_equal(
+                        getattr(eye_data, field_name),
+                        getattr(expected_eye_data, field_name),
+                    )
+        self.assertTrue(
+            (
+                self.pupil_positions_path.parent / PUPIL_POSITIONS_CACHE_FILE_NAME
+            ).exists()
+        )
+
+    def test_cache_is_only_used_while_the_csv_is_unchanged(self):
+        session_data_loader = SessionDataLoader(self.session_path)
+        session_data_loader.load_pupil_data()
+
+        with mock.patch(
+            "src.pupil_labs_stuff.pupil_export_loader.parse_pupil_positions_by_eye"
+        ) as parse_pupil_positions_by_eye:
+            session_data_loader.load_pupil_data()
+            parse_pupil_positions_by_eye.assert_not_called()
+
+        # re-exported with shifted timestamps
+        self.pupil_dataframe["pupil_timestamp"] += 1
+        self.pupil_dataframe.to_csv(self.pupil_positions_path, index=False)
+        stat = self.pupil_positions_path.stat()
+        os.utime(
+            self.pupil_positions_path,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9),
+        )
+        right_eye_timestamps = (
+            session_data_loader.load_pupil_data().get_eye_data("right").timestamps
+        )
+        self.assertAlmostEqual(
+            right_eye_timestamps[0],
+            1001
+            + 2 / 240
+            - self.pupil_recording_info_json["start_time_synced_s"]
+            + self.pupil_recording_info_json["start_time_system_s"],
+        )
+
+    def test_freemocap_unix_timestamps(self):
+        unix_timestamps_dataframe = pd.DataFrame(
+            {
+                "Unnamed: 0": [0, 1, 2],
+                "Cam0": [10.0, 11.0, 12.0],
+                "Cam1": [10.2, -1, 12.2],
+                "timestamp_mean": [0, 0, 0],
+            }
+        )
+        unix_timestamps_dataframe.to_csv(
+            self.session_path / "unix_synced_timestamps.csv", index=False
+        )
+        session_data_loader = SessionDataLoader(self.session_path)
+        for _ in range(2):
+            np.testing.assert_allclose(
+                session_data_loader.load_freemocap_unix_timestamps(),
+                [10.1, 11.0, 12.1],
+            )
@@ -0,0 +1,117 @@
+from unittest import TestCase
+
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+from src.pupil_labs_stuff.rotation_matrix_calculator import RotationMatrixCalculator
+
+
+class TestRotationMatrixCalculator(TestCase):
+    def setUp(self):
+        # a head (nose, eyes, ears) turning around, the same way mediapipe lays out the face markers on the body
+        number_of_frames = 200
+        head_markers_xyz = np.array(
+            [
+                [100, 0, 0],  # nose
+                [80, 25, 20],  # left eye inner
+                [80, 35, 20],  # left eye
+                [80, 45, 20],  # left eye outer
+                [80, -25, 20],  # right eye inner
+                [80, -35, 20],  # right eye
+                [80, -45, 20],  # right eye outer
+                [0, 80, 0],  # left ear
+                [0, -80, 0],  # right ear
+            ],
+            dtype=float,
+        )
+        self.true_head_rotations = Rotation.from_rotvec(
+            np.random.default_rng(0).normal(0, 0.5, (number_of_frames, 3))
+        )
+        head_center_fr_xyz = np.cumsum(
+            np.random.default_rng(1).normal(0, 5, (number_of_frames, 3)), axis=0
+        )
+        self.mediapipe_skeleton_fr_mar_xyz = (
+            np.einsum(
+                "fij,mj->fmi", self.true_head_rotations.as_matrix(), head_markers_xyz
+            )
+            + head_center_fr_xyz[:, np.newaxis, :]
+        )
+        self.head_center_fr_xyz = head_center_fr_xyz
+        self.nan_frames = [3, 50, 51]
+        self.mediapipe_skeleton_fr_mar_xyz[self.nan_frames, 7, :] = np.nan
+
+    def test_head_rotation_stack_matches_the_true_head_rotation(self):
+        head_rotation_data = RotationMatrixCalculator(
+            self.mediapipe_skeleton_fr_mar_xyz
+        ).calculate_head_rotation_matricies()
+
+        self.assertEqual(head_rotation_data.rotation_matricies.shape, (200, 3, 3))
+        self.assertTrue(head_rotation_data.rotation_matricies.flags["C_CONTIGUOUS"])
+        self.assertEqual(head_rotation_data.local_origin_fr_xyz.shape, (200, 3))
+
+        valid_frames = np.ones(200, dtype=bool)
+        valid_frames[self.nan_frames] = False
+        np.testing.assert_array_equal(head_rotation_data.valid_frames, valid_frames)
+        self.assertTrue(
+            np.isnan(head_rotation_data.rotation_matricies[self.nan_frames]).all()
+        )
+
+        # the rows are the head's x (nose), y (left ear) and z axes in the world, i.e. the transposed head rotation
+        np.testing.assert_allclose(
+            head_rotation_data.rotation_matricies[valid_frames],
+            np.transpose(self.true_head_rotations.as_matrix()[valid_frames], (0, 2, 1)),
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            head_rotation_data.local_origin_fr_xyz[valid_frames],
+            self.head_center_fr_xyz[valid_frames],
+        )
+
+    def test_quaternion_and_euler_angle_exports(self):
+        head_rotation_data = RotationMatrixCalculator(
+            self.mediapipe_skeleton_fr_mar_xyz
+        ).calculate_head_rotation_matricies()
+        valid_frames = head_rotation_data.valid_frames
+
+        quaternions_fr_wxyz = head_rotation_data.as_quaternions(scalar_first=True)
+        euler_angles_fr_xyz = head_rotation_data.as_euler_angles("xyz", degrees=True)
+        self.assertEqual(quaternions_fr_wxyz.shape, (200, 4))
+        self.assertEqual(euler_angles_fr_xyz.shape, (200, 3))
+        self.assertTrue(np.isnan(quaternions_fr_wxyz[~valid_frames]).all())
+        self.assertTrue(np.isnan(euler_angles_fr_xyz[~valid_frames]).all())
+
+        head_rotations_from_export = Rotation.from_quat(
+            np.roll(quaternions_fr_wxyz[valid_frames], -1, axis=1)
+        )
+        np.testing.assert_allclose(
+            head_rotations_from_export.inv().as_matrix(),
+            self.true_head_rotations[valid_frames].as_matrix(),
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            Rotation.from_euler(
+                "xyz", euler_angles_fr_xyz[valid_frames], degrees=True
+            ).as_matrix(),
+            head_rotation_data.rotation_matricies[valid_frames],
+            atol=1e-12,
+        )
+
+    def test_eye_rotation_stacks(self):
+        rotation_matrix_calculator = RotationMatrixCalculator(
+            self.mediapipe_skeleton_fr_mar_xyz
+        )
+        for eye in ["left", "right"]:
+            eye_socket_rotation_data = (
+                rotation_matrix_calculator.calculate_eye_rotation_matricies(eye)
+            )
+            # the eye markers don't depend on the ear that's missing
+            self.assertTrue(eye_socket_rotation_data.valid_frames.all())
+            np.testing.assert_allclose(
+                np.einsum(
+                    "fij,fkj->fik",
+                    eye_socket_rotation_data.rotation_matricies,
+                    eye_socket_rotation_data.rotation_matricies,
+                ),
+                np.broadcast_to(np.eye(3), (200, 3, 3)),
+                atol=1e-12,
+            )
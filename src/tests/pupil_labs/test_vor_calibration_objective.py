@@ -0,0 +1,86 @@
+from unittest import TestCase
+
+import numpy as np
+from scipy import optimize
+from scipy.spatial.transform import Rotation
+
+from src.benchmarks.vor_calibration_benchmark import (
+    create_synthetic_vor_segment,
+    get_vor_calibration_error_per_frame_loop,
+)
+from src.pupil_labs_stuff.vor_calibration_objective import (
+    VorCalibrationObjective,
+    get_offset_rotation_matrix_and_derivatives,
+)
+
+
+class TestVorCalibrationObjective(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.vor_segment = create_synthetic_vor_segment(number_of_frames=600)
+        cls.objective_arguments = (
+            cls.vor_segment["eye_socket_origin_fr_xyz"],
+            cls.vor_segment["head_rotation_matricies"],
+            cls.vor_segment["fixation_point_fr_xyz"],
+            cls.vor_segment["gaze_fr_xyz"],
+        )
+
+    def test_offset_rotation_matrix_matches_scipy(self):
+        for rotational_offset in [[0, 0, 0], [0.3, -1.2, 2.5], [-2, 0.1, -0.4]]:
+            offset_rotation_matrix, _ = get_offset_rotation_matrix_and_derivatives(
+                rotational_offset
+            )
+            np.testing.assert_allclose(
+                offset_rotation_matrix,
+                Rotation.from_euler("xyz", rotational_offset).as_matrix(),
+                atol=1e-12,
+            )
+
+    def test_error_and_gradient_match_the_per_frame_loop(self):
+        gaze_fr_xyz = self.vor_segment["gaze_fr_xyz"].copy()
+        gaze_fr_xyz[[10, 11, 300], :] = np.nan  # dropped eye tracker frames
+        objective_arguments = self.objective_arguments[:3] + (gaze_fr_xyz,)
+        vor_calibration_objective = VorCalibrationObjective(*objective_arguments)
+
+        rotational_offset = np.array([0.05, 0.02, -0.1])
+        error, error_gradient = vor_calibration_objective.get_error_and_gradient(
+            rotational_offset
+        )
+        self.assertAlmostEqual(
+            error,
+            get_vor_calibration_error_per_frame_loop(
+                rotational_offset, *objective_arguments
+            ),
+            places=8,
+        )
+
+        step_size = 1e-6
+        finite_difference_gradient = [
+            (
+                get_vor_calibration_error_per_frame_loop(
+                    rotational_offset + step_size * unit_vector, *objective_arguments
+                )
+                - get_vor_calibration_error_per_frame_loop(
+                    rotational_offset - step_size * unit_vector, *objective_arguments
+                )
+            )
+            / (2 * step_size)
+            for unit_vector in np.eye(3)
+        ]
+        np.testing.assert_allclose(
+            error_gradient, finite_difference_gradient, rtol=1e-5, atol=1e-4
+        )
+
+    def test_least_squares_recovers_the_rotational_offset(self):
+        vor_calibration_objective = VorCalibrationObjective(*self.objective_arguments)
+        optimization_results = optimize.least_squares(
+            vor_calibration_objective.get_error,
+            [0, 0, 0],
+            jac=vor_calibration_objective.get_jacobian,
+            gtol=1e-10,
+        )
+        np.testing.assert_allclose(
+            optimization_results.x,
+            self.vor_segment["true_rotational_offset"],
+            atol=2e-3,
+        )
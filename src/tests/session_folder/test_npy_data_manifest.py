@@ -0,0 +1,61 @@
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.config.home_dir import DATA_MANIFEST_FILE_NAME
+from src.core_processes.utils.npy_data_manifest import (
+    check_npy_against_data_manifest,
+    save_npy_and_record_in_data_manifest,
+)
+
+
+class NpyDataManifestTestCase(TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.npy_file_path = Path(self.temp_folder.name) / "data.npy"
+        self.data = np.random.default_rng(0).normal(size=(100, 543, 3))
+        self.data[:10, 0] = np.nan
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def test_manifest_entry_matches_saved_file(self):
+        entry = save_npy_and_record_in_data_manifest(self.npy_file_path, self.data)
+
+        assert np.array_equal(np.load(self.npy_file_path), self.data, equal_nan=True)
+        assert (
+            entry["sha256"]
+            == hashlib.sha256(self.npy_file_path.read_bytes()).hexdigest()
+        )
+        assert entry["shape"] == [100, 543, 3]
+        assert entry["dtype"] == "float64"
+        assert entry["number_of_nans"] == 30
+        assert (
+            json.loads(
+                (Path(self.temp_folder.name) / DATA_MANIFEST_FILE_NAME).read_text()
+            )["data.npy"]
+            == entry
+        )
+
+        check_npy_against_data_manifest(
+            self.npy_file_path,
+            expected_shape=self.data.shape,
+            expected_dtype="float64",
+            verify_checksum=True,
+        )
+
+    def test_changed_files_fail_the_check(self):
+        save_npy_and_record_in_data_manifest(self.npy_file_path, self.data)
+
+        with self.assertRaises(ValueError):
+            check_npy_against_data_manifest(
+                self.npy_file_path, expected_shape=(99, 543, 3)
+            )
+
+        np.save(self.npy_file_path, self.data[:50])
+        with self.assertRaises(ValueError):
+            check_npy_against_data_manifest(self.npy_file_path)
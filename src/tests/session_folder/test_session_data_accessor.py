@@ -0,0 +1,73 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.config.home_dir import (
+    MEDIAPIPE_2D_NPY_FILE_NAME,
+    MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+    RAW_DATA_FOLDER_NAME,
+)
+from src.core_processes.mediapipe_stuff.session_data_accessor import (
+    MEDIAPIPE_2D_DATA_NAME,
+    POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME,
+    SessionDataAccessor,
+)
+
+
+class SessionDataAccessorTestCase(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.output_data_folder_path = Path(self._temporary_directory.name)
+        (self.output_data_folder_path / RAW_DATA_FOLDER_NAME).mkdir()
+
+        random_number_generator = np.random.default_rng(0)
+        self.mediapipe_2d_data = random_number_generator.random((3, 50, 10, 2))
+        self.skeleton_3d_data = random_number_generator.random((50, 10, 3))
+        np.save(
+            self.output_data_folder_path
+            / RAW_DATA_FOLDER_NAME
+            / MEDIAPIPE_2D_NPY_FILE_NAME,
+            self.mediapipe_2d_data,
+        )
+        np.save(
+            self.output_data_folder_path / MEDIAPIPE_3D_ORIGIN_ALIGNED_NPY_FILE_NAME,
+            self.skeleton_3d_data,
+        )
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def test_arrays_are_memory_mapped_and_opened_lazily(self):
+        with SessionDataAccessor(self.output_data_folder_path) as accessor:
+            assert accessor._opened_arrays == {}
+            assert isinstance(accessor.post_processed_mediapipe_3d_data, np.memmap)
+            assert list(accessor._opened_arrays) == [
+                POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME
+            ]
+        assert accessor._opened_arrays == {}
+
+    def test_frame_and_marker_slices(self):
+        with SessionDataAccessor(self.output_data_folder_path) as accessor:
+            assert accessor.get_number_of_frames(MEDIAPIPE_2D_DATA_NAME) == 50
+            np.testing.assert_array_equal(
+                accessor.get_frames(POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME, 7),
+                self.skeleton_3d_data[7],
+            )
+            np.testing.assert_array_equal(
+                accessor.get_frames(MEDIAPIPE_2D_DATA_NAME, 10, 20),
+                self.mediapipe_2d_data[:, 10:20],
+            )
+            marker_range = accessor.get_marker_range(
+                POST_PROCESSED_MEDIAPIPE_3D_DATA_NAME, 2, 5, start_frame=40
+            )
+        # slices are plain in-memory copies, so they outlive the accessor
+        assert not isinstance(marker_range, np.memmap)
+        np.testing.assert_array_equal(marker_range, self.skeleton_3d_data[40:, 2:5])
+
+    def test_missing_data(self):
+        with SessionDataAccessor(self.output_data_folder_path) as accessor:
+            assert not accessor.has_data("raw_mediapipe_3d")
+            with self.assertRaises(FileNotFoundError):
+                accessor.raw_mediapipe_3d_data
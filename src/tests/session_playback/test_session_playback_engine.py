@@ -0,0 +1,152 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from src.gui.main.visualize_session.session_playback_engine import (
+    PlaybackClock,
+    SessionPlaybackEngine,
+    VideoFrameDecoder,
+)
+
+NUMBER_OF_FRAMES = 40
+
+
+def read_all_frames(video_path: str) -> list:
+    video_capture = cv2.VideoCapture(video_path)
+    list_of_images = []
+    while True:
+        success, image = video_capture.read()
+        if not success:
+            break
+        list_of_images.append(image)
+    video_capture.release()
+    return list_of_images
+
+
+def wait_for_frame(video_frame_decoder: VideoFrameDecoder, frame_number: int):
+    for _ in range(1000):
+        decoded_frame = video_frame_decoder.get_frame(frame_number)
+        if decoded_frame is not None and decoded_frame[0] == frame_number:
+            return decoded_frame[1]
+        time.sleep(0.005)
+    raise TimeoutError(f"frame {frame_number} never got decoded")
+
+
+class TestSessionPlaybackEngine(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temporary_directory = tempfile.TemporaryDirectory()
+        random_number_generator = np.random.default_rng(0)
+        cls.list_of_video_paths = []
+        for video_number in range(2):
+            video_path = str(
+                Path(cls._temporary_directory.name) / f"cam_{video_number}.mp4"
+            )
+            video_writer = cv2.VideoWriter(
+                video_path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48)
+            )
+            for _ in range(NUMBER_OF_FRAMES):
+                video_writer.write(
+                    random_number_generator.integers(
+                        0, 255, (48, 64, 3), dtype=np.uint8
+                    )
+                )
+            video_writer.release()
+            cls.list_of_video_paths.append(video_path)
+        cls.sequential_frames = read_all_frames(cls.list_of_video_paths[0])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._temporary_directory.cleanup()
+
+    def test_seeking_lands_on_the_same_frame_as_reading_through(self):
+        video_frame_decoder = VideoFrameDecoder(
+            self.list_of_video_paths[0], number_of_frames=NUMBER_OF_FRAMES
+        )
+        try:
+            for frame_number in [0, 1, 2, 25, 7, 39, 13]:
+                video_frame_decoder.seek(frame_number)
+                np.testing.assert_array_equal(
+                    wait_for_frame(video_frame_decoder, frame_number),
+                    self.sequential_frames[frame_number],
+                )
+        finally:
+            video_frame_decoder.close()
+
+    def test_clock_skips_frames_instead_of_drifting(self):
+        fake_time = [0.0]
+        playback_clock = PlaybackClock(
+            frames_per_second=10, number_of_frames=100, get_time=lambda: fake_time[0]
+        )
+        playback_clock.play()
+        fake_time[0] = 0.25
+        self.assertEqual(playback_clock.get_current_frame_number(), 2)
+        # a slow frame doesn't push the rest back
+        fake_time[0] = 1.05
+        self.assertEqual(playback_clock.get_current_frame_number(), 10)
+        self.assertAlmostEqual(playback_clock.get_seconds_until_next_frame(), 0.05)
+
+        playback_clock.pause()
+        fake_time[0] = 5.0
+        self.assertEqual(playback_clock.get_current_frame_number(), 10)
+        playback_clock.seek(95)
+        playback_clock.play()
+        fake_time[0] = 5.85
+        self.assertEqual(playback_clock.get_current_frame_number(), 3)
+
+    def test_stepping_through_shows_every_frame_of_every_video(self):
+        fake_time = [0.0]
+        with SessionPlaybackEngine(
+            self.list_of_video_paths,
+            frames_per_second=30,
+            buffer_size_frames=8,
+            get_time=lambda: fake_time[0],
+        ) as playback_engine:
+            self.assertEqual(playback_engine.number_of_frames, NUMBER_OF_FRAMES)
+            playback_engine.play()
+            for frame_number in range(NUMBER_OF_FRAMES + 5):
+                fake_time[0] = (frame_number + 0.5) / 30
+                video_images = {}
+                for _ in range(1000):
+                    (
+                        current_frame_number,
+                        new_video_images,
+                    ) = playback_engine.get_new_frames()
+                    video_images.update(new_video_images)
+                    if len(video_images) == len(self.list_of_video_paths):
+                        break
+                    time.sleep(0.005)
+                self.assertEqual(current_frame_number, frame_number % NUMBER_OF_FRAMES)
+                np.testing.assert_array_equal(
+                    video_images["cam_0"],
+                    self.sequential_frames[frame_number % NUMBER_OF_FRAMES],
+                )
+            for video_statistics in playback_engine.get_playback_statistics().values():
+                self.assertEqual(video_statistics["number_of_frames_dropped"], 0)
+
+    def test_frames_that_cant_be_read_dont_get_shown(self):
+        # says the videos are longer than they are, so the last few frames fail to read
+        with SessionPlaybackEngine(
+            self.list_of_video_paths,
+            frames_per_second=30,
+            number_of_frames=NUMBER_OF_FRAMES + 5,
+        ) as playback_engine:
+            for frame_number in [NUMBER_OF_FRAMES - 1, NUMBER_OF_FRAMES + 2]:
+                playback_engine.seek(frame_number)
+                video_images = {}
+                for _ in range(200):
+                    _, new_video_images = playback_engine.get_new_frames()
+                    video_images.update(new_video_images)
+                    time.sleep(0.005)
+                if frame_number < NUMBER_OF_FRAMES:
+                    np.testing.assert_array_equal(
+                        video_images["cam_0"], self.sequential_frames[frame_number]
+                    )
+                else:
+                    self.assertEqual(video_images, {})
+            for video_statistics in playback_engine.get_playback_statistics().values():
+                self.assertGreater(video_statistics["number_of_failed_reads"], 0)
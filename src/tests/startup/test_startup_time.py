@@ -0,0 +1,122 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest import TestCase, skipUnless
+
+REPOSITORY_ROOT_PATH = Path(__file__).parent.parent.parent.parent
+
+# cold start (fresh interpreter, import + create) on a lab machine
+API_STARTUP_TIME_BUDGET_SECONDS = 1.0
+GUI_STARTUP_TIME_BUDGET_SECONDS = 1.0
+NUMBER_OF_STARTUP_RUNS = 3
+
+# these should only get imported once a route/panel actually needs them
+API_MODULES_THAT_SHOULD_LOAD_LAZILY = [
+    "mediapipe",
+    "cv2",
+    "scipy",
+    "pandas",
+    "aniposelib",
+    "PyQt6",
+    "pyqtgraph",
+]
+GUI_MODULES_THAT_SHOULD_LOAD_LAZILY = ["mediapipe", "scipy", "pandas", "aniposelib"]
+
+MEASURE_API_STARTUP_CODE = """
+import time
+start_time = time.perf_counter()
+from src.api.app_factory import create_app
+create_app()
+"""
+
+MEASURE_GUI_STARTUP_CODE = """
+import time
+start_time = time.perf_counter()
+from src.gui.main.app import get_qt_app
+from src.gui.main.main_window.main_window import MainWindow
+app = get_qt_app()
+main_window = MainWindow()
+"""
+
+REPORT_STARTUP_CODE = """
+import json, sys
+print(json.dumps({"startup_time_seconds": time.perf_counter() - start_time, "loaded_modules": sorted(sys.modules)}))
+"""
+
+
+def measure_startup(measure_startup_code: str) -> dict:
+    """runs the code in a fresh interpreter, so nothing is imported yet"""
+    completed_process = subprocess.run(
+        [sys.executable, "-c", measure_startup_code + REPORT_STARTUP_CODE],
+        cwd=str(REPOSITORY_ROOT_PATH),
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                [str(REPOSITORY_ROOT_PATH), os.environ.get("PYTHONPATH", "")]
+            ),
+            "QT_QPA_PLATFORM": "offscreen",
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed_process.stdout.strip().splitlines()[-1])
+
+
+class StartupTimeTestCase(TestCase):
+    def check_startup(
+        self,
+        measure_startup_code: str,
+        startup_time_budget_seconds: float,
+        modules_that_should_load_lazily: list,
+    ):
+        startup_measurements = [
+            measure_startup(measure_startup_code) for _ in range(NUMBER_OF_STARTUP_RUNS)
+        ]
+        fastest_startup_time_seconds = min(
+            startup_measurement["startup_time_seconds"]
+            for startup_measurement in startup_measurements
+        )
+
+        loaded_top_level_modules = {
+            module_name.split(".")[0]
+            for module_name in startup_measurements[0]["loaded_modules"]
+        }
+        self.assertEqual(
+            [
+                module_name
+                for module_name in modules_that_should_load_lazily
+                if module_name in loaded_top_level_modules
+            ],
+            [],
+        )
+        self.assertLess(
+            fastest_startup_time_seconds,
+            startup_time_budget_seconds,
+            f"startup took {fastest_startup_time_seconds:.3f}s (fastest of {NUMBER_OF_STARTUP_RUNS} runs)",
+        )
+
+    @skipUnless(
+        importlib.util.find_spec("fastapi") and importlib.util.find_spec("uvicorn"),
+        "needs the api dependencies",
+    )
+    def test_api_startup(self):
+        self.check_startup(
+            MEASURE_API_STARTUP_CODE,
+            API_STARTUP_TIME_BUDGET_SECONDS,
+            API_MODULES_THAT_SHOULD_LOAD_LAZILY,
+        )
+
+    @skipUnless(
+        importlib.util.find_spec("PyQt6") and importlib.util.find_spec("pyqtgraph"),
+        "needs the gui dependencies",
+    )
+    def test_gui_startup(self):
+        self.check_startup(
+            MEASURE_GUI_STARTUP_CODE,
+            GUI_STARTUP_TIME_BUDGET_SECONDS,
+            GUI_MODULES_THAT_SHOULD_LOAD_LAZILY,
+        )
@@ -0,0 +1,192 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from src.config.home_dir import (
+    FRAME_TIMING_NPZ_FILE_NAME,
+    FRAME_TIMING_REPORT_JSON_FILE_NAME,
+)
+from src.core_processes.utils.session_frame_timing import (
+    TIMESTAMPS_FOLDER_NAME,
+    find_dropped_and_duplicated_frames,
+    load_session_frame_timing,
+    reindex_onto_common_time_base,
+    save_session_frame_timing,
+)
+
+FRAMES_PER_SECOND = 30
+
+
+def create_camera_timestamps(
+    number_of_frames: int,
+    start_time: float = 1.0,
+    dropped_frames=(),
+    duplicated_frames=(),
+    jitter_seconds: float = 0.003,
+    random_seed: int = 0,
+) -> np.ndarray:
+    """
+    timestamps (seconds from record start) the way `save_synchronized_videos` leaves them - dropped frames are gone,
+    duplicated frames show up twice
+    """
+    timestamps = (
+        start_time
+        + np.arange(number_of_frames) / FRAMES_PER_SECOND
+        + np.random.default_rng(random_seed).uniform(
+            -jitter_seconds, jitter_seconds, number_of_frames
+        )
+    )
+    timestamps = np.delete(timestamps, list(dropped_frames))
+    return np.sort(np.concatenate([timestamps, timestamps[list(duplicated_frames)]]))
+
+
+class TestSessionFrameTiming(TestCase):
+    def setUp(self):
+        self._temporary_directory = tempfile.TemporaryDirectory()
+        self.synchronized_videos_folder_path = (
+            Path(self._temporary_directory.name) / "synchronized_videos"
+        )
+        (self.synchronized_videos_folder_path / TIMESTAMPS_FOLDER_NAME).mkdir(
+            parents=True
+        )
+
+    def tearDown(self):
+        self._temporary_directory.cleanup()
+
+    def save_camera_timestamps(self, camera_name: str, timestamps: np.ndarray):
+        (self.synchronized_videos_folder_path / f"{camera_name}.mp4").touch()
+        np.save(
+            self.synchronized_videos_folder_path
+            / TIMESTAMPS_FOLDER_NAME
+            / f"{camera_name}_binary.npy",
+            timestamps,
+        )
+
+    def test_finds_dropped_and_duplicated_frames(self):
+        camera_report = find_dropped_and_duplicated_frames(
+            create_camera_timestamps(
+                300, dropped_frames=[100, 200, 201, 202], duplicated_frames=[50]
+            )
+        )
+        self.assertAlmostEqual(
+            camera_report["frames_per_second"], FRAMES_PER_SECOND, delta=0.5
+        )
+        self.assertEqual(camera_report["number_of_duplicated_frames"], 1)
+        self.assertEqual(camera_report["duplicated_frame_indices"], [51])
+        self.assertEqual(camera_report["number_of_dropped_frames"], 4)
+        self.assertEqual(
+            [
+                (gap["after_frame_index"], gap["number_of_frames_dropped"])
+                for gap in camera_report["dropped_frame_gaps"]
+            ],
+            [(100, 1), (199, 3)],
+        )
+
+    def test_frame_index_maps_line_the_cameras_up(self):
+        # camera 0 starts a couple of frames late, camera 1 drops frames (and repeats one), camera 2 is fine
+        self.save_camera_timestamps(
+            "Camera_000",
+            create_camera_timestamps(298, start_time=1 + 2 / FRAMES_PER_SECOND),
+        )
+        self.save_camera_timestamps(
+            "Camera_001",
+            create_camera_timestamps(
+                300, dropped_frames=[100, 150, 151], duplicated_frames=[20]
+            ),
+        )
+        self.save_camera_timestamps(
+            "Camera_002", create_camera_timestamps(300, random_seed=2)
+        )
+
+        session_frame_timing = load_session_frame_timing(
+            self.synchronized_videos_folder_path
+        )
+        self.assertEqual(
+            sorted(session_frame_timing.camera_names),
+            ["Camera_000", "Camera_001", "Camera_002"],
+        )
+        self.assertEqual(session_frame_timing.number_of_frames, 298)
+        self.assertAlmostEqual(
+            session_frame_timing.frames_per_second, FRAMES_PER_SECOND, delta=0.5
+        )
+
+        frame_index_maps_by_camera = dict(
+            zip(
+                session_frame_timing.camera_names, session_frame_timing.frame_index_maps
+            )
+        )
+        np.testing.assert_array_equal(
+            frame_index_maps_by_camera["Camera_000"], np.arange(298)
+        )
+        np.testing.assert_array_equal(
+            frame_index_maps_by_camera["Camera_002"], np.arange(2, 300)
+        )
+        # original frame `n` of camera 1 is at common frame `n - 2`
+        camera_1_frame_index_map = frame_index_maps_by_camera["Camera_001"]
+        missing_common_frames = np.flatnonzero(np.isnan(camera_1_frame_index_map))
+        np.testing.assert_array_equal(missing_common_frames, [98, 148, 149])
+        # (one extra frame in the video for the duplicate, one less for each drop before it)
+        self.assertEqual(camera_1_frame_index_map[10], 12)
+        self.assertEqual(camera_1_frame_index_map[30], 33)
+        self.assertEqual(camera_1_frame_index_map[99], 101)
+        self.assertEqual(camera_1_frame_index_map[150], 150)
+        # no video frame gets used twice
+        used_frames = camera_1_frame_index_map[~np.isnan(camera_1_frame_index_map)]
+        self.assertEqual(np.unique(used_frames).size, used_frames.size)
+
+        # e.g. the mediapipe 2d data - [number_of_cameras, number_of_video_frames, number_of_tracked_points, XY]
+        camera_names = session_frame_timing.camera_names
+        number_of_video_frames = max(
+            np.load(
+                self.synchronized_videos_folder_path
+                / TIMESTAMPS_FOLDER_NAME
+                / f"{camera_name}_binary.npy"
+            ).shape[0]
+            for camera_name in camera_names
+        )
+        data2d_cams_frames_mar_xy = np.random.default_rng(0).normal(
+            size=(len(camera_names), number_of_video_frames, 5, 2)
+        )
+        reindexed_data2d = reindex_onto_common_time_base(
+            data2d_cams_frames_mar_xy, session_frame_timing.frame_index_maps
+        )
+        self.assertEqual(reindexed_data2d.shape, (3, 298, 5, 2))
+        camera_1_number = camera_names.index("Camera_001")
+        self.assertTrue(np.isnan(reindexed_data2d[camera_1_number, 98]).all())
+        np.testing.assert_array_equal(
+            reindexed_data2d[camera_1_number, 99],
+            data2d_cams_frames_mar_xy[camera_1_number, 101],
+        )
+
+        save_session_frame_timing(
+            session_frame_timing, self.synchronized_videos_folder_path.parent
+        )
+        frame_timing_report = json.loads(
+            (
+                self.synchronized_videos_folder_path.parent
+                / FRAME_TIMING_REPORT_JSON_FILE_NAME
+            ).read_text()
+        )
+        self.assertEqual(
+            {
+                camera_report["camera_name"]: camera_report["number_of_dropped_frames"]
+                for camera_report in frame_timing_report["cameras"]
+            },
+            {"Camera_000": 0, "Camera_001": 3, "Camera_002": 0},
+        )
+        with np.load(
+            self.synchronized_videos_folder_path.parent / FRAME_TIMING_NPZ_FILE_NAME
+        ) as frame_timing_npz:
+            np.testing.assert_array_equal(
+                frame_timing_npz["frame_index_maps"],
+                session_frame_timing.frame_index_maps,
+            )
+
+    def test_sessions_without_timestamps(self):
+        (self.synchronized_videos_folder_path / "Camera_000.mp4").touch()
+        self.assertIsNone(
+            load_session_frame_timing(self.synchronized_videos_folder_path)
+        )
@@ -0,0 +1,167 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.core_processes.utils.timestamped_stream_resampling import (
+    get_frame_range_within_time_span,
+    resample_to_timestamps,
+    synchronize_timestamped_streams,
+)
+
+
+def create_synthetic_stream(
+    frames_per_second: float, start_time: float, duration_seconds: float
+):
+    """timestamps (with a bit of jitter) and [x, 2x, -x] position data that's a straight line in time"""
+    random_number_generator = np.random.default_rng(int(frames_per_second))
+    timestamps = start_time + np.arange(0, duration_seconds, 1 / frames_per_second)
+    timestamps += random_number_generator.uniform(
+        0, 0.2 / frames_per_second, timestamps.shape
+    )
+    return timestamps, np.column_stack([timestamps, 2 * timestamps, -timestamps])
+
+
+class TestTimestampedStreamResampling(TestCase):
+    def test_batched_resampling_matches_np_interp_on_every_channel(self):
+        random_number_generator = np.random.default_rng(0)
+        source_timestamps = np.cumsum(random_number_generator.uniform(0.001, 0.02, 200))
+        source_data = random_number_generator.normal(0, 1, (200, 7, 3))
+        # including times before and after the source data
+        target_timestamps = np.linspace(
+            source_timestamps[0] - 0.1, source_timestamps[-1] + 0.1, 333
+        )
+
+        resampled_data = resample_to_timestamps(
+            source_timestamps, source_data, target_timestamps
+        )
+
+        self.assertEqual(resampled_data.shape, (333, 7, 3))
+        for marker_number in range(7):
+            for dimension in range(3):
+                np.testing.assert_allclose(
+                    resampled_data[:, marker_number, dimension],
+                    np.interp(
+                        target_timestamps,
+                        source_timestamps,
+                        source_data[:, marker_number, dimension],
+                    ),
+                )
+
+    def test_nans_only_spread_as_far_as_np_interp_spreads_them(self):
+        source_timestamps = np.array([0.0, 1.0, 2.0, 3.0])
+        target_timestamps = np.array([-1.0, 0.0, 0.5, 1.0, 2.0, 2.5, 3.0, 4.0])
+        for source_data in [
+            np.array([1.0, np.nan, 3.0, 4.0]),
+            np.array([1.0, 2.0, np.nan, 4.0]),
+            np.array([np.nan, 2.0, 3.0, np.nan]),
+        ]:
+            np.testing.assert_array_equal(
+                resample_to_timestamps(
+                    source_timestamps, source_data, target_timestamps
+                ),
+                np.interp(target_timestamps, source_timestamps, source_data),
+            )
+
+        # e.g. a tracked point that drops out on some frames
+        random_number_generator = np.random.default_rng(1)
+        source_timestamps = np.cumsum(random_number_generator.uniform(0.001, 0.02, 100))
+        source_data = random_number_generator.normal(0, 1, (100, 5))
+        source_data[
+            random_number_generator.uniform(size=source_data.shape) < 0.2
+        ] = np.nan
+        target_timestamps = np.sort(
+            np.concatenate(
+                [
+                    source_timestamps[::3],
+                    random_number_generator.uniform(
+                        source_timestamps[0] - 0.1, source_timestamps[-1] + 0.1, 200
+                    ),
+                ]
+            )
+        )
+        resampled_data = resample_to_timestamps(
+            source_timestamps, source_data, target_timestamps
+        )
+        for channel_number in range(5):
+            np.testing.assert_allclose(
+                resampled_data[:, channel_number],
+                np.interp(
+                    target_timestamps,
+                    source_timestamps,
+                    source_data[:, channel_number],
+                ),
+            )
+
+    def test_streams_line_up_whichever_one_is_faster(self):
+        eye_timestamps, eye_data = create_synthetic_stream(
+            frames_per_second=120, start_time=1000.3, duration_seconds=10
+        )
+        for mocap_frames_per_second in [30, 240]:
+            mocap_timestamps, mocap_data = create_synthetic_stream(
+                frames_per_second=mocap_frames_per_second,
+                start_time=1000.0,
+                duration_seconds=9,
+            )
+            (
+                synchronized_timestamps,
+                synchronized_data,
+            ) = synchronize_timestamped_streams(
+                timestamps_by_stream={"mocap": mocap_timestamps, "eye": eye_timestamps},
+                data_by_stream={"mocap": mocap_data, "eye": eye_data},
+                reference_stream_name="mocap",
+            )
+
+            start_frame, end_frame = get_frame_range_within_time_span(
+                mocap_timestamps, eye_timestamps[0], mocap_timestamps[-1]
+            )
+            np.testing.assert_array_equal(
+                synchronized_timestamps, mocap_timestamps[start_frame:end_frame]
+            )
+            np.testing.assert_array_equal(
+                synchronized_data["mocap"], mocap_data[start_frame:end_frame]
+            )
+            # a straight line in time comes out exact at the reference timestamps
+            np.testing.assert_allclose(
+                synchronized_data["eye"], synchronized_data["mocap"]
+            )
+
+    def test_default_reference_is_the_fastest_stream(self):
+        slow_timestamps, slow_data = create_synthetic_stream(30, 0, 5)
+        fast_timestamps, fast_data = create_synthetic_stream(200, 0.5, 5)
+
+        synchronized_timestamps, synchronized_data = synchronize_timestamped_streams(
+            timestamps_by_stream={"slow": slow_timestamps, "fast": fast_timestamps},
+            data_by_stream={"slow": slow_data, "fast": fast_data},
+        )
+
+        self.assertGreater(synchronized_timestamps.shape[0], 800)
+        self.assertTrue(np.all(np.isin(synchronized_timestamps, fast_timestamps)))
+        self.assertGreaterEqual(synchronized_timestamps[0], 0.5)
+        self.assertLessEqual(synchronized_timestamps[-1], slow_timestamps[-1])
+        np.testing.assert_allclose(synchronized_data["slow"], synchronized_data["fast"])
+
+    def test_clock_offsets_get_applied_before_lining_up(self):
+        mocap_timestamps, mocap_data = create_synthetic_stream(30, 0, 5)
+        eye_timestamps, eye_data = create_synthetic_stream(120, 0, 5)
+        # the eye tracker's clock is 100 seconds ahead (its data still is in mocap time)
+        eye_timestamps_on_eye_clock = eye_timestamps + 100
+
+        synchronized_timestamps, synchronized_data = synchronize_timestamped_streams(
+            timestamps_by_stream={
+                "mocap": mocap_timestamps,
+                "eye": eye_timestamps_on_eye_clock,
+            },
+            data_by_stream={"mocap": mocap_data, "eye": eye_data},
+            reference_stream_name="mocap",
+            clock_offsets_seconds={"eye": -100},
+        )
+        np.testing.assert_allclose(synchronized_data["eye"], synchronized_data["mocap"])
+
+        with self.assertRaises(ValueError):
+            synchronize_timestamped_streams(
+                timestamps_by_stream={
+                    "mocap": mocap_timestamps,
+                    "eye": eye_timestamps_on_eye_clock,
+                },
+                data_by_stream={"mocap": mocap_data, "eye": eye_data},
+            )
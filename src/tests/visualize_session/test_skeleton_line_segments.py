@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.gui.main.visualize_session.skeleton_line_segments import (
+    gather_line_segment_vertices,
+    get_connection_index_array,
+)
+
+
+class TestSkeletonLineSegments(TestCase):
+    def test_one_gather_matches_indexing_every_connection(self):
+        random_number_generator = np.random.default_rng(0)
+        skeleton_xyz = random_number_generator.normal(0, 1e3, (40, 3))
+        hand_connections = [(0, 1), (1, 2), (2, 3), (0, 5), (5, 6)]
+        connection_index_array = get_connection_index_array(
+            hand_connections, first_tracked_point_index=33
+        )
+
+        vertex_buffer = np.empty((2 * len(hand_connections), 3), dtype=np.float32)
+        vertex_buffer_out = gather_line_segment_vertices(
+            skeleton_xyz, connection_index_array, out=vertex_buffer
+        )
+        self.assertIs(vertex_buffer_out, vertex_buffer)
+
+        expected_vertices = np.vstack(
+            [skeleton_xyz[[start + 33, end + 33], :] for start, end in hand_connections]
+        )
+        np.testing.assert_allclose(vertex_buffer, expected_vertices, rtol=1e-6)
+
+        # the buffer gets reused for the next frame
+        gather_line_segment_vertices(
+            skeleton_xyz + 1, connection_index_array, out=vertex_buffer
+        )
+        np.testing.assert_allclose(vertex_buffer, expected_vertices + 1, rtol=1e-6)